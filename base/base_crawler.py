@@ -10,9 +10,10 @@
 
 
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
-from playwright.async_api import BrowserContext, BrowserType, Playwright
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, BrowserType, Playwright
 
 
 class AbstractCrawler(ABC):
@@ -31,8 +32,8 @@ class AbstractCrawler(ABC):
         pass
 
     @abstractmethod
-    async def launch_browser(self, chromium: BrowserType, playwright_proxy: Optional[Dict], user_agent: Optional[str],
-                             headless: bool = True) -> BrowserContext:
+    async def launch_browser(self, chromium: "BrowserType", playwright_proxy: Optional[Dict], user_agent: Optional[str],
+                             headless: bool = True) -> "BrowserContext":
         """
         launch browser
         :param chromium: chromium browser
@@ -43,8 +44,8 @@ class AbstractCrawler(ABC):
         """
         pass
 
-    async def launch_browser_with_cdp(self, playwright: Playwright, playwright_proxy: Optional[Dict],
-                                     user_agent: Optional[str], headless: bool = True) -> BrowserContext:
+    async def launch_browser_with_cdp(self, playwright: "Playwright", playwright_proxy: Optional[Dict],
+                                     user_agent: Optional[str], headless: bool = True) -> "BrowserContext":
         """
         使用CDP模式启动浏览器（可选实现）
         :param playwright: playwright实例
@@ -100,10 +101,38 @@ class AbstractStoreImage(ABC):
 
 
 class AbstractApiClient(ABC):
+    # 代理池登记客户端时设置(ProxyIpPool.register_client), 请求结果上报计入当前IP的健康度
+    proxy_pool = None
+    proxy_info = None
+
     @abstractmethod
     async def request(self, method, url, **kwargs):
         pass
 
     @abstractmethod
-    async def update_cookies(self, browser_context: BrowserContext):
+    async def update_cookies(self, browser_context: "BrowserContext"):
         pass
+
+    async def update_proxy(self, ip_proxy_info):
+        """
+        热切换客户端使用的代理IP, 代理池在IP即将过期时会调用该方法
+        :param ip_proxy_info: 新的代理IP信息(IpInfoModel)
+        :return:
+        """
+        # fix circular import issue
+        from tools.utils import format_proxy_info
+        _, self.proxies = format_proxy_info(ip_proxy_info)
+
+    async def report_proxy_result(self, is_success: bool, latency: float) -> None:
+        """
+        向代理池上报使用当前代理IP的请求结果, 没有使用代理池时忽略
+        :param is_success:
+        :param latency: 请求耗时(秒)
+        :return:
+        """
+        if self.proxy_pool is None or self.proxy_info is None:
+            return
+        if is_success:
+            await self.proxy_pool.report_success(self.proxy_info, latency)
+        else:
+            await self.proxy_pool.report_failure(self.proxy_info)
@@ -0,0 +1,262 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 大量指定ID的详情爬取: 从文件或标准输入逐行读取ID, 同时进行的任务数有上限, 完成一个保存一个,
+#             按输入顺序记录已完成的ID数作为断点, 中断后重新运行跳过已完成的部分, 内存占用不随ID数量增长
+
+import asyncio
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import config
+from base.session_pool import get_session_config
+from tools import json_codec, utils
+
+STDIN_SOURCE = "-"
+# 支持从 SPECIFIED_ID_FILE 读取ID的平台
+STREAM_DETAIL_PLATFORMS = ("xhs", "dy", "bili")
+
+
+async def read_ids(source: str) -> AsyncIterator[str]:
+    """
+    逐批读取ID, 每行一个, 忽略空行和 # 开头的行, 读取在线程池中进行, 等待标准输入时不阻塞事件循环
+    :param source: 文件路径, "-" 为标准输入
+    :return:
+    """
+    file = sys.stdin if source == STDIN_SOURCE else open(source, encoding="utf-8")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            lines = await loop.run_in_executor(None, file.readlines, 64 * 1024)
+            if not lines:
+                return
+            for line in lines:
+                item_id = line.strip()
+                if item_id and not item_id.startswith("#"):
+                    yield item_id
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+class DetailCheckpoint:
+    def __init__(self, path: str, save_interval: float = 1.0):
+        """
+        断点记录输入中从头开始连续完成的ID数和这些ID的sha256, 任务乱序完成时只在内存中记住窗口内已完成的ID,
+        重新运行时先核对输入的前缀和断点一致再跳过, 断点之后已经完成的少量ID(最多一个窗口)会重新爬取
+        :param path: 断点文件路径
+        :param save_interval: 保存断点的最小间隔(秒)
+        """
+        self.path = path
+        self.save_interval = save_interval
+        self.done = 0
+        self.digest = ""
+        self._hash = hashlib.sha256()
+        self._finished: Dict[int, str] = {}
+        self._saved_at = 0.0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = json_codec.loads(f.read())
+            self.done, self.digest = state.get("done", 0), state.get("digest", "")
+
+    @classmethod
+    def for_source(cls, platform: str, source: str, shard: Tuple[int, int] = (0, 1)) -> "DetailCheckpoint":
+        """
+        按平台、ID来源和分片生成断点文件, 保存在 SPECIFIED_ID_CHECKPOINT_DIR 下
+        :param platform:
+        :param source: 文件路径, "-" 为标准输入
+        :param shard: (分片序号, 分片数)
+        :return:
+        """
+        name = "stdin" if source == STDIN_SOURCE else hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:12]
+        if shard[1] > 1:
+            name = f"{name}_shard{shard[0]}of{shard[1]}"
+        return cls(os.path.join(config.SPECIFIED_ID_CHECKPOINT_DIR, f"{platform}_detail_{name}.json"))
+
+    @staticmethod
+    def update_hash(ids_hash, item_id: str) -> None:
+        ids_hash.update(item_id.encode("utf-8") + b"\n")
+
+    def resume(self, ids_hash) -> None:
+        """
+        输入的前 done 个ID和断点一致, 从这里继续计算sha256
+        :param ids_hash: 前 done 个ID的sha256
+        :return:
+        """
+        self._hash = ids_hash
+
+    def reset(self) -> None:
+        """
+        输入和断点不一致, 从头开始
+        :return:
+        """
+        self.done, self.digest = 0, ""
+        self._hash = hashlib.sha256()
+        self._finished.clear()
+
+    def finish(self, index: int, item_id: str) -> None:
+        """
+        输入中第 index 个ID已完成
+        :param index: 从0开始的序号
+        :param item_id:
+        :return:
+        """
+        self._finished[index] = item_id
+        while self.done in self._finished:
+            self.update_hash(self._hash, self._finished.pop(self.done))
+            self.done += 1
+        self.digest = self._hash.hexdigest()
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self) -> None:
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_codec.dumps({"done": self.done, "digest": self.digest}))
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def complete(self) -> None:
+        """
+        输入全部完成, 删除断点, 再次运行时从头开始
+        :return:
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def select_shard(ids: AsyncIterator[str], shard: Tuple[int, int]) -> AsyncIterator[str]:
+    """
+    只保留属于该分片的ID
+    :param ids:
+    :param shard: (分片序号, 分片数)
+    :return:
+    """
+    shard_index, shard_count = shard
+    index = 0
+    async for item_id in ids:
+        if index % shard_count == shard_index:
+            yield item_id
+        index += 1
+
+
+async def _skip_finished(platform: str, ids: AsyncIterator[str],
+                         checkpoint: Optional[DetailCheckpoint]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    跳过断点之前已完成的ID, 跳过的ID先写入临时文件, 核对sha256不一致时(换了输入或修改了文件)重新从头处理
+    :return: (序号, ID)
+    """
+    index = 0
+    if checkpoint and checkpoint.done:
+        ids_hash = hashlib.sha256()
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as skipped:
+            async for item_id in ids:
+                checkpoint.update_hash(ids_hash, item_id)
+                skipped.write(item_id + "\n")
+                index += 1
+                if index == checkpoint.done:
+                    break
+            if index == checkpoint.done and ids_hash.hexdigest() == checkpoint.digest:
+                utils.logger.info(f"[stream_details] {platform} resume from checkpoint, skip {index} finished ids")
+                checkpoint.resume(ids_hash)
+            else:
+                utils.logger.warning(f"[stream_details] {platform} input does not match checkpoint {checkpoint.path}, "
+                                     f"start over")
+                checkpoint.reset()
+                skipped.seek(0)
+                for skipped_index, line in enumerate(skipped):
+                    yield skipped_index, line.rstrip("\n")
+    async for item_id in ids:
+        yield index, item_id
+        index += 1
+
+
+async def stream_details(platform: str, ids: AsyncIterator[str], fetch: Callable[[str], Awaitable[Any]],
+                         handle: Callable[[str, Any], Awaitable[None]], window: int,
+                         checkpoint: Optional[DetailCheckpoint] = None) -> int:
+    """
+    同时进行的任务不超过 window 个, 一个完成后才从输入中读取下一个ID, 出错的ID记录日志后也算作完成,
+    全部完成后删除断点
+    :param platform: 平台, 用于日志
+    :param ids: ID来源
+    :param fetch: 获取详情, 失败时返回 None
+    :param handle: 保存详情并爬取评论、媒体等, 只对获取成功的详情调用
+    :param window: 同时进行的任务数
+    :param checkpoint: 断点, 为空时不记录
+    :return: 本次处理的ID数
+    """
+    async def run(item_id: str) -> None:
+        detail = await fetch(item_id)
+        if detail is not None:
+            await handle(item_id, detail)
+
+    pending = {}
+
+    async def wait_first() -> None:
+        nonlocal processed
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            index, item_id = pending.pop(task)
+            if not task.cancelled() and task.exception() is not None:
+                utils.logger.error(f"[stream_details] {platform} id {item_id} failed: {task.exception()}")
+            processed += 1
+            if checkpoint:
+                checkpoint.finish(index, item_id)
+        if processed % 100 == 0 or not pending:
+            utils.logger.info(f"[stream_details] {platform} {processed} ids finished")
+
+    processed = 0
+    completed = False
+    try:
+        async for index, item_id in _skip_finished(platform, ids, checkpoint):
+            while len(pending) >= max(1, window):
+                await wait_first()
+            pending[asyncio.create_task(run(item_id))] = (index, item_id)
+        while pending:
+            await wait_first()
+        completed = True
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if checkpoint and completed:
+            checkpoint.complete()
+        elif checkpoint:
+            checkpoint.save()
+    return processed
+
+
+async def stream_specified_ids(platform: str, fetch: Callable[[str], Awaitable[Any]],
+                               handle: Callable[[str, Any], Awaitable[None]]) -> int:
+    """
+    按配置从 SPECIFIED_ID_FILE 读取当前分片(SPECIFIED_ID_SHARD, 会话池中为当前会话的分片)的ID,
+    窗口大小为 SPECIFIED_ID_WINDOW, 断点保存在 SPECIFIED_ID_CHECKPOINT_DIR
+    :param platform: 平台
+    :param fetch: 见 stream_details
+    :param handle: 见 stream_details
+    :return: 本次处理的ID数
+    """
+    source = config.SPECIFIED_ID_FILE
+    shard = tuple(get_session_config("SPECIFIED_ID_SHARD"))
+    utils.logger.info(f"[stream_specified_ids] {platform} read ids from {'stdin' if source == STDIN_SOURCE else source}"
+                      + (f", shard {shard[0]}/{shard[1]}" if shard[1] > 1 else ""))
+    ids = read_ids(source)
+    if shard[1] > 1:
+        ids = select_shard(ids, shard)
+    return await stream_details(platform, ids, fetch, handle, config.SPECIFIED_ID_WINDOW,
+                                DetailCheckpoint.for_source(platform, source, shard))
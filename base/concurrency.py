@@ -0,0 +1,114 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按爬取阶段和平台划分的全局并发控制, 同一阶段的所有任务(跨批次、跨关键词、跨会话)共用一个并发上限
+
+import asyncio
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+import config
+
+# keyword=同时搜索的关键词数 | search=搜索 | detail=详情 | comments=一级评论 | sub_comments=二级评论 | media=图片视频下载 | creator=创作者信息、粉丝、关注、动态
+STAGES = ("keyword", "search", "detail", "comments", "sub_comments", "media", "creator")
+
+_semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+_semaphores_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_stage_concurrency(platform: str, stage: str) -> int:
+    """
+    读取阶段的并发数, 优先级: PLATFORM_STAGE_CONCURRENCY > STAGE_CONCURRENCY > MAX_CONCURRENCY_NUM
+    :param platform: 平台, 例如 dy
+    :param stage: 阶段, 见STAGES
+    :return:
+    """
+    if stage not in STAGES:
+        raise ValueError(f"unknown crawler stage: {stage}")
+    concurrency = (
+        config.PLATFORM_STAGE_CONCURRENCY.get(platform, {}).get(stage)
+        or config.STAGE_CONCURRENCY.get(stage)
+        or config.MAX_CONCURRENCY_NUM
+    )
+    return max(1, int(concurrency))
+
+
+def stage_semaphore(platform: str, stage: str) -> asyncio.Semaphore:
+    """
+    获取平台某个阶段共用的信号量, 第一次使用时按当前配置创建
+    同一个任务不要在持有某阶段信号量时再次获取同一阶段的信号量, 否则并发数为1时会死锁
+    :param platform: 平台, 例如 dy
+    :param stage: 阶段, 见STAGES
+    :return:
+    """
+    global _semaphores_loop
+    loop = asyncio.get_event_loop()
+    if loop is not _semaphores_loop:
+        # 信号量绑定创建时的事件循环, 换了事件循环(例如测试用例)需要重新创建
+        _semaphores.clear()
+        _semaphores_loop = loop
+    key = (platform, stage)
+    semaphore = _semaphores.get(key)
+    if semaphore is None:
+        semaphore = _semaphores[key] = asyncio.Semaphore(get_stage_concurrency(platform, stage))
+    return semaphore
+
+
+def reset_stage_semaphores() -> None:
+    """
+    修改并发配置后调用, 下次获取信号量时按新配置创建
+    :return:
+    """
+    _semaphores.clear()
+
+
+def apply_concurrency_arg(value: str) -> None:
+    """
+    解析命令行的并发配置并写入config, 格式为逗号分隔的 [平台.]阶段=并发数, 单独的数字设置MAX_CONCURRENCY_NUM
+    例如 "4,comments=8,media=2,dy.detail=1"
+    :param value:
+    :return:
+    """
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" not in item:
+            config.MAX_CONCURRENCY_NUM = int(item)
+            continue
+        key, concurrency = item.split("=", 1)
+        platform, _, stage = key.strip().rpartition(".")
+        if stage not in STAGES:
+            raise ValueError(f"unknown crawler stage: {stage}, supported stages: {','.join(STAGES)}")
+        if platform:
+            config.PLATFORM_STAGE_CONCURRENCY.setdefault(platform, {})[stage] = int(concurrency)
+        else:
+            config.STAGE_CONCURRENCY[stage] = int(concurrency)
+    reset_stage_semaphores()
+
+
+async def gather_all(aws: Iterable[Awaitable[Any]]) -> List[Any]:
+    """
+    并发执行并按顺序返回结果, 其中一个出错时取消其余任务再抛出异常, 避免出错后其余任务还在后台请求
+    并发数由任务内部获取的阶段信号量控制
+    :param aws:
+    :return:
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
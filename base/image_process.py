@@ -0,0 +1,206 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 图片后处理: 下载流水线保存图片后, 在进程池中用Pillow生成缩略图、重新压缩, 不占用事件循环
+
+import asyncio
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import config
+from store.media_store import get_media_store
+from tools import utils
+
+# 格式 -> 扩展名
+FORMAT_EXTENSIONS = {"webp": "webp", "avif": "avif", "jpeg": "jpg", "png": "png"}
+
+
+def is_format_supported(image_format: str) -> bool:
+    """
+    当前安装的Pillow是否可以保存该格式, 例如AVIF需要较新的Pillow或 pillow-avif-plugin
+    :param image_format: webp | avif | jpeg | png
+    :return:
+    """
+    # Pillow 只在开启图片处理时才需要, 用到时再导入
+    from PIL import Image
+    Image.init()
+    return image_format in FORMAT_EXTENSIONS and image_format.upper() in Image.SAVE
+
+
+def _render(source_path: str, outputs: List[Tuple[str, str, str, int, int]]) -> Dict:
+    """
+    在子进程中执行: 读取原图, 生成各个输出文件, 输出文件已存在时(相同内容处理过)只读取尺寸
+    :param source_path: 原图路径
+    :param outputs: [(名称, 输出路径, 格式, 质量, 最长边像素, 0为不缩放)]
+    :return: {"width": 原图宽, "height": 原图高, "variants": {名称: {"path", "width", "height", "size"}}}
+    """
+    from PIL import Image
+    with Image.open(source_path) as image:
+        result = {"width": image.width, "height": image.height, "variants": {}}
+        for name, output_path, image_format, quality, max_size in outputs:
+            if not os.path.exists(output_path):
+                output = image.copy()
+                if max_size:
+                    output.thumbnail((max_size, max_size))
+                if output.mode not in ("RGB", "RGBA"):
+                    output = output.convert("RGBA" if "transparency" in output.info or "A" in output.mode else "RGB")
+                if image_format == "jpeg" and output.mode == "RGBA":
+                    output = output.convert("RGB")
+                pathlib.Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = f"{output_path}.{os.getpid()}.tmp"
+                output.save(tmp_path, format=image_format.upper(), quality=quality)
+                os.replace(tmp_path, output_path)
+            with Image.open(output_path) as output:
+                result["variants"][name] = {
+                    "path": output_path, "width": output.width, "height": output.height,
+                    "size": os.path.getsize(output_path),
+                }
+    return result
+
+
+def _remove_original(target_path: str, blob_path: Optional[str]) -> None:
+    os.remove(target_path)
+    # 硬链接模式下没有其他笔记引用这份内容时一起删除, 才能真正释放磁盘空间
+    if blob_path and os.path.exists(blob_path) and os.stat(blob_path).st_nlink == 1:
+        os.remove(blob_path)
+
+
+class ImageProcessor:
+    def __init__(self, workers: int = 2, thumbnail_size: int = 320, thumbnail_format: str = "webp",
+                 recompress_format: str = "webp", quality: int = 80, keep_original: bool = True):
+        """
+        缩略图保存为 {原文件名}_thumb.{格式}, 重新压缩的图片保存为 {原文件名去掉扩展名}.{格式};
+        开启媒体去重存储时生成的文件按原图的 sha256 保存在 MEDIA_STORE_DIR/derived 下, 相同图片只处理一次
+        :param workers: 进程数
+        :param thumbnail_size: 缩略图最长边的像素, 0为不生成
+        :param thumbnail_format: 缩略图格式
+        :param recompress_format: 重新压缩的格式, 为空时不重新压缩
+        :param quality: 质量 1-100
+        :param keep_original: 重新压缩后是否保留原图
+        """
+        self.workers = max(1, workers)
+        self.quality = quality
+        self.keep_original = keep_original
+        # (名称, 格式, 最长边像素)
+        self.variants: List[Tuple[str, str, int]] = []
+        if thumbnail_size:
+            self._add_variant("thumb", thumbnail_format, thumbnail_size)
+        if recompress_format:
+            self._add_variant("recompressed", recompress_format, 0)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _add_variant(self, name: str, image_format: str, max_size: int) -> None:
+        if not is_format_supported(image_format):
+            utils.logger.warning(f"[ImageProcessor] image format {image_format} is not supported by Pillow, "
+                                 f"skip generating {name} images")
+            return
+        self.variants.append((name, image_format, max_size))
+
+    @staticmethod
+    def output_path(target_path: str, name: str, image_format: str) -> str:
+        """
+        生成的文件在笔记目录中的路径
+        :param target_path: 原图路径
+        :param name: thumb | recompressed
+        :param image_format:
+        :return:
+        """
+        stem = os.path.splitext(target_path)[0]
+        if name == "recompressed":
+            return f"{stem}.{FORMAT_EXTENSIONS[image_format]}"
+        return f"{stem}_{name}.{FORMAT_EXTENSIONS[image_format]}"
+
+    async def process(self, entry: Dict) -> Optional[Dict]:
+        """
+        处理已保存的图片, 把原图和生成文件的尺寸追加到媒体存储的清单中, 处理失败只记录日志
+        :param entry: 保存图片时返回的清单记录
+        :return: 追加的清单记录, 失败时返回 None
+        """
+        media_store = get_media_store()
+        target_path = entry["path"]
+        outputs, note_paths = [], {}
+        for name, image_format, max_size in self.variants:
+            note_path = self.output_path(target_path, name, image_format)
+            if note_path == target_path:
+                # 原图已经是该格式
+                continue
+            note_paths[name] = note_path
+            render_path = note_path
+            if media_store.enabled:
+                render_path = media_store.derived_path(
+                    entry["sha256"], f"{name}{max_size or ''}_q{self.quality}.{FORMAT_EXTENSIONS[image_format]}")
+            outputs.append((name, render_path, image_format, self.quality, max_size))
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), _render, target_path, outputs)
+            for name, variant in result["variants"].items():
+                if media_store.enabled:
+                    await media_store.link_file(variant["path"], note_paths[name])
+                variant["path"] = note_paths[name]
+            keep_original = self.keep_original or "recompressed" not in result["variants"]
+            if not keep_original:
+                blob_path = media_store.blob_path(entry["sha256"]) if media_store.link_mode == "hardlink" else None
+                await loop.run_in_executor(None, _remove_original, target_path, blob_path)
+        except Exception as e:
+            utils.logger.error(f"[ImageProcessor.process] process image {target_path} failed: {e}")
+            return None
+        record = {**entry, "width": result["width"], "height": result["height"],
+                  "variants": result["variants"], "original_kept": keep_original}
+        await media_store.record(record)
+        return record
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def close(self) -> None:
+        """
+        关闭进程池, 可重复调用, 在线程池中等待子进程退出, 不阻塞事件循环
+        :return:
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+
+_image_processor: Optional[ImageProcessor] = None
+
+
+def get_image_processor() -> ImageProcessor:
+    """
+    获取按当前配置创建的图片处理器
+    :return:
+    """
+    global _image_processor
+    if _image_processor is None:
+        _image_processor = ImageProcessor(
+            workers=config.IMAGE_PROCESS_WORKERS,
+            thumbnail_size=config.IMAGE_THUMBNAIL_SIZE,
+            thumbnail_format=config.IMAGE_THUMBNAIL_FORMAT,
+            recompress_format=config.IMAGE_RECOMPRESS_FORMAT,
+            quality=config.IMAGE_QUALITY,
+            keep_original=config.IMAGE_KEEP_ORIGINAL,
+        )
+    return _image_processor
+
+
+async def close_image_processor() -> None:
+    """
+    关闭图片处理的进程池
+    :return:
+    """
+    if _image_processor is not None:
+        await _image_processor.close()
@@ -0,0 +1,100 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多关键词并发搜索: 每个关键词一个任务, 并发数由 keyword 阶段控制, 记录每个关键词的进度和剩余时间
+
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from tools import utils
+from var import source_keyword_var
+
+from .concurrency import gather_all, stage_semaphore
+
+
+class KeywordSearchProgress:
+    def __init__(self, platform: str, keywords: List[str]):
+        """
+        关键词搜索进度, 剩余时间按已完成关键词的平均耗时估算(已经包含了并发的效果)
+        :param platform: 平台
+        :param keywords: 关键词列表
+        """
+        self.platform = platform
+        self.total = len(keywords)
+        self.finished = 0
+        self.running = 0
+        self.started_at = time.perf_counter()
+
+    def start(self, keyword: str) -> float:
+        """
+        开始搜索一个关键词
+        :param keyword:
+        :return: 开始时间
+        """
+        self.running += 1
+        utils.logger.info(
+            f"[KeywordSearch] {self.platform} keyword '{keyword}' started, "
+            f"{self.running} running, {self.finished}/{self.total} finished"
+        )
+        return time.perf_counter()
+
+    def finish(self, keyword: str, started_at: float) -> None:
+        """
+        一个关键词搜索完成
+        :param keyword:
+        :param started_at: start 返回的开始时间
+        :return:
+        """
+        self.running -= 1
+        self.finished += 1
+        eta = self.eta()
+        utils.logger.info(
+            f"[KeywordSearch] {self.platform} keyword '{keyword}' finished in {time.perf_counter() - started_at:.1f}s, "
+            f"{self.finished}/{self.total} keywords finished, elapsed {self.elapsed():.1f}s"
+            + (f", eta {eta:.1f}s" if eta is not None else "")
+        )
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def eta(self) -> Optional[float]:
+        """
+        预计剩余时间(秒), 还没有关键词完成时无法估算
+        :return:
+        """
+        if not self.finished:
+            return None
+        return self.elapsed() / self.finished * (self.total - self.finished)
+
+
+async def search_keywords(platform: str, keywords: str, search_keyword: Callable[..., Awaitable[Any]],
+                          *args: Any) -> None:
+    """
+    并发搜索多个关键词, 同时搜索的关键词数量由 keyword 阶段的并发数控制, 每个关键词内部的请求仍受各阶段并发数限制
+    每个关键词在独立的任务中运行, source_keyword_var 只在该任务的上下文中生效, 不会串到其他关键词的数据里
+    :param platform: 平台, 例如 xhs
+    :param keywords: 英文逗号分隔的关键词
+    :param search_keyword: 搜索单个关键词的协程函数, 第一个参数为关键词
+    :param args: 传给 search_keyword 的其余参数
+    :return:
+    """
+    keyword_list = keywords.split(",")
+    progress = KeywordSearchProgress(platform, keyword_list)
+
+    async def run(keyword: str) -> None:
+        async with stage_semaphore(platform, "keyword"):
+            source_keyword_var.set(keyword)
+            started_at = progress.start(keyword)
+            await search_keyword(keyword, *args)
+            progress.finish(keyword, started_at)
+
+    await gather_all(run(keyword) for keyword in keyword_list)
@@ -0,0 +1,240 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 媒体文件下载: 开启 MEDIA_REVALIDATE 时对已保存过的URL发送条件请求, 服务端返回304时使用本地已保存的内容,
+#             所有下载共用 MEDIA_MAX_BYTES_PER_SEC 的带宽上限, 大文件用Range请求分段并行下载到临时文件
+
+import asyncio
+import hashlib
+import os
+import pathlib
+import time
+import uuid
+from typing import Dict, Optional, Tuple, Union
+
+import httpx
+
+import config
+from store.media_store import MediaContent, MediaFile, MediaLink, get_media_store
+from tools import utils
+
+
+class BandwidthLimiter:
+    def __init__(self, bytes_per_sec: float, burst_bytes: Optional[float] = None):
+        """
+        令牌桶限速, 每读到一块数据扣除对应的令牌, 令牌不足时等待到欠下的令牌补齐,
+        多个下载同时欠令牌时后来的等待更久, 总速率不超过上限
+        :param bytes_per_sec: 每秒字节数, 小于等于0时不限速
+        :param burst_bytes: 令牌桶容量, 默认为一秒的字节数
+        """
+        self.bytes_per_sec = bytes_per_sec
+        self.burst_bytes = burst_bytes or bytes_per_sec
+        self._tokens = self.burst_bytes
+        self._updated_at = time.monotonic()
+
+    async def acquire(self, size: int) -> None:
+        """
+        扣除令牌, 令牌不足时等待
+        :param size: 字节数
+        :return:
+        """
+        if self.bytes_per_sec <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst_bytes, self._tokens + (now - self._updated_at) * self.bytes_per_sec)
+        self._updated_at = now
+        self._tokens -= size
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.bytes_per_sec)
+
+
+_bandwidth_limiter: Optional[BandwidthLimiter] = None
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter:
+    """
+    获取所有媒体下载共用的限速器, 修改 MEDIA_MAX_BYTES_PER_SEC 后重新创建
+    :return:
+    """
+    global _bandwidth_limiter
+    bytes_per_sec = config.MEDIA_MAX_BYTES_PER_SEC
+    if _bandwidth_limiter is None or _bandwidth_limiter.bytes_per_sec != bytes_per_sec:
+        _bandwidth_limiter = BandwidthLimiter(bytes_per_sec)
+    return _bandwidth_limiter
+
+
+async def _get(client: httpx.AsyncClient, url: str, headers: Dict[str, str], **kwargs) -> Tuple[bytes, httpx.Response]:
+    """
+    流式下载, 每读到一块数据向限速器申请令牌
+    :return: (内容, 响应), 状态码不是200时内容为空, 响应体已读取可以使用 response.text
+    """
+    async with client.stream("GET", url, headers=headers, **kwargs) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return b"", response
+        return await _read_body(response), response
+
+
+async def _read_body(response: httpx.Response) -> bytes:
+    limiter = get_bandwidth_limiter()
+    chunks = []
+    async for chunk in response.aiter_bytes():
+        await limiter.acquire(len(chunk))
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def request_media(client: httpx.AsyncClient, url: str, cache_url: str = "",
+                        headers: Optional[Dict[str, str]] = None,
+                        **kwargs) -> Tuple[Union[MediaContent, MediaLink, None], httpx.Response]:
+    """
+    下载媒体文件, 返回的内容带有 ETag/Last-Modified, 保存时记录到媒体存储的清单中;
+    条件请求返回304时不读取已保存的文件, 返回 MediaLink, 保存时直接链接已有内容
+    :param client:
+    :param url: 请求地址
+    :param cache_url: 媒体存储中记录的地址, 默认与请求地址相同(例如微博图片通过代理地址下载)
+    :param headers: 请求头
+    :param kwargs: 传给 client.stream 的其余参数
+    :return: (内容, 响应), 请求失败时内容为 None
+    """
+    media_store = get_media_store()
+    cache_url = cache_url or url
+    conditional_headers = media_store.conditional_headers(cache_url) if media_store.revalidate else {}
+    body, response = await _get(client, url, {**(headers or {}), **conditional_headers}, **kwargs)
+    if response.status_code == 304:
+        entry = media_store.lookup_valid_url(cache_url)
+        if entry is not None:
+            return MediaLink(cache_url, entry["size"]), response
+        # 本地文件在请求期间失效, 重新完整下载
+        body, response = await _get(client, url, headers or {}, **kwargs)
+    if response.status_code != 200:
+        return None, response
+    return MediaContent.from_response(body, response.headers), response
+
+
+class _RangeNotSupported(Exception):
+    pass
+
+
+class _SegmentError(Exception):
+    pass
+
+
+def use_segmented_download(size: int) -> bool:
+    """
+    已知大小的文件是否需要分段下载
+    :param size: 文件大小, 0为未知
+    :return:
+    """
+    return 0 < config.MEDIA_SEGMENT_BYTES < size
+
+
+async def _get_range(client: httpx.AsyncClient, url: str, start: int, end: int, headers: Dict[str, str],
+                     **kwargs) -> Tuple[bytes, httpx.Headers]:
+    async with client.stream("GET", url, headers={**headers, "Range": f"bytes={start}-{end}"}, **kwargs) as response:
+        if response.status_code == 200:
+            # 服务端忽略了Range请求头, 不读取响应体
+            raise _RangeNotSupported()
+        if response.status_code != 206:
+            raise _SegmentError(f"status {response.status_code}")
+        content = await _read_body(response)
+    if len(content) != end - start + 1:
+        raise _SegmentError(f"expected {end - start + 1} bytes, got {len(content)}")
+    return content, response.headers
+
+
+def _allocate_file(path: str, size: int) -> None:
+    pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+
+def _write_at(path: str, offset: int, content: bytes) -> None:
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(content)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def download_segmented(client: httpx.AsyncClient, url: str, size: int,
+                             headers: Optional[Dict[str, str]] = None,
+                             **kwargs) -> Union[MediaContent, MediaFile, MediaLink, None]:
+    """
+    按 MEDIA_SEGMENT_BYTES 分段, 同时下载 MEDIA_SEGMENT_CONCURRENCY 段, 每段下载完成后写入临时文件的对应位置,
+    单段失败时只重试该段; 服务端不支持Range请求、或需要条件请求确认已保存的内容时, 改为整个文件下载
+    :param client:
+    :param url: 请求地址
+    :param size: 文件大小
+    :param headers: 请求头
+    :param kwargs: 传给 client.stream 的其余参数
+    :return: 临时文件, 整个文件下载时为内容, 下载失败时为 None
+    """
+    media_store = get_media_store()
+    headers = headers or {}
+    if not use_segmented_download(size) or (media_store.revalidate and media_store.conditional_headers(url)):
+        return await _download_whole(client, url, headers, **kwargs)
+
+    segment_bytes = config.MEDIA_SEGMENT_BYTES
+    # 同一URL可能被多个任务同时下载, 每次下载使用单独的临时文件
+    tmp_path = os.path.join(media_store.tmp_dir, f"{hashlib.sha1(url.encode()).hexdigest()}.{uuid.uuid4().hex}.part")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _allocate_file, tmp_path, size)
+    semaphore = asyncio.Semaphore(max(1, config.MEDIA_SEGMENT_CONCURRENCY))
+    validators: Dict[str, str] = {}
+
+    async def fetch_segment(start: int):
+        end = min(start + segment_bytes, size) - 1
+        async with semaphore:
+            for attempt in range(config.MEDIA_SEGMENT_RETRY + 1):
+                try:
+                    content, response_headers = await _get_range(client, url, start, end, headers, **kwargs)
+                    break
+                except (httpx.HTTPError, _SegmentError) as e:
+                    if attempt >= config.MEDIA_SEGMENT_RETRY:
+                        raise
+                    utils.logger.warning(f"[download_segmented] {url} bytes {start}-{end} failed: {e}, "
+                                         f"retry {attempt + 1}/{config.MEDIA_SEGMENT_RETRY}")
+                    await asyncio.sleep(attempt)
+            validators.setdefault("etag", response_headers.get("etag", ""))
+            validators.setdefault("last_modified", response_headers.get("last-modified", ""))
+            await loop.run_in_executor(None, _write_at, tmp_path, start, content)
+
+    tasks = [asyncio.create_task(fetch_segment(start)) for start in range(0, size, segment_bytes)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException as e:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await loop.run_in_executor(None, _remove_file, tmp_path)
+        if isinstance(e, _RangeNotSupported):
+            utils.logger.info(f"[download_segmented] {url} does not support range requests, download the whole file")
+            return await _download_whole(client, url, headers, **kwargs)
+        if isinstance(e, (httpx.HTTPError, _SegmentError)):
+            utils.logger.error(f"[download_segmented] request {url} err: {e}")
+            return None
+        raise
+    return MediaFile(tmp_path, size, validators.get("etag", ""), validators.get("last_modified", ""))
+
+
+async def _download_whole(client: httpx.AsyncClient, url: str, headers: Dict[str, str],
+                          **kwargs) -> Union[MediaContent, MediaLink, None]:
+    content, response = await request_media(client, url, headers=headers, **kwargs)
+    if content is None:
+        utils.logger.error(f"[download_segmented] request {url} err, res:{response.text}")
+    return content
@@ -0,0 +1,194 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 媒体下载流水线: 图片视频下载任务放入独立的有界优先队列, 由单独的下载协程处理, 爬取元数据不等待CDN传输
+
+import asyncio
+import itertools
+from typing import Awaitable, Callable, List, Optional
+
+import config
+from base.image_process import close_image_processor, get_image_processor
+from metrics.crawler_metrics import MEDIA_BYTES, MEDIA_JOBS, MEDIA_QUEUE_DEPTH
+from store.media_store import MediaLink
+from tools import utils
+
+# 队列优先级, 数值小的先下载
+PRIORITY_IMAGE = 0
+PRIORITY_VIDEO = 1
+PRIORITY_LARGE_VIDEO = 2
+
+
+class MediaJob:
+    def __init__(self, platform: str, url: str, download: Callable[[], Awaitable[Optional[bytes]]],
+                 save: Callable[[bytes], Awaitable], link: Optional[Callable[[], Awaitable[bool]]] = None,
+                 kind: str = "image", size_hint: int = 0):
+        """
+        一个媒体文件的下载任务
+        :param platform: 平台, 例如 dy
+        :param url: 媒体地址, 用于日志
+        :param download: 下载内容, 失败时返回 None
+        :param save: 保存下载的内容, 返回媒体存储的清单记录时可以对图片做后处理
+        :param link: 下载前先尝试链接已保存过的内容, 链接成功时跳过下载
+        :param kind: image | video
+        :param size_hint: 已知的文件大小, 0为未知
+        """
+        self.platform = platform
+        self.url = url
+        self.download = download
+        self.save = save
+        self.link = link
+        self.kind = kind
+        self.size_hint = size_hint
+
+    @property
+    def priority(self) -> int:
+        if self.kind != "video":
+            return PRIORITY_IMAGE
+        if self.size_hint > config.MEDIA_LARGE_VIDEO_BYTES:
+            return PRIORITY_LARGE_VIDEO
+        return PRIORITY_VIDEO
+
+
+async def run_media_job(job: MediaJob) -> str:
+    """
+    执行下载任务, 开启 ENABLE_IMAGE_PROCESS 时对新下载的图片做后处理, 异常只记录日志不向外抛出
+    :param job:
+    :return: 结果 linked | downloaded | failed
+    """
+    try:
+        if job.link is not None and await job.link():
+            result = "linked"
+        else:
+            content = await job.download()
+            if content is None:
+                result = "failed"
+            elif isinstance(content, MediaLink):
+                # 条件请求确认内容没有变化, 链接已保存的内容
+                await job.save(content)
+                result = "linked"
+            else:
+                entry = await job.save(content)
+                MEDIA_BYTES.labels(job.platform).inc(len(content))
+                result = "downloaded"
+                if job.kind == "image" and config.ENABLE_IMAGE_PROCESS and isinstance(entry, dict):
+                    await get_image_processor().process(entry)
+    except Exception as e:
+        utils.logger.error(f"[run_media_job] {job.platform} {job.kind} {job.url} failed: {e}")
+        result = "failed"
+    MEDIA_JOBS.labels(job.platform, job.kind, result).inc()
+    return result
+
+
+class MediaPipeline:
+    def __init__(self, worker_num: int, queue_size: int):
+        """
+        提交的任务按 图片 > 视频 > 大视频 的优先级下载, 同一优先级先提交的先下载;
+        队列满时提交任务的协程等待, 避免爬取速度远超下载速度时无限占用内存
+        :param worker_num: 下载协程数, 0表示不使用队列, 提交时直接下载
+        :param queue_size: 队列中等待下载的任务数上限
+        """
+        self.worker_num = worker_num
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._counter = itertools.count()
+
+    def _is_running_loop(self) -> bool:
+        return self._queue is not None and self._loop is asyncio.get_running_loop()
+
+    def _ensure_workers(self) -> asyncio.PriorityQueue:
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is not loop:
+            # 之前的事件循环已经结束(例如多次调用 asyncio.run), 它的队列和下载协程不能再使用
+            utils.logger.warning(
+                f"[MediaPipeline] event loop changed, drop {self._queue.qsize()} pending media downloads")
+            self._queue, self._workers = None, []
+        if self._queue is None:
+            # 队列和下载协程在第一次提交时创建, 绑定当前的事件循环
+            self._queue = asyncio.PriorityQueue(self.queue_size)
+            self._loop = loop
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_num)]
+        return self._queue
+
+    async def submit(self, job: MediaJob) -> None:
+        """
+        提交下载任务
+        :param job:
+        :return:
+        """
+        if self.worker_num <= 0:
+            await run_media_job(job)
+            return
+        queue = self._ensure_workers()
+        await queue.put((job.priority, next(self._counter), job))
+        MEDIA_QUEUE_DEPTH.labels(job.platform).inc()
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            MEDIA_QUEUE_DEPTH.labels(job.platform).dec()
+            try:
+                await run_media_job(job)
+            finally:
+                self._queue.task_done()
+
+    def pending(self) -> int:
+        """
+        等待下载的任务数, 不包括正在下载的
+        :return:
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def join(self) -> None:
+        """
+        等待已提交的任务全部完成
+        :return:
+        """
+        if not self._is_running_loop():
+            return
+        if self.pending():
+            utils.logger.info(f"[MediaPipeline.join] waiting for {self.pending()} media downloads ...")
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """
+        停止下载协程和图片处理进程池, 未下载的任务丢弃, 可重复调用
+        :return:
+        """
+        if self._queue is not None and not self._is_running_loop():
+            # 队列属于已经结束的事件循环, 下载协程已随它停止
+            self._queue, self._workers = None, []
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while self._queue is not None and not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            MEDIA_QUEUE_DEPTH.labels(job.platform).dec()
+        self._queue = None
+        await close_image_processor()
+
+
+_media_pipeline: Optional[MediaPipeline] = None
+
+
+def get_media_pipeline() -> MediaPipeline:
+    """
+    获取所有平台共用的下载流水线, 第一次使用时按当前配置创建
+    :return:
+    """
+    global _media_pipeline
+    if _media_pipeline is None:
+        _media_pipeline = MediaPipeline(config.MEDIA_WORKER_NUM, config.MEDIA_QUEUE_SIZE)
+    return _media_pipeline
@@ -0,0 +1,236 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多账号/多浏览器上下文会话池, 在同一进程内并行运行多个爬虫会话
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from base.base_crawler import AbstractCrawler
+from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
+from tools import utils
+from var import crawler_session_var
+
+# 各平台在不同爬取类型下需要拆分到各个会话的任务配置项, 第一项为主任务列表, 主任务为空的会话不会启动
+SESSION_TASK_CONFIG_NAMES: Dict[str, Dict[str, List[str]]] = {
+    "xhs": {"detail": ["XHS_SPECIFIED_NOTE_URL_LIST"], "creator": ["XHS_CREATOR_ID_LIST"]},
+    "dy": {"detail": ["DY_SPECIFIED_ID_LIST"], "creator": ["DY_CREATOR_ID_LIST"]},
+    "ks": {"detail": ["KS_SPECIFIED_ID_LIST"], "creator": ["KS_CREATOR_ID_LIST"]},
+    "bili": {"detail": ["BILI_SPECIFIED_ID_LIST"], "creator": ["BILI_CREATOR_ID_LIST"]},
+    "wb": {"detail": ["WEIBO_SPECIFIED_ID_LIST"], "creator": ["WEIBO_CREATOR_ID_LIST"]},
+    "tieba": {
+        "search": ["KEYWORDS", "TIEBA_NAME_LIST"],
+        "detail": ["TIEBA_SPECIFIED_ID_LIST"],
+        "creator": ["TIEBA_CREATOR_URL_LIST"],
+    },
+    "zhihu": {"detail": ["ZHIHU_SPECIFIED_ID_LIST"], "creator": ["ZHIHU_CREATOR_URL_LIST"]},
+}
+
+
+def get_task_config_names(platform: str, crawler_type: str) -> List[str]:
+    """
+    获取平台在该爬取类型下的任务配置项名称
+    :param platform: 平台
+    :param crawler_type: 爬取类型
+    :return: 第一项为主任务列表, 不支持拆分任务时返回空列表
+    """
+    return SESSION_TASK_CONFIG_NAMES.get(platform, {}).get(
+        crawler_type, ["KEYWORDS"] if crawler_type == "search" else []
+    )
+
+
+def get_task_list(name: str) -> List[Any]:
+    """
+    读取全局的任务列表配置, 关键词配置是以英文逗号分隔的字符串
+    :param name:
+    :return:
+    """
+    if name == "KEYWORDS":
+        return [keyword for keyword in config.KEYWORDS.split(",") if keyword]
+    return list(getattr(config, name))
+
+
+def make_task_config_value(name: str, tasks: List[Any]) -> Any:
+    """
+    把任务列表转换成对应配置项的值, 关键词需要重新拼接成字符串
+    :param name:
+    :param tasks:
+    :return:
+    """
+    return ",".join(tasks) if name == "KEYWORDS" else tasks
+
+
+class CrawlerSession:
+    def __init__(self, session_id: int, config_overrides: Dict[str, Any]):
+        """
+        一个爬虫会话, 拥有独立的浏览器用户数据目录、Cookie、代理IP以及分配到的任务
+        :param session_id: 会话编号
+        :param config_overrides: 该会话覆盖的配置项
+        """
+        self.session_id = session_id
+        self.config_overrides = config_overrides
+        self.ip_proxy_pool: Optional[ProxyIpPool] = None
+        self.ip_proxy_info: Optional[IpInfoModel] = None
+
+
+def get_session_config(name: str) -> Any:
+    """
+    读取当前会话的配置, 不在会话池中运行或会话没有覆盖该配置时回退到全局config
+    :param name: 配置项名称, 例如 KEYWORDS
+    :return:
+    """
+    session = crawler_session_var.get()
+    if session is not None and name in session.config_overrides:
+        return session.config_overrides[name]
+    return getattr(config, name)
+
+
+async def create_session_ip_proxy() -> Tuple[ProxyIpPool, IpInfoModel]:
+    """
+    获取当前会话使用的代理池和代理IP, 不在会话池中运行时创建独立的代理池
+    :return:
+    """
+    session = crawler_session_var.get()
+    if session is not None and session.ip_proxy_pool is not None:
+        return session.ip_proxy_pool, session.ip_proxy_info
+    ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+    return ip_proxy_pool, await ip_proxy_pool.get_proxy()
+
+
+def split_round_robin(items: List[Any], count: int) -> List[List[Any]]:
+    """
+    把任务列表轮询拆分成count份
+    :param items:
+    :param count:
+    :return:
+    """
+    return [items[index::count] for index in range(count)]
+
+
+class CrawlerSessionPool:
+    def __init__(self, crawler_creator: Callable[[], AbstractCrawler], pool_size: int):
+        """
+        会话池, 启动多个持久化浏览器上下文, 把爬取任务分配给各个会话并行执行,
+        各会话的爬取结果仍然写入共享的存储
+        :param crawler_creator: 创建爬虫实例的函数, 每个会话一个实例
+        :param pool_size: 会话数量
+        """
+        self.crawler_creator = crawler_creator
+        self.pool_size = pool_size
+
+    def create_sessions(self) -> List[CrawlerSession]:
+        """
+        根据当前平台和爬取类型拆分任务, 创建各个会话
+        :return:
+        """
+        from base.bulk_detail import STREAM_DETAIL_PLATFORMS
+        if config.CRAWLER_TYPE == "detail" and config.SPECIFIED_ID_FILE and config.PLATFORM in STREAM_DETAIL_PLATFORMS:
+            return self.create_id_file_sessions()
+
+        task_config_names = get_task_config_names(config.PLATFORM, config.CRAWLER_TYPE)
+        if not task_config_names:
+            utils.logger.warning(
+                f"[CrawlerSessionPool.create_sessions] crawler type {config.CRAWLER_TYPE} does not support sharding, "
+                f"only one session will be started")
+            return [self.new_session(0, {})]
+
+        task_chunks: Dict[str, List[List[Any]]] = {}
+        primary_tasks = get_task_list(task_config_names[0])
+        session_count = max(min(self.pool_size, len(primary_tasks)), 1)
+        for name in task_config_names:
+            task_chunks[name] = split_round_robin(get_task_list(name), session_count)
+
+        sessions = []
+        for session_id in range(session_count):
+            session_tasks = {}
+            for name, chunks in task_chunks.items():
+                session_tasks[name] = make_task_config_value(name, chunks[session_id])
+            sessions.append(self.new_session(session_id, session_tasks))
+        return sessions
+
+    def create_id_file_sessions(self) -> List[CrawlerSession]:
+        """
+        从文件读取ID时按行号分片, 每个会话读取同一个文件中属于自己的分片, 使用各自的断点;
+        标准输入只能读取一次, 只启动一个会话
+        :return:
+        """
+        from base.bulk_detail import STDIN_SOURCE
+        if config.SPECIFIED_ID_FILE == STDIN_SOURCE:
+            if self.pool_size > 1:
+                utils.logger.warning(
+                    "[CrawlerSessionPool.create_sessions] ids are read from stdin, only one session will be started")
+            return [self.new_session(0, {})]
+        shard_index, shard_count = config.SPECIFIED_ID_SHARD
+        # 已经指定了分片(多进程)时, 在该分片内继续按会话拆分
+        return [
+            self.new_session(session_id, {
+                "SPECIFIED_ID_SHARD": (shard_index + session_id * shard_count, shard_count * self.pool_size)
+            })
+            for session_id in range(self.pool_size)
+        ]
+
+    @staticmethod
+    def new_session(session_id: int, session_tasks: Dict[str, Any]) -> CrawlerSession:
+        """
+        创建会话, 第0个会话沿用原有的浏览器用户数据目录和Cookie, 保证单会话时行为不变
+        :param session_id:
+        :param session_tasks: 分配给该会话的任务
+        :return:
+        """
+        config_overrides = dict(session_tasks)
+        if session_id > 0:
+            config_overrides["USER_DATA_DIR"] = f"{config.USER_DATA_DIR}_session{session_id}"
+        if session_id < len(config.SESSION_COOKIES_LIST):
+            config_overrides["COOKIES"] = config.SESSION_COOKIES_LIST[session_id]
+        return CrawlerSession(session_id=session_id, config_overrides=config_overrides)
+
+    async def assign_proxies(self, sessions: List[CrawlerSession]) -> None:
+        """
+        所有会话共享一个代理池, 按健康分从高到低为每个会话分配不同的代理IP
+        :param sessions:
+        :return:
+        """
+        ip_proxy_pool = await create_ip_pool(max(config.IP_PROXY_POOL_COUNT, len(sessions)), enable_validate_ip=True)
+        proxy_list = sorted(ip_proxy_pool.proxy_list, key=ip_proxy_pool.get_proxy_score, reverse=True)
+        if len(proxy_list) < len(sessions):
+            utils.logger.warning(
+                f"[CrawlerSessionPool.assign_proxies] only {len(proxy_list)} ip for {len(sessions)} sessions, "
+                f"some sessions will share the same ip")
+        for index, session in enumerate(sessions):
+            session.ip_proxy_pool = ip_proxy_pool
+            session.ip_proxy_info = proxy_list[index % len(proxy_list)] if proxy_list else await ip_proxy_pool.get_proxy()
+
+    async def start(self) -> None:
+        """
+        启动所有会话并等待全部完成, 单个会话失败不影响其他会话
+        :return:
+        """
+        sessions = self.create_sessions()
+        if config.ENABLE_IP_PROXY:
+            await self.assign_proxies(sessions)
+        utils.logger.info(f"[CrawlerSessionPool.start] start {len(sessions)} crawler sessions ...")
+        results = await asyncio.gather(*[self._run_session(session) for session in sessions], return_exceptions=True)
+        for session, result in zip(sessions, results):
+            if isinstance(result, Exception):
+                utils.logger.error(f"[CrawlerSessionPool.start] session {session.session_id} failed: {result}")
+
+    async def _run_session(self, session: CrawlerSession) -> None:
+        """
+        在独立的上下文中运行一个会话, asyncio.gather会为每个协程创建task并复制上下文, 所以会话之间互不影响
+        :param session:
+        :return:
+        """
+        crawler_session_var.set(session)
+        crawler = self.crawler_creator()
+        await crawler.start()
+        utils.logger.info(f"[CrawlerSessionPool._run_session] session {session.session_id} finished ...")
@@ -0,0 +1,122 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 替代playwright的假浏览器, 让爬虫的start流程在没有浏览器的情况下跑通
+
+import copy
+from typing import Any, Dict, List, Optional
+
+
+class FakePage:
+    def __init__(self, evaluate_rules: List[Dict[str, Any]]):
+        """
+        假页面, evaluate 按规则返回录制好的结果
+        :param evaluate_rules: [{"contains": js表达式包含的片段, "result": 返回值}], 按顺序匹配
+        """
+        self.evaluate_rules = evaluate_rules
+        self.url = "about:blank"
+
+    async def goto(self, url: str, **kwargs) -> None:
+        self.url = url
+
+    async def evaluate(self, expression: str, arg: Any = None) -> Any:
+        for rule in self.evaluate_rules:
+            if rule["contains"] in expression:
+                return copy.deepcopy(rule["result"])
+        return None
+
+    async def wait_for_timeout(self, timeout: float) -> None:
+        pass
+
+    async def wait_for_load_state(self, *args, **kwargs) -> None:
+        pass
+
+    async def content(self) -> str:
+        return ""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeBrowserContext:
+    def __init__(self, evaluate_rules: List[Dict[str, Any]], cookies: Dict[str, str]):
+        """
+        假浏览器上下文
+        :param evaluate_rules: 传给页面的evaluate规则
+        :param cookies: 预置的登录态cookie
+        """
+        self.evaluate_rules = evaluate_rules
+        self._cookies = [{"name": name, "value": value} for name, value in cookies.items()]
+
+    async def add_init_script(self, script: Optional[str] = None, path: Optional[str] = None) -> None:
+        pass
+
+    async def new_page(self) -> FakePage:
+        return FakePage(self.evaluate_rules)
+
+    async def cookies(self, urls: Any = None) -> List[Dict[str, str]]:
+        return list(self._cookies)
+
+    async def add_cookies(self, cookies: List[Dict[str, Any]]) -> None:
+        self._cookies.extend({"name": c["name"], "value": c["value"]} for c in cookies)
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, context: FakeBrowserContext):
+        self._context = context
+
+    async def new_context(self, **kwargs) -> FakeBrowserContext:
+        return self._context
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeBrowserType:
+    def __init__(self, context: FakeBrowserContext):
+        self._context = context
+
+    async def launch(self, **kwargs) -> FakeBrowser:
+        return FakeBrowser(self._context)
+
+    async def launch_persistent_context(self, user_data_dir: str, **kwargs) -> FakeBrowserContext:
+        return self._context
+
+
+class FakePlaywright:
+    def __init__(self, context: FakeBrowserContext):
+        self.chromium = FakeBrowserType(context)
+        self.firefox = self.chromium
+        self.webkit = self.chromium
+
+    async def __aenter__(self) -> "FakePlaywright":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+def fake_async_playwright(evaluate_rules: List[Dict[str, Any]], cookies: Dict[str, str]):
+    """
+    生成替代 playwright.async_api.async_playwright 的工厂函数
+    :param evaluate_rules:
+    :param cookies:
+    :return:
+    """
+    def async_playwright() -> FakePlaywright:
+        return FakePlaywright(FakeBrowserContext(evaluate_rules, cookies))
+
+    return async_playwright
@@ -0,0 +1,121 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 记录类型微基准: 对比 model.record.Record 与字段相同的 pydantic 模型创建和 model_dump 的耗时
+#            python -m benchmark.records --number 20000
+
+import argparse
+import timeit
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel, Field, create_model
+
+from model.m_baidu_tieba import TiebaComment, TiebaNote
+from model.m_zhihu import ZhihuComment, ZhihuContent
+from model.record import Record
+
+# 每种模型一条典型数据, 和解析页面/接口时传入的参数一致(贴吧的回复数是字符串)
+SAMPLES: Dict[Type[Record], Dict[str, Any]] = {
+    TiebaComment: dict(
+        comment_id="150726491368", content="中国队第22金！无悬念！", sub_comment_count=3,
+        user_link="https://tieba.baidu.com/home/main?id=tb.1", user_nickname="网球迷",
+        user_avatar="https://gss0.bdstatic.com/portrait/item/tb.1", ip_location="福建",
+        publish_time="2024-08-06 22:09", note_id="9117905169", note_url="https://tieba.baidu.com/p/9117905169",
+        tieba_id="4513750", tieba_name="网球风云吧", tieba_link="https://tieba.baidu.com/f?kw=网球风云吧",
+    ),
+    TiebaNote: dict(
+        note_id="9117905169", title="对于一个父亲来说", desc="描述", note_url="https://tieba.baidu.com/p/9117905169",
+        user_link="https://tieba.baidu.com/home/main?id=tb.1", user_nickname="章景轩", user_avatar="",
+        tieba_name="以太比特吧", tieba_link="https://tieba.baidu.com/f?kw=以太比特", ip_location="广东",
+        publish_time="2024-08-05 16:56", total_replay_num="786", total_replay_page="13",
+    ),
+    ZhihuComment: dict(
+        comment_id="10947543210", parent_comment_id="", content="按项目整体报价", publish_time=1717215000,
+        ip_location="广东", sub_comment_count=2, like_count=31, dislike_count=0, content_id="123",
+        content_type="answer", user_id="2b8d4e7f", user_link="https://www.zhihu.com/people/coder-laozhou",
+        user_nickname="编程老周", user_avatar="https://picx.zhimg.com/a.jpg",
+    ),
+    ZhihuContent: dict(
+        content_id="123", content_type="answer", content_text="三个月接了十个外包", question_id="456",
+        content_url="https://www.zhihu.com/question/456/answer/123", title="程序员有哪些靠谱的副业?",
+        desc="复盘一下报价和沟通", created_time=1717215000, updated_time=1717301400, voteup_count=3021,
+        comment_count=186, user_id="2b8d4e7f", user_link="https://www.zhihu.com/people/coder-laozhou",
+        user_nickname="编程老周", user_avatar="https://picx.zhimg.com/a.jpg", user_url_token="coder-laozhou",
+    ),
+}
+
+
+def to_pydantic_model(record_class: Type[Record]) -> Type[BaseModel]:
+    """
+    按记录类型的字段声明创建同样的 pydantic 模型, 作为对比的基准
+    :param record_class:
+    :return:
+    """
+    fields = {
+        name: (info.annotation, Field(default=info.default, description=info.description))
+        for name, info in record_class.__record_fields__.items()
+    }
+    return create_model(f"Pydantic{record_class.__name__}", **fields)
+
+
+def measure(model_class: Type, data: Dict[str, Any], number: int) -> Dict[str, float]:
+    """
+    测量创建和 model_dump 每次的耗时(微秒)
+    :param model_class: 模型类
+    :param data: 构造参数
+    :param number: 重复次数
+    :return:
+    """
+    instance = model_class(**data)
+    create_us = min(timeit.repeat(lambda: model_class(**data), number=number, repeat=3)) / number * 1e6
+    dump_us = min(timeit.repeat(instance.model_dump, number=number, repeat=3)) / number * 1e6
+    return {"create_us": round(create_us, 3), "dump_us": round(dump_us, 3)}
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    results = []
+    for record_class, data in SAMPLES.items():
+        pydantic_class = to_pydantic_model(record_class)
+        assert pydantic_class(**data).model_dump() == record_class(**data).model_dump()
+        pydantic_result = measure(pydantic_class, data, number)
+        record_result = measure(record_class, data, number)
+        results.append({
+            "model": record_class.__name__,
+            "pydantic": pydantic_result,
+            "record": record_result,
+            "speedup": round((pydantic_result["create_us"] + pydantic_result["dump_us"])
+                             / (record_result["create_us"] + record_result["dump_us"]), 2),
+        })
+    return results
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'model':<16}{'pydantic create/dump(us)':>28}{'record create/dump(us)':>28}{'speedup':>10}"]
+    for item in results:
+        pydantic_result, record_result = item["pydantic"], item["record"]
+        lines.append(f"{item['model']:<16}"
+                     f"{pydantic_result['create_us']:>18}/{pydantic_result['dump_us']:<9}"
+                     f"{record_result['create_us']:>18}/{record_result['dump_us']:<9}"
+                     f"{item['speedup']:>10}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="record types micro benchmark")
+    parser.add_argument("--number", type=int, default=20000, help="iterations per measurement")
+    args = parser.parse_args(argv)
+    print(format_report(run(max(1, args.number))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 本地回放传输层: 按路由表把请求映射到录制好的响应, 替代真实网络
+
+import asyncio
+import contextlib
+import fnmatch
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import requests
+
+from tools import json_codec, utils
+
+# 在替换asyncio.sleep之前保留原始实现, 路由的模拟延迟需要真实等待
+_real_sleep = asyncio.sleep
+
+_TEMPLATE_PATTERN = re.compile(r"\{\{([\w.\-]+)\}\}")
+
+
+class ReplayRoute:
+    def __init__(self, route: Dict[str, Any], base_dir: str):
+        """
+        一条回放路由, 字段说明:
+            method: 请求方法, 默认GET
+            url: scheme://host/path, 支持 * 通配符, 不包含查询参数
+            match: 查询参数和请求体字段需要满足的取值, 用来区分同一接口的不同分页, 嵌套字段用点号连接, 取值 * 表示只要求参数存在
+            status/headers: 响应状态码和响应头
+            json/text/file: 响应体, file 为相对于仓库根目录的文件路径
+            delay_ms: 模拟的网络耗时
+        响应体中的 {{seq}} 替换为该路由的响应序号, {{param.xxx}} 替换为请求参数xxx, {{path.-1}} 替换为路径的最后一段
+        :param route: 路由配置
+        :param base_dir: file 字段的相对路径基准目录
+        """
+        self.method = route.get("method", "GET").upper()
+        self.url = route["url"]
+        self.match: Dict[str, str] = {k: str(v) for k, v in route.get("match", {}).items()}
+        self.status = route.get("status", 200)
+        self.headers: Dict[str, str] = dict(route.get("headers", {}))
+        self.delay_ms: float = route.get("delay_ms", 0)
+        self.hits = 0
+        if "json" in route:
+            self.body = json.dumps(route["json"], ensure_ascii=False)
+            self.headers.setdefault("content-type", "application/json")
+        elif "file" in route:
+            with open(os.path.join(base_dir, route["file"]), encoding="utf-8") as f:
+                self.body = f.read()
+            self.headers.setdefault("content-type", "text/html; charset=utf-8")
+        else:
+            self.body = route.get("text", "")
+            self.headers.setdefault("content-type", "text/html; charset=utf-8")
+        self._has_template = _TEMPLATE_PATTERN.search(self.body) is not None
+
+    def matches(self, method: str, url: str, params: Dict[str, str]) -> bool:
+        if method != self.method or not fnmatch.fnmatchcase(url, self.url):
+            return False
+        return all(k in params if v == "*" else params.get(k) == v for k, v in self.match.items())
+
+    def render(self, path: str, params: Dict[str, str]) -> bytes:
+        self.hits += 1
+        if not self._has_template:
+            return self.body.encode("utf-8")
+        seq = str(self.hits)
+        path_segments = path.rstrip("/").split("/")
+
+        def replace(match: re.Match) -> str:
+            name = match.group(1)
+            if name == "seq":
+                return seq
+            if name.startswith("param."):
+                return params.get(name[len("param."):], "")
+            if name.startswith("path."):
+                index = int(name[len("path."):])
+                return path_segments[index] if -len(path_segments) <= index < len(path_segments) else ""
+            return match.group(0)
+
+        return _TEMPLATE_PATTERN.sub(replace, self.body).encode("utf-8")
+
+
+def _decode_body_params(content: bytes) -> Dict[str, str]:
+    """
+    把请求体转成参数字典, 支持json和表单两种格式
+    :param content:
+    :return:
+    """
+    if not content:
+        return {}
+    text = content.decode("utf-8", errors="ignore")
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return dict(parse_qsl(text, keep_blank_values=True))
+    if not isinstance(body, dict):
+        return {}
+    return _flatten_params(body)
+
+
+def _flatten_params(body: Dict[str, Any], prefix: str = "") -> Dict[str, str]:
+    """
+    展开嵌套的请求体, 嵌套字段用点号连接, 例如graphql请求的 variables.pcursor
+    :param body:
+    :param prefix:
+    :return:
+    """
+    params = {}
+    for key, value in body.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            params.update(_flatten_params(value, f"{name}."))
+        params[name] = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return params
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, routes: List[Dict[str, Any]], base_dir: str):
+        """
+        按路由表回放响应的httpx传输层, 同时提供requests.request的同步回放入口
+        未命中路由的请求返回404并记录到 unmatched, 基准测试据此判断录制数据是否完整
+        :param routes: 路由配置列表, 按顺序匹配
+        :param base_dir: 路由 file 字段的相对路径基准目录
+        """
+        self.routes = [ReplayRoute(route, base_dir) for route in routes]
+        self.unmatched: List[str] = []
+        self.request_count = 0
+
+    def resolve(self, method: str, url: str, content: bytes = b"") -> Tuple[int, Dict[str, str], bytes, float]:
+        """
+        查找路由并渲染响应
+        :param method: 请求方法
+        :param url: 完整请求url
+        :param content: 请求体
+        :return: (状态码, 响应头, 响应体, 模拟延迟秒数)
+        """
+        self.request_count += 1
+        split_url = urlsplit(url)
+        params = dict(parse_qsl(split_url.query, keep_blank_values=True))
+        params.update(_decode_body_params(content))
+        base_url = f"{split_url.scheme}://{split_url.netloc}{split_url.path}"
+        for route in self.routes:
+            if route.matches(method.upper(), base_url, params):
+                return route.status, dict(route.headers), route.render(split_url.path, params), route.delay_ms / 1000
+        self.unmatched.append(f"{method.upper()} {base_url}")
+        utils.logger.warning(f"[ReplayTransport.resolve] no replay route for {method.upper()} {url}")
+        return 404, {"content-type": "application/json"}, b"{}", 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status, headers, body, delay = self.resolve(request.method, str(request.url), await request.aread())
+        if delay:
+            await _real_sleep(delay)
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+    def request(self, method: str, url: str, params: Optional[Dict] = None, data: Any = None,
+                json_data: Any = None) -> requests.Response:
+        """
+        requests.request 的同步回放, 抖音客户端使用requests发请求
+        """
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        if json_data is not None:
+            content = json.dumps(json_data).encode("utf-8")
+        elif isinstance(data, dict):
+            content = urlencode(data).encode("utf-8")
+        elif isinstance(data, str):
+            content = data.encode("utf-8")
+        else:
+            content = data or b""
+        status, headers, body, _ = self.resolve(method, url, content)
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = body
+        response.url = url
+        response.encoding = "utf-8"
+        return response
+
+
+@contextlib.contextmanager
+def install_transport(transport: ReplayTransport) -> Iterator[ReplayTransport]:
+    """
+    在上下文内把所有新建的httpx.AsyncClient和requests.request请求都指向回放传输层
+    :param transport:
+    :return:
+    """
+    original_init = httpx.AsyncClient.__init__
+    original_request = requests.request
+
+    def replay_init(client, *args, **kwargs):
+        kwargs.pop("proxies", None)
+        kwargs["transport"] = transport
+        original_init(client, *args, **kwargs)
+
+    def replay_request(method, url, params=None, data=None, json=None, **kwargs):
+        return transport.request(method, url, params=params, data=data, json_data=json)
+
+    httpx.AsyncClient.__init__ = replay_init
+    requests.request = replay_request
+    try:
+        yield transport
+    finally:
+        httpx.AsyncClient.__init__ = original_init
+        requests.request = original_request
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    """
+    读取平台的回放数据文件
+    :param path:
+    :return:
+    """
+    with open(path, "rb") as f:
+        return json_codec.loads(f.read())
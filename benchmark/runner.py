@@ -0,0 +1,357 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 离线回放基准测试入口: 每种存储方式一个子进程, 依次回放各平台的 search/detail/creator 流程,
+#            统计吞吐(items/sec)、各阶段p50/p99延迟和内存峰值, 并与基线对比拦截性能回退
+#            python -m benchmark.runner --stores json,csv,sqlite --baseline benchmark/baseline.json
+
+import argparse
+import asyncio
+import copy
+import json
+import math
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import config
+from base.concurrency import STAGES, reset_stage_semaphores
+from main import CrawlerFactory
+from metrics.crawler_metrics import STORE_ITEMS
+from metrics.loop_watchdog import LoopWatchdog
+from metrics.tracing import TRACER
+
+from .fake_browser import fake_async_playwright
+from .replay import ReplayTransport, install_transport, load_fixture
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_DIR = os.path.join(REPO_ROOT, "benchmark", "fixtures")
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmark", "baseline.json")
+FLOWS = ("search", "detail", "creator")
+STORE_BACKENDS = ("json", "csv", "sqlite")
+# 报告中按阶段统计耗时的列, 与 base.concurrency 中限制并发的阶段不同
+PROFILE_STAGES = ("network", "sign", "cdp", "decode", "store")
+# 单个回调阻塞事件循环超过该时长(毫秒)时记录调用位置, 只报告不拦截
+BLOCKING_THRESHOLD_MS = 50
+
+# 回放时的公共配置: 不下载媒体、不走代理和CDP, 打开评论和二级评论让流程尽量完整
+BENCHMARK_CONFIG = {
+    "ENABLE_IP_PROXY": False,
+    "ENABLE_CDP_MODE": False,
+    "SAVE_LOGIN_STATE": False,
+    "HEADLESS": True,
+    "LOGIN_TYPE": "cookie",
+    "SESSION_POOL_SIZE": 1,
+    "TASK_QUEUE_MODE": "",
+    "START_PAGE": 1,
+    "CRAWLER_MAX_NOTES_COUNT": 40,
+    "CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES": 20,
+    "MAX_CONCURRENCY_NUM": 1,
+    "STAGE_CONCURRENCY": {stage: 0 for stage in STAGES},
+    "PLATFORM_STAGE_CONCURRENCY": {},
+    "ENABLE_GET_IMAGES": False,
+    "ENABLE_GET_COMMENTS": True,
+    "ENABLE_GET_SUB_COMMENTS": True,
+    "ENABLE_GET_WORDCLOUD": False,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    最近秩法计算分位数
+    :param values: 样本
+    :param q: 分位, 0~1
+    :return:
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_stages(events: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    按阶段分类汇总trace事件的耗时
+    :param events: TRACER收集的事件, dur单位为微秒
+    :return: {stage: {"count", "p50_ms", "p99_ms"}}
+    """
+    durations: Dict[str, List[float]] = {}
+    for event in events:
+        durations.setdefault(event["cat"], []).append(event["dur"] / 1000)
+    return {
+        stage: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 0.5), 3),
+            "p99_ms": round(percentile(values, 0.99), 3),
+        }
+        for stage, values in durations.items()
+    }
+
+
+def count_store_items(platform: str) -> float:
+    return sum(child.value for labels, child in STORE_ITEMS.samples() if labels["platform"] == platform)
+
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay: float, result: Any = None) -> Any:
+    """
+    回放时跳过爬取间隔等待, 只让出一次事件循环
+    """
+    return await _real_sleep(0, result)
+
+
+async def run_scenario(platform: str, flow: str, fixture: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    用回放数据跑一遍平台的完整流程
+    :param platform: 平台
+    :param flow: search | detail | creator
+    :param fixture: 平台的回放数据
+    :return: 该流程的统计结果
+    """
+    config_snapshot = {name: copy.deepcopy(getattr(config, name)) for name in dir(config) if name.isupper()}
+    overrides = {**BENCHMARK_CONFIG, **fixture["config"].get("common", {}), **fixture["config"][flow]}
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    config.PLATFORM = platform
+    config.CRAWLER_TYPE = flow
+    reset_stage_semaphores()
+
+    transport = ReplayTransport(fixture["routes"], REPO_ROOT)
+    crawler = CrawlerFactory.create_crawler(platform)
+    crawler_module = sys.modules[crawler.__class__.__module__]
+    original_playwright = getattr(crawler_module, "async_playwright", None)
+    browser = fixture.get("browser", {})
+    crawler_module.async_playwright = fake_async_playwright(browser.get("evaluate", []), browser.get("cookies", {}))
+    asyncio.sleep = _no_sleep
+    TRACER.clear()
+    loop_watchdog = LoopWatchdog(threshold_ms=BLOCKING_THRESHOLD_MS)
+    items_before = count_store_items(platform)
+    start_time = time.perf_counter()
+    loop_watchdog.start()
+    try:
+        with install_transport(transport):
+            await crawler.start()
+    finally:
+        elapsed = time.perf_counter() - start_time
+        loop_watchdog.stop()
+        asyncio.sleep = _real_sleep
+        if original_playwright is not None:
+            crawler_module.async_playwright = original_playwright
+        for name, value in config_snapshot.items():
+            setattr(config, name, value)
+
+    items = count_store_items(platform) - items_before
+    return {
+        "platform": platform,
+        "flow": flow,
+        "items": int(items),
+        "requests": transport.request_count,
+        "unmatched": sorted(set(transport.unmatched)),
+        "elapsed_sec": round(elapsed, 4),
+        "items_per_sec": round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": summarize_stages(TRACER.get_events()),
+        "blocking_calls": [
+            {key: offender[key] for key in ("call_site", "count", "total_ms", "max_ms")}
+            for offender in loop_watchdog.get_offenders()[:5]
+        ],
+    }
+
+
+def get_peak_rss_mb() -> float:
+    # linux下ru_maxrss单位为KB, macOS下为字节
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+async def run_store_benchmark(store: str, platforms: Sequence[str], flows: Sequence[str]) -> Dict[str, Any]:
+    """
+    在当前进程中用指定的存储方式回放所有平台流程, 需要在临时工作目录中运行
+    :param store: json | csv | sqlite
+    :param platforms: 平台列表
+    :param flows: 流程列表
+    :return:
+    """
+    config.SAVE_DATA_OPTION = store
+    if store == "sqlite":
+        import db
+        config.SQLITE_DB_PATH = os.path.abspath("benchmark.db")
+        await db.init_table_schema("sqlite")
+    TRACER.configure(enabled=True, slow_threshold_ms=0)
+
+    scenarios = []
+    for platform in platforms:
+        fixture = load_fixture(os.path.join(FIXTURE_DIR, f"{platform}.json"))
+        for flow in flows:
+            if flow in fixture["config"]:
+                scenarios.append(await run_scenario(platform, flow, fixture))
+    return {"store": store, "scenarios": scenarios, "peak_rss_mb": get_peak_rss_mb()}
+
+
+def prepare_workdir(workdir: str) -> None:
+    """
+    爬虫和存储使用相对路径读取js、graphql和建表语句、写入data目录, 在临时目录中链接需要的只读目录
+    :param workdir:
+    :return:
+    """
+    for name in ("libs", "schema", "media_platform"):
+        link = os.path.join(workdir, name)
+        if not os.path.exists(link):
+            os.symlink(os.path.join(REPO_ROOT, name), link)
+
+
+def spawn_store_benchmark(store: str, platforms: Sequence[str], flows: Sequence[str]) -> Dict[str, Any]:
+    """
+    每种存储方式在独立子进程中运行, 内存峰值互不影响
+    :param store:
+    :param platforms:
+    :param flows:
+    :return:
+    """
+    with tempfile.TemporaryDirectory(prefix=f"mediacrawler_bench_{store}_") as workdir:
+        prepare_workdir(workdir)
+        result_file = os.path.join(workdir, "result.json")
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")]))}
+        command = [
+            sys.executable, "-m", "benchmark.runner", "--worker",
+            "--stores", store, "--platforms", ",".join(platforms), "--flows", ",".join(flows),
+            "--result_file", result_file,
+        ]
+        process = subprocess.run(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if process.returncode != 0 or not os.path.exists(result_file):
+            raise RuntimeError(f"benchmark worker for store {store} failed:\n{process.stderr.decode(errors='ignore')[-4000:]}")
+        with open(result_file, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def check_regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线对比, 返回回退项说明
+    吞吐低于基线的(1 - tolerance)、内存峰值高于基线的(1 + tolerance)、存储条数与基线不同或有未录制的请求都算回退
+    :param report: 本次结果
+    :param baseline: 基线结果
+    :param tolerance: 允许的波动比例
+    :return:
+    """
+    problems = []
+    baseline_stores = {item["store"]: item for item in baseline.get("stores", [])}
+    for store_result in report["stores"]:
+        store = store_result["store"]
+        for scenario in store_result["scenarios"]:
+            if scenario["unmatched"]:
+                problems.append(f"{store}/{scenario['platform']}/{scenario['flow']}: "
+                                f"requests without replay route {scenario['unmatched']}")
+        base = baseline_stores.get(store)
+        if base is None:
+            continue
+        if store_result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{store}: peak rss {store_result['peak_rss_mb']}MB > baseline {base['peak_rss_mb']}MB")
+        base_scenarios = {(s["platform"], s["flow"]): s for s in base["scenarios"]}
+        for scenario in store_result["scenarios"]:
+            key = (scenario["platform"], scenario["flow"])
+            base_scenario = base_scenarios.get(key)
+            if base_scenario is None:
+                continue
+            name = f"{store}/{key[0]}/{key[1]}"
+            if scenario["items"] != base_scenario["items"]:
+                problems.append(f"{name}: stored {scenario['items']} items, baseline {base_scenario['items']}")
+            if scenario["items_per_sec"] < base_scenario["items_per_sec"] * (1 - tolerance):
+                problems.append(f"{name}: {scenario['items_per_sec']} items/sec < "
+                                f"baseline {base_scenario['items_per_sec']} items/sec")
+    return problems
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'store':<8}{'platform':<10}{'flow':<9}{'items':>7}{'items/s':>10}"
+             + "".join(f"{stage + ' p50/p99(ms)':>26}" for stage in PROFILE_STAGES)]
+    for store_result in report["stores"]:
+        for scenario in store_result["scenarios"]:
+            stage_cells = []
+            for stage in PROFILE_STAGES:
+                stat = scenario["stages"].get(stage)
+                stage_cells.append(f"{stat['p50_ms']:.3f}/{stat['p99_ms']:.3f}" if stat else "-")
+            lines.append(f"{store_result['store']:<8}{scenario['platform']:<10}{scenario['flow']:<9}"
+                         f"{scenario['items']:>7}{scenario['items_per_sec']:>10.1f}"
+                         + "".join(f"{cell:>26}" for cell in stage_cells))
+        lines.append(f"{store_result['store']:<8}peak rss: {store_result['peak_rss_mb']}MB")
+        for scenario in store_result["scenarios"]:
+            for offender in scenario.get("blocking_calls", []):
+                lines.append(f"{store_result['store']:<8}{scenario['platform']:<10}{scenario['flow']:<9}"
+                             f"blocked loop {offender['count']} times, total {offender['total_ms']}ms: "
+                             f"{offender['call_site']}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="MediaCrawler offline replay benchmark")
+    parser.add_argument("--platforms", type=str, default=",".join(CrawlerFactory.CRAWLERS),
+                        help="platforms to replay, separated by comma")
+    parser.add_argument("--flows", type=str, default=",".join(FLOWS), help="search,detail,creator")
+    parser.add_argument("--stores", type=str, default=",".join(STORE_BACKENDS), help="json,csv,sqlite")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="baseline file to compare with")
+    parser.add_argument("--save_baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed regression ratio")
+    parser.add_argument("--report", type=str, default="", help="write the full report json to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result_file", type=str, default="", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    platforms = [p for p in args.platforms.split(",") if p]
+    flows = [f for f in args.flows.split(",") if f]
+    stores = [s for s in args.stores.split(",") if s]
+
+    if args.worker:
+        # 与main.py一致使用默认事件循环, 各store在导入时创建的asyncio.Lock绑定的就是这个循环
+        result = asyncio.get_event_loop().run_until_complete(run_store_benchmark(stores[0], platforms, flows))
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        return 0
+
+    report = {
+        "python": sys.version.split()[0],
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "stores": [spawn_store_benchmark(store, platforms, flows) for store in stores],
+    }
+    print(format_report(report))
+    if args.report:
+        pathlib.Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        baseline = load_fixture(args.baseline)
+    problems = check_regressions(report, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
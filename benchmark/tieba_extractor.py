@@ -0,0 +1,97 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 贴吧页面解析基准测试: 用 media_platform/tieba/test_data 下的页面测量 TieBaExtractor 各个方法的耗时
+#            python -m benchmark.tieba_extractor --iterations 20
+
+import argparse
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from media_platform.tieba.help import TieBaExtractor
+from model.m_baidu_tieba import TiebaComment
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DATA_DIR = os.path.join(REPO_ROOT, "media_platform", "tieba", "test_data")
+PARENT_COMMENT = TiebaComment(comment_id="123456", content="content", user_link="user_link",
+                              user_nickname="user_nickname", user_avatar="user_avatar", publish_time="publish_time",
+                              parent_comment_id="parent_comment_id", note_id="note_id", note_url="note_url",
+                              tieba_id="tieba_id", tieba_name="tieba_name", tieba_link="tieba_link")
+# (页面文件, 解析方法, 额外参数)
+CASES = (
+    ("search_keyword_notes.html", "extract_search_note_list", ()),
+    ("tieba_note_list.html", "extract_tieba_note_list", ()),
+    ("note_detail.html", "extract_note_detail", ()),
+    ("note_comments.html", "extract_tieba_note_parment_comments", ("123456",)),
+    ("note_sub_comments.html", "extract_tieba_note_sub_comments", (PARENT_COMMENT,)),
+)
+
+
+def load_page(file_name: str) -> str:
+    with open(os.path.join(TEST_DATA_DIR, file_name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def run_case(extractor: TieBaExtractor, file_name: str, method: str, args: Sequence[Any],
+             iterations: int) -> Dict[str, Any]:
+    """
+    重复解析同一个页面, 取单次耗时的中位数和最小值
+    :param extractor: 解析器
+    :param file_name: 页面文件
+    :param method: 解析方法名
+    :param args: 额外参数
+    :param iterations: 重复次数
+    :return:
+    """
+    page_content = load_page(file_name)
+    extract = getattr(extractor, method)
+    result = extract(page_content, *args)
+    durations: List[float] = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        extract(page_content, *args)
+        durations.append((time.perf_counter() - started_at) * 1000)
+    durations.sort()
+    return {
+        "file": file_name,
+        "method": method,
+        "size_kb": round(len(page_content.encode("utf-8")) / 1024, 1),
+        "items": len(result) if isinstance(result, list) else 1,
+        "median_ms": round(durations[len(durations) // 2], 3),
+        "min_ms": round(durations[0], 3),
+    }
+
+
+def run(iterations: int) -> List[Dict[str, Any]]:
+    extractor = TieBaExtractor()
+    return [run_case(extractor, file_name, method, args, iterations) for file_name, method, args in CASES]
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'file':<28}{'method':<40}{'size(KB)':>10}{'items':>8}{'median(ms)':>12}{'min(ms)':>10}"]
+    for item in results:
+        lines.append(f"{item['file']:<28}{item['method']:<40}{item['size_kb']:>10}{item['items']:>8}"
+                     f"{item['median_ms']:>12}{item['min_ms']:>10}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="TieBaExtractor parsing benchmark")
+    parser.add_argument("--iterations", type=int, default=20, help="parse each page this many times")
+    args = parser.parse_args(argv)
+    print(format_report(run(max(1, args.iterations))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -36,5 +36,8 @@ class CacheFactory:
         elif cache_type == 'redis':
             from .redis_cache import RedisCache
             return RedisCache()
+        elif cache_type == 'tiered':
+            from .tiered_cache import TieredCache
+            return TieredCache(*args, **kwargs)
         else:
             raise ValueError(f'Unknown cache type: {cache_type}')
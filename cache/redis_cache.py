@@ -16,9 +16,10 @@
 # @Desc    : RedisCache实现
 import pickle
 import time
-from typing import Any, List
+from typing import Any, Callable, List
 
 from redis import Redis
+from redis.client import PubSubWorkerThread
 
 from cache.abs_cache import AbstractCache
 from config import db_config
@@ -70,6 +71,34 @@ class RedisCache(AbstractCache):
         """
         return [key.decode() for key in self._redis_client.keys(pattern)]
 
+    def ttl(self, key: str) -> int:
+        """
+        获取key的剩余过期时间(秒)
+        :param key:
+        :return: -2 表示key不存在, -1 表示key未设置过期时间
+        """
+        return self._redis_client.ttl(key)
+
+    def publish(self, channel: str, message: str) -> None:
+        """
+        向指定频道发布一条消息
+        :param channel: 频道名称
+        :param message: 消息内容
+        :return:
+        """
+        self._redis_client.publish(channel, message)
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> PubSubWorkerThread:
+        """
+        订阅指定频道, 在后台线程中把收到的消息交给handler处理
+        :param channel: 频道名称
+        :param handler: 消息处理函数, 入参为解码后的消息内容
+        :return: 后台线程对象, 调用stop()停止订阅
+        """
+        pubsub = self._redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{channel: lambda message: handler(message["data"].decode())})
+        return pubsub.run_in_thread(sleep_time=1, daemon=True)
+
 
 if __name__ == '__main__':
     redis_cache = RedisCache()
@@ -0,0 +1,193 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 二级缓存实现, 进程内LRU缓存 + Redis缓存
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache.abs_cache import AbstractCache
+
+
+class TieredCache(AbstractCache):
+    # 多进程之间通过该频道广播key失效消息
+    INVALIDATE_CHANNEL = "mediacrawler:cache:invalidate"
+
+    def __init__(self, local_max_size: int = 1024, local_ttl: int = 60,
+                 remote: Optional[AbstractCache] = None, enable_invalidate: bool = True):
+        """
+        初始化二级缓存, 热点key优先从进程内缓存读取, 未命中时回源到Redis
+        :param local_max_size: 进程内缓存最多保存的key数量, 超出后按LRU淘汰
+        :param local_ttl: 进程内缓存的最长过期时间(秒), 不会超过Redis中key的剩余过期时间
+        :param remote: 远端缓存, 默认为RedisCache
+        :param enable_invalidate: 是否通过Redis pub/sub 接收其他进程的key失效通知
+        :return:
+        """
+        self._subscriber = None
+        if remote is None:
+            from cache.redis_cache import RedisCache
+            remote = RedisCache()
+        self._remote = remote
+        self._local_max_size = local_max_size
+        self._local_ttl = local_ttl
+        self._local_container: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._instance_id = uuid.uuid4().hex
+        self._local_hits = 0
+        self._remote_hits = 0
+        self._misses = 0
+        if enable_invalidate and hasattr(self._remote, "subscribe"):
+            self._subscriber = self._remote.subscribe(self.INVALIDATE_CHANNEL, self._on_invalidate)
+
+    def __del__(self):
+        """
+        析构函数，停止订阅失效通知
+        :return:
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        停止订阅失效通知
+        :return:
+        """
+        if self._subscriber is not None:
+            self._subscriber.stop()
+            self._subscriber = None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值, 先查进程内缓存, 未命中再查Redis并回填进程内缓存
+        :param key:
+        :return:
+        """
+        with self._lock:
+            value = self._get_local(key)
+            if value is not None:
+                self._local_hits += 1
+                return value
+
+        value = self._remote.get(key)
+        if value is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._remote_hits += 1
+            expire_time = self._local_expire_time(key)
+            if expire_time > 0:
+                self._set_local(key, value, expire_time)
+        return value
+
+    def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值写入Redis和进程内缓存, 并通知其他进程该key已失效
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        self._remote.set(key, value, expire_time)
+        with self._lock:
+            self._set_local(key, value, min(expire_time, self._local_ttl))
+        if hasattr(self._remote, "publish"):
+            self._remote.publish(self.INVALIDATE_CHANNEL, f"{self._instance_id}:{key}")
+
+    def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key, 以Redis中的数据为准
+        :param pattern: 匹配模式
+        :return:
+        """
+        return self._remote.keys(pattern)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        获取各级缓存的命中情况
+        :return:
+        """
+        with self._lock:
+            total = self._local_hits + self._remote_hits + self._misses
+            return {
+                "local_hits": self._local_hits,
+                "remote_hits": self._remote_hits,
+                "misses": self._misses,
+                "local_hit_ratio": self._local_hits / total if total else 0.0,
+                "remote_hit_ratio": self._remote_hits / total if total else 0.0,
+                "local_size": len(self._local_container),
+            }
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        """
+        从进程内缓存获取值, 调用方需持有锁
+        :param key:
+        :return:
+        """
+        value, expire_time = self._local_container.get(key, (None, 0))
+        if value is None:
+            return None
+        if expire_time < time.time():
+            del self._local_container[key]
+            return None
+        self._local_container.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        写入进程内缓存, 超出容量时淘汰最久未使用的key, 调用方需持有锁
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        self._local_container[key] = (value, time.time() + expire_time)
+        self._local_container.move_to_end(key)
+        while len(self._local_container) > self._local_max_size:
+            self._local_container.popitem(last=False)
+
+    def _local_expire_time(self, key: str) -> int:
+        """
+        计算回填进程内缓存时的过期时间, 保证不晚于Redis中key的过期时间
+        :param key:
+        :return: 小于等于0表示不应回填
+        """
+        if not hasattr(self._remote, "ttl"):
+            return self._local_ttl
+        remote_ttl = self._remote.ttl(key)
+        if remote_ttl == -1:
+            return self._local_ttl
+        return min(remote_ttl, self._local_ttl)
+
+    def _on_invalidate(self, message: str) -> None:
+        """
+        处理其他进程发来的key失效通知
+        :param message: 格式为 "{instance_id}:{key}"
+        :return:
+        """
+        instance_id, _, key = message.partition(":")
+        if instance_id == self._instance_id:
+            return
+        with self._lock:
+            self._local_container.pop(key, None)
+
+
+if __name__ == '__main__':
+    tiered_cache = TieredCache(local_max_size=2, local_ttl=10)
+    tiered_cache.set("name", "程序员阿江-Relakkes", 5)
+    print(tiered_cache.get("name"))
+    print(tiered_cache.keys("*"))
+    print(tiered_cache.get_stats())
+    tiered_cache.close()
@@ -8,6 +8,8 @@ import json
 import os
 from typing import List, Dict, Any
 
+from tools import json_codec
+
 def parse_har_file_stats_only(har_file_path: str) -> Dict[str, int]:
     """
     只解析HAR文件统计信息，不返回具体数据
@@ -20,8 +22,8 @@ def parse_har_file_stats_only(har_file_path: str) -> Dict[str, int]:
     }
     
     try:
-        with open(har_file_path, 'r', encoding='utf-8') as f:
-            har_data = json.load(f)
+        with open(har_file_path, 'rb') as f:
+            har_data = json_codec.loads(f.read())
     except Exception as e:
         print(f"❌ 读取HAR文件失败: {e}")
         return stats
@@ -64,7 +66,7 @@ def parse_har_file_stats_only(har_file_path: str) -> Dict[str, int]:
                                 
                                 # 尝试解析JSON
                                 try:
-                                    response_data = json.loads(response_text)
+                                    response_data = json_codec.loads(response_text)
                                     
                                     # 提取 aweme_list
                                     if 'aweme_list' in response_data:
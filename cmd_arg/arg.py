@@ -12,6 +12,7 @@
 import argparse
 
 import config
+from base.concurrency import apply_concurrency_arg
 from tools.utils import str2bool
 
 
@@ -40,6 +41,20 @@ async def parse_cmd():
                         choices=['csv', 'db', 'json', 'sqlite'], default=config.SAVE_DATA_OPTION)
     parser.add_argument('--cookies', type=str,
                         help='Cookies used for cookie login type / Cookie登录方式使用的Cookie值', default=config.COOKIES)
+    parser.add_argument('--task_queue_mode', type=str,
+                        help='Distributed task queue mode / 分布式任务队列模式 (producer=写入任务 | worker=执行任务)',
+                        choices=['', 'producer', 'worker'], default=config.TASK_QUEUE_MODE)
+    parser.add_argument('--profile', type=str,
+                        help='Profile the run and save a report to PROFILE_EXPORT_DIR / 性能分析模式 (cprofile=确定性分析 | sample=采样分析)',
+                        choices=['', 'cprofile', 'sample'], default=config.PROFILE_MODE)
+    parser.add_argument('--concurrency', type=str,
+                        help='Concurrency per stage, e.g. "4,comments=8,media=2,dy.detail=1" / 并发数控制, 单独的数字设置全局并发数, '
+                             '阶段: keyword,search,detail,comments,sub_comments,media,creator, 可以加平台前缀')
+    parser.add_argument('--id_file', type=str,
+                        help='Read ids for detail mode from a file, "-" for stdin / 详情模式从文件读取ID列表, "-"为标准输入',
+                        default=config.SPECIFIED_ID_FILE)
+    parser.add_argument('--loop_watchdog', type=str2bool,
+                        help='''Whether to report callbacks blocking the event loop / 是否开启事件循环阻塞看门狗, supported values case insensitive / 支持的值(不区分大小写) ('yes', 'true', 't', 'y', '1', 'no', 'false', 'f', 'n', '0')''')
 
     args = parser.parse_args()
 
@@ -56,3 +71,10 @@ async def parse_cmd():
         config.ENABLE_GET_SUB_COMMENTS = args.get_sub_comment
     config.SAVE_DATA_OPTION = args.save_data_option
     config.COOKIES = args.cookies
+    config.TASK_QUEUE_MODE = args.task_queue_mode
+    config.PROFILE_MODE = args.profile
+    config.SPECIFIED_ID_FILE = args.id_file
+    if args.concurrency:
+        apply_concurrency_arg(args.concurrency)
+    if args.loop_watchdog is not None:
+        config.ENABLE_LOOP_WATCHDOG = args.loop_watchdog
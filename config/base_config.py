@@ -26,6 +26,15 @@ IP_PROXY_POOL_COUNT = 2
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"
 
+# 代理IP健康检测间隔(秒)，开启IP验证时后台会定时并发检测池中所有IP，剔除失效的IP
+IP_PROXY_HEALTH_CHECK_INTERVAL = 60
+
+# 代理IP剩余有效期低于该值(秒)时，后台提前从代理商预取新IP并热切换客户端使用的代理
+IP_PROXY_REFRESH_BEFORE_EXPIRE_SEC = 60
+
+# 检查代理IP是否即将过期的间隔(秒)
+IP_PROXY_EXPIRE_CHECK_INTERVAL = 10
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -65,9 +74,69 @@ AUTO_CLOSE_BROWSER = True
 # 数据保存类型选项配置,支持四种类型：csv、db、json、sqlite, 最好保存到DB，有排重的功能。
 SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite
 
+# JSON编解码后端，auto时依次尝试msgspec、orjson(需自行pip安装)，都没有安装时使用标准库json，输出格式与标准库一致
+JSON_CODEC = "auto"  # auto or msgspec or orjson or json
+
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
 
+# 会话池大小，大于1时在同一进程内启动多个浏览器上下文（各自独立的浏览器缓存目录、Cookie和代理IP），
+# 并把关键词/指定ID/创作者等任务轮询分配给各个会话并行爬取
+SESSION_POOL_SIZE = 1
+
+# 各会话使用的Cookie，按会话顺序一一对应，未配置的会话使用COOKIES
+SESSION_COOKIES_LIST = []
+
+# 分布式任务队列模式，为空时不使用任务队列
+# producer: 把当前配置的关键词/指定ID/创作者等任务写入队列后退出
+# worker: 从队列中拉取任务执行，可以在多台机器上同时启动多个worker
+TASK_QUEUE_MODE = ""
+
+# 任务队列类型，redis（多机共享） | sqlite（单机，数据库路径见 db_config.TASK_QUEUE_SQLITE_PATH）
+TASK_QUEUE_TYPE = "redis"
+
+# 任务队列名称，不同的爬取任务可以使用不同的队列
+TASK_QUEUE_NAME = "default"
+
+# worker每次拉取的任务数量
+TASK_QUEUE_BATCH_SIZE = 10
+
+# 任务租约时长（秒），worker崩溃后租约到期的任务会被其他worker重新执行
+TASK_QUEUE_LEASE_SEC = 300
+
+# 任务执行失败的最大重试次数
+TASK_QUEUE_MAX_RETRY = 3
+
+# 是否开启本地指标HTTP接口，开启后可以访问 http://127.0.0.1:9100/metrics（Prometheus格式）或 /metrics.json
+ENABLE_METRICS_SERVER = False
+METRICS_SERVER_HOST = "127.0.0.1"
+METRICS_SERVER_PORT = 9100
+
+# 程序退出时把指标摘要保存为JSON文件的目录，为空时不保存
+METRICS_DUMP_DIR = "data/metrics"
+
+# 是否开启耗时追踪，开启后程序退出时在TRACE_EXPORT_DIR目录下导出Chrome trace文件（chrome://tracing 或 Perfetto 打开）
+ENABLE_TRACE = False
+TRACE_EXPORT_DIR = "data/trace"
+
+# 慢操作阈值（毫秒），CDP调用、签名、请求、解析和存储耗时超过该值时打印日志，为0时不打印
+TRACE_SLOW_THRESHOLD_MS = 3000
+
+# 性能分析模式，cprofile=确定性分析 | sample=线程采样分析，为空时不开启，报告保存在PROFILE_EXPORT_DIR目录
+PROFILE_MODE = ""
+PROFILE_EXPORT_DIR = "data/profile"
+
+# 采样分析的采样间隔（毫秒）
+PROFILE_SAMPLE_INTERVAL_MS = 5
+
+# 事件循环延迟告警阈值（毫秒），性能分析时事件循环被同步调用阻塞超过该值会打印日志并记录到报告
+LOOP_LAG_THRESHOLD_MS = 100
+
+# 是否开启事件循环阻塞看门狗，开启后单个回调阻塞事件循环超过阈值时抓取调用栈，程序退出时按调用位置汇总保存报告
+ENABLE_LOOP_WATCHDOG = False
+LOOP_WATCHDOG_THRESHOLD_MS = 200
+LOOP_WATCHDOG_EXPORT_DIR = "data/watchdog"
+
 # 爬取开始页数 默认从第一页开始
 START_PAGE = 1
 
@@ -77,9 +146,72 @@ CRAWLER_MAX_NOTES_COUNT = 1
 # 并发爬虫数量控制
 MAX_CONCURRENCY_NUM = 1
 
+# 各阶段的并发数控制, 为0时使用MAX_CONCURRENCY_NUM, 同一阶段的所有任务(包括会话池中的多个会话)共用一个并发上限
+# keyword=同时搜索的关键词数 | search=搜索 | detail=详情 | comments=一级评论 | sub_comments=二级评论 | media=图片视频下载 | creator=创作者信息、粉丝、关注、动态
+STAGE_CONCURRENCY = {
+    "keyword": 0,
+    "search": 0,
+    "detail": 0,
+    "comments": 0,
+    "sub_comments": 0,
+    "media": 0,
+    "creator": 0,
+}
+
+# 按平台覆盖各阶段的并发数，例如 {"dy": {"detail": 1}, "bili": {"media": 2}}
+PLATFORM_STAGE_CONCURRENCY = {}
+
+# 详情模式从文件读取大量ID(每行一个, 小红书为笔记完整URL), "-"为标准输入, 设置后不使用 *_SPECIFIED_ID_LIST,
+# 目前支持 xhs、dy、bili; 逐个读取, 完成一个保存一个, 中断后重新运行从断点继续
+SPECIFIED_ID_FILE = ""
+# 同时进行的详情任务数(包括保存、爬取评论), 实际请求并发仍由 detail 阶段的并发数控制
+SPECIFIED_ID_WINDOW = 20
+# 断点保存目录
+SPECIFIED_ID_CHECKPOINT_DIR = "data/checkpoint"
+# (分片序号, 分片数): 只处理序号除以分片数余数等于分片序号的ID, 各分片使用单独的断点,
+# 会话池中各会话自动分配分片, 也可以用于多个进程分别处理同一个文件
+SPECIFIED_ID_SHARD = (0, 1)
+
 # 是否开启爬图片模式, 默认不开启爬图片
 ENABLE_GET_IMAGES = True
 
+# 图片视频按内容去重保存: 相同内容在 MEDIA_STORE_DIR 下只保存一份, 各笔记目录中的文件是指向它的链接,
+# 同时记录URL对应的内容, 已经下载过的URL不再重复下载
+MEDIA_STORE_DIR = "data/media"
+# hardlink=硬链接(跨磁盘时退化为复制) | symlink=软链接 | copy=复制 | off=不去重, 直接写入笔记目录
+MEDIA_STORE_LINK_MODE = "hardlink"
+# 已下载过的URL默认直接使用本地文件, 设置为True时用 If-None-Match/If-Modified-Since 向服务端确认没有变化后再使用
+MEDIA_REVALIDATE = False
+# 大于0时图片视频由该数量的下载协程在后台下载, 爬取元数据不等待下载完成; 默认0, 在爬取流程中直接下载
+MEDIA_WORKER_NUM = 0
+# 等待下载的任务数上限, 队列满时提交任务的爬取流程等待
+MEDIA_QUEUE_SIZE = 1000
+# 所有媒体下载共用的带宽上限, 单位字节/秒, 0为不限制
+MEDIA_MAX_BYTES_PER_SEC = 0
+# 队列中图片优先于视频下载, 已知大小超过该值的视频排在最后
+MEDIA_LARGE_VIDEO_BYTES = 50 * 1024 * 1024
+# 已知大小超过该值的文件用Range请求分段并行下载, 各段写入临时文件后拼接, 单段失败只重试该段, 0为不分段
+MEDIA_SEGMENT_BYTES = 8 * 1024 * 1024
+# 单个文件同时下载的分段数
+MEDIA_SEGMENT_CONCURRENCY = 4
+# 单个分段的最大重试次数
+MEDIA_SEGMENT_RETRY = 3
+
+# 图片后处理: 下载保存后在进程池中生成缩略图、重新压缩, 结果和图片尺寸记录到 MEDIA_STORE_DIR 的清单中
+ENABLE_IMAGE_PROCESS = False
+# 缩略图最长边的像素, 文件名为 {原文件名}_thumb.{格式}, 0为不生成
+IMAGE_THUMBNAIL_SIZE = 320
+# 缩略图格式 webp | jpeg | avif(需要Pillow支持AVIF)
+IMAGE_THUMBNAIL_FORMAT = "webp"
+# 原图重新压缩的格式 webp | avif, 文件名为 {原文件名去掉扩展名}.{格式}, 为空时不重新压缩
+IMAGE_RECOMPRESS_FORMAT = "webp"
+# 缩略图和重新压缩的质量 1-100
+IMAGE_QUALITY = 80
+# 重新压缩后是否保留原图, 不保留时删除笔记目录中的原图, hardlink模式下没有其他笔记引用时同时删除 MEDIA_STORE_DIR 中的原内容
+IMAGE_KEEP_ORIGINAL = True
+# 图片处理的进程数
+IMAGE_PROCESS_WORKERS = 2
+
 # 是否开启爬评论模式, 默认开启爬评论
 ENABLE_GET_COMMENTS = False
 
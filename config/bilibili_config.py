@@ -45,3 +45,9 @@ CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES = 100
 
 # 单个视频/帖子最大爬取动态数
 CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES = 50
+
+# 下载视频的清晰度(qn): 16=360P 32=480P 64=720P 80=1080P 112=1080P+ 116=1080P60 120=4K, 高于账号可用清晰度时返回可用的最高清晰度
+BILI_VIDEO_QUALITY = 80
+
+# 下载视频的大小上限(字节), 超过时依次换用更低的清晰度, 最低清晰度仍超过上限时不下载, 0为不限制
+BILI_VIDEO_MAX_BYTES = 0
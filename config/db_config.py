@@ -28,6 +28,10 @@ REDIS_DB_NUM = os.getenv("REDIS_DB_NUM", 0)  # your redis db num
 # cache type
 CACHE_TYPE_REDIS = "redis"
 CACHE_TYPE_MEMORY = "memory"
+CACHE_TYPE_TIERED = "tiered"
 
 # sqlite config
-SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
\ No newline at end of file
+SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
+
+# task queue sqlite config
+TASK_QUEUE_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "task_queue.db")
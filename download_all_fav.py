@@ -18,7 +18,7 @@ import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import store.douyin as douyin_store
-from tools import utils
+from tools import json_codec, utils
 
 def sanitize_folder_name(title: str, aweme_id: str) -> str:
     """
@@ -56,8 +56,8 @@ def parse_har_file(har_file_path: str) -> List[Dict]:
     successful_responses = 0
     
     try:
-        with open(har_file_path, 'r', encoding='utf-8') as f:
-            har_data = json.load(f)
+        with open(har_file_path, 'rb') as f:
+            har_data = json_codec.loads(f.read())
     except Exception as e:
         print(f"❌ 读取HAR文件失败: {e}")
         return aweme_list
@@ -131,7 +131,7 @@ def parse_har_file(har_file_path: str) -> List[Dict]:
                                 print(f"🔍 响应文本前100字符: {response_text[:100]}")
                                 try:
                                     # 解析响应 JSON 数据
-                                    response_data = json.loads(response_text)
+                                    response_data = json_codec.loads(response_text)
                                     print(f"📊 响应数据键: {list(response_data.keys())}")
                                     
                                     # 提取 aweme_list
@@ -288,6 +288,10 @@ async def download_video(aweme_item: Dict):
         return
     
     video_url = video_urls[0]
+    # 其他作品或之前的抓取已经下载过这个链接时直接链接已有文件
+    if await douyin_store.link_douyin_aweme_video_for_love(aweme_item, video_url, f"{aweme_id}.mp4"):
+        print(f"⏭️  视频 {aweme_id} 已下载过，直接链接已有文件")
+        return
     print(f"📹 下载视频: {aweme_id}")
     print(f"🔗 视频链接: {video_url[:80]}...")
     
@@ -311,7 +315,8 @@ async def download_video(aweme_item: Dict):
             await douyin_store.update_douyin_aweme_video_for_love(
                 aweme_item=aweme_item,
                 video_content=video_content,
-                extension_file_name=f"{aweme_id}{extension}"
+                extension_file_name=f"{aweme_id}{extension}",
+                url=video_url
             )
             print(f"✅ 视频下载成功")
         else:
@@ -360,6 +365,17 @@ async def download_images(aweme_item: Dict):
                 continue
             
             image_url = url_list[0]
+            # 获取文件扩展名
+            extension = '.jpg'  # 抖音图片通常是jpg格式
+            if 'webp' in image_url.lower():
+                extension = '.webp'
+            elif 'png' in image_url.lower():
+                extension = '.png'
+            extension_file_name = f"{aweme_id}_{idx}{extension}"
+
+            if await douyin_store.link_douyin_aweme_image_for_love(aweme_id, image_url, extension_file_name, aweme_item):
+                print(f"⏭️  图片 {idx} 已下载过，直接链接已有文件")
+                continue
             print(f"📸 下载图片 {idx}/{len(images)}: {image_url[:80]}...")
             
             # 下载图片内容
@@ -374,19 +390,13 @@ async def download_images(aweme_item: Dict):
                 file_size = len(image_content)
                 print(f"📦 图片大小: {file_size / 1024:.2f} KB")
                 
-                # 获取文件扩展名
-                extension = '.jpg'  # 抖音图片通常是jpg格式
-                if 'webp' in image_url.lower():
-                    extension = '.webp'
-                elif 'png' in image_url.lower():
-                    extension = '.png'
-                
                 # 保存图片文件（使用修复后的存储逻辑，包含aweme_item参数）
                 await douyin_store.update_douyin_aweme_image_for_love(
                     aweme_id=aweme_id,
                     pic_content=image_content,
-                    extension_file_name=f"{aweme_id}_{idx}{extension}",
-                    aweme_item=aweme_item  # 关键：传递完整的作品信息
+                    extension_file_name=extension_file_name,
+                    aweme_item=aweme_item,  # 关键：传递完整的作品信息
+                    url=image_url
                 )
                 print(f"✅ 图片 {idx} 下载成功")
             else:
@@ -10,57 +10,135 @@
 
 
 import asyncio
+import importlib
 import sys
 from typing import Optional
 
 import cmd_arg
 import config
-import db
 from base.base_crawler import AbstractCrawler
-from media_platform.bilibili import BilibiliCrawler
-from media_platform.douyin import DouYinCrawler
-from media_platform.kuaishou import KuaishouCrawler
-from media_platform.tieba import TieBaCrawler
-from media_platform.weibo import WeiboCrawler
-from media_platform.xhs import XiaoHongShuCrawler
-from media_platform.zhihu import ZhihuCrawler
+from base.media_pipeline import get_media_pipeline
+from base.session_pool import CrawlerSessionPool
+from config import db_config
+from metrics.exporter import MetricsServer, dump_metrics
+from metrics.loop_watchdog import LoopWatchdog
+from metrics.profiler import RunProfiler
+from metrics.tracing import TRACER
+from task_queue.queue_factory import TaskQueueFactory
+from task_queue.worker import CrawlTaskWorker, produce_tasks
 
 
 class CrawlerFactory:
+    # 平台 -> (模块, 爬虫类名), 只导入选中的平台, 缩短启动时间
     CRAWLERS = {
-        "xhs": XiaoHongShuCrawler,
-        "dy": DouYinCrawler,
-        "ks": KuaishouCrawler,
-        "bili": BilibiliCrawler,
-        "wb": WeiboCrawler,
-        "tieba": TieBaCrawler,
-        "zhihu": ZhihuCrawler,
+        "xhs": ("media_platform.xhs", "XiaoHongShuCrawler"),
+        "dy": ("media_platform.douyin", "DouYinCrawler"),
+        "ks": ("media_platform.kuaishou", "KuaishouCrawler"),
+        "bili": ("media_platform.bilibili", "BilibiliCrawler"),
+        "wb": ("media_platform.weibo", "WeiboCrawler"),
+        "tieba": ("media_platform.tieba", "TieBaCrawler"),
+        "zhihu": ("media_platform.zhihu", "ZhihuCrawler"),
     }
 
     @staticmethod
     def create_crawler(platform: str) -> AbstractCrawler:
-        crawler_class = CrawlerFactory.CRAWLERS.get(platform)
-        if not crawler_class:
+        crawler_path = CrawlerFactory.CRAWLERS.get(platform)
+        if not crawler_path:
             raise ValueError(
                 "Invalid Media Platform Currently only supported xhs or dy or ks or bili ..."
             )
+        module_name, class_name = crawler_path
+        crawler_class = getattr(importlib.import_module(module_name), class_name)
         return crawler_class()
 
 
 crawler: Optional[AbstractCrawler] = None
+profiler: Optional[RunProfiler] = None
+loop_watchdog: Optional[LoopWatchdog] = None
+
+
+async def run_task_queue():
+    """
+    分布式任务队列模式, producer把任务写入队列, worker从队列中拉取任务执行
+    :return:
+    """
+    task_queue = TaskQueueFactory.create_queue(
+        config.TASK_QUEUE_TYPE, config.TASK_QUEUE_NAME, db_config.TASK_QUEUE_SQLITE_PATH
+    )
+    try:
+        if config.TASK_QUEUE_MODE == "producer":
+            await produce_tasks(task_queue)
+        else:
+            worker = CrawlTaskWorker(
+                task_queue,
+                crawler_creator=lambda: CrawlerFactory.create_crawler(platform=config.PLATFORM),
+                batch_size=config.TASK_QUEUE_BATCH_SIZE,
+                lease_sec=config.TASK_QUEUE_LEASE_SEC,
+                max_retry=config.TASK_QUEUE_MAX_RETRY,
+            )
+            await worker.run()
+    finally:
+        await task_queue.close()
 
 
 async def main():
-    # Init crawler
-    global crawler
+    global profiler, loop_watchdog
 
     # parse cmd
     await cmd_arg.parse_cmd()
+    TRACER.configure(enabled=config.ENABLE_TRACE, slow_threshold_ms=config.TRACE_SLOW_THRESHOLD_MS)
+    if config.PROFILE_MODE:
+        profiler = RunProfiler(
+            config.PROFILE_MODE,
+            config.PROFILE_EXPORT_DIR,
+            sample_interval_ms=config.PROFILE_SAMPLE_INTERVAL_MS,
+            lag_threshold_ms=config.LOOP_LAG_THRESHOLD_MS,
+        )
+        profiler.start()
+    if config.ENABLE_LOOP_WATCHDOG:
+        loop_watchdog = LoopWatchdog(threshold_ms=config.LOOP_WATCHDOG_THRESHOLD_MS)
+        loop_watchdog.start()
 
     # init db
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+        import db
         await db.init_db()
 
+    metrics_server = None
+    if config.ENABLE_METRICS_SERVER:
+        metrics_server = MetricsServer(config.METRICS_SERVER_HOST, config.METRICS_SERVER_PORT)
+        await metrics_server.start()
+
+    try:
+        await run_crawler()
+        # 爬取结束后等待后台的图片视频下载完成
+        await get_media_pipeline().join()
+    finally:
+        await get_media_pipeline().close()
+        if metrics_server:
+            await metrics_server.stop()
+        if profiler:
+            await profiler.stop()
+        if loop_watchdog:
+            loop_watchdog.stop()
+
+
+async def run_crawler():
+    global crawler
+
+    if config.TASK_QUEUE_MODE:
+        await run_task_queue()
+        return
+
+    if config.SESSION_POOL_SIZE > 1:
+        # 多会话并行爬取，每个会话一个爬虫实例
+        session_pool = CrawlerSessionPool(
+            crawler_creator=lambda: CrawlerFactory.create_crawler(platform=config.PLATFORM),
+            pool_size=config.SESSION_POOL_SIZE,
+        )
+        await session_pool.start()
+        return
+
     crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
     await crawler.start()
 
@@ -70,7 +148,16 @@ def cleanup():
         # asyncio.run(crawler.close())
         pass
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+        import db
         asyncio.run(db.close())
+    if config.METRICS_DUMP_DIR:
+        dump_metrics(config.METRICS_DUMP_DIR)
+    if config.ENABLE_TRACE:
+        TRACER.export_chrome_trace(config.TRACE_EXPORT_DIR)
+    if profiler:
+        profiler.export()
+    if loop_watchdog:
+        loop_watchdog.export(config.LOOP_WATCHDOG_EXPORT_DIR)
 
 
 if __name__ == "__main__":
@@ -24,7 +24,12 @@ from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from base.concurrency import gather_all, stage_semaphore
+from base.media_download import download_segmented, request_media, use_segmented_download
+from metrics.crawler_metrics import SIGN_LATENCY, RequestTimer
+from metrics.tracing import span
+from store.media_store import MediaFile
+from tools import json_codec, utils
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
@@ -49,13 +54,16 @@ class BilibiliClient(AbstractApiClient):
         self.cookie_dict = cookie_dict
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        async with RequestTimer("bili", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=self.proxies) as client:
+                response = await client.request(
+                    method, url, timeout=self.timeout,
+                    **kwargs
+                )
+            request_timer.status_code = response.status_code
         try:
-            data: Dict = response.json()
+            with span("bili.json_decode", "decode"):
+                data: Dict = json_codec.loads_response(response)
         except json.JSONDecodeError:
             utils.logger.error(f"[BilibiliClient.request] Failed to decode JSON from response. status_code: {response.status_code}, response_text: {response.text}")
             raise DataFetchError(f"Failed to decode JSON, content: {response.text}")
@@ -74,8 +82,11 @@ class BilibiliClient(AbstractApiClient):
         """
         if not req_data:
             return {}
-        img_key, sub_key = await self.get_wbi_keys()
-        return BilibiliSign(img_key, sub_key).sign(req_data)
+        with SIGN_LATENCY.labels("bili").time():
+            with span("bili.evaluate", "cdp"):
+                img_key, sub_key = await self.get_wbi_keys()
+            with span("bili.sign", "sign"):
+                return BilibiliSign(img_key, sub_key).sign(req_data)
 
     async def get_wbi_keys(self) -> Tuple[str, str]:
         """
@@ -110,7 +121,7 @@ class BilibiliClient(AbstractApiClient):
 
     async def post(self, uri: str, data: dict) -> Dict:
         data = await self.pre_request_data(data)
-        json_str = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        json_str = json_codec.dumps(data, separators=(',', ':'), ensure_ascii=False)
         return await self.request(method="POST", url=f"{self._host}{uri}",
                                   data=json_str, headers=self.headers)
 
@@ -160,7 +171,8 @@ class BilibiliClient(AbstractApiClient):
             "pubtime_begin_s": pubtime_begin_s,
             "pubtime_end_s": pubtime_end_s
         }
-        return await self.get(uri, post_data)
+        async with stage_semaphore("bili", "search"):
+            return await self.get(uri, post_data)
 
     async def get_video_info(self, aid: Union[int, None] = None, bvid: Union[str, None] = None) -> Dict:
         """
@@ -180,20 +192,23 @@ class BilibiliClient(AbstractApiClient):
             params.update({"bvid": bvid})
         return await self.get(uri, params, enable_params_sign=False)
 
-    async def get_video_play_url(self, aid: int, cid: int) -> Dict:
+    async def get_video_play_url(self, aid: int, cid: int, qn: Optional[int] = None) -> Dict:
         """
         Bilibli web video play url api
         :param aid: 稿件avid
         :param cid: cid
+        :param qn: 清晰度, 默认 config.BILI_VIDEO_QUALITY
         :return:
         """
         if not aid or not cid or aid <= 0 or cid <= 0:
             raise ValueError("aid 和 cid 必须存在")
+        if qn is None:
+            qn = config.BILI_VIDEO_QUALITY
         uri = "/x/player/wbi/playurl"
         params = {
             "avid": aid,
             "cid": cid,
-            "qn": 80,
+            "qn": qn,
             "fourk": 1,
             "fnval": 1,
             "platform": "pc",
@@ -201,14 +216,20 @@ class BilibiliClient(AbstractApiClient):
 
         return await self.get(uri, params, enable_params_sign=True)
 
-    async def get_video_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if not response.reason_phrase == "OK":
+    async def get_video_media(self, url: str, size: int = 0) -> Union[bytes, MediaFile, None]:
+        """
+        下载视频, 已知大小超过 MEDIA_SEGMENT_BYTES 时分段并行下载到临时文件
+        :param url:
+        :param size: 视频大小, 0为未知
+        :return:
+        """
+        async with stage_semaphore("bili", "media"), httpx.AsyncClient(proxies=self.proxies) as client:
+            if use_segmented_download(size):
+                return await download_segmented(client, url, size, timeout=self.timeout, headers=self.headers)
+            content, response = await request_media(client, url, timeout=self.timeout, headers=self.headers)
+            if content is None:
                 utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+            return content
 
     async def get_video_comments(self,
                                  video_id: str,
@@ -289,13 +310,13 @@ class BilibiliClient(AbstractApiClient):
                 utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
                 is_end = True
             if is_fetch_sub_comments:
-                for comment in comment_list:
-                    comment_id = comment['rpid']
-                    if (comment.get("rcount", 0) > 0):
-                        {
-                            await self.get_video_all_level_two_comments(
-                                video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval,  callback)
-                        }
+                # 各个一级评论下的二级评论并发获取, 并发数由sub_comments阶段的信号量控制
+                await gather_all(
+                    self.get_video_all_level_two_comments(
+                        video_id, comment['rpid'], CommentOrderType.DEFAULT, 10, crawl_interval, callback)
+                    for comment in comment_list
+                    if comment.get("rcount", 0) > 0
+                )
             if len(result) + len(comment_list) > max_count:
                 comment_list = comment_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
@@ -361,7 +382,8 @@ class BilibiliClient(AbstractApiClient):
             "pn": pn,
             "root": level_one_comment_id,
         }
-        result = await self.get(uri, post_data)
+        async with stage_semaphore("bili", "sub_comments"):
+            result = await self.get(uri, post_data)
         return result
 
     async def get_creator_videos(self, creator_id: str, pn: int, ps: int = 30, order_mode: SearchOrderType = SearchOrderType.LAST_PUBLISH) -> Dict:
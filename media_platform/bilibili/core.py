@@ -15,12 +15,12 @@
 # @Desc    : B站爬虫
 
 import asyncio
+import functools
 import os
 import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
-import pandas as pd
 
 from playwright.async_api import (
     BrowserContext,
@@ -33,17 +33,64 @@ from playwright._impl._errors import TargetClosedError
 
 import config
 from base.base_crawler import AbstractCrawler
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from base.bulk_detail import stream_specified_ids
+from base.concurrency import gather_all, stage_semaphore
+from base.keyword_search import search_keywords
+from base.media_pipeline import MediaJob, get_media_pipeline
+from base.session_pool import create_session_ip_proxy, get_session_config
 from store import bilibili as bilibili_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import BilibiliClient
 from .exception import DataFetchError
 from .field import SearchOrderType
 from .login import BilibiliLogin
 
+# 搜索接口每页固定20条, 同一个查询最多翻到第50页(1000条), 更多的结果需要缩小发布时间范围才能拿到
+BILI_SEARCH_PAGE_SIZE = 20
+BILI_SEARCH_MAX_RESULTS = 1000
+# 按时间范围搜索时窗口最小拆到1小时
+BILI_SEARCH_MIN_WINDOW_SECONDS = 3600
+
+
+class TimeRangeQuota:
+    def __init__(self, daily_limit: bool):
+        """
+        按时间范围搜索时一个关键词的数量限制, 所有窗口共享, 检查和计数之间没有 await, 并发窗口不会超出限制
+        :param daily_limit: 是否同时限制每天的数量(MAX_NOTES_PER_DAY)
+        """
+        self.daily_limit = daily_limit
+        self.total = 0
+        self.day_counts: Dict[str, int] = {}
+
+    def remaining(self, day: str) -> int:
+        """
+        还可以爬取的数量
+        :param day: 日期
+        :return:
+        """
+        remaining = config.CRAWLER_MAX_NOTES_COUNT - self.total
+        if self.daily_limit:
+            remaining = min(remaining, config.MAX_NOTES_PER_DAY - self.day_counts.get(day, 0))
+        return max(0, remaining)
+
+    def exhausted(self, day: str) -> bool:
+        return self.remaining(day) <= 0
+
+    def take(self, day: str) -> bool:
+        """
+        占用一个名额
+        :param day: 日期
+        :return: 是否还有名额
+        """
+        if self.exhausted(day):
+            return False
+        self.total += 1
+        self.day_counts[day] = self.day_counts.get(day, 0) + 1
+        return True
+
 
 class BilibiliCrawler(AbstractCrawler):
     context_page: Page
@@ -59,10 +106,7 @@ class BilibiliCrawler(AbstractCrawler):
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -91,13 +135,16 @@ class BilibiliCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.bili_client = await self.create_bilibili_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.bili_client, ip_proxy_info)
             if not await self.bili_client.pong():
                 login_obj = BilibiliLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone="",  # your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
                 await self.bili_client.update_cookies(
@@ -109,13 +156,16 @@ class BilibiliCrawler(AbstractCrawler):
                 await self.search()
             elif config.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
-                await self.get_specified_videos(config.BILI_SPECIFIED_ID_LIST)
+                if config.SPECIFIED_ID_FILE:
+                    await self.stream_specified_videos()
+                else:
+                    await self.get_specified_videos(get_session_config("BILI_SPECIFIED_ID_LIST"))
             elif config.CRAWLER_TYPE == "creator":
                 if config.CREATOR_MODE:
-                    for creator_id in config.BILI_CREATOR_ID_LIST:
+                    for creator_id in get_session_config("BILI_CREATOR_ID_LIST"):
                         await self.get_creator_videos(int(creator_id))
                 else:
-                    await self.get_all_creator_details(config.BILI_CREATOR_ID_LIST)
+                    await self.get_all_creator_details(get_session_config("BILI_CREATOR_ID_LIST"))
             else:
                 pass
             utils.logger.info("[BilibiliCrawler.start] Bilibili Crawler finished ...")
@@ -184,195 +234,230 @@ class BilibiliCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < bili_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = bili_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        await search_keywords(
+            "bili", get_session_config("KEYWORDS"), self.search_keyword, start_page, bili_limit_count
+        )
+
+    async def search_keyword(self, keyword: str, start_page: int, bili_limit_count: int) -> None:
+        """
+        search bilibili video with one keyword in normal mode
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param bili_limit_count: 每页数量
+        :return:
+        """
+        utils.logger.info(
+            f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(
+                    f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
+                )
+                page += 1
+                continue
+
             utils.logger.info(
-                f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}"
+                f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
-                    )
-                    page += 1
-                    continue
+            video_id_list: List[str] = []
+            videos_res = await self.bili_client.search_video_by_keyword(
+                keyword=keyword,
+                page=page,
+                page_size=bili_limit_count,
+                order=SearchOrderType.DEFAULT,
+                pubtime_begin_s=0,  # 作品发布日期起始时间戳
+                pubtime_end_s=0,  # 作品发布日期结束日期时间戳
+            )
+            video_list: List[Dict] = videos_res.get("result")
 
+            if not video_list:
                 utils.logger.info(
-                    f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
+                    f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
                 )
-                video_id_list: List[str] = []
-                videos_res = await self.bili_client.search_video_by_keyword(
-                    keyword=keyword,
-                    page=page,
-                    page_size=bili_limit_count,
-                    order=SearchOrderType.DEFAULT,
-                    pubtime_begin_s=0,  # 作品发布日期起始时间戳
-                    pubtime_end_s=0,  # 作品发布日期结束日期时间戳
-                )
-                video_list: List[Dict] = videos_res.get("result")
+                break
 
-                if not video_list:
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
-                    )
-                    break
-
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                task_list = []
-                try:
-                    task_list = [
-                        self.get_video_info_task(
-                            aid=video_item.get("aid"), bvid="", semaphore=semaphore
-                        )
-                        for video_item in video_list
-                    ]
-                except Exception as e:
-                    utils.logger.warning(
-                        f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}"
+            semaphore = stage_semaphore("bili", "detail")
+            task_list = []
+            try:
+                task_list = [
+                    self.get_video_info_task(
+                        aid=video_item.get("aid"), bvid="", semaphore=semaphore
                     )
-                video_items = await asyncio.gather(*task_list)
-                for video_item in video_items:
-                    if video_item:
-                        video_id_list.append(video_item.get("View").get("aid"))
-                        await bilibili_store.update_bilibili_video(video_item)
-                        await bilibili_store.update_up_info(video_item)
-                        await self.get_bilibili_video(video_item, semaphore)
-                page += 1
-                await self.batch_get_video_comments(video_id_list)
+                    for video_item in video_list
+                ]
+            except Exception as e:
+                utils.logger.warning(
+                    f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}"
+                )
+            video_items = await asyncio.gather(*task_list)
+            for video_item in video_items:
+                if video_item:
+                    video_id_list.append(video_item.get("View").get("aid"))
+                    await bilibili_store.update_bilibili_video(video_item)
+                    await bilibili_store.update_up_info(video_item)
+                    await self.get_bilibili_video(video_item, semaphore)
+            page += 1
+            await self.batch_get_video_comments(video_id_list)
+
+    @staticmethod
+    def get_day_windows(start: str = config.START_DAY, end: str = config.END_DAY) -> List[Tuple[str, int, int]]:
+        """
+        把 start 至 end 的时间范围按天拆成搜索窗口, 每个窗口的时间戳范围与 get_pubtime_datetime 一致(包含当天最后一秒)
+        :param start: 发布日期起始时间，YYYY-MM-DD
+        :param end: 发布日期结束时间，YYYY-MM-DD
+        :return: [(日期, pubtime_begin_s, pubtime_end_s), ...]
+        """
+        start_day: datetime = datetime.strptime(start, "%Y-%m-%d")
+        end_day: datetime = datetime.strptime(end, "%Y-%m-%d")
+        if start_day > end_day:
+            raise ValueError(
+                "Wrong time range, please check your start and end argument, to ensure that the start cannot exceed end"
+            )
+        windows = []
+        day = start_day
+        while day <= end_day:
+            next_day = day + timedelta(days=1)
+            windows.append((day.strftime("%Y-%m-%d"), int(day.timestamp()), int(next_day.timestamp()) - 1))
+            day = next_day
+        return windows
+
+    @staticmethod
+    def split_time_window(pubtime_begin_s: int, pubtime_end_s: int) -> List[Tuple[int, int]]:
+        """
+        把时间窗口从中间拆成两个不重叠的窗口, 两端都包含
+        :param pubtime_begin_s: 窗口起始时间戳
+        :param pubtime_end_s: 窗口结束时间戳
+        :return:
+        """
+        middle = pubtime_begin_s + (pubtime_end_s - pubtime_begin_s + 1) // 2
+        return [(pubtime_begin_s, middle - 1), (middle, pubtime_end_s)]
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
         Search bilibili video with keywords in a given time range.
+        每个关键词的所有日期窗口并发搜索, 请求数由 search/detail 阶段信号量控制
         :param daily_limit: if True, strictly limit the number of notes per day and total.
         """
         utils.logger.info(
             f"[BilibiliCrawler.search_by_keywords_in_time_range] Begin search with daily_limit={daily_limit}"
         )
-        bili_limit_count = 20
-        start_page = config.START_PAGE
+        day_windows = self.get_day_windows(config.START_DAY, config.END_DAY)
+        await search_keywords(
+            "bili", get_session_config("KEYWORDS"), self.search_keyword_in_time_range, day_windows, daily_limit
+        )
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+    async def search_keyword_in_time_range(
+        self, keyword: str, day_windows: List[Tuple[str, int, int]], daily_limit: bool
+    ) -> None:
+        """
+        search bilibili video with one keyword in a given time range
+        :param keyword: 搜索关键词
+        :param day_windows: get_day_windows 返回的日期窗口
+        :param daily_limit: 是否限制每天的数量
+        :return:
+        """
+        utils.logger.info(
+            f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}, "
+            f"{len(day_windows)} days"
+        )
+        quota = TimeRangeQuota(daily_limit)
+        await gather_all(
+            self.search_time_window(keyword, day, pubtime_begin_s, pubtime_end_s, quota)
+            for day, pubtime_begin_s, pubtime_end_s in day_windows
+        )
+        if quota.total >= config.CRAWLER_MAX_NOTES_COUNT:
             utils.logger.info(
-                f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}"
+                f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}'."
             )
-            total_notes_crawled_for_keyword = 0
 
-            for day in pd.date_range(
-                start=config.START_DAY, end=config.END_DAY, freq="D"
-            ):
+    async def search_time_window(self, keyword: str, day: str, pubtime_begin_s: int, pubtime_end_s: int,
+                                 quota: TimeRangeQuota):
+        """
+        翻页搜索一个时间窗口内的视频, 窗口内结果超过搜索接口的上限时拆成两半并发搜索, 直到窗口缩小到 BILI_SEARCH_MIN_WINDOW_SECONDS
+        :param keyword: 搜索关键词
+        :param day: 窗口所属的日期, 用于每日数量限制
+        :param pubtime_begin_s: 窗口起始时间戳
+        :param pubtime_end_s: 窗口结束时间戳
+        :param quota: 当前关键词的数量限制
+        :return:
+        """
+        window_desc = (
+            f"{datetime.fromtimestamp(pubtime_begin_s):%Y-%m-%d %H:%M:%S} - "
+            f"{datetime.fromtimestamp(pubtime_end_s):%Y-%m-%d %H:%M:%S}"
+        )
+        page = 1
+        while not quota.exhausted(day):
+            try:
+                utils.logger.info(
+                    f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, time: {window_desc}, page: {page}"
+                )
+                videos_res = await self.bili_client.search_video_by_keyword(
+                    keyword=keyword,
+                    page=page,
+                    page_size=BILI_SEARCH_PAGE_SIZE,
+                    order=SearchOrderType.DEFAULT,
+                    pubtime_begin_s=pubtime_begin_s,
+                    pubtime_end_s=pubtime_end_s,
+                )
+                num_results = int(videos_res.get("numResults") or 0)
                 if (
-                    daily_limit
-                    and total_notes_crawled_for_keyword
-                    >= config.CRAWLER_MAX_NOTES_COUNT
+                    page == 1
+                    and num_results >= BILI_SEARCH_MAX_RESULTS
+                    and quota.remaining(day) > BILI_SEARCH_MAX_RESULTS
+                    and pubtime_end_s - pubtime_begin_s + 1 >= BILI_SEARCH_MIN_WINDOW_SECONDS * 2
                 ):
+                    # 接口最多只能翻到第50页, 拆小窗口才能拿到全部结果
                     utils.logger.info(
-                        f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
+                        f"[BilibiliCrawler.search] {num_results} results in {window_desc} exceed the search api limit, "
+                        f"split into smaller windows"
                     )
-                    break
+                    await gather_all(
+                        self.search_time_window(keyword, day, begin_s, end_s, quota)
+                        for begin_s, end_s in self.split_time_window(pubtime_begin_s, pubtime_end_s)
+                    )
+                    return
 
-                if (
-                    not daily_limit
-                    and total_notes_crawled_for_keyword
-                    >= config.CRAWLER_MAX_NOTES_COUNT
-                ):
+                video_list: List[Dict] = (videos_res.get("result") or [])[:quota.remaining(day)]
+                if not video_list:
                     utils.logger.info(
-                        f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
+                        f"[BilibiliCrawler.search] No more videos for '{keyword}' in {window_desc}, moving to next window."
                     )
-                    break
-
-                pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(
-                    start=day.strftime("%Y-%m-%d"), end=day.strftime("%Y-%m-%d")
-                )
-                page = 1
-                notes_count_this_day = 0
+                    return
 
-                while True:
-                    if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
-                        utils.logger.info(
-                            f"[BilibiliCrawler.search] Reached MAX_NOTES_PER_DAY limit for {day.ctime()}."
-                        )
-                        break
-                    if (
-                        daily_limit
-                        and total_notes_crawled_for_keyword
-                        >= config.CRAWLER_MAX_NOTES_COUNT
-                    ):
-                        utils.logger.info(
-                            f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}'."
-                        )
-                        break
-                    if (
-                        not daily_limit
-                        and total_notes_crawled_for_keyword
-                        >= config.CRAWLER_MAX_NOTES_COUNT
-                    ):
+                semaphore = stage_semaphore("bili", "detail")
+                video_items = await asyncio.gather(*[
+                    self.get_video_info_task(
+                        aid=video_item.get("aid"), bvid="", semaphore=semaphore
+                    )
+                    for video_item in video_list
+                ])
+                video_id_list: List[str] = []
+                for video_item in video_items:
+                    if not video_item:
+                        continue
+                    # 各窗口并发执行, 计数要在 await 之前完成
+                    if not quota.take(day):
                         break
+                    video_id_list.append(video_item.get("View").get("aid"))
+                    await bilibili_store.update_bilibili_video(video_item)
+                    await bilibili_store.update_up_info(video_item)
+                    await self.get_bilibili_video(video_item, semaphore)
+                await self.batch_get_video_comments(video_id_list)
 
-                    try:
-                        utils.logger.info(
-                            f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, date: {day.ctime()}, page: {page}"
-                        )
-                        video_id_list: List[str] = []
-                        videos_res = await self.bili_client.search_video_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                            page_size=bili_limit_count,
-                            order=SearchOrderType.DEFAULT,
-                            pubtime_begin_s=pubtime_begin_s,
-                            pubtime_end_s=pubtime_end_s,
-                        )
-                        video_list: List[Dict] = videos_res.get("result")
-
-                        if not video_list:
-                            utils.logger.info(
-                                f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day."
-                            )
-                            break
-
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                        task_list = [
-                            self.get_video_info_task(
-                                aid=video_item.get("aid"), bvid="", semaphore=semaphore
-                            )
-                            for video_item in video_list
-                        ]
-                        video_items = await asyncio.gather(*task_list)
-
-                        for video_item in video_items:
-                            if video_item:
-                                if (
-                                    daily_limit
-                                    and total_notes_crawled_for_keyword
-                                    >= config.CRAWLER_MAX_NOTES_COUNT
-                                ):
-                                    break
-                                if (
-                                    not daily_limit
-                                    and total_notes_crawled_for_keyword
-                                    >= config.CRAWLER_MAX_NOTES_COUNT
-                                ):
-                                    break
-                                if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
-                                    break
-                                notes_count_this_day += 1
-                                total_notes_crawled_for_keyword += 1
-                                video_id_list.append(video_item.get("View").get("aid"))
-                                await bilibili_store.update_bilibili_video(video_item)
-                                await bilibili_store.update_up_info(video_item)
-                                await self.get_bilibili_video(video_item, semaphore)
-
-                        page += 1
-                        await self.batch_get_video_comments(video_id_list)
-
-                    except Exception as e:
-                        utils.logger.error(
-                            f"[BilibiliCrawler.search] Error searching on {day.ctime()}: {e}"
-                        )
-                        break
+                num_pages = min(int(videos_res.get("numPages") or 0), BILI_SEARCH_MAX_RESULTS // BILI_SEARCH_PAGE_SIZE)
+                if num_pages and page >= num_pages:
+                    return
+                page += 1
+
+            except Exception as e:
+                utils.logger.error(
+                    f"[BilibiliCrawler.search] Error searching in {window_desc}: {e}"
+                )
+                return
 
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
@@ -389,7 +474,7 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(
             f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("bili", "comments")
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -438,7 +523,8 @@ class BilibiliCrawler(AbstractCrawler):
         ps = 30
         pn = 1
         while True:
-            result = await self.bili_client.get_creator_videos(creator_id, pn, ps)
+            async with stage_semaphore("bili", "creator"):
+                result = await self.bili_client.get_creator_videos(creator_id, pn, ps)
             video_bvids_list = [video["bvid"] for video in result["list"]["vlist"]]
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
@@ -451,7 +537,7 @@ class BilibiliCrawler(AbstractCrawler):
         get specified videos info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("bili", "detail")
         task_list = [
             self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore)
             for video_id in bvids_list
@@ -469,6 +555,26 @@ class BilibiliCrawler(AbstractCrawler):
                 await self.get_bilibili_video(video_detail, semaphore)
         await self.batch_get_video_comments(video_aids_list)
 
+    async def stream_specified_videos(self):
+        """
+        从 SPECIFIED_ID_FILE 逐行读取视频bvid, 同时进行的视频数有上限, 每个视频获取详情后立即保存并下载视频、爬取评论
+        :return:
+        """
+        semaphore = stage_semaphore("bili", "detail")
+
+        async def fetch(bvid: str) -> Optional[Dict]:
+            return await self.get_video_info_task(aid=0, bvid=bvid, semaphore=semaphore)
+
+        async def handle(bvid: str, video_detail: Dict):
+            await bilibili_store.update_bilibili_video(video_detail)
+            await bilibili_store.update_up_info(video_detail)
+            await self.get_bilibili_video(video_detail, semaphore)
+            video_aid = video_detail.get("View", {}).get("aid")
+            if video_aid:
+                await self.batch_get_video_comments([video_aid])
+
+        await stream_specified_ids("bili", fetch, handle)
+
     async def get_video_info_task(
         self, aid: int, bvid: str, semaphore: asyncio.Semaphore
     ) -> Optional[Dict]:
@@ -495,18 +601,19 @@ class BilibiliCrawler(AbstractCrawler):
                 return None
 
     async def get_video_play_url_task(
-        self, aid: int, cid: int, semaphore: asyncio.Semaphore
+        self, aid: int, cid: int, semaphore: asyncio.Semaphore, qn: Optional[int] = None
     ) -> Union[Dict, None]:
         """
         Get video play url
         :param aid:
         :param cid:
         :param semaphore:
+        :param qn: 清晰度, 默认 config.BILI_VIDEO_QUALITY
         :return:
         """
         async with semaphore:
             try:
-                result = await self.bili_client.get_video_play_url(aid=aid, cid=cid)
+                result = await self.bili_client.get_video_play_url(aid=aid, cid=cid, qn=qn)
                 return result
             except DataFetchError as ex:
                 utils.logger.error(
@@ -569,7 +676,7 @@ class BilibiliCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -657,31 +764,59 @@ class BilibiliCrawler(AbstractCrawler):
         video_item_view: Dict = video_item.get("View")
         aid = video_item_view.get("aid")
         cid = video_item_view.get("cid")
-        result = await self.get_video_play_url_task(aid, cid, semaphore)
-        if result is None:
-            utils.logger.info(
-                "[BilibiliCrawler.get_bilibili_video] get video play url failed"
-            )
-            return
-        durl_list = result.get("durl")
-        max_size = -1
-        video_url = ""
-        for durl in durl_list:
-            size = durl.get("size")
-            if size > max_size:
-                max_size = size
-                video_url = durl.get("url")
-        if video_url == "":
-            utils.logger.info(
-                "[BilibiliCrawler.get_bilibili_video] get video url failed"
-            )
+        stream = await self.select_video_stream(aid, cid, semaphore)
+        if stream is None:
             return
+        video_url, size = stream
 
-        content = await self.bili_client.get_video_media(video_url)
-        if content is None:
-            return
         extension_file_name = f"video.mp4"
-        await bilibili_store.store_video(aid, content, extension_file_name)
+        await get_media_pipeline().submit(MediaJob(
+            "bili", video_url,
+            download=functools.partial(self.bili_client.get_video_media, video_url, size),
+            save=functools.partial(bilibili_store.store_video, aid,
+                                   extension_file_name=extension_file_name, url=video_url),
+            link=functools.partial(bilibili_store.link_video, aid, video_url, extension_file_name),
+            kind="video",
+            size_hint=size,
+        ))
+
+    async def select_video_stream(self, aid: int, cid: int, semaphore: asyncio.Semaphore) -> Optional[Tuple[str, int]]:
+        """
+        按 BILI_VIDEO_QUALITY 获取播放地址, 视频大小超过 BILI_VIDEO_MAX_BYTES 时依次换用更低的清晰度
+        :param aid:
+        :param cid:
+        :param semaphore:
+        :return: (视频地址, 大小), 没有符合条件的视频时返回 None
+        """
+        qn = config.BILI_VIDEO_QUALITY
+        while True:
+            result = await self.get_video_play_url_task(aid, cid, semaphore, qn)
+            if result is None:
+                utils.logger.info(
+                    "[BilibiliCrawler.select_video_stream] get video play url failed"
+                )
+                return None
+            video_url, size = "", -1
+            for durl in result.get("durl") or []:
+                if durl.get("size", 0) > size:
+                    video_url, size = durl.get("url", ""), durl.get("size", 0)
+            if video_url == "":
+                utils.logger.info(
+                    "[BilibiliCrawler.select_video_stream] get video url failed"
+                )
+                return None
+            if not config.BILI_VIDEO_MAX_BYTES or size <= config.BILI_VIDEO_MAX_BYTES:
+                return video_url, size
+            # 返回的清晰度可能低于请求的清晰度, 以较低的为准, 每次请求的清晰度都严格降低
+            current_quality = min(result.get("quality", qn), qn)
+            lower_qualities = [quality for quality in result.get("accept_quality") or [] if quality < current_quality]
+            if not lower_qualities:
+                utils.logger.info(
+                    f"[BilibiliCrawler.select_video_stream] video {aid} is {size} bytes at the lowest quality, "
+                    f"larger than BILI_VIDEO_MAX_BYTES, skip"
+                )
+                return None
+            qn = max(lower_qualities)
 
     async def get_all_creator_details(self, creator_id_list: List[int]):
         """
@@ -694,7 +829,7 @@ class BilibiliCrawler(AbstractCrawler):
             f"[BilibiliCrawler.get_creator_details] creator ids:{creator_id_list}"
         )
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("bili", "creator")
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
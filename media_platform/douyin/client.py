@@ -11,16 +11,19 @@
 
 import asyncio
 import copy
-import json
 import urllib.parse
-from typing import Any, Callable, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import httpx
 import requests
 from playwright.async_api import BrowserContext
 
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from base.concurrency import gather_all, stage_semaphore
+from base.media_download import request_media
+from metrics.crawler_metrics import SIGN_LATENCY, RequestTimer
+from metrics.tracing import span
+from tools import json_codec, utils
 from var import request_keyword_var
 
 from .exception import *
@@ -89,20 +92,25 @@ class DOUYINClient(AbstractApiClient):
         post_data = {}
         if request_method == "POST":
             post_data = params
-        a_bogus = await get_a_bogus(uri, query_string, post_data, headers["User-Agent"], self.playwright_page)
+        with SIGN_LATENCY.labels("dy").time(), span("dy.sign", "sign"):
+            a_bogus = await get_a_bogus(uri, query_string, post_data, headers["User-Agent"], self.playwright_page)
         params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
         response = None
-        if method == "GET":
-            response = requests.request(method, url, **kwargs)
-        elif method == "POST":
-            response = requests.request(method, url, **kwargs)
+        async with RequestTimer("dy", url, self) as request_timer:
+            if method == "GET":
+                response = requests.request(method, url, **kwargs)
+            elif method == "POST":
+                response = requests.request(method, url, **kwargs)
+            if response is not None:
+                request_timer.status_code = response.status_code
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
                 raise Exception("account blocked")
-            return response.json()
+            with span("dy.json_decode", "decode"):
+                return json_codec.loads_response(response)
         except Exception as e:
             raise DataFetchError(f"{e}, {response.text}")
 
@@ -166,7 +174,7 @@ class DOUYINClient(AbstractApiClient):
             'search_id': search_id,
         }
         if sort_type.value != SearchSortType.GENERAL.value or publish_time.value != PublishTimeType.UNLIMITED.value:
-            query_params["filter_selected"] = json.dumps({
+            query_params["filter_selected"] = json_codec.dumps({
                 "sort_type": str(sort_type.value),
                 "publish_time": str(publish_time.value)
             })
@@ -175,7 +183,8 @@ class DOUYINClient(AbstractApiClient):
         referer_url = f"https://www.douyin.com/search/{keyword}?aid=f594bbd9-a0e2-4651-9319-ebe3cb6298c1&type=general"
         headers = copy.copy(self.headers)
         headers["Referer"] = urllib.parse.quote(referer_url, safe=':/')
-        return await self.get("/aweme/v1/web/general/search/single/", query_params, headers=headers)
+        async with stage_semaphore("dy", "search"):
+            return await self.get("/aweme/v1/web/general/search/single/", query_params, headers=headers)
 
     async def get_video_by_id(self, aweme_id: str) -> Any:
         """
@@ -224,7 +233,8 @@ class DOUYINClient(AbstractApiClient):
         referer_url = "https://www.douyin.com/search/" + keywords + '?aid=3a3cec5a-9e27-4040-b6aa-ef548c2c1138&publish_time=0&sort_type=0&source=search_history&type=general'
         headers = copy.copy(self.headers)
         headers["Referer"] = urllib.parse.quote(referer_url, safe=':/')
-        return await self.get(uri, params)
+        async with stage_semaphore("dy", "sub_comments"):
+            return await self.get(uri, params)
 
     async def get_aweme_all_comments(
             self,
@@ -262,27 +272,46 @@ class DOUYINClient(AbstractApiClient):
             await asyncio.sleep(crawl_interval)
             if not is_fetch_sub_comments:
                 continue
-            # 获取二级评论
-            for comment in comments:
-                reply_comment_total = comment.get("reply_comment_total")
-
-                if reply_comment_total > 0:
-                    comment_id = comment.get("cid")
-                    sub_comments_has_more = 1
-                    sub_comments_cursor = 0
-
-                    while sub_comments_has_more:
-                        sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
-                        sub_comments_has_more = sub_comments_res.get("has_more", 0)
-                        sub_comments_cursor = sub_comments_res.get("cursor", 0)
-                        sub_comments = sub_comments_res.get("comments", [])
+            # 获取二级评论, 各个一级评论下的二级评论并发获取, 并发数由sub_comments阶段的信号量控制
+            sub_comments_list = await gather_all(
+                self.get_comment_all_sub_comments(aweme_id, comment.get("cid"), crawl_interval, callback)
+                for comment in comments
+                if comment.get("reply_comment_total") > 0
+            )
+            for sub_comments in sub_comments_list:
+                result.extend(sub_comments)
+        return result
 
-                        if not sub_comments:
-                            continue
-                        result.extend(sub_comments)
-                        if callback:  # 如果有回调函数，就执行回调函数
-                            await callback(aweme_id, sub_comments)
-                        await asyncio.sleep(crawl_interval)
+    async def get_comment_all_sub_comments(
+            self,
+            aweme_id: str,
+            comment_id: str,
+            crawl_interval: float = 1.0,
+            callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        获取一条一级评论下的所有子评论, 逐页获取, 每页获取后立即回调
+        :param aweme_id: 帖子ID
+        :param comment_id: 一级评论ID
+        :param crawl_interval: 抓取间隔
+        :param callback: 回调函数，用于处理抓取到的评论
+        :return: 子评论列表
+        """
+        result = []
+        sub_comments_has_more = 1
+        sub_comments_cursor = 0
+        while sub_comments_has_more:
+            sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
+            sub_comments_has_more = sub_comments_res.get("has_more", 0)
+            sub_comments_cursor = sub_comments_res.get("cursor", 0)
+            sub_comments = sub_comments_res.get("comments", [])
+
+            if not sub_comments:
+                continue
+            result.extend(sub_comments)
+            if callback:  # 如果有回调函数，就执行回调函数
+                await callback(aweme_id, sub_comments)
+            await asyncio.sleep(crawl_interval)
         return result
 
     async def get_user_info(self, sec_user_id: str):
@@ -292,7 +321,8 @@ class DOUYINClient(AbstractApiClient):
             "publish_video_strategy_type": 2,
             "personal_center_strategy": 1,
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("dy", "creator"):
+            return await self.get(uri, params)
 
     async def get_user_aweme_posts(self, sec_user_id: str, max_cursor: str = "") -> Dict:
         uri = "/aweme/v1/web/aweme/post/"
@@ -305,7 +335,8 @@ class DOUYINClient(AbstractApiClient):
             'verifyFp': 'verify_ma3hrt8n_q2q2HyYA_uLyO_4N6D_BLvX_E2LgoGmkA1BU',
             'fp': 'verify_ma3hrt8n_q2q2HyYA_uLyO_4N6D_BLvX_E2LgoGmkA1BU'
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("dy", "creator"):
+            return await self.get(uri, params)
 
     async def get_all_user_aweme_posts(self, sec_user_id: str, callback: Optional[Callable] = None):
         posts_has_more = 1
@@ -386,12 +417,10 @@ class DOUYINClient(AbstractApiClient):
         Returns:
             bytes: 媒体文件内容
         """
-        async with httpx.AsyncClient(proxies=self.proxies, follow_redirects=True) as client:
-            response = await client.request("GET", url, timeout=self.timeout)
-            if response.status_code != 200:
+        async with stage_semaphore("dy", "media"), httpx.AsyncClient(proxies=self.proxies, follow_redirects=True) as client:
+            content, response = await request_media(client, url, timeout=self.timeout)
+            if content is None:
                 utils.logger.error(
                     f"[DOUYINClient.get_note_media] request {url} failed with status {response.status_code}, reason: {response.reason_phrase}"
                 )
-                return None
-            else:
-                return response.content
+            return content
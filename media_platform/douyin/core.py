@@ -10,6 +10,7 @@
 
 
 import asyncio
+import functools
 import os
 import random
 from asyncio import Task
@@ -25,11 +26,15 @@ from playwright.async_api import (
 
 import config
 from base.base_crawler import AbstractCrawler
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from base.bulk_detail import stream_specified_ids
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.media_pipeline import MediaJob, get_media_pipeline
+from base.session_pool import create_session_ip_proxy, get_session_config
 from store import douyin as douyin_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import DOUYINClient
 from .exception import DataFetchError
@@ -50,10 +55,7 @@ class DouYinCrawler(AbstractCrawler):
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -84,13 +86,16 @@ class DouYinCrawler(AbstractCrawler):
             await self.context_page.goto(self.index_url)
 
             self.dy_client = await self.create_douyin_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.dy_client, ip_proxy_info)
             if not await self.dy_client.pong(browser_context=self.browser_context):
                 login_obj = DouYinLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone="",  # you phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
                 await self.dy_client.update_cookies(
@@ -102,7 +107,10 @@ class DouYinCrawler(AbstractCrawler):
                 await self.search()
             elif config.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
-                await self.get_specified_awemes()
+                if config.SPECIFIED_ID_FILE:
+                    await self.stream_specified_awemes()
+                else:
+                    await self.get_specified_awemes()
             elif config.CRAWLER_TYPE == "creator":
                 # Get the information and comments of the specified creator
                 await self.get_creators_and_videos()
@@ -118,70 +126,80 @@ class DouYinCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < dy_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = dy_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
-            while (
-                page - start_page + 1
-            ) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
-                    page += 1
-                    continue
-                try:
+        await search_keywords(
+            "dy", get_session_config("KEYWORDS"), self.search_keyword, start_page, dy_limit_count
+        )
+
+    async def search_keyword(self, keyword: str, start_page: int, dy_limit_count: int) -> None:
+        """
+        search douyin awemes with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param dy_limit_count: 每页数量
+        :return:
+        """
+        utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
+        aweme_list: List[str] = []
+        page = 0
+        dy_search_id = ""
+        while (
+            page - start_page + 1
+        ) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
+                page += 1
+                continue
+            try:
+                utils.logger.info(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}"
+                )
+                posts_res = await self.dy_client.search_info_by_keyword(
+                    keyword=keyword,
+                    offset=page * dy_limit_count - dy_limit_count,
+                    publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
+                    search_id=dy_search_id,
+                )
+                if posts_res.get("data") is None or posts_res.get("data") == []:
                     utils.logger.info(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}"
-                    )
-                    posts_res = await self.dy_client.search_info_by_keyword(
-                        keyword=keyword,
-                        offset=page * dy_limit_count - dy_limit_count,
-                        publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
-                        search_id=dy_search_id,
-                    )
-                    if posts_res.get("data") is None or posts_res.get("data") == []:
-                        utils.logger.info(
-                            f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`"
-                        )
-                        break
-                except DataFetchError:
-                    utils.logger.error(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword} failed"
+                        f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`"
                     )
                     break
+            except DataFetchError:
+                utils.logger.error(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword} failed"
+                )
+                break
 
-                page += 1
-                if "data" not in posts_res:
-                    utils.logger.error(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
+            page += 1
+            if "data" not in posts_res:
+                utils.logger.error(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
+                )
+                break
+            dy_search_id = posts_res.get("extra", {}).get("logid", "")
+            for post_item in posts_res.get("data"):
+                try:
+                    aweme_info: Dict = (
+                        post_item.get("aweme_info")
+                        or post_item.get("aweme_mix_info", {}).get("mix_items")[0]
                     )
-                    break
-                dy_search_id = posts_res.get("extra", {}).get("logid", "")
-                for post_item in posts_res.get("data"):
-                    try:
-                        aweme_info: Dict = (
-                            post_item.get("aweme_info")
-                            or post_item.get("aweme_mix_info", {}).get("mix_items")[0]
-                        )
-                    except TypeError:
-                        continue
-                    aweme_list.append(aweme_info.get("aweme_id", ""))
-                    await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
-                    # 下载媒体文件（视频/图片）
-                    await self.get_notice_media(aweme_info)
-            utils.logger.info(
-                f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}"
-            )
-            await self.batch_get_note_comments(aweme_list)
+                except TypeError:
+                    continue
+                aweme_list.append(aweme_info.get("aweme_id", ""))
+                await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
+                # 下载媒体文件（视频/图片）
+                await self.get_notice_media(aweme_info)
+        utils.logger.info(
+            f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}"
+        )
+        await self.batch_get_note_comments(aweme_list)
 
     async def get_specified_awemes(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("dy", "detail")
         task_list = [
             self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore)
-            for aweme_id in config.DY_SPECIFIED_ID_LIST
+            for aweme_id in get_session_config("DY_SPECIFIED_ID_LIST")
         ]
         aweme_details = await asyncio.gather(*task_list)
         for aweme_detail in aweme_details:
@@ -189,7 +207,21 @@ class DouYinCrawler(AbstractCrawler):
                 await douyin_store.update_douyin_aweme(aweme_detail)
                 # 下载媒体文件（视频/图片）
                 await self.get_notice_media(aweme_detail)
-        await self.batch_get_note_comments(config.DY_SPECIFIED_ID_LIST)
+        await self.batch_get_note_comments(get_session_config("DY_SPECIFIED_ID_LIST"))
+
+    async def stream_specified_awemes(self):
+        """从 SPECIFIED_ID_FILE 逐行读取作品ID, 同时进行的作品数有上限, 每个作品获取详情后立即保存并下载媒体、爬取评论"""
+        semaphore = stage_semaphore("dy", "detail")
+
+        async def fetch(aweme_id: str) -> Any:
+            return await self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore)
+
+        async def handle(aweme_id: str, aweme_detail: Dict):
+            await douyin_store.update_douyin_aweme(aweme_detail)
+            await self.get_notice_media(aweme_detail)
+            await self.batch_get_note_comments([aweme_id])
+
+        await stream_specified_ids("dy", fetch, handle)
 
     async def get_aweme_detail(
         self, aweme_id: str, semaphore: asyncio.Semaphore
@@ -220,7 +252,7 @@ class DouYinCrawler(AbstractCrawler):
             return
 
         task_list: List[Task] = []
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("dy", "comments")
         for aweme_id in aweme_list:
             task = asyncio.create_task(
                 self.get_comments(aweme_id, semaphore), name=aweme_id
@@ -255,7 +287,7 @@ class DouYinCrawler(AbstractCrawler):
         utils.logger.info(
             "[DouYinCrawler.get_creators_and_videos] Begin get douyin creators"
         )
-        for user_id in config.DY_CREATOR_ID_LIST:
+        for user_id in get_session_config("DY_CREATOR_ID_LIST"):
             creator_info: Dict = await self.dy_client.get_user_info(user_id)
             if creator_info:
                 await douyin_store.save_creator(user_id, creator=creator_info)
@@ -312,7 +344,7 @@ class DouYinCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("dy", "detail")
         task_list = [
             self.get_aweme_detail(post_item.get("aweme_id"), semaphore)
             for post_item in video_list
@@ -355,7 +387,7 @@ class DouYinCrawler(AbstractCrawler):
         """Launch browser and create browser context"""
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -463,13 +495,15 @@ class DouYinCrawler(AbstractCrawler):
             if not url:
                 continue
                 
-            content = await self.dy_client.get_note_media(url)
-            if content is None:
-                continue
-                
             extension_file_name = f"{pic_num}.jpg"
+            await get_media_pipeline().submit(MediaJob(
+                "dy", url,
+                download=functools.partial(self.dy_client.get_note_media, url),
+                save=functools.partial(douyin_store.update_douyin_aweme_image_for_love, aweme_id,
+                                       extension_file_name=extension_file_name, url=url),
+                link=functools.partial(douyin_store.link_douyin_aweme_image_for_love, aweme_id, url, extension_file_name),
+            ))
             pic_num += 1
-            await douyin_store.update_douyin_aweme_image_for_love(aweme_id, content, extension_file_name)
 
     async def get_notice_video_for_love(self, aweme_item: Dict):
         """
@@ -503,14 +537,16 @@ class DouYinCrawler(AbstractCrawler):
             utils.logger.warning(f"[DouYinCrawler.get_notice_video_for_love] aweme_id: {aweme_id}, video URL is empty")
             return
             
-        content = await self.dy_client.get_note_media(video_url)
-        if content is None:
-            utils.logger.warning(f"[DouYinCrawler.get_notice_video_for_love] aweme_id: {aweme_id}, failed to download video content")
-            return
-            
         extension_file_name = "video.mp4"
-        await douyin_store.update_douyin_aweme_video_for_love(aweme_item, content, extension_file_name)
-        utils.logger.info(f"[DouYinCrawler.get_notice_video_for_love] aweme_id: {aweme_id}, video saved successfully")
+        await get_media_pipeline().submit(MediaJob(
+            "dy", video_url,
+            download=functools.partial(self.dy_client.get_note_media, video_url),
+            save=functools.partial(douyin_store.update_douyin_aweme_video_for_love, aweme_item,
+                                   extension_file_name=extension_file_name, url=video_url),
+            link=functools.partial(douyin_store.link_douyin_aweme_video_for_love, aweme_item, video_url, extension_file_name),
+            kind="video",
+            size_hint=video_item.get("play_addr", {}).get("data_size") or 0,
+        ))
 
     async def get_note_images(self, aweme_item: Dict):
         """
@@ -538,13 +574,15 @@ class DouYinCrawler(AbstractCrawler):
             if not url:
                 continue
                 
-            content = await self.dy_client.get_note_media(url)
-            if content is None:
-                continue
-                
             extension_file_name = f"{pic_num}.jpg"
+            await get_media_pipeline().submit(MediaJob(
+                "dy", url,
+                download=functools.partial(self.dy_client.get_note_media, url),
+                save=functools.partial(douyin_store.update_douyin_aweme_image, aweme_id,
+                                       extension_file_name=extension_file_name, url=url),
+                link=functools.partial(douyin_store.link_douyin_aweme_image, aweme_id, url, extension_file_name),
+            ))
             pic_num += 1
-            await douyin_store.update_douyin_aweme_image(aweme_id, content, extension_file_name)
 
     async def get_notice_video(self, aweme_item: Dict):
         """
@@ -578,14 +616,16 @@ class DouYinCrawler(AbstractCrawler):
             utils.logger.warning(f"[DouYinCrawler.get_notice_video] aweme_id: {aweme_id}, video URL is empty")
             return
             
-        content = await self.dy_client.get_note_media(video_url)
-        if content is None:
-            utils.logger.warning(f"[DouYinCrawler.get_notice_video] aweme_id: {aweme_id}, failed to download video content")
-            return
-            
         extension_file_name = "video.mp4"
-        await douyin_store.update_douyin_aweme_video(aweme_item, content, extension_file_name)
-        utils.logger.info(f"[DouYinCrawler.get_notice_video] aweme_id: {aweme_id}, video saved successfully")
+        await get_media_pipeline().submit(MediaJob(
+            "dy", video_url,
+            download=functools.partial(self.dy_client.get_note_media, video_url),
+            save=functools.partial(douyin_store.update_douyin_aweme_video, aweme_item,
+                                   extension_file_name=extension_file_name, url=video_url),
+            link=functools.partial(douyin_store.link_douyin_aweme_video, aweme_item, video_url, extension_file_name),
+            kind="video",
+            size_hint=video_item.get("play_addr", {}).get("data_size") or 0,
+        ))
 
     async def close(self) -> None:
         """Close browser context"""
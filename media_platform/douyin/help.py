@@ -20,7 +20,17 @@ import random
 import execjs
 from playwright.async_api import Page
 
-douyin_sign_obj = execjs.compile(open('libs/douyin.js', encoding='utf-8-sig').read())
+_douyin_sign_obj = None
+
+
+def get_douyin_sign_obj():
+    """
+    编译抖音签名js, 编译较慢, 在第一次签名时才执行
+    """
+    global _douyin_sign_obj
+    if _douyin_sign_obj is None:
+        _douyin_sign_obj = execjs.compile(open('libs/douyin.js', encoding='utf-8-sig').read())
+    return _douyin_sign_obj
 
 def get_web_id():
     """
@@ -64,7 +74,7 @@ def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     sign_js_name = "sign_datail"
     if "/reply" in url:
         sign_js_name = "sign_reply"
-    return douyin_sign_obj.call(sign_js_name, params, user_agent)
+    return get_douyin_sign_obj().call(sign_js_name, params, user_agent)
 
 
 
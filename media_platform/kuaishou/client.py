@@ -11,7 +11,6 @@
 
 # -*- coding: utf-8 -*-
 import asyncio
-import json
 from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlencode
 
@@ -20,7 +19,10 @@ from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from base.concurrency import gather_all, stage_semaphore
+from metrics.crawler_metrics import RequestTimer
+from metrics.tracing import span
+from tools import json_codec, utils
 
 from .exception import DataFetchError
 from .graphql import KuaiShouGraphQL
@@ -45,9 +47,12 @@ class KuaiShouClient(AbstractApiClient):
         self.graphql = KuaiShouGraphQL()
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
-        data: Dict = response.json()
+        async with RequestTimer("ks", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=self.proxies) as client:
+                response = await client.request(method, url, timeout=self.timeout, **kwargs)
+            request_timer.status_code = response.status_code
+        with span("ks.json_decode", "decode"):
+            data: Dict = json_codec.loads_response(response)
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
         else:
@@ -62,7 +67,7 @@ class KuaiShouClient(AbstractApiClient):
         )
 
     async def post(self, uri: str, data: dict) -> Dict:
-        json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        json_str = json_codec.dumps(data, separators=(",", ":"), ensure_ascii=False)
         return await self.request(
             method="POST", url=f"{self._host}{uri}", data=json_str, headers=self.headers
         )
@@ -114,7 +119,8 @@ class KuaiShouClient(AbstractApiClient):
             },
             "query": self.graphql.get("search_query"),
         }
-        return await self.post("", post_data)
+        async with stage_semaphore("ks", "search"):
+            return await self.post("", post_data)
 
     async def get_video_info(self, photo_id: str) -> Dict:
         """
@@ -159,7 +165,8 @@ class KuaiShouClient(AbstractApiClient):
             },
             "query": self.graphql.get("vision_sub_comment_list"),
         }
-        return await self.post("", post_data)
+        async with stage_semaphore("ks", "sub_comments"):
+            return await self.post("", post_data)
 
     async def get_creator_profile(self, userId: str) -> Dict:
         post_data = {
@@ -167,7 +174,8 @@ class KuaiShouClient(AbstractApiClient):
             "variables": {"userId": userId},
             "query": self.graphql.get("vision_profile"),
         }
-        return await self.post("", post_data)
+        async with stage_semaphore("ks", "creator"):
+            return await self.post("", post_data)
 
     async def get_video_by_creater(self, userId: str, pcursor: str = "") -> Dict:
         post_data = {
@@ -175,7 +183,8 @@ class KuaiShouClient(AbstractApiClient):
             "variables": {"page": "profile", "pcursor": pcursor, "userId": userId},
             "query": self.graphql.get("vision_profile_photo_list"),
         }
-        return await self.post("", post_data)
+        async with stage_semaphore("ks", "creator"):
+            return await self.post("", post_data)
 
     async def get_video_all_comments(
         self,
@@ -236,31 +245,54 @@ class KuaiShouClient(AbstractApiClient):
             )
             return []
 
+        # 各个一级评论下的二级评论并发获取, 并发数由sub_comments阶段的信号量控制
+        sub_comments_list = await gather_all(
+            self.get_comment_all_sub_comments(comment, photo_id, crawl_interval, callback)
+            for comment in comments
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(
+        self,
+        comment: Dict,
+        photo_id,
+        crawl_interval: float = 1.0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        获取一条一级评论下的所有二级评论, 逐页获取, 每页获取后立即回调
+        Args:
+            comment: 一级评论
+            photo_id: 视频id
+            crawl_interval: 爬取一次评论的延迟单位（秒）
+            callback: 一次评论爬取结束后
+        Returns:
+
+        """
         result = []
-        for comment in comments:
-            sub_comments = comment.get("subComments")
-            if sub_comments and callback:
-                await callback(photo_id, sub_comments)
+        sub_comments = comment.get("subComments")
+        if sub_comments and callback:
+            await callback(photo_id, sub_comments)
 
-            sub_comment_pcursor = comment.get("subCommentsPcursor")
-            if sub_comment_pcursor == "no_more":
-                continue
+        sub_comment_pcursor = comment.get("subCommentsPcursor")
+        if sub_comment_pcursor == "no_more":
+            return result
 
-            root_comment_id = comment.get("commentId")
-            sub_comment_pcursor = ""
+        root_comment_id = comment.get("commentId")
+        sub_comment_pcursor = ""
 
-            while sub_comment_pcursor != "no_more":
-                comments_res = await self.get_video_sub_comments(
-                    photo_id, root_comment_id, sub_comment_pcursor
-                )
-                vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
-                sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
-
-                comments = vision_sub_comment_list.get("subComments", {})
-                if callback:
-                    await callback(photo_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+        while sub_comment_pcursor != "no_more":
+            comments_res = await self.get_video_sub_comments(
+                photo_id, root_comment_id, sub_comment_pcursor
+            )
+            vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
+            sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+
+            comments = vision_sub_comment_list.get("subComments", {})
+            if callback:
+                await callback(photo_id, comments)
+            await asyncio.sleep(crawl_interval)
+            result.extend(comments)
         return result
 
     async def get_creator_info(self, user_id: str) -> Dict:
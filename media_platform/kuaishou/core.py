@@ -26,11 +26,13 @@ from playwright.async_api import (
 
 import config
 from base.base_crawler import AbstractCrawler
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.session_pool import create_session_ip_proxy, get_session_config
 from store import kuaishou as kuaishou_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import comment_tasks_var, crawler_type_var, source_keyword_var
+from var import comment_tasks_var, crawler_type_var
 
 from .client import KuaiShouClient
 from .exception import DataFetchError
@@ -51,10 +53,7 @@ class KuaishouCrawler(AbstractCrawler):
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -83,13 +82,16 @@ class KuaishouCrawler(AbstractCrawler):
 
             # Create a client to interact with the kuaishou website.
             self.ks_client = await self.create_ks_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.ks_client, ip_proxy_info)
             if not await self.ks_client.pong():
                 login_obj = KuaishouLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone=httpx_proxy_format,
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
                 await self.ks_client.update_cookies(
@@ -117,62 +119,72 @@ class KuaishouCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < ks_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = ks_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            search_session_id = ""
-            source_keyword_var.set(keyword)
+        await search_keywords(
+            "ks", get_session_config("KEYWORDS"), self.search_keyword, start_page, ks_limit_count
+        )
+
+    async def search_keyword(self, keyword: str, start_page: int, ks_limit_count: int) -> None:
+        """
+        search kuaishou videos with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param ks_limit_count: 每页数量
+        :return:
+        """
+        search_session_id = ""
+        utils.logger.info(
+            f"[KuaishouCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
+                page += 1
+                continue
             utils.logger.info(
-                f"[KuaishouCrawler.search] Current search keyword: {keyword}"
+                f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(
-                    f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
+            video_id_list: List[str] = []
+            videos_res = await self.ks_client.search_info_by_keyword(
+                keyword=keyword,
+                pcursor=str(page),
+                search_session_id=search_session_id,
+            )
+            if not videos_res:
+                utils.logger.error(
+                    f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
                 )
-                video_id_list: List[str] = []
-                videos_res = await self.ks_client.search_info_by_keyword(
-                    keyword=keyword,
-                    pcursor=str(page),
-                    search_session_id=search_session_id,
+                continue
+
+            vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
+            if vision_search_photo.get("result") != 1:
+                utils.logger.error(
+                    f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
                 )
-                if not videos_res:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
-                    )
-                    continue
-
-                vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
-                if vision_search_photo.get("result") != 1:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
-                    )
-                    continue
-                search_session_id = vision_search_photo.get("searchSessionId", "")
-                for video_detail in vision_search_photo.get("feeds"):
-                    video_id_list.append(video_detail.get("photo", {}).get("id"))
-                    await kuaishou_store.update_kuaishou_video(video_item=video_detail)
-
-                # batch fetch video comments
-                page += 1
-                await self.batch_get_video_comments(video_id_list)
+                continue
+            search_session_id = vision_search_photo.get("searchSessionId", "")
+            for video_detail in vision_search_photo.get("feeds"):
+                video_id_list.append(video_detail.get("photo", {}).get("id"))
+                await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+
+            # batch fetch video comments
+            page += 1
+            await self.batch_get_video_comments(video_id_list)
 
     async def get_specified_videos(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("ks", "detail")
         task_list = [
             self.get_video_info_task(video_id=video_id, semaphore=semaphore)
-            for video_id in config.KS_SPECIFIED_ID_LIST
+            for video_id in get_session_config("KS_SPECIFIED_ID_LIST")
         ]
         video_details = await asyncio.gather(*task_list)
         for video_detail in video_details:
             if video_detail is not None:
                 await kuaishou_store.update_kuaishou_video(video_detail)
-        await self.batch_get_video_comments(config.KS_SPECIFIED_ID_LIST)
+        await self.batch_get_video_comments(get_session_config("KS_SPECIFIED_ID_LIST"))
 
     async def get_video_info_task(
         self, video_id: str, semaphore: asyncio.Semaphore
@@ -211,7 +223,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("ks", "comments")
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -294,7 +306,7 @@ class KuaishouCrawler(AbstractCrawler):
         )
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -352,7 +364,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             "[KuaiShouCrawler.get_creators_and_videos] Begin get kuaishou creators"
         )
-        for user_id in config.KS_CREATOR_ID_LIST:
+        for user_id in get_session_config("KS_CREATOR_ID_LIST"):
             # get creator detail info from web html content
             createor_info: Dict = await self.ks_client.get_creator_info(user_id=user_id)
             if createor_info:
@@ -374,7 +386,7 @@ class KuaishouCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("ks", "detail")
         task_list = [
             self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
             for post_item in video_list
@@ -10,7 +10,6 @@
 
 
 import asyncio
-import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
@@ -20,9 +19,12 @@ from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 
 import config
 from base.base_crawler import AbstractApiClient
+from base.concurrency import gather_all, stage_semaphore
+from metrics.crawler_metrics import RequestTimer
+from metrics.tracing import span
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
-from proxy.proxy_ip_pool import ProxyIpPool
-from tools import utils
+from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool
+from tools import json_codec, utils
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -34,8 +36,10 @@ class BaiduTieBaClient(AbstractApiClient):
             timeout=10,
             ip_pool=None,
             default_ip_proxy=None,
+            default_ip_info=None,
     ):
         self.ip_pool: Optional[ProxyIpPool] = ip_pool
+        self.default_ip_info: Optional[IpInfoModel] = default_ip_info
         self.timeout = timeout
         self.headers = {
             "User-Agent": utils.get_user_agent(),
@@ -60,11 +64,13 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         actual_proxies = proxies if proxies else self.default_ip_proxy
-        async with httpx.AsyncClient(proxies=actual_proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                headers=self.headers, **kwargs
-            )
+        async with RequestTimer("tieba", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=actual_proxies) as client:
+                response = await client.request(
+                    method, url, timeout=self.timeout,
+                    headers=self.headers, **kwargs
+                )
+            request_timer.status_code = response.status_code
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -78,7 +84,8 @@ class BaiduTieBaClient(AbstractApiClient):
         if return_ori_content:
             return response.text
 
-        return response.json()
+        with span("tieba.json_decode", "decode"):
+            return json_codec.loads_response(response)
 
     async def get(self, uri: str, params=None, return_ori_content=False, **kwargs) -> Any:
         """
@@ -102,6 +109,7 @@ class BaiduTieBaClient(AbstractApiClient):
             return res
         except RetryError as e:
             if self.ip_pool:
+                # 每次请求失败已经在 request 中上报给代理池, 这里直接换用新IP重试
                 proxie_model = await self.ip_pool.get_proxy()
                 _, proxies = utils.format_proxy_info(proxie_model)
                 res = await self.request(method="GET", url=f"{self._host}{final_uri}",
@@ -109,6 +117,8 @@ class BaiduTieBaClient(AbstractApiClient):
                                          proxies=proxies,
                                          **kwargs)
                 self.default_ip_proxy = proxies
+                self.default_ip_info = proxie_model
+                self.ip_pool.register_client(self, proxie_model)
                 return res
 
             utils.logger.error(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
@@ -124,7 +134,7 @@ class BaiduTieBaClient(AbstractApiClient):
         Returns:
 
         """
-        json_str = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        json_str = json_codec.dumps(data, separators=(',', ':'), ensure_ascii=False)
         return await self.request(method="POST", url=f"{self._host}{uri}",
                                   data=json_str, **kwargs)
 
@@ -160,6 +170,18 @@ class BaiduTieBaClient(AbstractApiClient):
         """
         pass
 
+    async def update_proxy(self, ip_proxy_info: IpInfoModel):
+        """
+        热切换客户端使用的代理IP, 代理池在IP即将过期时会调用该方法
+        Args:
+            ip_proxy_info: 新的代理IP信息
+
+        Returns:
+
+        """
+        _, self.default_ip_proxy = utils.format_proxy_info(ip_proxy_info)
+        self.default_ip_info = ip_proxy_info
+
     async def get_notes_by_keyword(
             self, keyword: str,
             page: int = 1,
@@ -187,8 +209,9 @@ class BaiduTieBaClient(AbstractApiClient):
             "sm": sort.value,
             "only_thread": note_type.value
         }
-        page_content = await self.get(uri, params=params, return_ori_content=True)
-        return self._page_extractor.extract_search_note_list(page_content)
+        async with stage_semaphore("tieba", "search"):
+            page_content = await self.get(uri, params=params, return_ori_content=True)
+        return await self._page_extractor.extract_async(self._page_extractor.extract_search_note_list, page_content)
 
     async def get_note_by_id(self, note_id: str) -> TiebaNote:
         """
@@ -201,7 +224,7 @@ class BaiduTieBaClient(AbstractApiClient):
         """
         uri = f"/p/{note_id}"
         page_content = await self.get(uri, return_ori_content=True)
-        return self._page_extractor.extract_note_detail(page_content)
+        return await self._page_extractor.extract_async(self._page_extractor.extract_note_detail, page_content)
 
     async def get_note_all_comments(self, note_detail: TiebaNote, crawl_interval: float = 1.0,
                                     callback: Optional[Callable] = None,
@@ -225,8 +248,9 @@ class BaiduTieBaClient(AbstractApiClient):
                 "pn": current_page
             }
             page_content = await self.get(uri, params=params, return_ori_content=True)
-            comments = self._page_extractor.extract_tieba_note_parment_comments(page_content,
-                                                                                note_id=note_detail.note_id)
+            comments = await self._page_extractor.extract_async(
+                self._page_extractor.extract_tieba_note_parment_comments, page_content, note_detail.note_id
+            )
             if not comments:
                 break
             if len(result) + len(comments) > max_count:
@@ -252,7 +276,6 @@ class BaiduTieBaClient(AbstractApiClient):
         Returns:
 
         """
-        uri = "/p/comment"
         if not config.ENABLE_GET_SUB_COMMENTS:
             return []
 
@@ -260,32 +283,51 @@ class BaiduTieBaClient(AbstractApiClient):
         # if self.headers.get("Cookies") == "" or not self.pong():
         #     raise Exception(f"[BaiduTieBaClient.pong] Cookies is empty, please login first...")
 
-        all_sub_comments: List[TiebaComment] = []
-        for parment_comment in comments:
-            if parment_comment.sub_comment_count == 0:
-                continue
-
-            current_page = 1
-            max_sub_page_num = parment_comment.sub_comment_count // 10 + 1
-            while max_sub_page_num >= current_page:
-                params = {
-                    "tid": parment_comment.note_id,  # 帖子ID
-                    "pid": parment_comment.comment_id,  # 父级评论ID
-                    "fid": parment_comment.tieba_id,  # 贴吧ID
-                    "pn": current_page  # 页码
-                }
+        # 各个一级评论下的子评论并发获取, 并发数由sub_comments阶段的信号量控制
+        sub_comments_list = await gather_all(
+            self.get_comment_all_sub_comments(parment_comment, crawl_interval, callback)
+            for parment_comment in comments
+            if parment_comment.sub_comment_count != 0
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(self, parment_comment: TiebaComment, crawl_interval: float = 1.0,
+                                           callback: Optional[Callable] = None) -> List[TiebaComment]:
+        """
+        获取一条评论下的所有子评论, 逐页获取, 每页获取后立即回调
+        Args:
+            parment_comment: 一级评论
+            crawl_interval: 爬取一次笔记的延迟单位（秒）
+            callback: 一次笔记爬取结束后
+
+        Returns:
+
+        """
+        uri = "/p/comment"
+        sub_comments_result: List[TiebaComment] = []
+        current_page = 1
+        max_sub_page_num = parment_comment.sub_comment_count // 10 + 1
+        while max_sub_page_num >= current_page:
+            params = {
+                "tid": parment_comment.note_id,  # 帖子ID
+                "pid": parment_comment.comment_id,  # 父级评论ID
+                "fid": parment_comment.tieba_id,  # 贴吧ID
+                "pn": current_page  # 页码
+            }
+            async with stage_semaphore("tieba", "sub_comments"):
                 page_content = await self.get(uri, params=params, return_ori_content=True)
-                sub_comments = self._page_extractor.extract_tieba_note_sub_comments(page_content,
-                                                                                    parent_comment=parment_comment)
-
-                if not sub_comments:
-                    break
-                if callback:
-                    await callback(parment_comment.note_id, sub_comments)
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
-                current_page += 1
-        return all_sub_comments
+            sub_comments = await self._page_extractor.extract_async(
+                self._page_extractor.extract_tieba_note_sub_comments, page_content, parment_comment
+            )
+
+            if not sub_comments:
+                break
+            if callback:
+                await callback(parment_comment.note_id, sub_comments)
+            sub_comments_result.extend(sub_comments)
+            await asyncio.sleep(crawl_interval)
+            current_page += 1
+        return sub_comments_result
 
     async def get_notes_by_tieba_name(self, tieba_name: str, page_num: int) -> List[TiebaNote]:
         """
@@ -298,8 +340,9 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         uri = f"/f?kw={tieba_name}&pn={page_num}"
-        page_content = await self.get(uri, return_ori_content=True)
-        return self._page_extractor.extract_tieba_note_list(page_content)
+        async with stage_semaphore("tieba", "search"):
+            page_content = await self.get(uri, return_ori_content=True)
+        return await self._page_extractor.extract_async(self._page_extractor.extract_tieba_note_list, page_content)
 
     async def get_creator_info_by_url(self, creator_url: str) -> str:
         """
@@ -310,7 +353,8 @@ class BaiduTieBaClient(AbstractApiClient):
         Returns:
 
         """
-        page_content = await self.request(method="GET", url=creator_url, return_ori_content=True)
+        async with stage_semaphore("tieba", "creator"):
+            page_content = await self.request(method="GET", url=creator_url, return_ori_content=True)
         return page_content
 
     async def get_notes_by_creator(self, user_name: str, page_number: int) -> Dict:
@@ -330,7 +374,8 @@ class BaiduTieBaClient(AbstractApiClient):
             "id": "utf-8",
             "_": utils.get_current_timestamp()
         }
-        return await self.get(uri, params=params)
+        async with stage_semaphore("tieba", "creator"):
+            return await self.get(uri, params=params)
 
     async def get_all_notes_by_creator_user_name(self,
                                                  user_name: str, crawl_interval: float = 1.0,
@@ -354,10 +399,8 @@ class BaiduTieBaClient(AbstractApiClient):
         # 百度贴吧比较特殊一些，前10个帖子是直接展示在主页上的，要单独处理，通过API获取不到
         result: List[TiebaNote] = []
         if creator_page_html_content:
-            thread_id_list = (
-                self._page_extractor.extract_tieba_thread_id_list_from_creator_page(
-                    creator_page_html_content
-                )
+            thread_id_list = await self._page_extractor.extract_async(
+                self._page_extractor.extract_tieba_thread_id_list_from_creator_page, creator_page_html_content
             )
             utils.logger.info(
                 f"[BaiduTieBaClient.get_all_notes_by_creator] got user_name:{user_name} thread_id_list len : {len(thread_id_list)}"
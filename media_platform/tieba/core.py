@@ -25,12 +25,14 @@ from playwright.async_api import (
 
 import config
 from base.base_crawler import AbstractCrawler
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.session_pool import create_session_ip_proxy, get_session_config
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import tieba as tieba_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import BaiduTieBaClient
 from .field import SearchNoteType, SearchSortType
@@ -56,15 +58,12 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        ip_proxy_pool, httpx_proxy_format = None, None
+        ip_proxy_pool, ip_proxy_info, httpx_proxy_format = None, None, None
         if config.ENABLE_IP_PROXY:
             utils.logger.info(
                 "[BaiduTieBaCrawler.start] Begin create ip proxy pool ..."
             )
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             _, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
             utils.logger.info(
                 f"[BaiduTieBaCrawler.start] Init default ip proxy, value: {httpx_proxy_format}"
@@ -74,7 +73,11 @@ class TieBaCrawler(AbstractCrawler):
         self.tieba_client = BaiduTieBaClient(
             ip_pool=ip_proxy_pool,
             default_ip_proxy=httpx_proxy_format,
+            default_ip_info=ip_proxy_info,
         )
+        if config.ENABLE_IP_PROXY:
+            # IP即将过期时由代理池预取新IP并热切换客户端的代理
+            ip_proxy_pool.register_client(self.tieba_client, ip_proxy_info)
         crawler_type_var.set(config.CRAWLER_TYPE)
         if config.CRAWLER_TYPE == "search":
             # Search for notes and retrieve their comment information.
@@ -82,7 +85,7 @@ class TieBaCrawler(AbstractCrawler):
             await self.get_specified_tieba_notes()
         elif config.CRAWLER_TYPE == "detail":
             # Get the information and comments of the specified post
-            await self.get_specified_notes()
+            await self.get_specified_notes(get_session_config("TIEBA_SPECIFIED_ID_LIST"))
         elif config.CRAWLER_TYPE == "creator":
             # Get creator's information and their notes and comments
             await self.get_creators_and_notes()
@@ -104,49 +107,59 @@ class TieBaCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[BaiduTieBaCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * tieba_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[BaiduTieBaCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-                try:
-                    utils.logger.info(
-                        f"[BaiduTieBaCrawler.search] search tieba keyword: {keyword}, page: {page}"
-                    )
-                    notes_list: List[TiebaNote] = (
-                        await self.tieba_client.get_notes_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                            page_size=tieba_limit_count,
-                            sort=SearchSortType.TIME_DESC,
-                            note_type=SearchNoteType.FIXED_THREAD,
-                        )
+        await search_keywords(
+            "tieba", get_session_config("KEYWORDS"), self.search_keyword, start_page, tieba_limit_count
+        )
+
+    async def search_keyword(self, keyword: str, start_page: int, tieba_limit_count: int) -> None:
+        """
+        search baidu tieba notes with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param tieba_limit_count: 每页数量
+        :return:
+        """
+        utils.logger.info(
+            f"[BaiduTieBaCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * tieba_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[BaiduTieBaCrawler.search] Skip page {page}")
+                page += 1
+                continue
+            try:
+                utils.logger.info(
+                    f"[BaiduTieBaCrawler.search] search tieba keyword: {keyword}, page: {page}"
+                )
+                notes_list: List[TiebaNote] = (
+                    await self.tieba_client.get_notes_by_keyword(
+                        keyword=keyword,
+                        page=page,
+                        page_size=tieba_limit_count,
+                        sort=SearchSortType.TIME_DESC,
+                        note_type=SearchNoteType.FIXED_THREAD,
                     )
-                    if not notes_list:
-                        utils.logger.info(
-                            f"[BaiduTieBaCrawler.search] Search note list is empty"
-                        )
-                        break
+                )
+                if not notes_list:
                     utils.logger.info(
-                        f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}"
-                    )
-                    await self.get_specified_notes(
-                        note_id_list=[note_detail.note_id for note_detail in notes_list]
-                    )
-                    page += 1
-                except Exception as ex:
-                    utils.logger.error(
-                        f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
+                        f"[BaiduTieBaCrawler.search] Search note list is empty"
                     )
                     break
+                utils.logger.info(
+                    f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}"
+                )
+                await self.get_specified_notes(
+                    note_id_list=[note_detail.note_id for note_detail in notes_list]
+                )
+                page += 1
+            except Exception as ex:
+                utils.logger.error(
+                    f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
+                )
+                break
 
     async def get_specified_tieba_notes(self):
         """
@@ -157,7 +170,7 @@ class TieBaCrawler(AbstractCrawler):
         tieba_limit_count = 50
         if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
-        for tieba_name in config.TIEBA_NAME_LIST:
+        for tieba_name in get_session_config("TIEBA_NAME_LIST"):
             utils.logger.info(
                 f"[BaiduTieBaCrawler.get_specified_tieba_notes] Begin get tieba name: {tieba_name}"
             )
@@ -191,7 +204,7 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("tieba", "detail")
         task_list = [
             self.get_note_detail_async_task(note_id=note_id, semaphore=semaphore)
             for note_id in note_id_list
@@ -251,7 +264,7 @@ class TieBaCrawler(AbstractCrawler):
         if not config.ENABLE_GET_COMMENTS:
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("tieba", "comments")
         task_list: List[Task] = []
         for note_detail in note_detail_list:
             task = asyncio.create_task(
@@ -293,12 +306,12 @@ class TieBaCrawler(AbstractCrawler):
         utils.logger.info(
             "[WeiboCrawler.get_creators_and_notes] Begin get weibo creators"
         )
-        for creator_url in config.TIEBA_CREATOR_URL_LIST:
+        for creator_url in get_session_config("TIEBA_CREATOR_URL_LIST"):
             creator_page_html_content = await self.tieba_client.get_creator_info_by_url(
                 creator_url=creator_url
             )
-            creator_info: TiebaCreator = self._page_extractor.extract_creator_info(
-                creator_page_html_content
+            creator_info: TiebaCreator = await self._page_extractor.extract_async(
+                self._page_extractor.extract_creator_info, creator_page_html_content
             )
             if creator_info:
                 utils.logger.info(
@@ -352,7 +365,7 @@ class TieBaCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -10,26 +10,138 @@
 
 
 # -*- coding: utf-8 -*-
+# @Desc    : 贴吧页面解析, 每个页面只解析一次, XPath表达式在模块加载时预编译, 页面级的字段在循环外提取
 import html
-import json
 import re
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple, TypeVar, Union
 from urllib.parse import parse_qs, unquote
 
+from lxml import etree
 from parsel import Selector
 
 from constant import baidu_tieba as const
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
-from tools import utils
+from tools import json_codec, utils
 
 GENDER_MALE = "sex_male"
 GENDER_FEMALE = "sex_female"
 
+# 超过该长度(字符数)的页面放到线程中解析, 避免阻塞事件循环, lxml解析时会释放GIL
+PARSE_IN_THREAD_MIN_SIZE = 100 * 1024
+
+T = TypeVar("T")
+
+XPath = etree.XPath
+
+# 关键词搜索结果页
+SEARCH_POST_LIST = XPath("//div[@class='s_post']")
+SEARCH_NOTE_ID = XPath(".//span[@class='p_title']/a/@data-tid")
+SEARCH_TITLE = XPath(".//span[@class='p_title']/a/text()")
+SEARCH_DESC = XPath(".//div[@class='p_content']/text()")
+SEARCH_NOTE_URL = XPath(".//span[@class='p_title']/a/@href")
+SEARCH_USER_NICKNAME = XPath(".//a[starts-with(@href, '/home/main')]/font/text()")
+SEARCH_USER_LINK = XPath(".//a[starts-with(@href, '/home/main')]/@href")
+SEARCH_TIEBA_NAME = XPath(".//a[@class='p_forum']/font/text()")
+SEARCH_TIEBA_LINK = XPath(".//a[@class='p_forum']/@href")
+SEARCH_PUBLISH_TIME = XPath(".//font[@class='p_green p_date']/text()")
+
+# 页面级字段
+PAGE_TIEBA_NAME = XPath("//a[@class='card_title_fname']/text()")
+PAGE_TIEBA_LINK = XPath("//a[@class='card_title_fname']/@href")
+PAGE_TITLE = XPath("//title/text()")
+PAGE_DESC = XPath("//meta[@name='description']/@content")
+
+# 贴吧帖子列表页
+THREAD_LIST = XPath("//ul[@id='thread_list']/li")
+THREAD_TITLE = XPath(".//a[@class='j_th_tit ']/text()")
+THREAD_DESC = XPath(".//div[@class='threadlist_abs threadlist_abs_onlyline ']/text()")
+THREAD_USER_LINK = XPath(".//a[@class='frs-author-name j_user_card ']/@href")
+
+# 帖子详情页和一级评论
+DETAIL_FIRST_FLOOR = XPath("//div[@class='p_postlist'][1]")
+DETAIL_ONLY_VIEW_AUTHOR_LINK = XPath("//*[@id='lzonly_cntn']/@href")
+DETAIL_THREAD_NUM_INFOS = XPath("//div[@id='thread_theme_5']//li[@class='l_reply_num']//span[@class='red']")
+POST_TAIL_WRAP = XPath(".//div[@class='post-tail-wrap']")
+AUTHOR_FACE_LINK = XPath(".//a[@class='p_author_face ']/@href")
+AUTHOR_NAME = XPath(".//a[@class='p_author_name j_user_card']/text()")
+AUTHOR_AVATAR = XPath(".//a[@class='p_author_face ']/img/@src")
+COMMENT_LIST = XPath("//div[@class='l_post l_post_bright j_l_post clearfix  ']")
+
+# 二级评论
+SUB_COMMENT_FIRST_LIST = XPath("//li[@class='lzl_single_post j_lzl_s_p first_no_border']")
+SUB_COMMENT_LIST = XPath("//li[@class='lzl_single_post j_lzl_s_p ']")
+SUB_COMMENT_USER = XPath("./a[@class='j_user_card lzl_p_p']")
+SUB_COMMENT_CONTENT = XPath(".//span[@class='lzl_content_main']")
+SUB_COMMENT_TIME = XPath(".//span[@class='lzl_time']/text()")
+
+# 创作者主页
+CREATOR_USER_LINK = XPath("//p[@class='space']/a/@href")
+CREATOR_USERDATA = XPath("//div[@class='userinfo_userdata']")
+CREATOR_CONCERN_NUM = XPath("//span[@class='concern_num']")
+CREATOR_NICKNAME = XPath(".//span[@class='userinfo_username ']/text()")
+CREATOR_AVATAR = XPath(".//div[@class='userinfo_left_head']//img/@src")
+CREATOR_THREAD_URLS = XPath("//ul[@class='new_list clearfix']//div[@class='thread_name']/a[1]/@href")
+
+TEXT = XPath("./text()")
+IMG_SRC = XPath("./img/@src")
+
+
+def parse_html(page_content: str) -> etree._Element:
+    """
+    解析页面, 返回根节点, 与 parsel.Selector 的解析方式一致
+    :param page_content: 页面内容
+    :return:
+    """
+    return Selector(text=page_content).root
+
+
+def to_html(element: etree._Element) -> str:
+    """
+    节点序列化为HTML, 与 parsel 的 Selector.get() 一致
+    :param element:
+    :return:
+    """
+    return etree.tostring(element, method="html", encoding="unicode", with_tail=False)
+
+
+def xpath_get(xpath: XPath, node: Union[etree._Element, List[etree._Element]], default: str = "") -> str:
+    """
+    取XPath的第一个结果, 与 parsel 的 Selector/SelectorList.get(default=...) 一致
+    :param xpath: 预编译的XPath
+    :param node: 查询的节点, 为列表时依次查询, 返回第一个结果
+    :param default: 没有结果时的默认值
+    :return:
+    """
+    for current_node in (node if isinstance(node, list) else [node]):
+        results = xpath(current_node)
+        if not results:
+            continue
+        first = results[0]
+        if isinstance(first, etree._Element):
+            return to_html(first)
+        # lxml返回的字符串会引用整个文档, 转成普通字符串
+        return str(first)
+    return default
+
 
 class TieBaExtractor:
     def __init__(self):
         pass
 
+    @staticmethod
+    async def extract_async(extract_func: Callable[..., T], page_content: str, *args: Any) -> T:
+        """
+        在事件循环中调用解析方法, 大页面放到线程中解析
+        Args:
+            extract_func: 解析方法, 例如 extractor.extract_note_detail
+            page_content: 页面内容的HTML字符串
+            *args: 解析方法的其余参数
+
+        Returns:
+            解析方法的返回值
+        """
+        return await utils.run_page_parser(extract_func, page_content, *args, min_size=PARSE_IN_THREAD_MIN_SIZE)
+
     @staticmethod
     def extract_search_note_list(page_content: str) -> List[TiebaNote]:
         """
@@ -40,23 +152,17 @@ class TieBaExtractor:
         Returns:
             包含帖子信息的字典列表
         """
-        xpath_selector = "//div[@class='s_post']"
-        post_list = Selector(text=page_content).xpath(xpath_selector)
         result: List[TiebaNote] = []
-        for post in post_list:
-            tieba_note = TiebaNote(note_id=post.xpath(".//span[@class='p_title']/a/@data-tid").get(default='').strip(),
-                                   title=post.xpath(".//span[@class='p_title']/a/text()").get(default='').strip(),
-                                   desc=post.xpath(".//div[@class='p_content']/text()").get(default='').strip(),
-                                   note_url=const.TIEBA_URL + post.xpath(".//span[@class='p_title']/a/@href").get(
-                                       default=''),
-                                   user_nickname=post.xpath(".//a[starts-with(@href, '/home/main')]/font/text()").get(
-                                       default='').strip(), user_link=const.TIEBA_URL + post.xpath(
-                    ".//a[starts-with(@href, '/home/main')]/@href").get(default=''),
-                                   tieba_name=post.xpath(".//a[@class='p_forum']/font/text()").get(default='').strip(),
-                                   tieba_link=const.TIEBA_URL + post.xpath(".//a[@class='p_forum']/@href").get(
-                                       default=''),
-                                   publish_time=post.xpath(".//font[@class='p_green p_date']/text()").get(
-                                       default='').strip(), )
+        for post in SEARCH_POST_LIST(parse_html(page_content)):
+            tieba_note = TiebaNote(note_id=xpath_get(SEARCH_NOTE_ID, post).strip(),
+                                   title=xpath_get(SEARCH_TITLE, post).strip(),
+                                   desc=xpath_get(SEARCH_DESC, post).strip(),
+                                   note_url=const.TIEBA_URL + xpath_get(SEARCH_NOTE_URL, post),
+                                   user_nickname=xpath_get(SEARCH_USER_NICKNAME, post).strip(),
+                                   user_link=const.TIEBA_URL + xpath_get(SEARCH_USER_LINK, post),
+                                   tieba_name=xpath_get(SEARCH_TIEBA_NAME, post).strip(),
+                                   tieba_link=const.TIEBA_URL + xpath_get(SEARCH_TIEBA_LINK, post),
+                                   publish_time=xpath_get(SEARCH_PUBLISH_TIME, post).strip(), )
             result.append(tieba_note)
         return result
 
@@ -70,27 +176,23 @@ class TieBaExtractor:
 
         """
         page_content = page_content.replace('<!--', "")
-        content_selector = Selector(text=page_content)
-        xpath_selector = "//ul[@id='thread_list']/li"
-        post_list = content_selector.xpath(xpath_selector)
+        root = parse_html(page_content)
+        tieba_name = xpath_get(PAGE_TIEBA_NAME, root).strip()
+        tieba_link = const.TIEBA_URL + xpath_get(PAGE_TIEBA_LINK, root)
         result: List[TiebaNote] = []
-        for post_selector in post_list:
-            post_field_value: Dict = self.extract_data_field_value(post_selector)
+        for post in THREAD_LIST(root):
+            post_field_value: Dict = self.extract_data_field_value(post)
             if not post_field_value:
                 continue
             note_id = str(post_field_value.get("id"))
             tieba_note = TiebaNote(note_id=note_id,
-                                   title=post_selector.xpath(".//a[@class='j_th_tit ']/text()").get(default='').strip(),
-                                   desc=post_selector.xpath(
-                                       ".//div[@class='threadlist_abs threadlist_abs_onlyline ']/text()").get(
-                                       default='').strip(), note_url=const.TIEBA_URL + f"/p/{note_id}",
-                                   user_link=const.TIEBA_URL + post_selector.xpath(
-                                       ".//a[@class='frs-author-name j_user_card ']/@href").get(default='').strip(),
+                                   title=xpath_get(THREAD_TITLE, post).strip(),
+                                   desc=xpath_get(THREAD_DESC, post).strip(),
+                                   note_url=const.TIEBA_URL + f"/p/{note_id}",
+                                   user_link=const.TIEBA_URL + xpath_get(THREAD_USER_LINK, post).strip(),
                                    user_nickname=post_field_value.get("authoer_nickname") or post_field_value.get(
                                        "author_name"),
-                                   tieba_name=content_selector.xpath("//a[@class='card_title_fname']/text()").get(
-                                       default='').strip(), tieba_link=const.TIEBA_URL + content_selector.xpath(
-                    "//a[@class='card_title_fname']/@href").get(default=''),
+                                   tieba_name=tieba_name, tieba_link=tieba_link,
                                    total_replay_num=post_field_value.get("reply_num", 0))
             result.append(tieba_note)
         return result
@@ -104,31 +206,26 @@ class TieBaExtractor:
         Returns:
 
         """
-        content_selector = Selector(text=page_content)
-        first_floor_selector = content_selector.xpath("//div[@class='p_postlist'][1]")
-        only_view_author_link = content_selector.xpath("//*[@id='lzonly_cntn']/@href").get(default='').strip()
+        root = parse_html(page_content)
+        first_floor = DETAIL_FIRST_FLOOR(root)
+        only_view_author_link = xpath_get(DETAIL_ONLY_VIEW_AUTHOR_LINK, root).strip()
         note_id = only_view_author_link.split("?")[0].split("/")[-1]
         # 帖子回复数、回复页数
-        thread_num_infos = content_selector.xpath(
-            "//div[@id='thread_theme_5']//li[@class='l_reply_num']//span[@class='red']")
+        thread_num_infos = DETAIL_THREAD_NUM_INFOS(root)
         # IP地理位置、发表时间
-        other_info_content = content_selector.xpath(".//div[@class='post-tail-wrap']").get(default="").strip()
+        other_info_content = xpath_get(POST_TAIL_WRAP, root).strip()
         ip_location, publish_time = self.extract_ip_and_pub_time(other_info_content)
-        note = TiebaNote(note_id=note_id, title=content_selector.xpath("//title/text()").get(default='').strip(),
-                         desc=content_selector.xpath("//meta[@name='description']/@content").get(default='').strip(),
+        note = TiebaNote(note_id=note_id, title=xpath_get(PAGE_TITLE, root).strip(),
+                         desc=xpath_get(PAGE_DESC, root).strip(),
                          note_url=const.TIEBA_URL + f"/p/{note_id}",
-                         user_link=const.TIEBA_URL + first_floor_selector.xpath(
-                             ".//a[@class='p_author_face ']/@href").get(default='').strip(),
-                         user_nickname=first_floor_selector.xpath(
-                             ".//a[@class='p_author_name j_user_card']/text()").get(default='').strip(),
-                         user_avatar=first_floor_selector.xpath(".//a[@class='p_author_face ']/img/@src").get(
-                             default='').strip(),
-                         tieba_name=content_selector.xpath("//a[@class='card_title_fname']/text()").get(
-                             default='').strip(), tieba_link=const.TIEBA_URL + content_selector.xpath(
-                "//a[@class='card_title_fname']/@href").get(default=''), ip_location=ip_location,
+                         user_link=const.TIEBA_URL + xpath_get(AUTHOR_FACE_LINK, first_floor).strip(),
+                         user_nickname=xpath_get(AUTHOR_NAME, first_floor).strip(),
+                         user_avatar=xpath_get(AUTHOR_AVATAR, first_floor).strip(),
+                         tieba_name=xpath_get(PAGE_TIEBA_NAME, root).strip(),
+                         tieba_link=const.TIEBA_URL + xpath_get(PAGE_TIEBA_LINK, root), ip_location=ip_location,
                          publish_time=publish_time,
-                         total_replay_num=thread_num_infos[0].xpath("./text()").get(default='').strip(),
-                         total_replay_page=thread_num_infos[1].xpath("./text()").get(default='').strip(), )
+                         total_replay_num=xpath_get(TEXT, thread_num_infos[0]).strip(),
+                         total_replay_page=xpath_get(TEXT, thread_num_infos[1]).strip(), )
         note.title = note.title.replace(f"【{note.tieba_name}】_百度贴吧", "")
         return note
 
@@ -142,27 +239,23 @@ class TieBaExtractor:
         Returns:
 
         """
-        xpath_selector = "//div[@class='l_post l_post_bright j_l_post clearfix  ']"
-        comment_list = Selector(text=page_content).xpath(xpath_selector)
+        root = parse_html(page_content)
+        tieba_name = xpath_get(PAGE_TIEBA_NAME, root).strip()
         result: List[TiebaComment] = []
-        for comment_selector in comment_list:
-            comment_field_value: Dict = self.extract_data_field_value(comment_selector)
+        for comment in COMMENT_LIST(root):
+            comment_field_value: Dict = self.extract_data_field_value(comment)
             if not comment_field_value:
                 continue
-            tieba_name = comment_selector.xpath("//a[@class='card_title_fname']/text()").get(default='').strip()
-            other_info_content = comment_selector.xpath(".//div[@class='post-tail-wrap']").get(default="").strip()
+            other_info_content = xpath_get(POST_TAIL_WRAP, comment).strip()
             ip_location, publish_time = self.extract_ip_and_pub_time(other_info_content)
             tieba_comment = TiebaComment(comment_id=str(comment_field_value.get("content").get("post_id")),
                                          sub_comment_count=comment_field_value.get("content").get("comment_num"),
                                          content=utils.extract_text_from_html(
                                              comment_field_value.get("content").get("content")),
                                          note_url=const.TIEBA_URL + f"/p/{note_id}",
-                                         user_link=const.TIEBA_URL + comment_selector.xpath(
-                                             ".//a[@class='p_author_face ']/@href").get(default='').strip(),
-                                         user_nickname=comment_selector.xpath(
-                                             ".//a[@class='p_author_name j_user_card']/text()").get(default='').strip(),
-                                         user_avatar=comment_selector.xpath(
-                                             ".//a[@class='p_author_face ']/img/@src").get(default='').strip(),
+                                         user_link=const.TIEBA_URL + xpath_get(AUTHOR_FACE_LINK, comment).strip(),
+                                         user_nickname=xpath_get(AUTHOR_NAME, comment).strip(),
+                                         user_avatar=xpath_get(AUTHOR_AVATAR, comment).strip(),
                                          tieba_id=str(comment_field_value.get("content").get("forum_id", "")),
                                          tieba_name=tieba_name, tieba_link=f"https://tieba.baidu.com/f?kw={tieba_name}",
                                          ip_location=ip_location, publish_time=publish_time, note_id=note_id, )
@@ -179,23 +272,22 @@ class TieBaExtractor:
         Returns:
 
         """
-        selector = Selector(page_content)
+        root = parse_html(page_content)
         comments = []
-        comment_ele_list = selector.xpath("//li[@class='lzl_single_post j_lzl_s_p first_no_border']")
-        comment_ele_list.extend(selector.xpath("//li[@class='lzl_single_post j_lzl_s_p ']"))
+        comment_ele_list = SUB_COMMENT_FIRST_LIST(root)
+        comment_ele_list.extend(SUB_COMMENT_LIST(root))
         for comment_ele in comment_ele_list:
             comment_value = self.extract_data_field_value(comment_ele)
             if not comment_value:
                 continue
-            comment_user_a_selector = comment_ele.xpath("./a[@class='j_user_card lzl_p_p']")[0]
-            content = utils.extract_text_from_html(
-                comment_ele.xpath(".//span[@class='lzl_content_main']").get(default=""))
+            comment_user_a = SUB_COMMENT_USER(comment_ele)[0]
+            content = utils.extract_text_from_html(xpath_get(SUB_COMMENT_CONTENT, comment_ele))
             comment = TiebaComment(
                 comment_id=str(comment_value.get("spid")), content=content,
-                user_link=comment_user_a_selector.xpath("./@href").get(default=""),
+                user_link=comment_user_a.get("href", ""),
                 user_nickname=comment_value.get("showname"),
-                user_avatar=comment_user_a_selector.xpath("./img/@src").get(default=""),
-                publish_time=comment_ele.xpath(".//span[@class='lzl_time']/text()").get(default="").strip(),
+                user_avatar=xpath_get(IMG_SRC, comment_user_a),
+                publish_time=xpath_get(SUB_COMMENT_TIME, comment_ele).strip(),
                 parent_comment_id=parent_comment.comment_id,
                 note_id=parent_comment.note_id, note_url=parent_comment.note_url,
                 tieba_id=parent_comment.tieba_id, tieba_name=parent_comment.tieba_name,
@@ -213,23 +305,19 @@ class TieBaExtractor:
         Returns:
 
         """
-        selector = Selector(text=html_content)
-        user_link_selector = selector.xpath("//p[@class='space']/a")
-        user_link: str = user_link_selector.xpath("./@href").get(default='')
+        root = parse_html(html_content)
+        user_link: str = xpath_get(CREATOR_USER_LINK, root)
         user_link_params: Dict = parse_qs(unquote(user_link.split("?")[-1]))
         user_name = user_link_params.get("un")[0] if user_link_params.get("un") else ""
         user_id = user_link_params.get("id")[0] if user_link_params.get("id") else ""
-        userinfo_userdata_selector = selector.xpath("//div[@class='userinfo_userdata']")
-        follow_fans_selector = selector.xpath("//span[@class='concern_num']")
+        follow_fans_elements = CREATOR_CONCERN_NUM(root)
         follows, fans = 0, 0
-        if len(follow_fans_selector) == 2:
-            follows, fans = self.extract_follow_and_fans(follow_fans_selector)
-        user_content = userinfo_userdata_selector.get(default='')
+        if len(follow_fans_elements) == 2:
+            follows, fans = self.extract_follow_and_fans([to_html(element) for element in follow_fans_elements])
+        user_content = xpath_get(CREATOR_USERDATA, root)
         return TiebaCreator(user_id=user_id, user_name=user_name,
-                            nickname=selector.xpath(".//span[@class='userinfo_username ']/text()").get(
-                                default='').strip(),
-                            avatar=selector.xpath(".//div[@class='userinfo_left_head']//img/@src").get(
-                                default='').strip(),
+                            nickname=xpath_get(CREATOR_NICKNAME, root).strip(),
+                            avatar=xpath_get(CREATOR_AVATAR, root).strip(),
                             gender=self.extract_gender(user_content),
                             ip_location=self.extract_ip(user_content),
                             follows=follows,
@@ -249,14 +337,9 @@ class TieBaExtractor:
         Returns:
 
         """
-        selector = Selector(text=html_content)
         thread_id_list = []
-        xpath_selector = (
-            "//ul[@class='new_list clearfix']//div[@class='thread_name']/a[1]/@href"
-        )
-        thread_url_list = selector.xpath(xpath_selector).getall()
-        for thread_url in thread_url_list:
-            thread_id = thread_url.split("?")[0].split("/")[-1]
+        for thread_url in CREATOR_THREAD_URLS(parse_html(html_content)):
+            thread_id = str(thread_url).split("?")[0].split("/")[-1]
             thread_id_list.append(thread_id)
         return thread_id_list
 
@@ -306,18 +389,18 @@ class TieBaExtractor:
         return '未知'
 
     @staticmethod
-    def extract_follow_and_fans(selectors: List[Selector]) -> Tuple[str, str]:
+    def extract_follow_and_fans(html_contents: List[str]) -> Tuple[str, str]:
         """
         提取关注数和粉丝数
         Args:
-            selectors:
+            html_contents: 关注数和粉丝数两个节点的HTML
 
         Returns:
 
         """
         pattern = re.compile(r'<span class="concern_num">\(<a[^>]*>(\d+)</a>\)</span>')
-        follow_match = pattern.findall(selectors[0].get())
-        fans_match = pattern.findall(selectors[1].get())
+        follow_match = pattern.findall(html_contents[0])
+        fans_match = pattern.findall(html_contents[1])
         follows = follow_match[0] if follow_match else 0
         fans = fans_match[0] if fans_match else 0
         return follows, fans
@@ -334,22 +417,23 @@ class TieBaExtractor:
         return match.group(1) if match else ""
 
     @staticmethod
-    def extract_data_field_value(selector: Selector) -> Dict:
+    def extract_data_field_value(selector: Union[Selector, etree._Element]) -> Dict:
         """
         提取data-field的值
         Args:
-            selector:
+            selector: 节点, 也可以是 parsel 的 Selector
 
         Returns:
 
         """
-        data_field_value = selector.xpath("./@data-field").get(default='').strip()
+        element = selector.root if isinstance(selector, Selector) else selector
+        data_field_value = element.get("data-field", "").strip()
         if not data_field_value or data_field_value == "{}":
             return {}
         try:
             # 先使用 html.unescape 处理转义字符 再json.loads 将 JSON 字符串转换为 Python 字典
             unescaped_json_str = html.unescape(data_field_value)
-            data_field_dict_value = json.loads(unescaped_json_str)
+            data_field_dict_value = json_codec.loads(unescaped_json_str)
         except Exception as ex:
             print(f"extract_data_field_value，错误信息：{ex}, 尝试使用其他方式解析")
             data_field_dict_value = {}
@@ -16,7 +16,6 @@
 
 import asyncio
 import copy
-import json
 import re
 from typing import Callable, Dict, List, Optional, Union
 from urllib.parse import parse_qs, unquote, urlencode
@@ -26,13 +25,18 @@ from httpx import Response
 from playwright.async_api import BrowserContext, Page
 
 import config
-from tools import utils
+from base.base_crawler import AbstractApiClient
+from base.concurrency import stage_semaphore
+from base.media_download import request_media
+from metrics.crawler_metrics import RequestTimer
+from metrics.tracing import span
+from tools import json_codec, utils
 
 from .exception import DataFetchError
 from .field import SearchType
 
 
-class WeiboClient:
+class WeiboClient(AbstractApiClient):
     def __init__(
             self,
             timeout=10,
@@ -52,16 +56,19 @@ class WeiboClient:
 
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         enable_return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        async with RequestTimer("wb", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=self.proxies) as client:
+                response = await client.request(
+                    method, url, timeout=self.timeout,
+                    **kwargs
+                )
+            request_timer.status_code = response.status_code
 
         if enable_return_response:
             return response
 
-        data: Dict = response.json()
+        with span("wb.json_decode", "decode"):
+            data: Dict = json_codec.loads_response(response)
         ok_code = data.get("ok")
         if ok_code == 0:  # response error
             utils.logger.error(f"[WeiboClient.request] request {method}:{url} err, res:{data}")
@@ -83,7 +90,7 @@ class WeiboClient:
         return await self.request(method="GET", url=f"{self._host}{final_uri}", headers=headers, **kwargs)
 
     async def post(self, uri: str, data: dict) -> Dict:
-        json_str = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        json_str = json_codec.dumps(data, separators=(',', ':'), ensure_ascii=False)
         return await self.request(method="POST", url=f"{self._host}{uri}",
                                   data=json_str, headers=self.headers)
 
@@ -128,7 +135,8 @@ class WeiboClient:
             "page_type": "searchall",
             "page": page,
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("wb", "search"):
+            return await self.get(uri, params)
 
     async def get_note_comments(self, mid_id: str, max_id: int, max_id_type: int = 0) -> Dict:
         """get notes comments
@@ -228,7 +236,7 @@ class WeiboClient:
             match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
             if match:
                 render_data_json = match.group(1)
-                render_data_dict = json.loads(render_data_json)
+                render_data_dict = json_codec.loads(render_data_json)
                 note_detail = render_data_dict[0].get("status")
                 note_item = {
                     "mblog": note_detail
@@ -239,6 +247,7 @@ class WeiboClient:
                 return dict()
 
     async def get_note_image(self, image_url: str) -> bytes:
+        origin_url = image_url
         image_url = image_url[8:]  # 去掉 https://
         sub_url = image_url.split("/")
         image_url = ""
@@ -252,13 +261,11 @@ class WeiboClient:
         # 微博图床对外存在防盗链，所以需要代理访问
         # 由于微博图片是通过 i1.wp.com 来访问的，所以需要拼接一下
         final_uri = (f"{self._image_agent_host}" f"{image_url}")
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", final_uri, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
+        async with stage_semaphore("wb", "media"), httpx.AsyncClient(proxies=self.proxies) as client:
+            content, response = await request_media(client, final_uri, cache_url=origin_url, timeout=self.timeout)
+            if content is None:
                 utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+            return content
 
 
 
@@ -273,7 +280,8 @@ class WeiboClient:
         Returns: {
 
         """
-        response = await self.get(f"/u/{creator_id}", return_response=True)
+        async with stage_semaphore("wb", "creator"):
+            response = await self.get(f"/u/{creator_id}", return_response=True)
         m_weibocn_params = response.cookies.get("M_WEIBOCN_PARAMS")
         if not m_weibocn_params:
             raise DataFetchError("get containerid failed")
@@ -304,7 +312,8 @@ class WeiboClient:
             "containerid": container_info["fid_container_id"],
         }
 
-        user_res = await self.get(uri, params)
+        async with stage_semaphore("wb", "creator"):
+            user_res = await self.get(uri, params)
 
         if user_res.get("tabsInfo"):
             tabs: List[Dict] = user_res.get("tabsInfo", {}).get("tabs", [])
@@ -335,7 +344,8 @@ class WeiboClient:
             "containerid": container_id,
             "since_id": since_id,
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("wb", "creator"):
+            return await self.get(uri, params)
 
     async def get_all_notes_by_creator_id(self, creator_id: str, container_id: str, crawl_interval: float = 1.0,
                                           callback: Optional[Callable] = None) -> List[Dict]:
@@ -16,6 +16,7 @@
 
 
 import asyncio
+import functools
 import os
 import random
 from asyncio import Task
@@ -31,11 +32,14 @@ from playwright.async_api import (
 
 import config
 from base.base_crawler import AbstractCrawler
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.media_pipeline import MediaJob, get_media_pipeline
+from base.session_pool import create_session_ip_proxy, get_session_config
 from store import weibo as weibo_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import WeiboClient
 from .exception import DataFetchError
@@ -60,10 +64,7 @@ class WeiboCrawler(AbstractCrawler):
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -92,13 +93,16 @@ class WeiboCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.wb_client = await self.create_weibo_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.wb_client, ip_proxy_info)
             if not await self.wb_client.pong():
                 login_obj = WeiboLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone="",  # your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
 
@@ -152,53 +156,66 @@ class WeiboCrawler(AbstractCrawler):
             )
             return
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[WeiboCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(
-                    f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}"
-                )
-                search_res = await self.wb_client.get_note_by_keyword(
-                    keyword=keyword, page=page, search_type=search_type
-                )
-                note_id_list: List[str] = []
-                note_list = filter_search_result_card(search_res.get("cards"))
-                for note_item in note_list:
-                    if note_item:
-                        mblog: Dict = note_item.get("mblog")
-                        if mblog:
-                            note_id_list.append(mblog.get("id"))
-                            await weibo_store.update_weibo_note(note_item)
-                            await self.get_note_images(mblog)
+        await search_keywords(
+            "wb", get_session_config("KEYWORDS"), self.search_keyword, start_page, weibo_limit_count, search_type
+        )
 
+    async def search_keyword(
+        self, keyword: str, start_page: int, weibo_limit_count: int, search_type: SearchType
+    ) -> None:
+        """
+        search weibo notes with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param weibo_limit_count: 每页数量
+        :param search_type: 搜索类型
+        :return:
+        """
+        utils.logger.info(
+            f"[WeiboCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
                 page += 1
-                await self.batch_get_notes_comments(note_id_list)
+                continue
+            utils.logger.info(
+                f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}"
+            )
+            search_res = await self.wb_client.get_note_by_keyword(
+                keyword=keyword, page=page, search_type=search_type
+            )
+            note_id_list: List[str] = []
+            note_list = filter_search_result_card(search_res.get("cards"))
+            for note_item in note_list:
+                if note_item:
+                    mblog: Dict = note_item.get("mblog")
+                    if mblog:
+                        note_id_list.append(mblog.get("id"))
+                        await weibo_store.update_weibo_note(note_item)
+                        await self.get_note_images(mblog)
+
+            page += 1
+            await self.batch_get_notes_comments(note_id_list)
 
     async def get_specified_notes(self):
         """
         get specified notes info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("wb", "detail")
         task_list = [
             self.get_note_info_task(note_id=note_id, semaphore=semaphore)
-            for note_id in config.WEIBO_SPECIFIED_ID_LIST
+            for note_id in get_session_config("WEIBO_SPECIFIED_ID_LIST")
         ]
         video_details = await asyncio.gather(*task_list)
         for note_item in video_details:
             if note_item:
                 await weibo_store.update_weibo_note(note_item)
-        await self.batch_get_notes_comments(config.WEIBO_SPECIFIED_ID_LIST)
+        await self.batch_get_notes_comments(get_session_config("WEIBO_SPECIFIED_ID_LIST"))
 
     async def get_note_info_task(
         self, note_id: str, semaphore: asyncio.Semaphore
@@ -239,7 +256,7 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(
             f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("wb", "comments")
         task_list: List[Task] = []
         for note_id in note_id_list:
             task = asyncio.create_task(
@@ -296,12 +313,14 @@ class WeiboCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.wb_client.get_note_image(url)
-            if content != None:
-                extension_file_name = url.split(".")[-1]
-                await weibo_store.update_weibo_note_image(
-                    pic["pid"], content, extension_file_name
-                )
+            extension_file_name = url.split(".")[-1]
+            await get_media_pipeline().submit(MediaJob(
+                "wb", url,
+                download=functools.partial(self.wb_client.get_note_image, url),
+                save=functools.partial(weibo_store.update_weibo_note_image, pic["pid"],
+                                       extension_file_name=extension_file_name, url=url),
+                link=functools.partial(weibo_store.link_weibo_note_image, pic["pid"], url, extension_file_name),
+            ))
 
     async def get_creators_and_notes(self) -> None:
         """
@@ -312,7 +331,7 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(
             "[WeiboCrawler.get_creators_and_notes] Begin get weibo creators"
         )
-        for user_id in config.WEIBO_CREATOR_ID_LIST:
+        for user_id in get_session_config("WEIBO_CREATOR_ID_LIST"):
             createor_info_res: Dict = await self.wb_client.get_creator_info_by_id(
                 creator_id=user_id
             )
@@ -380,7 +399,7 @@ class WeiboCrawler(AbstractCrawler):
         )
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -10,7 +10,6 @@
 
 
 import asyncio
-import json
 import re
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
@@ -21,7 +20,11 @@ from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_result
 
 import config
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from base.concurrency import gather_all, stage_semaphore
+from base.media_download import request_media
+from metrics.crawler_metrics import SIGN_LATENCY, RequestTimer
+from metrics.tracing import span
+from tools import json_codec, utils
 from html import unescape
 
 from .exception import DataFetchError, IPBlockError
@@ -61,16 +64,19 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        encrypt_params = await self.playwright_page.evaluate(
-            "([url, data]) => window._webmsxyw(url,data)", [url, data]
-        )
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
-        signs = sign(
-            a1=self.cookie_dict.get("a1", ""),
-            b1=local_storage.get("b1", ""),
-            x_s=encrypt_params.get("X-s", ""),
-            x_t=str(encrypt_params.get("X-t", "")),
-        )
+        with SIGN_LATENCY.labels("xhs").time():
+            with span("xhs.evaluate", "cdp"):
+                encrypt_params = await self.playwright_page.evaluate(
+                    "([url, data]) => window._webmsxyw(url,data)", [url, data]
+                )
+                local_storage = await self.playwright_page.evaluate("() => window.localStorage")
+            with span("xhs.sign", "sign"):
+                signs = sign(
+                    a1=self.cookie_dict.get("a1", ""),
+                    b1=local_storage.get("b1", ""),
+                    x_s=encrypt_params.get("X-s", ""),
+                    x_t=str(encrypt_params.get("X-t", "")),
+                )
 
         headers = {
             "X-S": signs["x-s"],
@@ -95,8 +101,17 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        async with RequestTimer("xhs", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=self.proxies) as client:
+                response = await client.request(method, url, timeout=self.timeout, **kwargs)
+            request_timer.status_code = response.status_code
+            data: Dict = {}
+            if not return_response and response.status_code not in (461, 471):
+                with span("xhs.json_decode", "decode"):
+                    data = json_codec.loads_response(response)
+                if not data["success"] and data["code"] == self.IP_ERROR_CODE:
+                    # 在请求计时结束前标记, 上报给代理池计为该IP失败
+                    request_timer.proxy_failed = True
 
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
@@ -108,7 +123,6 @@ class XiaoHongShuClient(AbstractApiClient):
 
         if return_response:
             return response.text
-        data: Dict = response.json()
         if data["success"]:
             return data.get("data", data.get("success", {}))
         elif data["code"] == self.IP_ERROR_CODE:
@@ -145,7 +159,7 @@ class XiaoHongShuClient(AbstractApiClient):
 
         """
         headers = await self._pre_headers(uri, data)
-        json_str = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        json_str = json_codec.dumps(data, separators=(",", ":"), ensure_ascii=False)
         return await self.request(
             method="POST",
             url=f"{self._host}{uri}",
@@ -155,15 +169,13 @@ class XiaoHongShuClient(AbstractApiClient):
         )
 
     async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
+        async with stage_semaphore("xhs", "media"), httpx.AsyncClient(proxies=self.proxies) as client:
+            content, response = await request_media(client, url, timeout=self.timeout)
+            if content is None:
                 utils.logger.error(
                     f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
                 )
-                return None
-            else:
-                return response.content
+            return content
 
     async def pong(self) -> bool:
         """
@@ -228,7 +240,8 @@ class XiaoHongShuClient(AbstractApiClient):
             "sort": sort.value,
             "note_type": note_type.value,
         }
-        return await self.post(uri, data)
+        async with stage_semaphore("xhs", "search"):
+            return await self.post(uri, data)
 
     async def get_note_by_id(
         self, note_id: str, xsec_source: str, xsec_token: str
@@ -317,7 +330,8 @@ class XiaoHongShuClient(AbstractApiClient):
             "top_comment_id": "",
             "xsec_token": xsec_token,
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("xhs", "sub_comments"):
+            return await self.get(uri, params)
 
     async def get_note_all_comments(
         self,
@@ -392,46 +406,70 @@ class XiaoHongShuClient(AbstractApiClient):
             )
             return []
 
-        result = []
-        for comment in comments:
-            note_id = comment.get("note_id")
-            sub_comments = comment.get("sub_comments")
-            if sub_comments and callback:
-                await callback(note_id, sub_comments)
-
-            sub_comment_has_more = comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
+        # 各个一级评论下的二级评论并发获取, 并发数由sub_comments阶段的信号量控制
+        sub_comments_list = await gather_all(
+            self.get_comment_all_sub_comments(comment, xsec_token, crawl_interval, callback)
+            for comment in comments
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
 
-            root_comment_id = comment.get("id")
-            sub_comment_cursor = comment.get("sub_comment_cursor")
+    async def get_comment_all_sub_comments(
+        self,
+        comment: Dict,
+        xsec_token: str,
+        crawl_interval: float = 1.0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        获取一条一级评论下的所有二级评论, 逐页获取, 每页获取后立即回调
+        Args:
+            comment: 一级评论
+            xsec_token: 验证token
+            crawl_interval: 爬取一次评论的延迟单位（秒）
+            callback: 一次评论爬取结束后
 
-            while sub_comment_has_more:
-                comments_res = await self.get_note_sub_comments(
-                    note_id=note_id,
-                    root_comment_id=root_comment_id,
-                    xsec_token=xsec_token,
-                    num=10,
-                    cursor=sub_comment_cursor,
+        Returns:
+
+        """
+        result = []
+        note_id = comment.get("note_id")
+        sub_comments = comment.get("sub_comments")
+        if sub_comments and callback:
+            await callback(note_id, sub_comments)
+
+        sub_comment_has_more = comment.get("sub_comment_has_more")
+        if not sub_comment_has_more:
+            return result
+
+        root_comment_id = comment.get("id")
+        sub_comment_cursor = comment.get("sub_comment_cursor")
+
+        while sub_comment_has_more:
+            comments_res = await self.get_note_sub_comments(
+                note_id=note_id,
+                root_comment_id=root_comment_id,
+                xsec_token=xsec_token,
+                num=10,
+                cursor=sub_comment_cursor,
+            )
+
+            if comments_res is None:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comment_all_sub_comments] No response found for note_id: {note_id}"
                 )
-                
-                if comments_res is None:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}"
-                    )
-                    continue
-                sub_comment_has_more = comments_res.get("has_more", False)
-                sub_comment_cursor = comments_res.get("cursor", "")
-                if "comments" not in comments_res:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}"
-                    )
-                    break
-                comments = comments_res["comments"]
-                if callback:
-                    await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+                continue
+            sub_comment_has_more = comments_res.get("has_more", False)
+            sub_comment_cursor = comments_res.get("cursor", "")
+            if "comments" not in comments_res:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comment_all_sub_comments] No 'comments' key found in response: {comments_res}"
+                )
+                break
+            comments = comments_res["comments"]
+            if callback:
+                await callback(note_id, comments)
+            await asyncio.sleep(crawl_interval)
+            result.extend(comments)
         return result
 
     async def get_creator_info(self, user_id: str) -> Dict:
@@ -441,9 +479,10 @@ class XiaoHongShuClient(AbstractApiClient):
         eg: https://www.xiaohongshu.com/user/profile/59d8cb33de5fb4696bf17217
         """
         uri = f"/user/profile/{user_id}"
-        html_content = await self.request(
-            "GET", self._domain + uri, return_response=True, headers=self.headers
-        )
+        async with stage_semaphore("xhs", "creator"):
+            html_content = await self.request(
+                "GET", self._domain + uri, return_response=True, headers=self.headers
+            )
         match = re.search(
             r"<script>window.__INITIAL_STATE__=(.+)<\/script>", html_content, re.M
         )
@@ -451,7 +490,7 @@ class XiaoHongShuClient(AbstractApiClient):
         if match is None:
             return {}
 
-        info = json.loads(match.group(1).replace(":undefined", ":null"), strict=False)
+        info = json_codec.loads(match.group(1).replace(":undefined", ":null"), strict=False)
         if info is None:
             return {}
         return info.get("user").get("userPageData")
@@ -476,7 +515,8 @@ class XiaoHongShuClient(AbstractApiClient):
             "num": page_size,
             "image_formats": "jpg,webp,avif",
         }
-        return await self.get(uri, data)
+        async with stage_semaphore("xhs", "creator"):
+            return await self.get(uri, data)
 
     async def get_all_notes_by_creator(
         self,
@@ -572,19 +612,19 @@ class XiaoHongShuClient(AbstractApiClient):
         def camel_to_underscore(key):
             return re.sub(r"(?<!^)(?=[A-Z])", "_", key).lower()
 
-        def transform_json_keys(json_data):
-            data_dict = json.loads(json_data)
+        def transform_keys(data_dict):
+            # 直接转换解析好的字典, 不再对每一层先序列化再解析
             dict_new = {}
             for key, value in data_dict.items():
                 new_key = camel_to_underscore(key)
                 if not value:
                     dict_new[new_key] = value
                 elif isinstance(value, dict):
-                    dict_new[new_key] = transform_json_keys(json.dumps(value))
+                    dict_new[new_key] = transform_keys(value)
                 elif isinstance(value, list):
                     dict_new[new_key] = [
                         (
-                            transform_json_keys(json.dumps(item))
+                            transform_keys(item)
                             if (item and isinstance(item, dict))
                             else item
                         )
@@ -594,6 +634,9 @@ class XiaoHongShuClient(AbstractApiClient):
                     dict_new[new_key] = value
             return dict_new
 
+        def transform_json_keys(json_data):
+            return transform_keys(json_codec.loads(json_data))
+
         url = (
             "https://www.xiaohongshu.com/explore/"
             + note_id
@@ -10,6 +10,7 @@
 
 
 import asyncio
+import functools
 import os
 import random
 import time
@@ -27,13 +28,17 @@ from tenacity import RetryError
 
 import config
 from base.base_crawler import AbstractCrawler
+from base.bulk_detail import stream_specified_ids
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.media_pipeline import MediaJob, get_media_pipeline
+from base.session_pool import create_session_ip_proxy, get_session_config
 from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import xhs as xhs_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import XiaoHongShuClient
 from .exception import DataFetchError
@@ -57,10 +62,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -92,13 +94,16 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.xhs_client, ip_proxy_info)
             if not await self.xhs_client.pong():
                 login_obj = XiaoHongShuLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone="",  # input your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
                 await self.xhs_client.update_cookies(
@@ -111,7 +116,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 await self.search()
             elif config.CRAWLER_TYPE == "detail":
                 # Get the information and comments of the specified post
-                await self.get_specified_notes()
+                if config.SPECIFIED_ID_FILE:
+                    await self.stream_specified_notes()
+                else:
+                    await self.get_specified_notes()
             elif config.CRAWLER_TYPE == "creator":
                 # Get creator's information and their notes and comments
                 await self.get_creators_and_notes()
@@ -129,78 +137,88 @@ class XiaoHongShuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < xhs_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = xhs_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
-            search_id = get_search_id()
-            while (
-                    page - start_page + 1
-            ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
+        await search_keywords(
+            "xhs", get_session_config("KEYWORDS"), self.search_keyword, start_page, xhs_limit_count
+        )
 
-                try:
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
-                    )
-                    note_ids: List[str] = []
-                    xsec_tokens: List[str] = []
-                    notes_res = await self.xhs_client.get_note_by_keyword(
-                        keyword=keyword,
-                        search_id=search_id,
-                        page=page,
-                        sort=(
-                            SearchSortType(config.SORT_TYPE)
-                            if config.SORT_TYPE != ""
-                            else SearchSortType.GENERAL
-                        ),
-                    )
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
-                    )
-                    if not notes_res or not notes_res.get("has_more", False):
-                        utils.logger.info("No more content!")
-                        break
-                    semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                    task_list = [
-                        self.get_note_detail_async_task(
-                            note_id=post_item.get("id"),
-                            xsec_source=post_item.get("xsec_source"),
-                            xsec_token=post_item.get("xsec_token"),
-                            semaphore=semaphore,
-                        )
-                        for post_item in notes_res.get("items", {})
-                        if post_item.get("model_type") not in ("rec_query", "hot_query")
-                    ]
-                    note_details = await asyncio.gather(*task_list)
-                    for note_detail in note_details:
-                        if note_detail:
-                            await xhs_store.update_xhs_note(note_detail)
-                            await self.get_notice_media(note_detail)
-                            note_ids.append(note_detail.get("note_id"))
-                            xsec_tokens.append(note_detail.get("xsec_token"))
-                    page += 1
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Note details: {note_details}"
-                    )
-                    await self.batch_get_note_comments(note_ids, xsec_tokens)
-                except DataFetchError:
-                    utils.logger.error(
-                        "[XiaoHongShuCrawler.search] Get note detail error"
-                    )
+    async def search_keyword(self, keyword: str, start_page: int, xhs_limit_count: int) -> None:
+        """
+        search xiaohongshu notes with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param xhs_limit_count: 每页数量
+        :return:
+        """
+        utils.logger.info(
+            f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        search_id = get_search_id()
+        while (
+                page - start_page + 1
+        ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
+                page += 1
+                continue
+
+            try:
+                utils.logger.info(
+                    f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
+                )
+                note_ids: List[str] = []
+                xsec_tokens: List[str] = []
+                notes_res = await self.xhs_client.get_note_by_keyword(
+                    keyword=keyword,
+                    search_id=search_id,
+                    page=page,
+                    sort=(
+                        SearchSortType(config.SORT_TYPE)
+                        if config.SORT_TYPE != ""
+                        else SearchSortType.GENERAL
+                    ),
+                )
+                utils.logger.info(
+                    f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
+                )
+                if not notes_res or not notes_res.get("has_more", False):
+                    utils.logger.info("No more content!")
                     break
+                semaphore = stage_semaphore("xhs", "detail")
+                task_list = [
+                    self.get_note_detail_async_task(
+                        note_id=post_item.get("id"),
+                        xsec_source=post_item.get("xsec_source"),
+                        xsec_token=post_item.get("xsec_token"),
+                        semaphore=semaphore,
+                    )
+                    for post_item in notes_res.get("items", {})
+                    if post_item.get("model_type") not in ("rec_query", "hot_query")
+                ]
+                note_details = await asyncio.gather(*task_list)
+                for note_detail in note_details:
+                    if note_detail:
+                        await xhs_store.update_xhs_note(note_detail)
+                        await self.get_notice_media(note_detail)
+                        note_ids.append(note_detail.get("note_id"))
+                        xsec_tokens.append(note_detail.get("xsec_token"))
+                page += 1
+                utils.logger.info(
+                    f"[XiaoHongShuCrawler.search] Note details: {note_details}"
+                )
+                await self.batch_get_note_comments(note_ids, xsec_tokens)
+            except DataFetchError:
+                utils.logger.error(
+                    "[XiaoHongShuCrawler.search] Get note detail error"
+                )
+                break
 
     async def get_creators_and_notes(self) -> None:
         """Get creator's notes and retrieve their comment information."""
         utils.logger.info(
             "[XiaoHongShuCrawler.get_creators_and_notes] Begin get xiaohongshu creators"
         )
-        for user_id in config.XHS_CREATOR_ID_LIST:
+        for user_id in get_session_config("XHS_CREATOR_ID_LIST"):
             # get creator detail info from web html content
             createor_info: Dict = await self.xhs_client.get_creator_info(
                 user_id=user_id
@@ -231,7 +249,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("xhs", "detail")
         task_list = [
             self.get_note_detail_async_task(
                 note_id=post_item.get("note_id"),
@@ -255,7 +273,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
         """
         get_note_detail_task_list = []
-        for full_note_url in config.XHS_SPECIFIED_NOTE_URL_LIST:
+        for full_note_url in get_session_config("XHS_SPECIFIED_NOTE_URL_LIST"):
             note_url_info: NoteUrlInfo = parse_note_info_from_note_url(full_note_url)
             utils.logger.info(
                 f"[XiaoHongShuCrawler.get_specified_notes] Parse note url info: {note_url_info}"
@@ -264,7 +282,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 note_id=note_url_info.note_id,
                 xsec_source=note_url_info.xsec_source,
                 xsec_token=note_url_info.xsec_token,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=stage_semaphore("xhs", "detail"),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -278,6 +296,29 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 await xhs_store.update_xhs_note(note_detail)
         await self.batch_get_note_comments(need_get_comment_note_ids, xsec_tokens)
 
+    async def stream_specified_notes(self):
+        """
+        从 SPECIFIED_ID_FILE 逐行读取笔记完整URL, 同时进行的笔记数有上限, 每篇笔记获取详情后立即保存并爬取评论
+        Returns:
+
+        """
+        semaphore = stage_semaphore("xhs", "detail")
+
+        async def fetch(full_note_url: str) -> Optional[Dict]:
+            note_url_info: NoteUrlInfo = parse_note_info_from_note_url(full_note_url)
+            return await self.get_note_detail_async_task(
+                note_id=note_url_info.note_id,
+                xsec_source=note_url_info.xsec_source,
+                xsec_token=note_url_info.xsec_token,
+                semaphore=semaphore,
+            )
+
+        async def handle(full_note_url: str, note_detail: Dict):
+            await xhs_store.update_xhs_note(note_detail)
+            await self.batch_get_note_comments([note_detail.get("note_id", "")], [note_detail.get("xsec_token", "")])
+
+        await stream_specified_ids("xhs", fetch, handle)
+
     async def get_note_detail_async_task(
             self,
             note_id: str,
@@ -345,7 +386,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         utils.logger.info(
             f"[XiaoHongShuCrawler.batch_get_note_comments] Begin batch get note comments, note list: {note_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("xhs", "comments")
         task_list: List[Task] = []
         for index, note_id in enumerate(note_list):
             task = asyncio.create_task(
@@ -426,7 +467,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -520,12 +561,15 @@ class XiaoHongShuCrawler(AbstractCrawler):
             url = pic.get("url")
             if not url:
                 continue
-            content = await self.xhs_client.get_note_media(url)
-            if content is None:
-                continue
             extension_file_name = f"{picNum}.jpg"
+            await get_media_pipeline().submit(MediaJob(
+                "xhs", url,
+                download=functools.partial(self.xhs_client.get_note_media, url),
+                save=functools.partial(xhs_store.update_xhs_note_image, note_id,
+                                       extension_file_name=extension_file_name, url=url),
+                link=functools.partial(xhs_store.link_xhs_note_image, note_id, url, extension_file_name),
+            ))
             picNum += 1
-            await xhs_store.update_xhs_note_image(note_id, content, extension_file_name)
 
     async def get_notice_video(self, note_item: Dict):
         """
@@ -543,9 +587,13 @@ class XiaoHongShuCrawler(AbstractCrawler):
             return
         videoNum = 0
         for url in videos:
-            content = await self.xhs_client.get_note_media(url)
-            if content is None:
-                continue
             extension_file_name = f"{videoNum}.mp4"
+            await get_media_pipeline().submit(MediaJob(
+                "xhs", url,
+                download=functools.partial(self.xhs_client.get_note_media, url),
+                save=functools.partial(xhs_store.update_xhs_note_image, note_id,
+                                       extension_file_name=extension_file_name, url=url),
+                link=functools.partial(xhs_store.link_xhs_note_image, note_id, url, extension_file_name),
+                kind="video",
+            ))
             videoNum += 1
-            await xhs_store.update_xhs_note_image(note_id, content, extension_file_name)
@@ -22,9 +22,12 @@ from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
 from base.base_crawler import AbstractApiClient
+from base.concurrency import gather_all, stage_semaphore
 from constant import zhihu as zhihu_constant
+from metrics.crawler_metrics import SIGN_LATENCY, RequestTimer
+from metrics.tracing import span
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
-from tools import utils
+from tools import json_codec, utils
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
@@ -58,7 +61,8 @@ class ZhiHuClient(AbstractApiClient):
         d_c0 = self.cookie_dict.get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
+        with SIGN_LATENCY.labels("zhihu").time(), span("zhihu.sign", "sign"):
+            sign_res = sign(url, self.default_headers["cookie"])
         headers = self.default_headers.copy()
         headers['x-zst-81'] = sign_res["x-zst-81"]
         headers['x-zse-96'] = sign_res["x-zse-96"]
@@ -79,11 +83,13 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxies=self.proxies, ) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        async with RequestTimer("zhihu", url, self) as request_timer:
+            async with httpx.AsyncClient(proxies=self.proxies, ) as client:
+                response = await client.request(
+                    method, url, timeout=self.timeout,
+                    **kwargs
+                )
+            request_timer.status_code = response.status_code
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
@@ -97,7 +103,8 @@ class ZhiHuClient(AbstractApiClient):
         if return_response:
             return response.text
         try:
-            data: Dict = response.json()
+            with span("zhihu.json_decode", "decode"):
+                data: Dict = json_codec.loads_response(response)
             if data.get("error"):
                 utils.logger.error(f"[ZhiHuClient.request] Request error: {data}")
                 raise DataFetchError(data.get("error", {}).get("message"))
@@ -209,7 +216,8 @@ class ZhiHuClient(AbstractApiClient):
             "sort": sort.value,
             "vertical": note_type.value,
         }
-        search_res = await self.get(uri, params)
+        async with stage_semaphore("zhihu", "search"):
+            search_res = await self.get(uri, params)
         utils.logger.info(f"[ZhiHuClient.get_note_by_keyword] Search result: {search_res}")
         return self._extractor.extract_contents_from_search(search_res)
 
@@ -257,7 +265,8 @@ class ZhiHuClient(AbstractApiClient):
             "offset": offset,
             "limit": limit
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("zhihu", "sub_comments"):
+            return await self.get(uri, params)
 
     async def get_note_all_comments(self, content: ZhihuContent, crawl_interval: float = 1.0,
                                     callback: Optional[Callable] = None) -> List[ZhihuComment]:
@@ -311,32 +320,50 @@ class ZhiHuClient(AbstractApiClient):
         if not config.ENABLE_GET_SUB_COMMENTS:
             return []
 
-        all_sub_comments: List[ZhihuComment] = []
-        for parment_comment in comments:
-            if parment_comment.sub_comment_count == 0:
-                continue
-
-            is_end: bool = False
-            offset: str = ""
-            limit: int = 10
-            while not is_end:
-                child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
-                if not child_comment_res:
-                    break
-                paging_info = child_comment_res.get("paging", {})
-                is_end = paging_info.get("is_end")
-                offset = self._extractor.extract_offset(paging_info)
-                sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
-
-                if not sub_comments:
-                    break
-
-                if callback:
-                    await callback(sub_comments)
-
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
-        return all_sub_comments
+        # 各个一级评论下的子评论并发获取, 并发数由sub_comments阶段的信号量控制
+        sub_comments_list = await gather_all(
+            self.get_comment_all_sub_comments(content, parment_comment, crawl_interval, callback)
+            for parment_comment in comments
+            if parment_comment.sub_comment_count != 0
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(self, content: ZhihuContent, parment_comment: ZhihuComment,
+                                           crawl_interval: float = 1.0,
+                                           callback: Optional[Callable] = None) -> List[ZhihuComment]:
+        """
+        获取一条评论下的所有子评论, 逐页获取, 每页获取后立即回调
+        Args:
+            content: 内容详情对象(问题｜文章｜视频)
+            parment_comment: 一级评论
+            crawl_interval: 爬取一次笔记的延迟单位（秒）
+            callback: 一次笔记爬取结束后
+
+        Returns:
+
+        """
+        sub_comments_result: List[ZhihuComment] = []
+        is_end: bool = False
+        offset: str = ""
+        limit: int = 10
+        while not is_end:
+            child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
+            if not child_comment_res:
+                break
+            paging_info = child_comment_res.get("paging", {})
+            is_end = paging_info.get("is_end")
+            offset = self._extractor.extract_offset(paging_info)
+            sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
+
+            if not sub_comments:
+                break
+
+            if callback:
+                await callback(sub_comments)
+
+            sub_comments_result.extend(sub_comments)
+            await asyncio.sleep(crawl_interval)
+        return sub_comments_result
 
     async def get_creator_info(self, url_token: str) -> Optional[ZhihuCreator]:
         """
@@ -348,8 +375,13 @@ class ZhiHuClient(AbstractApiClient):
 
         """
         uri = f"/people/{url_token}"
-        html_content: str = await self.get(uri, return_response=True)
-        return self._extractor.extract_creator(url_token, html_content)
+        async with stage_semaphore("zhihu", "creator"):
+            html_content: str = await self.get(uri, return_response=True)
+        if not html_content:
+            return None
+        return await self._extractor.extract_async(
+            lambda page_content: self._extractor.extract_creator(url_token, page_content), html_content
+        )
 
     async def get_creator_answers(self, url_token: str, offset: int = 0, limit: int = 20) -> Dict:
         """
@@ -370,7 +402,8 @@ class ZhiHuClient(AbstractApiClient):
             "limit": limit,
             "order_by": "created"
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("zhihu", "creator"):
+            return await self.get(uri, params)
 
     async def get_creator_articles(self, url_token: str, offset: int = 0, limit: int = 20) -> Dict:
         """
@@ -390,7 +423,8 @@ class ZhiHuClient(AbstractApiClient):
             "limit": limit,
             "order_by": "created"
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("zhihu", "creator"):
+            return await self.get(uri, params)
 
     async def get_creator_videos(self, url_token: str, offset: int = 0, limit: int = 20) -> Dict:
         """
@@ -410,7 +444,8 @@ class ZhiHuClient(AbstractApiClient):
             "limit": limit,
             "similar_aggregation": "true"
         }
-        return await self.get(uri, params)
+        async with stage_semaphore("zhihu", "creator"):
+            return await self.get(uri, params)
 
     async def get_all_anwser_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0,
                                         callback: Optional[Callable] = None) -> List[ZhihuContent]:
@@ -520,7 +555,7 @@ class ZhiHuClient(AbstractApiClient):
         """
         uri = f"/question/{question_id}/answer/{answer_id}"
         response_html = await self.get(uri, return_response=True)
-        return self._extractor.extract_answer_content_from_html(response_html)
+        return await self._extractor.extract_async(self._extractor.extract_answer_content_from_html, response_html)
 
     async def get_article_info(self, article_id: str) -> Optional[ZhihuContent]:
         """
@@ -533,7 +568,7 @@ class ZhiHuClient(AbstractApiClient):
         """
         uri = f"/p/{article_id}"
         response_html = await self.get(uri, return_response=True)
-        return self._extractor.extract_article_content_from_html(response_html)
+        return await self._extractor.extract_async(self._extractor.extract_article_content_from_html, response_html)
 
     async def get_video_info(self, video_id: str) -> Optional[ZhihuContent]:
         """
@@ -546,4 +581,4 @@ class ZhiHuClient(AbstractApiClient):
         """
         uri = f"/zvideo/{video_id}"
         response_html = await self.get(uri, return_response=True)
-        return self._extractor.extract_zvideo_content_from_html(response_html)
+        return await self._extractor.extract_async(self._extractor.extract_zvideo_content_from_html, response_html)
@@ -27,12 +27,14 @@ from playwright.async_api import (
 import config
 from constant import zhihu as constant
 from base.base_crawler import AbstractCrawler
+from base.concurrency import stage_semaphore
+from base.keyword_search import search_keywords
+from base.session_pool import create_session_ip_proxy, get_session_config
 from model.m_zhihu import ZhihuContent, ZhihuCreator
-from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import zhihu as zhihu_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from var import crawler_type_var
 
 from .client import ZhiHuClient
 from .exception import DataFetchError
@@ -61,10 +63,7 @@ class ZhihuCrawler(AbstractCrawler):
         """
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(
-                config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
-            )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_pool, ip_proxy_info = await create_session_ip_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(
                 ip_proxy_info
             )
@@ -94,13 +93,16 @@ class ZhihuCrawler(AbstractCrawler):
 
             # Create a client to interact with the zhihu website.
             self.zhihu_client = await self.create_zhihu_client(httpx_proxy_format)
+            if config.ENABLE_IP_PROXY:
+                # IP即将过期时由代理池预取新IP并热切换客户端的代理
+                ip_proxy_pool.register_client(self.zhihu_client, ip_proxy_info)
             if not await self.zhihu_client.pong():
                 login_obj = ZhiHuLogin(
                     login_type=config.LOGIN_TYPE,
                     login_phone="",  # input your phone number
                     browser_context=self.browser_context,
                     context_page=self.context_page,
-                    cookie_str=config.COOKIES,
+                    cookie_str=get_session_config("COOKIES"),
                 )
                 await login_obj.begin()
                 await self.zhihu_client.update_cookies(
@@ -139,45 +141,55 @@ class ZhihuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < zhihu_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = zhihu_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[ZhihuCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[ZhihuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-
-                try:
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
-                    )
-                    content_list: List[ZhihuContent] = (
-                        await self.zhihu_client.get_note_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                        )
-                    )
-                    utils.logger.info(
-                        f"[ZhihuCrawler.search] Search contents :{content_list}"
+        await search_keywords(
+            "zhihu", get_session_config("KEYWORDS"), self.search_keyword, start_page, zhihu_limit_count
+        )
+
+    async def search_keyword(self, keyword: str, start_page: int, zhihu_limit_count: int) -> None:
+        """
+        search zhihu contents with one keyword
+        :param keyword: 搜索关键词
+        :param start_page: 开始爬取的页码
+        :param zhihu_limit_count: 每页数量
+        :return:
+        """
+        utils.logger.info(
+            f"[ZhihuCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[ZhihuCrawler.search] Skip page {page}")
+                page += 1
+                continue
+
+            try:
+                utils.logger.info(
+                    f"[ZhihuCrawler.search] search zhihu keyword: {keyword}, page: {page}"
+                )
+                content_list: List[ZhihuContent] = (
+                    await self.zhihu_client.get_note_by_keyword(
+                        keyword=keyword,
+                        page=page,
                     )
-                    if not content_list:
-                        utils.logger.info("No more content!")
-                        break
+                )
+                utils.logger.info(
+                    f"[ZhihuCrawler.search] Search contents :{content_list}"
+                )
+                if not content_list:
+                    utils.logger.info("No more content!")
+                    break
 
-                    page += 1
-                    for content in content_list:
-                        await zhihu_store.update_zhihu_content(content)
+                page += 1
+                for content in content_list:
+                    await zhihu_store.update_zhihu_content(content)
 
-                    await self.batch_get_content_comments(content_list)
-                except DataFetchError:
-                    utils.logger.error("[ZhihuCrawler.search] Search content error")
-                    return
+                await self.batch_get_content_comments(content_list)
+            except DataFetchError:
+                utils.logger.error("[ZhihuCrawler.search] Search content error")
+                return
 
     async def batch_get_content_comments(self, content_list: List[ZhihuContent]):
         """
@@ -194,7 +206,7 @@ class ZhihuCrawler(AbstractCrawler):
             )
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = stage_semaphore("zhihu", "comments")
         task_list: List[Task] = []
         for content_item in content_list:
             task = asyncio.create_task(
@@ -234,7 +246,7 @@ class ZhihuCrawler(AbstractCrawler):
         utils.logger.info(
             "[ZhihuCrawler.get_creators_and_notes] Begin get xiaohongshu creators"
         )
-        for user_link in config.ZHIHU_CREATOR_URL_LIST:
+        for user_link in get_session_config("ZHIHU_CREATOR_URL_LIST"):
             utils.logger.info(
                 f"[ZhihuCrawler.get_creators_and_notes] Begin get creator {user_link}"
             )
@@ -327,12 +339,12 @@ class ZhihuCrawler(AbstractCrawler):
 
         """
         get_note_detail_task_list = []
-        for full_note_url in config.ZHIHU_SPECIFIED_ID_LIST:
+        for full_note_url in get_session_config("ZHIHU_SPECIFIED_ID_LIST"):
             # remove query params
             full_note_url = full_note_url.split("?")[0]
             crawler_task = self.get_note_detail(
                 full_note_url=full_note_url,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=stage_semaphore("zhihu", "detail"),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -341,7 +353,7 @@ class ZhihuCrawler(AbstractCrawler):
         for index, note_detail in enumerate(note_details):
             if not note_detail:
                 utils.logger.info(
-                    f"[ZhihuCrawler.get_specified_notes] Note {config.ZHIHU_SPECIFIED_ID_LIST[index]} not found"
+                    f"[ZhihuCrawler.get_specified_notes] Note {get_session_config('ZHIHU_SPECIFIED_ID_LIST')[index]} not found"
                 )
                 continue
 
@@ -393,7 +405,7 @@ class ZhihuCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", get_session_config("USER_DATA_DIR") % config.PLATFORM
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
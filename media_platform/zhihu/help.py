@@ -11,7 +11,8 @@
 
 # -*- coding: utf-8 -*-
 import json
-from typing import Dict, List, Optional
+import re
+from typing import Any, Callable, Dict, List, Optional, TypeVar
 from urllib.parse import parse_qs, urlparse
 
 import execjs
@@ -19,7 +20,7 @@ from parsel import Selector
 
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
-from tools import utils
+from tools import json_codec, utils
 from tools.crawler_util import extract_text_from_html
 
 ZHIHU_SGIN_JS = None
@@ -43,9 +44,106 @@ def sign(url: str, cookies: str) -> Dict:
     return ZHIHU_SGIN_JS.call("get_sign", url, cookies)
 
 
+# 超过该长度(字符数)的页面放到线程中解析, 回答页面可能有几MB
+PARSE_IN_THREAD_MIN_SIZE = 512 * 1024
+
+T = TypeVar("T")
+
+JS_INITIAL_DATA_XPATH = "//script[@id='js-initialData']/text()"
+JS_INITIAL_DATA_TAG = re.compile(r"""<script\b[^>]*\bid=(["']?)js-initialData\1[\s/>]""", re.IGNORECASE)
+ENTITIES_KEY = re.compile(r'"entities"\s*:\s*')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def find_js_initial_data(html_content: str) -> Optional[str]:
+    """
+    不构建DOM, 直接在页面中查找 script#js-initialData 的文本, 结果与 parsel 的 text() 一致(script内容不做实体转义)
+    Args:
+        html_content: 页面内容
+
+    Returns:
+        script的文本, 没有找到时返回None, 由调用方回退到DOM解析
+    """
+    index = html_content.find("js-initialData")
+    while index != -1:
+        tag_start = html_content.rfind("<", 0, index)
+        tag_end = html_content.find(">", index)
+        if tag_start != -1 and tag_end != -1 and JS_INITIAL_DATA_TAG.match(html_content, tag_start, tag_end + 1):
+            content_end = html_content.find("</script", tag_end)
+            if content_end == -1:
+                return None
+            return html_content[tag_end + 1:content_end]
+        index = html_content.find("js-initialData", index + 1)
+    return None
+
+
+def decode_initial_entities(js_init_data: str) -> Optional[Dict]:
+    """
+    只解码 initialState.entities 这一部分, 不解码整个 initialData
+    Args:
+        js_init_data: script#js-initialData 的文本
+
+    Returns:
+        entities, 找不到或解码失败时返回None, 由调用方回退到完整解码
+    """
+    initial_state_index = js_init_data.find('"initialState"')
+    if initial_state_index == -1:
+        return None
+    match = ENTITIES_KEY.search(js_init_data, initial_state_index)
+    if not match:
+        return None
+    try:
+        entities, _ = _JSON_DECODER.raw_decode(js_init_data, match.end())
+    except ValueError:
+        return None
+    return entities if isinstance(entities, dict) else None
+
+
 class ZhihuExtractor:
-    def __init__(self):
-        pass
+    def __init__(self, partial_decode: bool = True):
+        """
+        Args:
+            partial_decode: 从页面的 js-initialData 中只解码 entities 部分, 关闭后解码整个 initialData
+        """
+        self.partial_decode = partial_decode
+
+    @staticmethod
+    async def extract_async(extract_func: Callable[..., T], html_content: str, *args: Any) -> T:
+        """
+        在事件循环中调用解析方法, 大页面放到线程中解析
+        Args:
+            extract_func: 解析方法, 例如 extractor.extract_answer_content_from_html
+            html_content: 页面内容
+            *args: 解析方法的其余参数
+
+        Returns:
+            解析方法的返回值
+        """
+        return await utils.run_page_parser(extract_func, html_content, *args, min_size=PARSE_IN_THREAD_MIN_SIZE)
+
+    def extract_initial_entities(self, html_content: str, entity_type: str) -> Dict:
+        """
+        提取页面 js-initialData 中的 initialState.entities
+        先按文本查找script并只解码entities, 找不到或者缺少需要的实体类型时回退到DOM解析和完整解码
+        Args:
+            html_content: 页面内容
+            entity_type: 需要的实体类型, 例如 answers
+
+        Returns:
+            entities, 页面没有 js-initialData 时返回空字典
+        """
+        js_init_data = find_js_initial_data(html_content)
+        if js_init_data is None:
+            js_init_data = Selector(text=html_content).xpath(JS_INITIAL_DATA_XPATH).get(default="")
+        js_init_data = js_init_data.strip()
+        if not js_init_data:
+            return {}
+        if self.partial_decode:
+            entities = decode_initial_entities(js_init_data)
+            if entities and entities.get(entity_type):
+                return entities
+        js_init_data_dict: Dict = json_codec.loads(js_init_data)
+        return js_init_data_dict.get("initialState", {}).get("entities", {})
 
     def extract_contents_from_search(self, json_data: Dict) -> List[ZhihuContent]:
         """
@@ -329,12 +427,7 @@ class ZhihuExtractor:
         if not html_content:
             return None
 
-        js_init_data = Selector(text=html_content).xpath("//script[@id='js-initialData']/text()").get(default="").strip()
-        if not js_init_data:
-            return None
-
-        js_init_data_dict: Dict = json.loads(js_init_data)
-        users_info: Dict = js_init_data_dict.get("initialState", {}).get("entities", {}).get("users", {})
+        users_info: Dict = self.extract_initial_entities(html_content, "users").get("users", {})
         if not users_info:
             return None
 
@@ -387,11 +480,7 @@ class ZhihuExtractor:
         Returns:
 
         """
-        js_init_data: str = Selector(text=html_content).xpath("//script[@id='js-initialData']/text()").get(default="")
-        if not js_init_data:
-            return None
-        json_data: Dict = json.loads(js_init_data)
-        answer_info: Dict = json_data.get("initialState", {}).get("entities", {}).get("answers", {})
+        answer_info: Dict = self.extract_initial_entities(html_content, "answers").get("answers", {})
         if not answer_info:
             return None
 
@@ -406,11 +495,7 @@ class ZhihuExtractor:
         Returns:
 
         """
-        js_init_data: str = Selector(text=html_content).xpath("//script[@id='js-initialData']/text()").get(default="")
-        if not js_init_data:
-            return None
-        json_data: Dict = json.loads(js_init_data)
-        article_info: Dict = json_data.get("initialState", {}).get("entities", {}).get("articles", {})
+        article_info: Dict = self.extract_initial_entities(html_content, "articles").get("articles", {})
         if not article_info:
             return None
 
@@ -425,12 +510,9 @@ class ZhihuExtractor:
         Returns:
 
         """
-        js_init_data: str = Selector(text=html_content).xpath("//script[@id='js-initialData']/text()").get(default="")
-        if not js_init_data:
-            return None
-        json_data: Dict = json.loads(js_init_data)
-        zvideo_info: Dict = json_data.get("initialState", {}).get("entities", {}).get("zvideos", {})
-        users: Dict = json_data.get("initialState", {}).get("entities", {}).get("users", {})
+        entities: Dict = self.extract_initial_entities(html_content, "zvideos")
+        zvideo_info: Dict = entities.get("zvideos", {})
+        users: Dict = entities.get("users", {})
         if not zvideo_info:
             return None
 
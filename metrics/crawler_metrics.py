@@ -0,0 +1,147 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬虫各环节的指标定义
+
+import re
+import time
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from .registry import REGISTRY
+from .tracing import span
+
+REQUEST_COUNT = REGISTRY.counter(
+    "mediacrawler_request_total", "Number of platform api requests", ["platform", "endpoint", "status"]
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "mediacrawler_request_latency_seconds", "Latency of platform api requests", ["platform", "endpoint"]
+)
+SIGN_LATENCY = REGISTRY.histogram(
+    "mediacrawler_sign_latency_seconds", "Time spent on signing requests", ["platform"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+STORE_FLUSH_LATENCY = REGISTRY.histogram(
+    "mediacrawler_store_flush_latency_seconds", "Latency of writing one item to the store",
+    ["platform", "store_type"],
+)
+STORE_QUEUE_DEPTH = REGISTRY.gauge(
+    "mediacrawler_store_queue_depth", "Number of items waiting to be written to the store", ["platform"]
+)
+STORE_ITEMS = REGISTRY.counter(
+    "mediacrawler_store_items_total", "Number of items stored", ["platform", "entity_type"]
+)
+MEDIA_QUEUE_DEPTH = REGISTRY.gauge(
+    "mediacrawler_media_queue_depth", "Number of media downloads waiting in the media pipeline", ["platform"]
+)
+MEDIA_JOBS = REGISTRY.counter(
+    "mediacrawler_media_jobs_total", "Number of media pipeline jobs by result", ["platform", "kind", "result"]
+)
+MEDIA_BYTES = REGISTRY.counter(
+    "mediacrawler_media_download_bytes_total", "Number of media bytes downloaded", ["platform"]
+)
+PROXY_POOL_SIZE = REGISTRY.gauge("mediacrawler_proxy_pool_size", "Number of proxies in the proxy pool")
+PROXY_HEALTH_SCORE = REGISTRY.gauge(
+    "mediacrawler_proxy_health_score_avg", "Average health score of proxies in the proxy pool"
+)
+PROXY_EVICTED = REGISTRY.counter("mediacrawler_proxy_evicted_total", "Number of proxies evicted from the pool")
+LOOP_LAG = REGISTRY.histogram(
+    "mediacrawler_event_loop_lag_seconds", "Delay between when a loop callback was scheduled and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+# 路径中包含数字的长片段一般是内容ID, 统一替换掉避免标签数量无限增长
+_ID_SEGMENT_PATTERN = re.compile(r"^(?=.*\d)[\w\-.]{6,}$")
+
+
+def normalize_endpoint(url: str) -> str:
+    """
+    把请求url转换成接口标签: 去掉域名和查询参数, 内容ID替换为 {id}
+    :param url:
+    :return:
+    """
+    path = urlparse(url).path or "/"
+    return "/".join("{id}" if _ID_SEGMENT_PATTERN.match(segment) else segment for segment in path.split("/"))
+
+
+# 表示代理IP被限制访问的状态码: 403 禁止访问, 429 请求过多, 461/471 小红书验证码
+PROXY_BLOCKED_STATUS = (403, 429, 461, 471)
+
+
+class RequestTimer:
+    def __init__(self, platform: str, url: str, api_client: Any = None):
+        """
+        记录一次接口请求的次数和耗时, 请求抛出异常时状态记为 error, 同时记录一个 network 阶段的span;
+        用 async with 并传入 api_client 时, 把请求结果上报给客户端使用的代理池
+        :param platform: 平台
+        :param url: 请求url
+        :param api_client: 发起请求的平台API客户端(AbstractApiClient)
+        """
+        self.platform = platform
+        self.endpoint = normalize_endpoint(url)
+        self.status_code: Optional[int] = None
+        self.api_client = api_client
+        # 客户端从响应内容判断代理IP被封时设置, 计为该代理IP失败
+        self.proxy_failed = False
+        self.latency = 0.0
+        self._start_time = 0.0
+        self._span = span(f"{platform}.request", "network", endpoint=self.endpoint)
+
+    def __enter__(self):
+        self._span.__enter__()
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._span.args["status"] = self.status_code
+        self._span.__exit__(exc_type, exc_val, exc_tb)
+        status = "error" if exc_type is not None or self.status_code is None else str(self.status_code)
+        self.latency = time.perf_counter() - self._start_time
+        REQUEST_LATENCY.labels(self.platform, self.endpoint).observe(self.latency)
+        REQUEST_COUNT.labels(self.platform, self.endpoint, status).inc()
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.__exit__(exc_type, exc_val, exc_tb)
+        if self.api_client is not None:
+            # 请求异常(连接失败、超时)、服务端错误、IP被限制访问或被封计为该代理IP失败
+            is_success = (exc_type is None and not self.proxy_failed and self.status_code is not None
+                          and self.status_code < 500 and self.status_code not in PROXY_BLOCKED_STATUS)
+            await self.api_client.report_proxy_result(is_success, self.latency)
+
+
+class StoreTimer:
+    def __init__(self, platform: str, store_type: str):
+        """
+        记录一次存储写入: 等待写入时计入队列深度, 结束后记录耗时和存储数量, 同时记录一个 store 阶段的span
+        :param platform: 平台
+        :param store_type: 存储的数据类型, 例如 contents、comments、creators
+        """
+        self.platform = platform
+        self.store_type = store_type
+        self._start_time = 0.0
+        self._span = span(f"{platform}.store_{store_type}", "store")
+
+    def __enter__(self):
+        STORE_QUEUE_DEPTH.labels(self.platform).inc()
+        self._span.__enter__()
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._span.__exit__(exc_type, exc_val, exc_tb)
+        STORE_QUEUE_DEPTH.labels(self.platform).dec()
+        STORE_FLUSH_LATENCY.labels(self.platform, self.store_type).observe(time.perf_counter() - self._start_time)
+        if exc_type is None:
+            STORE_ITEMS.labels(self.platform, self.store_type).inc()
@@ -0,0 +1,96 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 指标导出: 本地HTTP接口(Prometheus文本格式和JSON)以及退出时的JSON摘要文件
+
+import asyncio
+import contextlib
+import json
+import os
+import pathlib
+import time
+from typing import Optional
+
+from tools import utils
+
+from .registry import REGISTRY, MetricsRegistry
+
+
+class MetricsServer:
+    def __init__(self, host: str, port: int, registry: MetricsRegistry = REGISTRY):
+        """
+        指标HTTP服务, /metrics 为Prometheus文本格式, /metrics.json 为JSON摘要
+        fastapi和uvicorn只有开启时才导入
+        :param host: 监听地址
+        :param port: 监听端口
+        :param registry: 指标注册表
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server = None
+        self._serve_task: Optional[asyncio.Task] = None
+
+    def create_app(self):
+        from fastapi import FastAPI
+        from fastapi.responses import PlainTextResponse
+
+        app = FastAPI()
+
+        @app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics_text():
+            return self.registry.render_text()
+
+        @app.get("/metrics.json")
+        async def metrics_json():
+            return self.registry.to_dict()
+
+        return app
+
+    async def start(self) -> None:
+        """
+        在当前事件循环中后台启动HTTP服务
+        :return:
+        """
+        import uvicorn
+
+        class _Server(uvicorn.Server):
+            @contextlib.contextmanager
+            def capture_signals(self):
+                # 信号交给爬虫主程序处理, 不要让指标服务吞掉 Ctrl+C
+                yield
+
+        self._server = _Server(uvicorn.Config(self.create_app(), host=self.host, port=self.port, log_level="warning"))
+        self._serve_task = asyncio.create_task(self._server.serve())
+        utils.logger.info(f"[MetricsServer.start] metrics server listen on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.should_exit = True
+        await self._serve_task
+        self._server = None
+        self._serve_task = None
+
+
+def dump_metrics(dump_dir: str, registry: MetricsRegistry = REGISTRY) -> str:
+    """
+    把指标摘要写入JSON文件
+    :param dump_dir: 保存目录
+    :param registry: 指标注册表
+    :return: 文件路径
+    """
+    pathlib.Path(dump_dir).mkdir(parents=True, exist_ok=True)
+    file_name = f"{dump_dir}/metrics_{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}.json"
+    with open(file_name, "w", encoding="utf-8") as file:
+        json.dump(registry.to_dict(), file, ensure_ascii=False, indent=2)
+    return file_name
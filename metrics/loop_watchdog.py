@@ -0,0 +1,158 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 事件循环阻塞看门狗: 后台线程检查事件循环心跳, 阻塞时抓取主线程调用栈, 按调用位置汇总输出报告
+
+import asyncio
+import collections
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools import utils
+
+from .profiler import extract_stack, find_call_site
+
+
+class _BlockEpisode:
+    def __init__(self, beat: float):
+        """
+        一次事件循环阻塞
+        :param beat: 阻塞前最后一次心跳的时间
+        """
+        self.beat = beat
+        self.stacks: List[Tuple[str, ...]] = []
+
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = 200, heartbeat_ms: float = 20, max_stack_depth: int = 30):
+        """
+        事件循环里的心跳协程定时更新心跳时间, 后台线程发现心跳停止超过阈值时, 说明当前回调阻塞了事件循环,
+        这时抓取主线程的调用栈就是阻塞的位置, 阻塞期间会多次抓取, 取出现最多的调用位置
+        :param threshold_ms: 回调执行超过该时长视为阻塞
+        :param heartbeat_ms: 心跳间隔
+        :param max_stack_depth: 报告中保留的调用栈深度
+        """
+        self.threshold = threshold_ms / 1000
+        self.heartbeat_interval = heartbeat_ms / 1000
+        self.check_interval = max(0.005, min(self.threshold / 4, 0.05))
+        self.max_stack_depth = max_stack_depth
+        self.offenders: Dict[str, Dict[str, Any]] = {}
+        self._thread_id = threading.get_ident()
+        self._last_beat = 0.0
+        self._episode: Optional[_BlockEpisode] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat_handle: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        """
+        在事件循环中调用
+        :return:
+        """
+        self._thread_id = threading.get_ident()
+        self._loop = asyncio.get_event_loop()
+        self._heartbeat()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop_watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        停止心跳和后台线程, 可重复调用
+        :return:
+        """
+        if self._heartbeat_handle is not None:
+            self._heartbeat_handle.cancel()
+            self._heartbeat_handle = None
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._episode is not None:
+                self._finish_episode(self._episode, time.perf_counter())
+                self._episode = None
+
+    def _heartbeat(self) -> None:
+        # 用call_later而不是asyncio.sleep, 不受替换了sleep的场景影响(例如基准测试跳过爬取间隔)
+        self._last_beat = time.perf_counter()
+        self._heartbeat_handle = self._loop.call_later(self.heartbeat_interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.check_interval):
+            beat = self._last_beat
+            stalled = time.perf_counter() - beat - self.heartbeat_interval
+            with self._lock:
+                if self._episode is not None and self._episode.beat != beat:
+                    # 心跳恢复, 阻塞结束
+                    self._finish_episode(self._episode, beat)
+                    self._episode = None
+                if stalled < self.threshold:
+                    continue
+                if self._episode is None:
+                    self._episode = _BlockEpisode(beat)
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    self._episode.stacks.append(extract_stack(frame)[-self.max_stack_depth:])
+                del frame
+
+    def _finish_episode(self, episode: _BlockEpisode, resumed_at: float) -> None:
+        duration = max(0.0, resumed_at - episode.beat - self.heartbeat_interval)
+        if not episode.stacks:
+            return
+        call_sites = collections.Counter(find_call_site(stack) for stack in episode.stacks)
+        call_site = call_sites.most_common(1)[0][0]
+        stack = next(stack for stack in episode.stacks if find_call_site(stack) == call_site)
+        offender = self.offenders.setdefault(call_site, {
+            "call_site": call_site, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "stack": list(stack),
+        })
+        offender["count"] += 1
+        offender["total_ms"] = round(offender["total_ms"] + duration * 1000, 1)
+        if duration * 1000 >= offender["max_ms"]:
+            offender["max_ms"] = round(duration * 1000, 1)
+            offender["stack"] = list(stack)
+        utils.logger.warning(f"[LoopWatchdog] event loop blocked for {duration * 1000:.1f}ms at {call_site}")
+
+    def get_offenders(self) -> List[Dict[str, Any]]:
+        """
+        按阻塞总时长排序的调用位置
+        :return:
+        """
+        with self._lock:
+            return sorted((dict(offender) for offender in self.offenders.values()),
+                          key=lambda offender: offender["total_ms"], reverse=True)
+
+    def export(self, export_dir: str) -> str:
+        """
+        保存阻塞报告, 并在日志中打印阻塞最多的调用位置
+        :param export_dir: 保存目录
+        :return: 文件路径
+        """
+        self.stop()
+        offenders = self.get_offenders()
+        pathlib.Path(export_dir).mkdir(parents=True, exist_ok=True)
+        file_name = f"{export_dir}/loop_watchdog_{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}.json"
+        with open(file_name, "w", encoding="utf-8") as file:
+            json.dump({"threshold_ms": self.threshold * 1000, "offenders": offenders}, file, ensure_ascii=False, indent=2)
+        utils.logger.info(f"[LoopWatchdog.export] {len(offenders)} call sites blocked the event loop, "
+                          f"report saved to {file_name}")
+        for offender in offenders[:10]:
+            utils.logger.info(f"[LoopWatchdog.export] {offender['count']} times, total {offender['total_ms']}ms, "
+                              f"max {offender['max_ms']}ms: {offender['call_site']}")
+        return file_name
@@ -0,0 +1,459 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 运行期性能分析: cProfile或线程采样分析, 按协程类别统计墙钟时间, 监控事件循环延迟
+
+import asyncio
+import collections
+import cProfile
+import functools
+import io
+import json
+import os
+import pathlib
+import pstats
+import re
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from tools import utils
+
+from .crawler_metrics import LOOP_LAG
+
+PROJECT_ROOT = str(pathlib.Path(__file__).resolve().parent.parent)
+_STORE_DIR = "store" + os.sep
+# 采样到的项目内文件(相对路径), 用于在调用栈中区分项目代码和第三方库
+_project_files = set()
+
+# 协程函数名 -> 类别, 一个任务按调用链上最内层能归类的函数计入, 例如搜索流程里抓评论的任务计入comments
+FAMILY_PATTERNS: Tuple[Tuple[str, "re.Pattern"], ...] = (
+    ("media", re.compile(r"media|image|notice_video|bilibili_video|play_url|download")),
+    ("comments", re.compile(r"comment")),
+    ("detail", re.compile(r"detail|specified|info_task")),
+    ("creator", re.compile(r"creator")),
+    ("search", re.compile(r"search|keyword")),
+)
+
+# 事件循环在_run_once里等待IO时主线程是空闲的, 子进程通信等同步调用也会停在select, 但不是空闲
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "_poll", "kqueue", "control"}
+
+
+@functools.lru_cache(maxsize=4096)
+def project_path(file_name: str) -> Optional[str]:
+    """
+    项目内文件返回相对项目根目录的路径, 否则返回None, 通过软链接引用的项目文件(例如基准测试的临时工作目录)也算项目内
+    :param file_name: code对象的文件名
+    :return:
+    """
+    real_name = os.path.realpath(file_name)
+    if not real_name.startswith(PROJECT_ROOT + os.sep) or "site-packages" in real_name:
+        return None
+    return os.path.relpath(real_name, PROJECT_ROOT)
+
+
+def is_idle_stack(stack: Tuple[str, ...]) -> bool:
+    return len(stack) >= 2 and stack[-1].split(" ", 1)[0] in _IDLE_FUNCTIONS and stack[-2].startswith("_run_once ")
+
+
+def classify_code(code: CodeType) -> Optional[str]:
+    """
+    判断一个函数属于哪类协程, store包下的函数都算store
+    :param code: 函数的code对象
+    :return: 类别, 无法归类时返回None
+    """
+    file_name = project_path(code.co_filename)
+    if file_name and file_name.startswith(_STORE_DIR):
+        return "store"
+    for family, pattern in FAMILY_PATTERNS:
+        if pattern.search(code.co_name):
+            return family
+    return None
+
+
+def get_coroutine_chain(coro: Any, max_depth: int = 64) -> List[CodeType]:
+    """
+    沿着await链取出任务当前挂起位置的所有协程函数, 由外到内
+    :param coro: 任务的协程对象
+    :param max_depth: 最大深度
+    :return:
+    """
+    codes = []
+    while coro is not None and len(codes) < max_depth:
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None) or getattr(coro, "ag_code", None)
+        if code is None:
+            break
+        codes.append(code)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return codes
+
+
+def classify_task(task: asyncio.Task) -> str:
+    for code in reversed(get_coroutine_chain(task.get_coro())):
+        family = classify_code(code)
+        if family:
+            return family
+    return "other"
+
+
+def format_frame(code: CodeType, lineno: int) -> str:
+    file_name = project_path(code.co_filename)
+    if file_name:
+        _project_files.add(file_name)
+    else:
+        file_name = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({file_name}:{lineno})"
+
+
+def extract_stack(frame: Optional[FrameType]) -> Tuple[str, ...]:
+    """
+    由外到内的调用栈
+    :param frame: 最内层的帧
+    :return:
+    """
+    stack = []
+    while frame is not None:
+        stack.append(format_frame(frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def find_call_site(stack: Tuple[str, ...]) -> str:
+    """
+    找出调用栈中最内层的项目代码和实际耗时的函数, 例如 recv_into (ssl.py:1241) <- request (media_platform/douyin/client.py:80)
+    :param stack: 由外到内的调用栈
+    :return:
+    """
+    if not stack:
+        return ""
+    leaf = stack[-1]
+    for item in reversed(stack):
+        file_name = item.rsplit("(", 1)[-1].rsplit(":", 1)[0]
+        if file_name in _project_files:
+            return leaf if item == leaf else f"{leaf} <- {item}"
+    return leaf
+
+
+class LoopMonitor:
+    def __init__(self, interval_ms: float = 20, lag_threshold_ms: float = 100, max_events: int = 200):
+        """
+        运行在事件循环里的监控协程, 每隔interval_ms醒来一次:
+            实际醒来时间比预期晚的部分就是事件循环延迟, 超过阈值说明有回调阻塞了事件循环
+            同时按协程类别统计当前挂起的任务, 累加得到各类别的墙钟时间
+        :param interval_ms: 采样间隔
+        :param lag_threshold_ms: 延迟超过该值时记录为阻塞事件并打印日志
+        :param max_events: 最多记录的阻塞事件数量
+        """
+        self.interval = interval_ms / 1000
+        self.lag_threshold = lag_threshold_ms / 1000
+        self.max_events = max_events
+        self.family_wall: Dict[str, float] = collections.defaultdict(float)
+        self.family_task_time: Dict[str, float] = collections.defaultdict(float)
+        self.lag_events: List[Dict[str, Any]] = []
+        self.blocked_count = 0
+        self.blocked_total = 0.0
+        self.on_blocked = None
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        self._task = asyncio.get_event_loop().create_task(self._run(), name="loop_monitor")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        last_time = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed = now - last_time
+            last_time = now
+            lag = max(0.0, elapsed - self.interval)
+            LOOP_LAG.observe(lag)
+            families = self.sample_tasks(elapsed)
+            if lag >= self.lag_threshold:
+                self.record_lag(now - elapsed + self.interval, now, lag, families)
+
+    def sample_tasks(self, elapsed: float) -> List[str]:
+        """
+        把elapsed这段时间计入当前各任务所属的类别
+        :param elapsed: 距上次采样的时间
+        :return: 当前活跃的类别
+        """
+        counts: Dict[str, int] = collections.Counter(
+            classify_task(task) for task in asyncio.all_tasks() if task is not self._task
+        )
+        for family, count in counts.items():
+            self.family_wall[family] += elapsed
+            self.family_task_time[family] += elapsed * count
+        return sorted(counts)
+
+    def record_lag(self, blocked_from: float, blocked_to: float, lag: float, families: List[str]) -> None:
+        self.blocked_count += 1
+        self.blocked_total += lag
+        blocking_call = self.on_blocked(blocked_from, blocked_to) if self.on_blocked else ""
+        utils.logger.warning(f"[LoopMonitor] event loop blocked for {lag * 1000:.1f}ms, active families: {families}"
+                             + (f", blocking call: {blocking_call}" if blocking_call else ""))
+        if len(self.lag_events) < self.max_events:
+            self.lag_events.append({
+                "at_sec": round(blocked_from - self._started_at, 3),
+                "lag_ms": round(lag * 1000, 1),
+                "families": families,
+                "blocking_call": blocking_call,
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        families = {}
+        for family in sorted(self.family_wall, key=self.family_wall.get, reverse=True):
+            wall = self.family_wall[family]
+            families[family] = {
+                "wall_sec": round(wall, 3),
+                "task_sec": round(self.family_task_time[family], 3),
+                "avg_concurrency": round(self.family_task_time[family] / wall, 2) if wall else 0.0,
+            }
+        p50, p99 = LOOP_LAG.quantile(0.5), LOOP_LAG.quantile(0.99)
+        return {
+            "families": families,
+            "loop_lag": {
+                "samples": LOOP_LAG.count,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+                "max_ms": round(LOOP_LAG.max * 1000, 1),
+                "blocked_count": self.blocked_count,
+                "blocked_total_sec": round(self.blocked_total, 3),
+                "events": self.lag_events,
+            },
+        }
+
+
+class StackSampler:
+    def __init__(self, interval_ms: float = 5, thread_id: Optional[int] = None, history_sec: float = 30):
+        """
+        后台线程定时采样主线程的调用栈, 统计每个函数的自身和累计采样数, 可导出折叠栈给火焰图工具
+        不需要额外依赖, 也能看到阻塞事件循环的同步调用(requests、time.sleep、execjs等)
+        :param interval_ms: 采样间隔
+        :param thread_id: 被采样的线程, 默认当前线程
+        :param history_sec: 保留最近多少秒的采样, 用于定位阻塞事件循环的调用
+        """
+        self.interval = interval_ms / 1000
+        self.thread_id = thread_id or threading.get_ident()
+        self.stack_counts: Dict[Tuple[str, ...], int] = collections.Counter()
+        self.sample_count = 0
+        self.idle_count = 0
+        self._history: Deque[Tuple[float, Tuple[str, ...]]] = collections.deque(
+            maxlen=max(1, int(history_sec / self.interval))
+        )
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="stack_sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = extract_stack(frame)
+            del frame
+            with self._lock:
+                self.sample_count += 1
+                if is_idle_stack(stack):
+                    self.idle_count += 1
+                    continue
+                self.stack_counts[stack] += 1
+                self._history.append((time.perf_counter(), stack))
+
+    def find_blocking_call(self, start: float, end: float) -> str:
+        """
+        在[start, end]这段时间的采样中找出出现最多的调用位置
+        :param start: perf_counter时间
+        :param end: perf_counter时间
+        :return:
+        """
+        with self._lock:
+            call_sites = collections.Counter(
+                find_call_site(stack) for sample_time, stack in self._history if start <= sample_time <= end
+            )
+        return call_sites.most_common(1)[0][0] if call_sites else ""
+
+    def top_functions(self, limit: int = 30) -> List[Dict[str, Any]]:
+        self_counts: Dict[str, int] = collections.Counter()
+        total_counts: Dict[str, int] = collections.Counter()
+        with self._lock:
+            for stack, count in self.stack_counts.items():
+                self_counts[stack[-1]] += count
+                for item in set(stack):
+                    total_counts[item] += count
+            sample_count = self.sample_count
+        ranked = total_counts.most_common()
+        return [
+            {
+                "function": function,
+                "self_pct": round(self_counts[function] * 100 / sample_count, 2),
+                "total_pct": round(count * 100 / sample_count, 2),
+            }
+            # 每个非空闲样本都在栈上的函数(入口、run_until_complete等)没有信息量, 而且栈很深时会挤掉真正的热点
+            for function, count in [item for item in ranked if item[1] < ranked[0][1]][:limit]
+        ] if sample_count else []
+
+    def export_folded(self, file_name: str) -> None:
+        """
+        导出折叠栈格式, 可以用 speedscope 或 flamegraph.pl 生成火焰图
+        :param file_name:
+        :return:
+        """
+        with self._lock:
+            lines = [f"{';'.join(stack)} {count}" for stack, count in self.stack_counts.items()]
+        with open(file_name, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+class RunProfiler:
+    MODES = ("cprofile", "sample")
+
+    def __init__(self, mode: str, export_dir: str, sample_interval_ms: float = 5, lag_threshold_ms: float = 100):
+        """
+        一次爬取运行的性能分析
+        :param mode: cprofile 确定性分析 | sample 线程采样分析
+        :param export_dir: 报告保存目录
+        :param sample_interval_ms: 采样分析的采样间隔
+        :param lag_threshold_ms: 事件循环延迟的告警阈值
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid profile mode: {mode}, supported: {self.MODES}")
+        self.mode = mode
+        self.export_dir = export_dir
+        self.loop_monitor = LoopMonitor(lag_threshold_ms=lag_threshold_ms)
+        self.stack_sampler: Optional[StackSampler] = None
+        self.cprofile: Optional[cProfile.Profile] = None
+        if mode == "sample":
+            self.stack_sampler = StackSampler(interval_ms=sample_interval_ms)
+            self.loop_monitor.on_blocked = self.stack_sampler.find_blocking_call
+        else:
+            self.cprofile = cProfile.Profile()
+        self._start_time = 0.0
+        self._end_time = 0.0
+        self._started_at = ""
+
+    def start(self) -> None:
+        """
+        在事件循环中调用
+        :return:
+        """
+        self._start_time = time.perf_counter()
+        self._started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.loop_monitor.start()
+        if self.stack_sampler:
+            self.stack_sampler.start()
+        if self.cprofile:
+            self.cprofile.enable()
+
+    async def stop(self) -> None:
+        self.stop_profiling()
+        await self.loop_monitor.stop()
+
+    def stop_profiling(self) -> None:
+        """
+        停止采样, 可重复调用, 程序被中断时事件循环已经停止, 只能停掉采样线程和cProfile
+        :return:
+        """
+        if self._end_time:
+            return
+        self._end_time = time.perf_counter()
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.stack_sampler:
+            self.stack_sampler.stop()
+
+    def to_dict(self) -> Dict[str, Any]:
+        end_time = self._end_time or time.perf_counter()
+        report = {
+            "mode": self.mode,
+            "started_at": self._started_at,
+            "elapsed_sec": round(end_time - self._start_time, 3),
+            **self.loop_monitor.to_dict(),
+        }
+        if self.stack_sampler:
+            report["samples"] = self.stack_sampler.sample_count
+            report["idle_pct"] = round(self.stack_sampler.idle_count * 100 / self.stack_sampler.sample_count, 2) \
+                if self.stack_sampler.sample_count else 0.0
+            report["top_functions"] = self.stack_sampler.top_functions()
+        return report
+
+    def format_report(self, report: Dict[str, Any]) -> str:
+        lines = [f"profile mode: {report['mode']}, started at {report['started_at']}, "
+                 f"elapsed {report['elapsed_sec']}s", "",
+                 f"{'family':<12}{'wall(s)':>10}{'task(s)':>10}{'avg concurrency':>18}"]
+        for family, stat in report["families"].items():
+            lines.append(f"{family:<12}{stat['wall_sec']:>10.2f}{stat['task_sec']:>10.2f}{stat['avg_concurrency']:>18.2f}")
+        loop_lag = report["loop_lag"]
+        lines += ["", f"event loop lag: p50 {loop_lag['p50_ms']}ms, p99 {loop_lag['p99_ms']}ms, "
+                      f"max {loop_lag['max_ms']}ms, blocked {loop_lag['blocked_count']} times "
+                      f"({loop_lag['blocked_total_sec']}s)"]
+        for event in sorted(loop_lag["events"], key=lambda e: e["lag_ms"], reverse=True)[:20]:
+            lines.append(f"  +{event['at_sec']:.3f}s {event['lag_ms']:>8.1f}ms {','.join(event['families'])} "
+                         f"{event['blocking_call']}")
+        if self.stack_sampler:
+            lines += ["", f"samples: {report['samples']}, idle: {report['idle_pct']}%",
+                      f"{'self%':>8}{'total%':>8}  function"]
+            for item in report["top_functions"]:
+                lines.append(f"{item['self_pct']:>8.2f}{item['total_pct']:>8.2f}  {item['function']}")
+        if self.cprofile:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.cprofile, stream=stream).sort_stats("cumulative")
+            stats.print_stats(40)
+            # 事件循环本身的开销排在前面, 单独列出项目内的函数
+            stream.write("project functions:\n")
+            stats.print_stats(re.escape(PROJECT_ROOT + os.sep), 40)
+            lines += ["", stream.getvalue()]
+        return "\n".join(lines) + "\n"
+
+    def export(self) -> str:
+        """
+        保存报告: .txt 可读报告, .json 结构化数据, 以及 .prof(cProfile) 或 .folded(折叠栈)
+        :return: 报告文件路径, 不含扩展名
+        """
+        self.stop_profiling()
+        pathlib.Path(self.export_dir).mkdir(parents=True, exist_ok=True)
+        file_prefix = f"{self.export_dir}/profile_{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}"
+        report = self.to_dict()
+        with open(f"{file_prefix}.json", "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        with open(f"{file_prefix}.txt", "w", encoding="utf-8") as file:
+            file.write(self.format_report(report))
+        if self.cprofile:
+            self.cprofile.dump_stats(f"{file_prefix}.prof")
+        if self.stack_sampler:
+            self.stack_sampler.export_folded(f"{file_prefix}.folded")
+        utils.logger.info(f"[RunProfiler.export] profile report saved to {file_prefix}.txt")
+        return file_prefix
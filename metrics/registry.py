@@ -0,0 +1,252 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 简单的指标注册表, 支持计数器、仪表盘和直方图, 可以输出Prometheus文本格式和JSON摘要
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        指标基类, 每组标签值对应一个子指标
+        :param name: 指标名称
+        :param documentation: 指标说明
+        :param labelnames: 标签名称
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, *labelvalues) -> "_Metric":
+        """
+        获取标签值对应的子指标, 不存在时创建
+        :param labelvalues: 标签值, 与labelnames一一对应
+        :return:
+        """
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"metric {self.name} expects labels {self.labelnames}, got {labelvalues}")
+        key = tuple(str(value) for value in labelvalues)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _new_child(self) -> "_Metric":
+        return self.__class__(self.name, self.documentation)
+
+    def samples(self) -> List[Tuple[Dict[str, str], "_Metric"]]:
+        """
+        获取所有子指标, 没有标签的指标返回自身
+        :return:
+        """
+        if not self.labelnames:
+            return [({}, self)]
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), child) for key, child in self._children.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class _Timer:
+    def __init__(self, histogram: "Histogram"):
+        self._histogram = histogram
+        self._start_time = 0.0
+
+    def __enter__(self):
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._histogram.observe(time.perf_counter() - self._start_time)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    self.bucket_counts[index] += 1
+                    break
+
+    def time(self) -> _Timer:
+        """
+        计时上下文管理器, 退出时记录耗时(秒)
+        :return:
+        """
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        根据桶分布估算分位数, 返回所在桶的上界
+        :param q: 0~1
+        :return:
+        """
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return upper_bound
+        return self.max
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    label_str = ",".join(
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + label_str + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        注册指标, 同名指标只注册一次
+        :param metric:
+        :return: 已注册的指标
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get_metrics(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render_text(self) -> str:
+        """
+        输出Prometheus文本格式
+        :return:
+        """
+        lines = []
+        for metric in self.get_metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for labels, child in metric.samples():
+                if isinstance(child, Histogram):
+                    cumulative = 0
+                    for upper_bound, bucket_count in zip(child.buckets, child.bucket_counts):
+                        cumulative += bucket_count
+                        bucket_labels = _format_labels({**labels, "le": str(upper_bound)})
+                        lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {child.count}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {child.sum}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {child.count}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {child.value}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict:
+        """
+        输出JSON摘要, 直方图只保留次数、总和、平均值、最大值和估算的分位数
+        :return:
+        """
+        summary = {}
+        for metric in self.get_metrics():
+            samples = []
+            for labels, child in metric.samples():
+                if isinstance(child, Histogram):
+                    samples.append({
+                        "labels": labels,
+                        "count": child.count,
+                        "sum": round(child.sum, 6),
+                        "avg": round(child.sum / child.count, 6) if child.count else 0,
+                        "max": round(child.max, 6),
+                        "p50": child.quantile(0.5),
+                        "p95": child.quantile(0.95),
+                    })
+                else:
+                    samples.append({"labels": labels, "value": child.value})
+            summary[metric.name] = {"type": metric.type_name, "help": metric.documentation, "samples": samples}
+        return summary
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,169 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 轻量的耗时追踪: 用contextvars传递当前span, 记录慢操作日志, 可导出Chrome trace(chrome://tracing 或 Perfetto打开)
+
+import asyncio
+import itertools
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+from tools import utils
+from var import trace_span_var
+
+_span_id_counter = itertools.count(1)
+
+
+class Span:
+    def __init__(self, name: str, category: str, tracer: "Tracer", args: Optional[Dict[str, Any]] = None):
+        """
+        一个计时片段, 通过 with 使用, 同步和异步代码都可以, 嵌套的span会自动记录父span
+        :param name: 名称, 例如 xhs.request
+        :param category: 阶段分类, 例如 cdp、sign、network、decode、store
+        :param tracer: 记录span的tracer
+        :param args: 附加信息, 会写入trace
+        """
+        self.name = name
+        self.category = category
+        self.args = args or {}
+        self.span_id = next(_span_id_counter)
+        self.parent: Optional[Span] = None
+        self.start_time = 0.0
+        self.end_time = 0.0
+        self._tracer = tracer
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+    def path(self) -> str:
+        """
+        从根span到当前span的调用路径
+        :return:
+        """
+        names = []
+        span = self
+        while span is not None:
+            names.append(span.name)
+            span = span.parent
+        return " > ".join(reversed(names))
+
+    def __enter__(self):
+        self.parent = trace_span_var.get()
+        self._token = trace_span_var.set(self)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.end_time = time.perf_counter()
+        trace_span_var.reset(self._token)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self._tracer.finish(self)
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, slow_threshold_ms: float = 0, max_events: int = 200000):
+        """
+        :param enabled: 是否收集span用于导出trace, 关闭时只记录慢操作日志
+        :param slow_threshold_ms: 慢操作阈值(毫秒), 为0时不记录慢操作日志
+        :param max_events: 最多收集的span数量, 避免长时间运行时内存无限增长
+        """
+        self.enabled = enabled
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_events = max_events
+        self._origin_time = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._tids: Dict[int, int] = {}
+
+    def configure(self, enabled: bool, slow_threshold_ms: float) -> None:
+        self.enabled = enabled
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def span(self, name: str, category: str, **args) -> Span:
+        return Span(name, category, self, args)
+
+    def _get_tid(self) -> int:
+        """
+        Chrome trace中的线程编号, 每个asyncio任务一行, 并发的请求可以分开展示
+        :return:
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        return self._tids.setdefault(key, len(self._tids) + 1)
+
+    def finish(self, span: Span) -> None:
+        duration_ms = span.duration * 1000
+        if self.slow_threshold_ms and duration_ms >= self.slow_threshold_ms:
+            utils.logger.warning(f"[Tracer] slow operation {span.path()} ({span.category}) took {duration_ms:.1f}ms, "
+                                 f"args: {span.args}")
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                return
+            self._events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start_time - self._origin_time) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": self._get_tid(),
+                "args": {**span.args, "span_id": span.span_id,
+                         "parent_id": span.parent.span_id if span.parent else None},
+            })
+
+    def get_events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._tids.clear()
+
+    def export_chrome_trace(self, export_dir: str) -> str:
+        """
+        导出Chrome trace格式的JSON文件
+        :param export_dir: 保存目录
+        :return: 文件路径
+        """
+        pathlib.Path(export_dir).mkdir(parents=True, exist_ok=True)
+        file_name = f"{export_dir}/trace_{time.strftime('%Y%m%d%H%M%S')}_{os.getpid()}.json"
+        with open(file_name, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.get_events(), "displayTimeUnit": "ms"}, file, ensure_ascii=False)
+        return file_name
+
+
+TRACER = Tracer(enabled=config.ENABLE_TRACE, slow_threshold_ms=config.TRACE_SLOW_THRESHOLD_MS)
+
+
+def span(name: str, category: str, **args) -> Span:
+    """
+    使用全局tracer创建span
+    :param name: 名称
+    :param category: 阶段分类
+    :param args: 附加信息
+    :return:
+    """
+    return TRACER.span(name, category, **args)
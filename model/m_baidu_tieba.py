@@ -12,10 +12,10 @@
 # -*- coding: utf-8 -*-
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from .record import Field, Record
 
 
-class TiebaNote(BaseModel):
+class TiebaNote(Record):
     """
     百度贴吧帖子
     """
@@ -35,7 +35,7 @@ class TiebaNote(BaseModel):
     source_keyword: str = Field(default="", description="来源关键词")
 
 
-class TiebaComment(BaseModel):
+class TiebaComment(Record):
     """
     百度贴吧评论
     """
@@ -56,7 +56,7 @@ class TiebaComment(BaseModel):
     tieba_link: str = Field(..., description="贴吧链接")
 
 
-class TiebaCreator(BaseModel):
+class TiebaCreator(Record):
     """
     百度贴吧创作者
     """
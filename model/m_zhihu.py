@@ -12,10 +12,10 @@
 # -*- coding: utf-8 -*-
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from .record import Field, Record
 
 
-class ZhihuContent(BaseModel):
+class ZhihuContent(Record):
     """
     知乎内容（回答、文章、视频）
     """
@@ -39,7 +39,7 @@ class ZhihuContent(BaseModel):
     user_url_token: str = Field(default="", description="用户url_token")
 
 
-class ZhihuComment(BaseModel):
+class ZhihuComment(Record):
     """
     知乎评论
     """
@@ -61,7 +61,7 @@ class ZhihuComment(BaseModel):
     user_avatar: str = Field(default="", description="用户头像地址")
 
 
-class ZhihuCreator(BaseModel):
+class ZhihuCreator(Record):
     """
     知乎创作者
     """
@@ -0,0 +1,182 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 轻量的记录类型: 用 __slots__ 保存字段, 构造时不做完整校验, 用于每条评论都要创建一次的模型
+#            字段声明方式与 pydantic 相同, 保留 model_dump 等存储层用到的接口, 需要校验时显式调用 validate/model_validate
+
+import json
+import typing
+from typing import Any, Callable, Dict, List, Tuple
+
+_MISSING: Any = ...
+
+
+class RecordValidationError(ValueError):
+    def __init__(self, model_name: str, errors: List[str]):
+        self.model_name = model_name
+        self.errors = errors
+        super().__init__(f"{len(errors)} validation error(s) for {model_name}: " + "; ".join(errors))
+
+
+class FieldInfo:
+    __slots__ = ("default", "description", "name", "annotation")
+
+    def __init__(self, default: Any = _MISSING, description: str = ""):
+        self.default = default
+        self.description = description
+        self.name = ""
+        self.annotation: Any = Any
+
+    @property
+    def required(self) -> bool:
+        return self.default is _MISSING
+
+
+def Field(default: Any = _MISSING, description: str = "") -> Any:
+    """
+    声明字段, 与 pydantic.Field 的用法一致, default 为 ... 时表示必填
+    :param default: 默认值, 只支持不可变的值
+    :param description: 字段说明
+    :return:
+    """
+    return FieldInfo(default, description)
+
+
+def to_int(value: Any) -> int:
+    """
+    与 pydantic 宽松模式一致地转换整数字段, 例如 "786" -> 786, 无法转换时抛出 ValueError
+    :param value:
+    :return:
+    """
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError(f"invalid int value: {value!r}")
+
+
+def _allowed_types(annotation: Any) -> Tuple[type, ...]:
+    if typing.get_origin(annotation) is typing.Union:
+        return tuple(type(None) if arg is type(None) else arg for arg in typing.get_args(annotation))
+    return (annotation,) if isinstance(annotation, type) else (object,)
+
+
+def _compile(source: str, name: str, namespace: Dict[str, Any]) -> Callable:
+    exec(source, namespace)
+    return namespace[name]
+
+
+def _make_init(fields: Dict[str, FieldInfo]) -> Callable:
+    # 和 dataclasses 一样生成构造函数, 比逐个字段循环 setattr 快很多
+    namespace: Dict[str, Any] = {"_to_int": to_int}
+    params, lines = [], []
+    for name, info in fields.items():
+        if info.required:
+            params.append(name)
+        else:
+            namespace[f"_default_{name}"] = info.default
+            params.append(f"{name}=_default_{name}")
+        if info.annotation is int:
+            lines.append(f"    self.{name} = {name} if {name}.__class__ is int else _to_int({name})")
+        else:
+            lines.append(f"    self.{name} = {name}")
+    source = f"def __init__(self, *, {', '.join(params)}, **_extra):\n" + "\n".join(lines or ["    pass"])
+    return _compile(source, "__init__", namespace)
+
+
+def _make_dump(fields: Dict[str, FieldInfo]) -> Callable:
+    items = ", ".join(f"{name!r}: self.{name}" for name in fields)
+    return _compile(f"def model_dump(self):\n    return {{{items}}}", "model_dump", {})
+
+
+class _RecordMeta(type):
+    def __new__(mcs, name: str, bases: Tuple[type, ...], namespace: Dict[str, Any]):
+        fields: Dict[str, FieldInfo] = {}
+        for base in reversed(bases):
+            fields.update(getattr(base, "__record_fields__", {}))
+        own_fields = []
+        for field_name, annotation in namespace.get("__annotations__", {}).items():
+            if field_name.startswith("__"):
+                continue
+            value = namespace.pop(field_name, _MISSING)
+            info = value if isinstance(value, FieldInfo) else FieldInfo(value)
+            info.name = field_name
+            info.annotation = annotation
+            fields[field_name] = info
+            own_fields.append(field_name)
+        namespace["__slots__"] = tuple(own_fields)
+        namespace["__record_fields__"] = fields
+        cls = super().__new__(mcs, name, bases, namespace)
+        if fields:
+            cls.__init__ = _make_init(fields)
+            cls.model_dump = _make_dump(fields)
+        return cls
+
+
+class Record(metaclass=_RecordMeta):
+    """
+    轻量记录类型的基类, 子类像 pydantic 模型一样声明字段:
+        class TiebaNote(Record):
+            note_id: str = Field(..., description="帖子ID")
+    与 pydantic 模型的区别: 构造时只把整数字段按宽松模式转换为 int, 不检查其他字段的类型, 赋值时也不检查
+    """
+    __slots__ = ()
+    __record_fields__: Dict[str, FieldInfo] = {}
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {}
+
+    def model_dump_json(self) -> str:
+        return json.dumps(self.model_dump(), ensure_ascii=False, separators=(",", ":"))
+
+    def validate(self) -> "Record":
+        """
+        按字段声明的类型完整校验, 用于数据来源不可信的边界
+        :return: self
+        """
+        errors = []
+        for name, info in self.__record_fields__.items():
+            value = getattr(self, name)
+            allowed_types = _allowed_types(info.annotation)
+            if int in allowed_types and isinstance(value, bool):
+                errors.append(f"{name}: expected int, got bool")
+            elif not isinstance(value, allowed_types):
+                errors.append(f"{name}: expected {info.annotation}, got {type(value).__name__}")
+        if errors:
+            raise RecordValidationError(type(self).__name__, errors)
+        return self
+
+    @classmethod
+    def model_validate(cls, data: Dict[str, Any]) -> "Record":
+        """
+        从字典创建记录并完整校验
+        :param data:
+        :return:
+        """
+        try:
+            record = cls(**data)
+        except (TypeError, ValueError) as e:
+            raise RecordValidationError(cls.__name__, [str(e)]) from e
+        return record.validate()
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.model_dump() == other.model_dump()
+
+    def __str__(self) -> str:
+        return " ".join(f"{name}={value!r}" for name, value in self.model_dump().items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={value!r}' for name, value in self.model_dump().items())})"
@@ -9,6 +9,8 @@ import json
 import os
 from typing import Dict, List, Any
 
+from tools import json_codec
+
 def parse_har_file(har_file_path: str) -> List[Dict[str, Any]]:
     """
     解析 HAR 文件，提取抖音点赞作品数据
@@ -21,8 +23,8 @@ def parse_har_file(har_file_path: str) -> List[Dict[str, Any]]:
     """
     print(f"正在解析 HAR 文件: {har_file_path}")
     
-    with open(har_file_path, 'r', encoding='utf-8') as f:
-        har_data = json.load(f)
+    with open(har_file_path, 'rb') as f:
+        har_data = json_codec.loads(f.read())
     
     aweme_list = []
     
@@ -50,7 +52,7 @@ def parse_har_file(har_file_path: str) -> List[Dict[str, Any]]:
                                 
                                 try:
                                     # 解析响应 JSON 数据
-                                    response_data = json.loads(response_text)
+                                    response_data = json_codec.loads(response_text)
                                     print(f"响应数据键: {list(response_data.keys())}")
                                     
                                     # 提取 aweme_list
@@ -107,7 +109,7 @@ def save_fav_json(aweme_list: List[Dict[str, Any]], output_path: str):
     # 保存到文件
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+        f.write(json_codec.dumps(output_data, ensure_ascii=False, indent=2))
     
     print(f"已保存到: {output_path}")
 
@@ -14,13 +14,13 @@
 # @Time    : 2023/12/2 11:18
 # @Desc    : 爬虫 IP 获取实现
 # @Url     : 快代理HTTP实现，官方文档：https://www.kuaidaili.com/?ref=ldwkjqipvz6c
-import json
 from abc import ABC, abstractmethod
 from typing import List
 
 import config
 from cache.abs_cache import AbstractCache
 from cache.cache_factory import CacheFactory
+from tools import json_codec
 from tools.utils import utils
 
 from .types import IpInfoModel
@@ -69,7 +69,7 @@ class IpCache:
                 ip_value = self.cache_client.get(ip_key)
                 if not ip_value:
                     continue
-                all_ip_list.append(IpInfoModel(**json.loads(ip_value)))
+                all_ip_list.append(IpInfoModel(**json_codec.loads(ip_value)))
         except Exception as e:
             utils.logger.error("[IpCache.load_all_ip] get ip err from redis db", e)
         return all_ip_list
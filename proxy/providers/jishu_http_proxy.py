@@ -21,7 +21,7 @@ import httpx
 
 from proxy import IpCache, IpGetError, ProxyProvider
 from proxy.types import IpInfoModel
-from tools import utils
+from tools import json_codec, utils
 
 
 class JiSuHttpProxy(ProxyProvider):
@@ -64,7 +64,7 @@ class JiSuHttpProxy(ProxyProvider):
             utils.logger.info(f"[JiSuHttpProxy.get_proxies] get ip proxy url:{url}")
             response = await client.get(url, headers={
                 "User-Agent": "MediaCrawler https://github.com/NanmiCoder/MediaCrawler"})
-            res_dict: Dict = response.json()
+            res_dict: Dict = json_codec.loads_response(response)
             if res_dict.get("code") == 0:
                 data: List[Dict] = res_dict.get("data")
                 current_ts = utils.get_unix_timestamp()
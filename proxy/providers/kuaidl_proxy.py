@@ -22,13 +22,13 @@ from pydantic import BaseModel, Field
 
 from proxy import IpCache, IpInfoModel, ProxyProvider
 from proxy.types import ProviderNameEnum
-from tools import utils
+from tools import json_codec, utils
 
 
 class KuaidailiProxyModel(BaseModel):
     ip: str = Field("ip")
     port: int = Field("端口")
-    expire_ts: int = Field("过期时间")
+    expire_ts: int = Field("剩余可用时长(秒)")
 
 
 def parse_kuaidaili_proxy(proxy_info: str) -> KuaidailiProxyModel:
@@ -108,12 +108,13 @@ class KuaiDaiLiProxy(ProxyProvider):
                 utils.logger.error(f"[KuaiDaiLiProxy.get_proxies] statuc code not 200 and response.txt:{response.text}")
                 raise Exception("get ip error from proxy provider and status code not 200 ...")
 
-            ip_response: Dict = response.json()
+            ip_response: Dict = json_codec.loads_response(response)
             if ip_response.get("code") != 0:
                 utils.logger.error(f"[KuaiDaiLiProxy.get_proxies]  code not 0 and msg:{ip_response.get('msg')}")
                 raise Exception("get ip error from proxy provider and  code not 0 ...")
 
             proxy_list: List[str] = ip_response.get("data", {}).get("proxy_list")
+            current_ts = utils.get_unix_timestamp()
             for proxy in proxy_list:
                 proxy_model = parse_kuaidaili_proxy(proxy)
                 ip_info_model = IpInfoModel(
@@ -121,11 +122,12 @@ class KuaiDaiLiProxy(ProxyProvider):
                     port=proxy_model.port,
                     user=self.kdl_user_name,
                     password=self.kdl_user_pwd,
-                    expired_time_ts=proxy_model.expire_ts,
+                    # 快代理返回的是IP剩余可用时长(秒), 这里换算成过期时间戳
+                    expired_time_ts=current_ts + proxy_model.expire_ts,
 
                 )
                 ip_key = f"{self.proxy_brand_name}_{ip_info_model.ip}_{ip_info_model.port}"
-                self.ip_cache.set_ip(ip_key, ip_info_model.model_dump_json(), ex=ip_info_model.expired_time_ts)
+                self.ip_cache.set_ip(ip_key, ip_info_model.model_dump_json(), ex=proxy_model.expire_ts)
                 ip_infos.append(ip_info_model)
 
         return ip_cache_list + ip_infos
@@ -13,79 +13,370 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
 # @Desc    : ip代理池实现
+import asyncio
 import random
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional, Set
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
+from base.base_crawler import AbstractApiClient
+from metrics.crawler_metrics import (PROXY_EVICTED, PROXY_HEALTH_SCORE,
+                                     PROXY_POOL_SIZE)
 from proxy.providers import new_jisu_http_proxy, new_kuai_daili_proxy
 from tools import utils
 
 from .base_proxy import ProxyProvider
-from .types import IpInfoModel, ProviderNameEnum
+from .types import IpInfoModel, ProviderNameEnum, ProxyHealthInfo
 
 
 class ProxyIpPool:
-    def __init__(self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider) -> None:
+    def __init__(self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider,
+                 ewma_alpha: float = 0.3, min_success_ratio: float = 0.5,
+                 refresh_before_expire_sec: int = 60) -> None:
         """
 
         Args:
             ip_pool_count:
             enable_validate_ip:
             ip_provider:
+            ewma_alpha: 健康度EWMA的平滑系数, 越大越看重最近一次的结果
+            min_success_ratio: 成功率EWMA低于该值的IP会被剔除出池子
+            refresh_before_expire_sec: IP剩余有效期低于该值(秒)时提前预取新IP并替换
         """
         self.valid_ip_url = "https://echo.apifox.cn/"  # 验证 IP 是否有效的地址
         self.ip_pool_count = ip_pool_count
         self.enable_validate_ip = enable_validate_ip
         self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
+        self.ewma_alpha = ewma_alpha
+        self.min_success_ratio = min_success_ratio
+        self.refresh_before_expire_sec = refresh_before_expire_sec
+        self.proxy_health: Dict[str, ProxyHealthInfo] = {}
+        self._evicted_proxy_keys: Set[str] = set()
+        self._validate_clients: Dict[str, httpx.AsyncClient] = {}
+        self._health_check_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._proxy_clients: Dict[str, List[AbstractApiClient]] = {}
+
+    @staticmethod
+    def get_proxy_key(proxy: IpInfoModel) -> str:
+        """
+        代理IP在池子中的唯一标识
+        :param proxy:
+        :return:
+        """
+        return f"{proxy.ip}:{proxy.port}"
 
     async def load_proxies(self) -> None:
         """
-        加载IP代理
+        加载IP代理, 开启验证时并发检测所有IP, 只保留有效的IP
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxies(self.ip_pool_count)
+        # 代理商会优先返回缓存中的IP(包括已被剔除的IP), 多取一些保证剔除后还能拿到足够的新IP
+        proxy_list = await self.ip_provider.get_proxies(self.ip_pool_count + len(self._evicted_proxy_keys))
+        proxy_list = [
+            proxy for proxy in proxy_list if self.get_proxy_key(proxy) not in self._evicted_proxy_keys
+        ][:self.ip_pool_count]
+        if self.enable_validate_ip and proxy_list:
+            valid_results = await asyncio.gather(*[self._is_valid_proxy(proxy) for proxy in proxy_list])
+            for proxy, is_valid in zip(proxy_list, valid_results):
+                if not is_valid:
+                    await self._evict_proxy(proxy)
+            proxy_list = [proxy for proxy, is_valid in zip(proxy_list, valid_results) if is_valid]
+        self.proxy_list = proxy_list
+        self._update_metrics()
 
     async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
         """
-        验证代理IP是否有效
+        验证代理IP是否有效, 并把检测结果计入该IP的健康度
         :param proxy:
         :return:
         """
         utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} is it valid ")
+        start_time = time.perf_counter()
         try:
+            response = await self._get_validate_client(proxy).get(self.valid_ip_url)
+            is_valid = response.status_code == 200
+        except Exception as e:
+            utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}")
+            is_valid = False
+        self._record_result(proxy, is_valid, time.perf_counter() - start_time)
+        return is_valid
+
+    def _get_validate_client(self, proxy: IpInfoModel) -> httpx.AsyncClient:
+        """
+        获取检测该IP使用的httpx客户端, 同一个IP的多次检测复用同一个连接池
+        :param proxy:
+        :return:
+        """
+        proxy_key = self.get_proxy_key(proxy)
+        if proxy_key not in self._validate_clients:
             httpx_proxy = {
                 f"{proxy.protocol}": f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
             }
-            async with httpx.AsyncClient(proxies=httpx_proxy) as client:
-                response = await client.get(self.valid_ip_url)
-            if response.status_code == 200:
-                return True
+            self._validate_clients[proxy_key] = httpx.AsyncClient(proxies=httpx_proxy, timeout=10)
+        return self._validate_clients[proxy_key]
+
+    def _record_result(self, proxy: IpInfoModel, is_success: bool, latency: float) -> ProxyHealthInfo:
+        """
+        按EWMA更新IP的成功率和耗时
+        :param proxy:
+        :param is_success:
+        :param latency: 本次请求耗时(秒)
+        :return:
+        """
+        health = self.proxy_health.setdefault(self.get_proxy_key(proxy), ProxyHealthInfo())
+        alpha = self.ewma_alpha
+        health.success_ewma = alpha * (1.0 if is_success else 0.0) + (1 - alpha) * health.success_ewma
+        if is_success:
+            if health.check_count == health.fail_count:
+                health.latency_ewma = latency
             else:
-                return False
-        except Exception as e:
-            utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}")
-            raise e
+                health.latency_ewma = alpha * latency + (1 - alpha) * health.latency_ewma
+        else:
+            health.fail_count += 1
+        health.check_count += 1
+        return health
+
+    def get_proxy_score(self, proxy: IpInfoModel) -> float:
+        """
+        计算IP的健康分, 成功率越高、耗时越低分数越高
+        :param proxy:
+        :return:
+        """
+        health = self.proxy_health.get(self.get_proxy_key(proxy))
+        if health is None:
+            return 1.0
+        return health.success_ewma / (1 + health.latency_ewma)
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        从代理池中提取健康分最高的代理IP, 分数相同(例如都还没有请求结果)时随机选择, 把请求分散到不同IP
         :return:
         """
         if len(self.proxy_list) == 0:
             await self._reload_proxies()
 
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy) # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
-                raise Exception("[ProxyIpPool.get_proxy] current ip invalid and again get it")
-        return proxy
+        if len(self.proxy_list) == 0:
+            raise Exception("[ProxyIpPool.get_proxy] no valid ip in pool and again get it")
+        # 优先使用不会很快过期的IP
+        candidate_list = [proxy for proxy in self.proxy_list if not self.is_proxy_expiring(proxy)] or self.proxy_list
+        best_score = max(self.get_proxy_score(proxy) for proxy in candidate_list)
+        return random.choice([proxy for proxy in candidate_list if self.get_proxy_score(proxy) >= best_score])
+
+    def get_remaining_lifetime(self, proxy: IpInfoModel) -> float:
+        """
+        获取IP剩余的有效期(秒), 没有过期时间的IP视为永不过期
+        :param proxy:
+        :return:
+        """
+        if not proxy.expired_time_ts:
+            return float("inf")
+        return proxy.expired_time_ts - utils.get_unix_timestamp()
+
+    def is_proxy_expiring(self, proxy: IpInfoModel) -> bool:
+        """
+        IP是否即将过期
+        :param proxy:
+        :return:
+        """
+        return self.get_remaining_lifetime(proxy) < self.refresh_before_expire_sec
+
+    def register_client(self, client: AbstractApiClient, proxy: IpInfoModel) -> None:
+        """
+        登记客户端当前使用的IP, 客户端的请求结果会上报计入该IP的健康度,
+        该IP即将过期或被剔除时代理池会调用client.update_proxy热切换到新IP
+        :param client: 平台API客户端
+        :param proxy: 客户端当前使用的IP
+        :return:
+        """
+        for client_list in self._proxy_clients.values():
+            if client in client_list:
+                client_list.remove(client)
+        self._proxy_clients.setdefault(self.get_proxy_key(proxy), []).append(client)
+        client.proxy_pool = self
+        client.proxy_info = proxy
+
+    async def _switch_clients(self, old_proxy: IpInfoModel, new_proxy: IpInfoModel) -> None:
+        """
+        把使用旧IP的客户端切换到新IP
+        :param old_proxy:
+        :param new_proxy:
+        :return:
+        """
+        for client in self._proxy_clients.pop(self.get_proxy_key(old_proxy), []):
+            await client.update_proxy(new_proxy)
+            self.register_client(client, new_proxy)
+
+    async def refresh_expiring_proxies(self) -> None:
+        """
+        对即将过期的IP提前从代理商预取替换IP, 把使用旧IP的客户端切换到新IP,
+        并且只关闭旧IP对应的连接
+        :return:
+        """
+        expiring_list = [proxy for proxy in self.proxy_list if self.is_proxy_expiring(proxy)]
+        if not expiring_list:
+            return
+
+        utils.logger.info(
+            f"[ProxyIpPool.refresh_expiring_proxies] {len(expiring_list)} ip will expire soon, prefetch new ip ...")
+        await self._prefetch_proxies(len(expiring_list))
+        for expiring_proxy in expiring_list:
+            candidate_list = [proxy for proxy in self.proxy_list if not self.is_proxy_expiring(proxy)]
+            if not candidate_list:
+                utils.logger.warning(
+                    f"[ProxyIpPool.refresh_expiring_proxies] no replacement for ip {expiring_proxy.ip}, keep using it")
+                continue
+            new_proxy = max(candidate_list, key=self.get_proxy_score)
+            await self._switch_clients(expiring_proxy, new_proxy)
+            utils.logger.info(
+                f"[ProxyIpPool.refresh_expiring_proxies] rotate ip {expiring_proxy.ip} -> {new_proxy.ip}")
+            await self._evict_proxy(expiring_proxy)
+
+    async def _prefetch_proxies(self, need_count: int) -> None:
+        """
+        从代理商获取新的IP加入池子, 开启验证时并发检测后只保留有效IP
+        :param need_count: 需要新增的IP数量
+        :return:
+        """
+        known_keys = {self.get_proxy_key(proxy) for proxy in self.proxy_list} | self._evicted_proxy_keys
+        # 代理商会优先返回缓存中的IP(包括即将过期的IP), 多取一些保证能拿到新的IP
+        proxy_list = await self.ip_provider.get_proxies(len(self.proxy_list) + need_count)
+        new_proxy_list = [
+            proxy for proxy in proxy_list
+            if self.get_proxy_key(proxy) not in known_keys and not self.is_proxy_expiring(proxy)
+        ]
+        if self.enable_validate_ip and new_proxy_list:
+            valid_results = await asyncio.gather(*[self._is_valid_proxy(proxy) for proxy in new_proxy_list])
+            new_proxy_list = [proxy for proxy, is_valid in zip(new_proxy_list, valid_results) if is_valid]
+        self.proxy_list.extend(new_proxy_list)
+        self._update_metrics()
+
+    async def report_success(self, proxy: IpInfoModel, latency: float) -> None:
+        """
+        爬虫上报使用该IP请求成功
+        :param proxy:
+        :param latency: 请求耗时(秒)
+        :return:
+        """
+        self._record_result(proxy, True, latency)
+
+    async def report_failure(self, proxy: IpInfoModel) -> None:
+        """
+        爬虫上报使用该IP请求失败, 健康度过低的IP会在过期前被提前剔除, 使用它的客户端切换到新IP
+        :param proxy:
+        :return:
+        """
+        health = self._record_result(proxy, False, 0)
+        if health.success_ewma < self.min_success_ratio and self.get_proxy_key(proxy) not in self._evicted_proxy_keys:
+            await self._evict_proxy(proxy)
+            if self._proxy_clients.get(self.get_proxy_key(proxy)):
+                try:
+                    await self._switch_clients(proxy, await self.get_proxy())
+                except Exception as e:
+                    utils.logger.error(f"[ProxyIpPool.report_failure] no replacement for evicted ip {proxy.ip}: {e}")
+
+    async def _evict_proxy(self, proxy: IpInfoModel) -> None:
+        """
+        把IP剔除出池子, 后续重新加载时也不再使用该IP
+        :param proxy:
+        :return:
+        """
+        proxy_key = self.get_proxy_key(proxy)
+        utils.logger.info(f"[ProxyIpPool._evict_proxy] evict unhealthy ip {proxy_key}")
+        self._evicted_proxy_keys.add(proxy_key)
+        self.proxy_list = [item for item in self.proxy_list if self.get_proxy_key(item) != proxy_key]
+        PROXY_EVICTED.inc()
+        self._update_metrics()
+        validate_client = self._validate_clients.pop(proxy_key, None)
+        if validate_client is not None:
+            await validate_client.aclose()
+
+    async def check_all_proxies(self) -> None:
+        """
+        并发重新检测池中所有IP的健康度
+        :return:
+        """
+        proxy_list = list(self.proxy_list)
+        valid_results = await asyncio.gather(*[self._is_valid_proxy(proxy) for proxy in proxy_list])
+        for proxy, is_valid in zip(proxy_list, valid_results):
+            health = self.proxy_health[self.get_proxy_key(proxy)]
+            if not is_valid and health.success_ewma < self.min_success_ratio:
+                await self._evict_proxy(proxy)
+        self._update_metrics()
+
+    def _update_metrics(self) -> None:
+        """
+        更新代理池大小和平均健康分指标
+        :return:
+        """
+        PROXY_POOL_SIZE.set(len(self.proxy_list))
+        scores = [self.get_proxy_score(proxy) for proxy in self.proxy_list]
+        PROXY_HEALTH_SCORE.set(sum(scores) / len(scores) if scores else 0)
+
+    def start_health_check(self, interval: int) -> None:
+        """
+        开启后台定时健康检测任务
+        :param interval: 检测间隔(秒)
+        :return:
+        """
+        if self._health_check_task is None:
+            self._health_check_task = asyncio.create_task(self._start_health_check_cron(interval))
+
+    def start_refresh(self, interval: int) -> None:
+        """
+        开启后台定时检查IP过期的任务
+        :param interval: 检查间隔(秒)
+        :return:
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._start_refresh_cron(interval))
+
+    async def _start_refresh_cron(self, interval: int) -> None:
+        """
+        定时替换即将过期的IP
+        :param interval:
+        :return:
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_expiring_proxies()
+            except Exception as e:
+                utils.logger.error(f"[ProxyIpPool._start_refresh_cron] refresh proxies err: {e}")
+
+    async def _start_health_check_cron(self, interval: int) -> None:
+        """
+        定时检测池中所有IP
+        :param interval:
+        :return:
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.check_all_proxies()
+            except Exception as e:
+                utils.logger.error(f"[ProxyIpPool._start_health_check_cron] check proxies err: {e}")
+
+    async def close(self) -> None:
+        """
+        停止后台检测任务并关闭检测用的客户端
+        :return:
+        """
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            self._health_check_task = None
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        for validate_client in self._validate_clients.values():
+            await validate_client.aclose()
+        self._validate_clients.clear()
 
     async def _reload_proxies(self):
         """
@@ -111,9 +402,13 @@ async def create_ip_pool(ip_pool_count: int, enable_validate_ip: bool) -> ProxyI
     """
     pool = ProxyIpPool(ip_pool_count=ip_pool_count,
                        enable_validate_ip=enable_validate_ip,
-                       ip_provider=IpProxyProvider.get(config.IP_PROXY_PROVIDER_NAME)
+                       ip_provider=IpProxyProvider.get(config.IP_PROXY_PROVIDER_NAME),
+                       refresh_before_expire_sec=config.IP_PROXY_REFRESH_BEFORE_EXPIRE_SEC,
                        )
     await pool.load_proxies()
+    pool.start_refresh(config.IP_PROXY_EXPIRE_CHECK_INTERVAL)
+    if enable_validate_ip:
+        pool.start_health_check(config.IP_PROXY_HEALTH_CHECK_INTERVAL)
     return pool
 
 
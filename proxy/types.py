@@ -32,3 +32,11 @@ class IpInfoModel(BaseModel):
     protocol: str = Field(default="https://", title="代理IP的协议")
     password: str = Field(title="IP代理认证用户的密码")
     expired_time_ts: Optional[int] = Field(title="IP 过期时间")
+
+
+class ProxyHealthInfo(BaseModel):
+    """代理IP的健康度统计, 使用EWMA平滑最近的检测结果"""
+    success_ewma: float = Field(default=1.0, title="成功率的EWMA值")
+    latency_ewma: float = Field(default=0.0, title="响应耗时(秒)的EWMA值")
+    check_count: int = Field(default=0, title="累计检测/上报次数")
+    fail_count: int = Field(default=0, title="累计失败次数")
@@ -17,6 +17,7 @@
 from typing import List
 
 import config
+from metrics.crawler_metrics import StoreTimer
 from var import source_keyword_var
 
 from .bilibili_store_impl import *
@@ -71,7 +72,8 @@ async def update_bilibili_video(video_item: Dict):
     utils.logger.info(
         f"[store.bilibili.update_bilibili_video] bilibili video id:{video_id}, title:{save_content_item.get('title')}"
     )
-    await BiliStoreFactory.create_store().store_content(content_item=save_content_item)
+    with StoreTimer("bili", "contents"):
+        await BiliStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
 async def update_up_info(video_item: Dict):
@@ -92,7 +94,8 @@ async def update_up_info(video_item: Dict):
     utils.logger.info(
         f"[store.bilibili.update_up_info] bilibili user_id:{video_item_card.get('mid')}"
     )
-    await BiliStoreFactory.create_store().store_creator(creator=saver_up_info)
+    with StoreTimer("bili", "creators"):
+        await BiliStoreFactory.create_store().store_creator(creator=saver_up_info)
 
 
 async def batch_update_bilibili_video_comments(video_id: str, comments: List[Dict]):
@@ -126,26 +129,42 @@ async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
     utils.logger.info(
         f"[store.bilibili.update_bilibili_video_comment] Bilibili video comment: {comment_id}, content: {save_comment_item.get('content')}"
     )
-    await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    with StoreTimer("bili", "comments"):
+        await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 
-async def store_video(aid, video_content, extension_file_name):
+async def store_video(aid, video_content, extension_file_name, url: str = ""):
     """
     video video storage implementation
     Args:
         aid:
         video_content:
         extension_file_name:
+        url: video url, recorded so the same url is not downloaded again
     """
     await BilibiliVideo().store_video(
         {
             "aid": aid,
             "video_content": video_content,
             "extension_file_name": extension_file_name,
+            "url": url,
         }
     )
 
 
+async def link_video(aid, url, extension_file_name) -> bool:
+    """
+    link an already downloaded video url to local
+    Args:
+        aid:
+        url:
+        extension_file_name:
+    Returns:
+        whether the url was downloaded before and linked, download it when False
+    """
+    return await BilibiliVideo().link_video(aid, url, extension_file_name)
+
+
 async def batch_update_bilibili_creator_fans(creator_info: Dict, fans_list: List[Dict]):
     if not fans_list:
         return
@@ -221,7 +240,8 @@ async def update_bilibili_creator_contact(creator_info: Dict, fan_info: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
 
-    await BiliStoreFactory.create_store().store_contact(contact_item=save_contact_item)
+    with StoreTimer("bili", "contacts"):
+        await BiliStoreFactory.create_store().store_contact(contact_item=save_contact_item)
 
 
 async def update_bilibili_creator_dynamic(creator_info: Dict, dynamic_info: Dict):
@@ -238,4 +258,5 @@ async def update_bilibili_creator_dynamic(creator_info: Dict, dynamic_info: Dict
         "last_modify_ts": utils.get_current_timestamp(),
     }
 
-    await BiliStoreFactory.create_store().store_dynamic(dynamic_item=save_dynamic_item)
+    with StoreTimer("bili", "dynamics"):
+        await BiliStoreFactory.create_store().store_dynamic(dynamic_item=save_dynamic_item)
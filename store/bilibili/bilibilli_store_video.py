@@ -13,12 +13,10 @@
 # @Author  : helloteemo
 # @Time    : 2024/7/12 20:01
 # @Desc    : bilibili图片保存
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage
+from store.media_store import get_media_store
 from tools import utils
 
 
@@ -35,7 +33,7 @@ class BilibiliVideo(AbstractStoreImage):
 
         """
         await self.save_video(video_content_item.get("aid"), video_content_item.get("video_content"),
-                              video_content_item.get("extension_file_name"))
+                              video_content_item.get("extension_file_name"), video_content_item.get("url", ""))
 
     def make_save_file_name(self, aid: str, extension_file_name: str) -> str:
         """
@@ -47,18 +45,29 @@ class BilibiliVideo(AbstractStoreImage):
         """
         return f"{self.video_store_path}/{aid}/{extension_file_name}"
 
-    async def save_video(self, aid: int, video_content: str, extension_file_name="mp4"):
+    async def save_video(self, aid: int, video_content: str, extension_file_name="mp4", url: str = ""):
         """
         save video to local
         Args:
             aid: aid
             video_content: video content
+            url: video url, recorded so the same url is not downloaded again
 
         Returns:
 
         """
-        pathlib.Path(self.video_store_path + "/" + str(aid)).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(str(aid), extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(video_content)
-            utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
+        await get_media_store().save(save_file_name, video_content, url=url)
+        utils.logger.info(f"[BilibiliVideoImplement.save_video] save save_video {save_file_name} success ...")
+
+    async def link_video(self, aid: int, url: str, extension_file_name="mp4") -> bool:
+        """
+        link an already downloaded url to the video directory
+        Args:
+            aid: aid
+            url: video url
+
+        Returns:
+            whether the url was downloaded before and linked
+        """
+        return await get_media_store().link_url(url, self.make_save_file_name(str(aid), extension_file_name))
@@ -15,6 +15,7 @@
 from typing import List
 
 import config
+from metrics.crawler_metrics import StoreTimer
 from var import source_keyword_var
 
 from .douyin_store_impl import *
@@ -171,7 +172,8 @@ async def update_douyin_aweme(aweme_item: Dict):
         "source_keyword": source_keyword_var.get(),
     }
     utils.logger.info(f"[store.douyin.update_douyin_aweme] douyin aweme id:{aweme_id}, title:{save_content_item.get('title')}")
-    await DouyinStoreFactory.create_store().store_content(content_item=save_content_item)
+    with StoreTimer("dy", "contents"):
+        await DouyinStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
 async def batch_update_dy_aweme_comments(aweme_id: str, comments: List[Dict]):
@@ -211,7 +213,8 @@ async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
     }
     utils.logger.info(f"[store.douyin.update_dy_aweme_comment] douyin aweme comment: {comment_id}, content: {save_comment_item.get('content')}")
 
-    await DouyinStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    with StoreTimer("dy", "comments"):
+        await DouyinStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -232,10 +235,11 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.douyin.save_creator] creator:{local_db_item}")
-    await DouyinStoreFactory.create_store().store_creator(local_db_item)
+    with StoreTimer("dy", "creators"):
+        await DouyinStoreFactory.create_store().store_creator(local_db_item)
 
 
-async def update_douyin_aweme_image(aweme_id: str, pic_content: bytes, extension_file_name: str):
+async def update_douyin_aweme_image(aweme_id: str, pic_content: bytes, extension_file_name: str, url: str = "") -> Dict:
     """
     保存抖音图片
     
@@ -243,6 +247,10 @@ async def update_douyin_aweme_image(aweme_id: str, pic_content: bytes, extension
         aweme_id: 抖音视频ID
         pic_content: 图片内容
         extension_file_name: 文件扩展名
+        url: 图片URL, 记录后同一URL不再重复下载
+        
+    Returns:
+        Dict: 媒体存储的清单记录
     """
     from .douyin_store_impl import DouyinStoreImage
     
@@ -250,13 +258,31 @@ async def update_douyin_aweme_image(aweme_id: str, pic_content: bytes, extension
         "aweme_id": aweme_id,
         "pic_content": pic_content,
         "extension_file_name": extension_file_name,
+        "url": url,
         "add_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.douyin.update_douyin_aweme_image] aweme_id:{aweme_id}, file_name:{extension_file_name}")
-    await DouyinStoreImage().store_image(local_db_item)
+    return await DouyinStoreImage().store_image(local_db_item)
+
+
+async def link_douyin_aweme_image(aweme_id: str, url: str, extension_file_name: str) -> bool:
+    """
+    图片URL之前下载过时直接链接到作品目录
+    
+    Args:
+        aweme_id: 抖音视频ID
+        url: 图片URL
+        extension_file_name: 文件扩展名
+        
+    Returns:
+        bool: 是否已链接, 为False时需要下载
+    """
+    from .douyin_store_impl import DouyinStoreImage
+
+    return await DouyinStoreImage().link_image(aweme_id, url, extension_file_name)
 
 
-async def update_douyin_aweme_video(aweme_item: Dict, video_content: bytes, extension_file_name: str):
+async def update_douyin_aweme_video(aweme_item: Dict, video_content: bytes, extension_file_name: str, url: str = ""):
     """
     保存抖音视频
     
@@ -264,6 +290,7 @@ async def update_douyin_aweme_video(aweme_item: Dict, video_content: bytes, exte
         aweme_item: 抖音视频完整信息
         video_content: 视频内容
         extension_file_name: 文件扩展名
+        url: 视频URL, 记录后同一URL不再重复下载
     """
     from .douyin_store_impl import DouyinStoreVideo
     
@@ -271,6 +298,7 @@ async def update_douyin_aweme_video(aweme_item: Dict, video_content: bytes, exte
         "aweme_item": aweme_item,
         "video_content": video_content,
         "extension_file_name": extension_file_name,
+        "url": url,
         "add_ts": utils.get_current_timestamp(),
     }
     aweme_id = aweme_item.get("aweme_id")
@@ -278,7 +306,25 @@ async def update_douyin_aweme_video(aweme_item: Dict, video_content: bytes, exte
     await DouyinStoreVideo().store_video(local_db_item)
 
 
-async def update_douyin_aweme_image_for_love(aweme_id: str, pic_content: bytes, extension_file_name: str, aweme_item: Dict = None):
+async def link_douyin_aweme_video(aweme_item: Dict, url: str, extension_file_name: str) -> bool:
+    """
+    视频URL之前下载过时直接链接到作品目录
+    
+    Args:
+        aweme_item: 抖音视频完整信息
+        url: 视频URL
+        extension_file_name: 文件扩展名
+        
+    Returns:
+        bool: 是否已链接, 为False时需要下载
+    """
+    from .douyin_store_impl import DouyinStoreVideo
+
+    return await DouyinStoreVideo().link_video(aweme_item, url, extension_file_name)
+
+
+async def update_douyin_aweme_image_for_love(aweme_id: str, pic_content: bytes, extension_file_name: str, aweme_item: Dict = None,
+                                             url: str = "") -> Dict:
     """
     保存抖音图片到love目录
     
@@ -287,6 +333,10 @@ async def update_douyin_aweme_image_for_love(aweme_id: str, pic_content: bytes,
         pic_content: 图片内容
         extension_file_name: 文件扩展名
         aweme_item: 抖音作品完整信息（可选）
+        url: 图片URL, 记录后同一URL不再重复下载
+        
+    Returns:
+        Dict: 媒体存储的清单记录
     """
     from .douyin_store_impl import DouyinStoreImageForLove
     
@@ -295,13 +345,32 @@ async def update_douyin_aweme_image_for_love(aweme_id: str, pic_content: bytes,
         "pic_content": pic_content,
         "extension_file_name": extension_file_name,
         "aweme_item": aweme_item,
+        "url": url,
         "add_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.douyin.update_douyin_aweme_image_for_love] aweme_id:{aweme_id}, file_name:{extension_file_name}")
-    await DouyinStoreImageForLove().store_image(local_db_item)
+    return await DouyinStoreImageForLove().store_image(local_db_item)
 
 
-async def update_douyin_aweme_video_for_love(aweme_item: Dict, video_content: bytes, extension_file_name: str):
+async def link_douyin_aweme_image_for_love(aweme_id: str, url: str, extension_file_name: str, aweme_item: Dict = None) -> bool:
+    """
+    图片URL之前下载过时直接链接到love目录
+    
+    Args:
+        aweme_id: 抖音视频ID
+        url: 图片URL
+        extension_file_name: 文件扩展名
+        aweme_item: 抖音作品完整信息（可选）
+        
+    Returns:
+        bool: 是否已链接, 为False时需要下载
+    """
+    from .douyin_store_impl import DouyinStoreImageForLove
+
+    return await DouyinStoreImageForLove().link_image(aweme_id, url, extension_file_name, aweme_item)
+
+
+async def update_douyin_aweme_video_for_love(aweme_item: Dict, video_content: bytes, extension_file_name: str, url: str = ""):
     """
     保存抖音视频到love目录
     
@@ -309,6 +378,7 @@ async def update_douyin_aweme_video_for_love(aweme_item: Dict, video_content: by
         aweme_item: 抖音视频完整信息
         video_content: 视频内容
         extension_file_name: 文件扩展名
+        url: 视频URL, 记录后同一URL不再重复下载
     """
     from .douyin_store_impl import DouyinStoreVideoForLove
     
@@ -316,8 +386,26 @@ async def update_douyin_aweme_video_for_love(aweme_item: Dict, video_content: by
         "aweme_item": aweme_item,
         "video_content": video_content,
         "extension_file_name": extension_file_name,
+        "url": url,
         "add_ts": utils.get_current_timestamp(),
     }
     aweme_id = aweme_item.get("aweme_id")
     utils.logger.info(f"[store.douyin.update_douyin_aweme_video_for_love] aweme_id:{aweme_id}, file_name:{extension_file_name}")
     await DouyinStoreVideoForLove().store_video(local_db_item)
+
+
+async def link_douyin_aweme_video_for_love(aweme_item: Dict, url: str, extension_file_name: str) -> bool:
+    """
+    视频URL之前下载过时直接链接到love目录
+    
+    Args:
+        aweme_item: 抖音视频完整信息
+        url: 视频URL
+        extension_file_name: 文件扩展名
+        
+    Returns:
+        bool: 是否已链接, 为False时需要下载
+    """
+    from .douyin_store_impl import DouyinStoreVideoForLove
+
+    return await DouyinStoreVideoForLove().link_video(aweme_item, url, extension_file_name)
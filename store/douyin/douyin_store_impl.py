@@ -15,7 +15,6 @@
 # @Desc    : 抖音存储实现类
 import asyncio
 import csv
-import json
 import os
 import pathlib
 from typing import Dict
@@ -24,7 +23,8 @@ import aiofiles
 
 import config
 from base.base_crawler import AbstractStore
-from tools import utils, words
+from store.media_store import get_media_store
+from tools import json_codec, utils, words
 from var import crawler_type_var
 
 
@@ -183,27 +183,40 @@ class DouyinStoreImage:
         self.store_path = "data/douyin/images"
         pathlib.Path(self.store_path).mkdir(parents=True, exist_ok=True)
     
-    async def store_image(self, image_item: Dict):
+    async def store_image(self, image_item: Dict) -> Dict:
         """
         保存抖音图片到本地
         
         Args:
             image_item: 图片信息字典
+            
+        Returns:
+            Dict: 媒体存储的清单记录
         """
         aweme_id = image_item.get("aweme_id")
         pic_content = image_item.get("pic_content")
         extension_file_name = image_item.get("extension_file_name")
         
-        # 创建以aweme_id命名的子目录
-        aweme_dir = os.path.join(self.store_path, aweme_id)
-        pathlib.Path(aweme_dir).mkdir(parents=True, exist_ok=True)
-        
-        # 保存图片文件
-        file_path = os.path.join(aweme_dir, extension_file_name)
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(pic_content)
+        # 保存到以aweme_id命名的子目录
+        file_path = os.path.join(self.store_path, aweme_id, extension_file_name)
+        entry = await get_media_store().save(file_path, pic_content, url=image_item.get("url", ""))
         
         utils.logger.info(f"[DouyinStoreImage.store_image] 图片已保存: {file_path}")
+        return entry
+
+    async def link_image(self, aweme_id: str, url: str, extension_file_name: str) -> bool:
+        """
+        图片URL之前下载过时直接链接到作品目录
+        
+        Args:
+            aweme_id: 抖音视频ID
+            url: 图片URL
+            extension_file_name: 文件名
+            
+        Returns:
+            bool: 是否已链接, 为False时需要下载
+        """
+        return await get_media_store().link_url(url, os.path.join(self.store_path, aweme_id, extension_file_name))
 
 
 class DouyinStoreVideo:
@@ -247,17 +260,16 @@ class DouyinStoreVideo:
         
         return filename.strip(' _')
     
-    async def store_video(self, video_item: Dict):
+    def _make_aweme_dir(self, aweme_item: Dict) -> str:
         """
-        保存抖音视频到本地
+        以作品标题命名的子目录
         
         Args:
-            video_item: 视频信息字典
+            aweme_item: 抖音作品完整信息
+            
+        Returns:
+            str: 目录路径
         """
-        aweme_item = video_item.get("aweme_item")
-        video_content = video_item.get("video_content")
-        extension_file_name = video_item.get("extension_file_name")
-        
         aweme_id = aweme_item.get("aweme_id")
         title = aweme_item.get("title", aweme_item.get("desc", aweme_id))
         
@@ -265,24 +277,63 @@ class DouyinStoreVideo:
         folder_name = self._sanitize_filename(title)
         if not folder_name:
             folder_name = aweme_id
+        return os.path.join(self.store_path, folder_name)
+
+    async def _save_aweme_json(self, aweme_dir: str, aweme_item: Dict) -> str:
+        """
+        保存作品json数据
         
-        # 创建以作品标题命名的子目录
-        aweme_dir = os.path.join(self.store_path, folder_name)
+        Args:
+            aweme_dir: 作品目录
+            aweme_item: 抖音作品完整信息
+            
+        Returns:
+            str: json文件路径
+        """
         pathlib.Path(aweme_dir).mkdir(parents=True, exist_ok=True)
+        json_file_path = os.path.join(aweme_dir, f"{aweme_item.get('aweme_id')}.json")
+        async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
+            await f.write(json_codec.dumps(aweme_item, ensure_ascii=False, indent=2))
+        return json_file_path
+    
+    async def store_video(self, video_item: Dict):
+        """
+        保存抖音视频到本地
         
-        # 保存视频文件
-        file_path = os.path.join(aweme_dir, extension_file_name)
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(video_content)
+        Args:
+            video_item: 视频信息字典
+        """
+        aweme_item = video_item.get("aweme_item")
+        video_content = video_item.get("video_content")
+        extension_file_name = video_item.get("extension_file_name")
+        aweme_dir = self._make_aweme_dir(aweme_item)
         
-        # 保存作品json数据
-        json_file_path = os.path.join(aweme_dir, f"{aweme_id}.json")
-        async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(aweme_item, ensure_ascii=False, indent=2))
+        # 保存视频文件, 相同内容只保存一份
+        file_path = os.path.join(aweme_dir, extension_file_name)
+        await get_media_store().save(file_path, video_content, url=video_item.get("url", ""))
+        json_file_path = await self._save_aweme_json(aweme_dir, aweme_item)
         
         utils.logger.info(f"[DouyinStoreVideo.store_video] 视频已保存: {file_path}")
         utils.logger.info(f"[DouyinStoreVideo.store_video] JSON已保存: {json_file_path}")
 
+    async def link_video(self, aweme_item: Dict, url: str, extension_file_name: str) -> bool:
+        """
+        视频URL之前下载过时直接链接到作品目录, 并保存作品json数据
+        
+        Args:
+            aweme_item: 抖音作品完整信息
+            url: 视频URL
+            extension_file_name: 文件名
+            
+        Returns:
+            bool: 是否已链接, 为False时需要下载
+        """
+        aweme_dir = self._make_aweme_dir(aweme_item)
+        if not await get_media_store().link_url(url, os.path.join(aweme_dir, extension_file_name)):
+            return False
+        await self._save_aweme_json(aweme_dir, aweme_item)
+        return True
+
 
 class DouyinStoreImageForLove:
     """
@@ -324,19 +375,18 @@ class DouyinStoreImageForLove:
             filename = filename[:80]
         
         return filename.strip(' _')
-    
-    async def store_image(self, image_item: Dict):
+
+    def _make_aweme_dir(self, aweme_id: str, aweme_item: Dict = None) -> str:
         """
-        保存抖音点赞图片到本地love目录
+        以作品标题命名的子目录, 没有作品信息时使用aweme_id
         
         Args:
-            image_item: 图片信息字典
+            aweme_id: 抖音视频ID
+            aweme_item: 抖音作品完整信息（可选）
+            
+        Returns:
+            str: 目录路径
         """
-        aweme_id = image_item.get("aweme_id")
-        pic_content = image_item.get("pic_content")
-        extension_file_name = image_item.get("extension_file_name")
-        aweme_item = image_item.get("aweme_item")
-        
         # 获取作品标题作为文件夹名
         title = aweme_item.get("title", aweme_item.get("desc", aweme_id)) if aweme_item else aweme_id
         
@@ -344,26 +394,68 @@ class DouyinStoreImageForLove:
         folder_name = self._sanitize_filename(title)
         if not folder_name:
             folder_name = aweme_id
+        return os.path.join(self.store_path, folder_name)
+
+    async def _save_aweme_json(self, aweme_dir: str, aweme_id: str, aweme_item: Dict = None):
+        """
+        保存作品json数据（如果有aweme_item信息）
         
-        # 创建以作品标题命名的子目录
-        aweme_dir = os.path.join(self.store_path, folder_name)
-        pathlib.Path(aweme_dir).mkdir(parents=True, exist_ok=True)
+        Args:
+            aweme_dir: 作品目录
+            aweme_id: 抖音视频ID
+            aweme_item: 抖音作品完整信息（可选）
+        """
+        if not aweme_item:
+            return
+        json_file_path = os.path.join(aweme_dir, f"{aweme_id}.json")
+        # 检查JSON文件是否已存在，避免重复保存
+        if not os.path.exists(json_file_path):
+            async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
+                await f.write(json_codec.dumps(aweme_item, ensure_ascii=False, indent=2))
+            utils.logger.info(f"[DouyinStoreImageForLove.store_image] 点赞JSON已保存: {json_file_path}")
+    
+    async def store_image(self, image_item: Dict) -> Dict:
+        """
+        保存抖音点赞图片到本地love目录
         
-        # 保存图片文件
+        Args:
+            image_item: 图片信息字典
+            
+        Returns:
+            Dict: 媒体存储的清单记录
+        """
+        aweme_id = image_item.get("aweme_id")
+        pic_content = image_item.get("pic_content")
+        extension_file_name = image_item.get("extension_file_name")
+        aweme_item = image_item.get("aweme_item")
+        
+        # 保存到以作品标题命名的子目录, 相同内容只保存一份
+        aweme_dir = self._make_aweme_dir(aweme_id, aweme_item)
         file_path = os.path.join(aweme_dir, extension_file_name)
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(pic_content)
-        
-        # 保存作品json数据（如果有aweme_item信息）
-        if aweme_item:
-            json_file_path = os.path.join(aweme_dir, f"{aweme_id}.json")
-            # 检查JSON文件是否已存在，避免重复保存
-            if not os.path.exists(json_file_path):
-                async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
-                    await f.write(json.dumps(aweme_item, ensure_ascii=False, indent=2))
-                utils.logger.info(f"[DouyinStoreImageForLove.store_image] 点赞JSON已保存: {json_file_path}")
+        entry = await get_media_store().save(file_path, pic_content, url=image_item.get("url", ""))
+        await self._save_aweme_json(aweme_dir, aweme_id, aweme_item)
         
         utils.logger.info(f"[DouyinStoreImageForLove.store_image] 点赞图片已保存: {file_path}")
+        return entry
+
+    async def link_image(self, aweme_id: str, url: str, extension_file_name: str, aweme_item: Dict = None) -> bool:
+        """
+        图片URL之前下载过时直接链接到love目录
+        
+        Args:
+            aweme_id: 抖音视频ID
+            url: 图片URL
+            extension_file_name: 文件名
+            aweme_item: 抖音作品完整信息（可选）
+            
+        Returns:
+            bool: 是否已链接, 为False时需要下载
+        """
+        aweme_dir = self._make_aweme_dir(aweme_id, aweme_item)
+        if not await get_media_store().link_url(url, os.path.join(aweme_dir, extension_file_name)):
+            return False
+        await self._save_aweme_json(aweme_dir, aweme_id, aweme_item)
+        return True
 
 
 class DouyinStoreVideoForLove:
@@ -407,17 +499,16 @@ class DouyinStoreVideoForLove:
         
         return filename.strip(' _')
     
-    async def store_video(self, video_item: Dict):
+    def _make_aweme_dir(self, aweme_item: Dict) -> str:
         """
-        保存抖音点赞视频到本地love目录
+        以作品标题命名的子目录
         
         Args:
-            video_item: 视频信息字典
+            aweme_item: 抖音作品完整信息
+            
+        Returns:
+            str: 目录路径
         """
-        aweme_item = video_item.get("aweme_item")
-        video_content = video_item.get("video_content")
-        extension_file_name = video_item.get("extension_file_name")
-        
         aweme_id = aweme_item.get("aweme_id")
         title = aweme_item.get("title", aweme_item.get("desc", aweme_id))
         
@@ -425,31 +516,69 @@ class DouyinStoreVideoForLove:
         folder_name = self._sanitize_filename(title)
         if not folder_name:
             folder_name = aweme_id
+        return os.path.join(self.store_path, folder_name)
+
+    async def _save_aweme_json(self, aweme_dir: str, aweme_item: Dict) -> str:
+        """
+        保存作品json数据
         
-        # 创建以作品标题命名的子目录
-        aweme_dir = os.path.join(self.store_path, folder_name)
+        Args:
+            aweme_dir: 作品目录
+            aweme_item: 抖音作品完整信息
+            
+        Returns:
+            str: json文件路径
+        """
         pathlib.Path(aweme_dir).mkdir(parents=True, exist_ok=True)
+        json_file_path = os.path.join(aweme_dir, f"{aweme_item.get('aweme_id')}.json")
+        async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
+            await f.write(json_codec.dumps(aweme_item, ensure_ascii=False, indent=2))
+        return json_file_path
+    
+    async def store_video(self, video_item: Dict):
+        """
+        保存抖音点赞视频到本地love目录
         
-        # 保存视频文件
-        file_path = os.path.join(aweme_dir, extension_file_name)
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(video_content)
+        Args:
+            video_item: 视频信息字典
+        """
+        aweme_item = video_item.get("aweme_item")
+        video_content = video_item.get("video_content")
+        extension_file_name = video_item.get("extension_file_name")
+        aweme_dir = self._make_aweme_dir(aweme_item)
         
-        # 保存作品json数据
-        json_file_path = os.path.join(aweme_dir, f"{aweme_id}.json")
-        async with aiofiles.open(json_file_path, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(aweme_item, ensure_ascii=False, indent=2))
+        # 保存视频文件, 相同内容只保存一份
+        file_path = os.path.join(aweme_dir, extension_file_name)
+        await get_media_store().save(file_path, video_content, url=video_item.get("url", ""))
+        json_file_path = await self._save_aweme_json(aweme_dir, aweme_item)
         
         utils.logger.info(f"[DouyinStoreVideoForLove.store_video] 点赞视频已保存: {file_path}")
         utils.logger.info(f"[DouyinStoreVideoForLove.store_video] 点赞JSON已保存: {json_file_path}")
 
+    async def link_video(self, aweme_item: Dict, url: str, extension_file_name: str) -> bool:
+        """
+        视频URL之前下载过时直接链接到作品目录, 并保存作品json数据
+        
+        Args:
+            aweme_item: 抖音作品完整信息
+            url: 视频URL
+            extension_file_name: 文件名
+            
+        Returns:
+            bool: 是否已链接, 为False时需要下载
+        """
+        aweme_dir = self._make_aweme_dir(aweme_item)
+        if not await get_media_store().link_url(url, os.path.join(aweme_dir, extension_file_name)):
+            return False
+        await self._save_aweme_json(aweme_dir, aweme_item)
+        return True
+
 class DouyinJsonStoreImplement(AbstractStore):
     json_store_path: str = "data/douyin/json"
     words_store_path: str = "data/douyin/words"
 
     lock = asyncio.Lock()
     file_count: int = calculate_number_of_files(json_store_path)
-    WordCloud = words.AsyncWordCloudGenerator()
 
     def make_save_file_name(self, store_type: str) -> (str,str):
         """
@@ -483,15 +612,15 @@ class DouyinJsonStoreImplement(AbstractStore):
         async with self.lock:
             if os.path.exists(save_file_name):
                 async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
+                    save_data = json_codec.loads(await file.read())
 
             save_data.append(save_item)
             async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
+                await file.write(json_codec.dumps(save_data, ensure_ascii=False))
 
             if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
                 try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
+                    await words.get_word_cloud_generator().generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
                 except:
                     pass
 
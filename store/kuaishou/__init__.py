@@ -16,6 +16,7 @@
 from typing import List
 
 import config
+from metrics.crawler_metrics import StoreTimer
 from var import source_keyword_var
 
 from .kuaishou_store_impl import *
@@ -63,7 +64,8 @@ async def update_kuaishou_video(video_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_kuaishou_video] Kuaishou video id:{video_id}, title:{save_content_item.get('title')}")
-    await KuaishouStoreFactory.create_store().store_content(content_item=save_content_item)
+    with StoreTimer("ks", "contents"):
+        await KuaishouStoreFactory.create_store().store_content(content_item=save_content_item)
 
 
 async def batch_update_ks_video_comments(video_id: str, comments: List[Dict]):
@@ -89,7 +91,8 @@ async def update_ks_video_comment(video_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_ks_video_comment] Kuaishou video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    with StoreTimer("ks", "comments"):
+        await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 async def save_creator(user_id: str, creator: Dict):
     ownerCount = creator.get('ownerCount', {})
@@ -108,4 +111,5 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.kuaishou.save_creator] creator:{local_db_item}")
-    await KuaishouStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
+    with StoreTimer("ks", "creators"):
+        await KuaishouStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
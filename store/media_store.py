@@ -0,0 +1,357 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按内容寻址的媒体文件存储: 相同内容只保存一份, 笔记目录中的文件链接到它,
+#             并记录URL对应的内容和缓存校验信息(ETag、Last-Modified)
+
+import asyncio
+import hashlib
+import os
+import pathlib
+import shutil
+import threading
+from typing import Dict, List, Optional, Union
+
+import config
+from tools import json_codec, utils
+
+LINK_MODES = ("hardlink", "symlink", "copy", "off")
+# 加载清单时过期的行(同一路径、同一URL已有更新的记录)超过该数量并且多于有效行时, 重写清单只保留有效行
+MANIFEST_COMPACT_THRESHOLD = 10000
+
+
+class MediaContent(bytes):
+    """
+    下载到的媒体内容, 附带响应中的缓存校验信息, 保存时一起记录到清单中
+    """
+    etag: str = ""
+    last_modified: str = ""
+
+    @classmethod
+    def from_response(cls, content: bytes, headers: Dict[str, str]) -> "MediaContent":
+        media_content = cls(content)
+        media_content.etag = headers.get("etag", "")
+        media_content.last_modified = headers.get("last-modified", "")
+        return media_content
+
+
+class MediaFile:
+    def __init__(self, path: str, size: int, etag: str = "", last_modified: str = ""):
+        """
+        已下载到临时文件的媒体内容(例如分段下载的大视频), 保存时移动到存储目录, 不读入内存
+        :param path: 临时文件路径
+        :param size: 文件大小
+        :param etag:
+        :param last_modified:
+        """
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class MediaLink:
+    def __init__(self, url: str, size: int):
+        """
+        条件请求返回304, 服务端确认URL已保存的内容没有变化, 保存时直接链接已有内容, 不读取文件
+        :param url: 媒体存储中记录的地址
+        :param size: 已保存的文件大小
+        """
+        self.url = url
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class MediaStore:
+    def __init__(self, root_dir: str = "", link_mode: str = "", revalidate: Optional[bool] = None):
+        """
+        文件按 sha256 保存在 {root_dir}/blobs 下, 保存到笔记目录的文件是指向它的硬链接/软链接,
+        每次保存都追加一行到 {root_dir}/manifest.jsonl(路径、URL、sha256、大小、ETag、Last-Modified),
+        启动时从中恢复URL索引, 过期的行过多时压缩清单
+        :param root_dir: 存储目录, 默认 config.MEDIA_STORE_DIR
+        :param link_mode: hardlink | symlink | copy | off, 默认 config.MEDIA_STORE_LINK_MODE
+        :param revalidate: 已下载过的URL是否需要用条件请求确认没有变化, 默认 config.MEDIA_REVALIDATE
+        """
+        self.root_dir = root_dir or config.MEDIA_STORE_DIR
+        self.link_mode = link_mode or config.MEDIA_STORE_LINK_MODE
+        self.revalidate = config.MEDIA_REVALIDATE if revalidate is None else revalidate
+        if self.link_mode not in LINK_MODES:
+            raise ValueError(f"invalid media store link mode: {self.link_mode}, expected one of {' | '.join(LINK_MODES)}")
+        self.blob_dir = os.path.join(self.root_dir, "blobs")
+        self.manifest_path = os.path.join(self.root_dir, "manifest.jsonl")
+        # 分段下载的临时文件, 和 blobs 在同一个磁盘上, 保存时直接移动
+        self.tmp_dir = os.path.join(self.root_dir, "tmp")
+        # 由原文件生成的文件(缩略图、重新压缩的图片), 按原文件的 sha256 保存
+        self.derived_dir = os.path.join(self.root_dir, "derived")
+        self._url_index: Optional[Dict[str, Dict]] = None
+        # 文件操作都在线程池中执行, 用线程锁保护索引和清单文件
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.link_mode != "off"
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def derived_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.derived_dir, digest[:2], f"{digest}_{suffix}")
+
+    def lookup_url(self, url: str) -> Optional[Dict]:
+        """
+        查询URL已保存的内容
+        :param url:
+        :return: 清单中的记录, 包含 sha256、size、path、url、etag、last_modified, 没有时返回 None
+        """
+        if not self.enabled or not url:
+            return None
+        with self._lock:
+            return self._load_url_index().get(url)
+
+    def lookup_valid_url(self, url: str) -> Optional[Dict]:
+        """
+        查询URL已保存并且文件还在、大小一致的记录, 文件无效时从索引中移除
+        :param url:
+        :return:
+        """
+        entry = self.lookup_url(url)
+        if entry is None:
+            return None
+        if not self._is_valid_blob(self.blob_path(entry["sha256"]), entry["size"]):
+            with self._lock:
+                self._load_url_index().pop(url, None)
+            return None
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        已保存过的URL的条件请求头, 服务端确认没有变化时返回304, 不用重新下载
+        :param url:
+        :return:
+        """
+        entry = self.lookup_valid_url(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def save(self, target_path: str, content: Union[bytes, MediaFile, MediaLink], url: str = "") -> Dict:
+        """
+        保存媒体内容到 target_path, 内容已存在时只创建链接
+        :param target_path: 笔记目录中的文件路径
+        :param content: 文件内容, 或已下载到临时文件的内容(保存后临时文件被移走或删除), 或304时已保存的内容
+        :param url: 文件的下载地址, 为空时不记录URL索引
+        :return: 清单记录
+        """
+        if isinstance(content, MediaLink):
+            save = self._save_link
+        elif isinstance(content, MediaFile):
+            save = self._save_file
+        else:
+            save = self._save
+        return await asyncio.get_running_loop().run_in_executor(None, save, target_path, content, url)
+
+    async def link_url(self, url: str, target_path: str) -> bool:
+        """
+        URL之前已经下载过并且内容还在时, 直接把 target_path 链接到已有内容, 不需要再下载,
+        需要用条件请求确认时(revalidate)总是返回 False, 由下载时处理
+        :param url:
+        :param target_path:
+        :return: 是否已链接
+        """
+        if self.revalidate or self.lookup_url(url) is None:
+            return False
+        entry = await asyncio.get_running_loop().run_in_executor(None, self._link_url, url, target_path)
+        return entry is not None
+
+    async def link_file(self, source_path: str, target_path: str) -> None:
+        """
+        按 link_mode 把存储目录中的文件(例如 derived_path)链接到 target_path
+        :param source_path:
+        :param target_path:
+        :return:
+        """
+        pathlib.Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.get_running_loop().run_in_executor(None, self._link, source_path, target_path)
+
+    async def record(self, entry: Dict) -> None:
+        """
+        追加一条记录到清单, 例如补充图片尺寸
+        :param entry: 清单记录, 至少包含 path、url
+        :return:
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._append_manifest, entry)
+
+    def _load_url_index(self) -> Dict[str, Dict]:
+        if self._url_index is not None:
+            return self._url_index
+        self._url_index = {}
+        if not os.path.exists(self.manifest_path):
+            return self._url_index
+        entries, line_count = [], 0
+        with open(self.manifest_path, "rb") as f:
+            for line in f:
+                line_count += 1
+                try:
+                    entries.append(json_codec.loads(line))
+                except ValueError:
+                    # 进程中途退出时最后一行可能不完整
+                    continue
+        # 每个路径、每个URL只有最新的一条记录有效
+        latest_by_path, latest_by_url = {}, {}
+        for index, entry in enumerate(entries):
+            latest_by_path[entry.get("path")] = index
+            if entry.get("url"):
+                latest_by_url[entry["url"]] = index
+                self._url_index[entry["url"]] = entry
+        live_indexes = set(latest_by_path.values()) | set(latest_by_url.values())
+        stale_count = line_count - len(live_indexes)
+        if stale_count > MANIFEST_COMPACT_THRESHOLD and stale_count > len(live_indexes):
+            self._compact_manifest([entry for index, entry in enumerate(entries) if index in live_indexes], stale_count)
+        return self._url_index
+
+    def _compact_manifest(self, entries: List[Dict], stale_count: int) -> None:
+        """
+        只保留有效记录重写清单, 先写临时文件再替换, 中途退出不会损坏原清单
+        :param entries: 按原顺序排列的有效记录
+        :param stale_count: 丢弃的行数
+        :return:
+        """
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json_codec.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.manifest_path)
+        utils.logger.info(f"[MediaStore._compact_manifest] removed {stale_count} stale lines from {self.manifest_path}, "
+                          f"{len(entries)} lines kept")
+
+    def _save(self, target_path: str, content: bytes, url: str) -> Dict:
+        entry = {
+            "path": target_path, "url": url, "sha256": hashlib.sha256(content).hexdigest(), "size": len(content),
+            "etag": getattr(content, "etag", ""), "last_modified": getattr(content, "last_modified", ""),
+        }
+        pathlib.Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+        if not self.enabled:
+            self._write_file(target_path, content)
+            return entry
+        blob_path = self.blob_path(entry["sha256"])
+        if not self._is_valid_blob(blob_path, entry["size"]):
+            pathlib.Path(blob_path).parent.mkdir(parents=True, exist_ok=True)
+            self._write_file(blob_path, content)
+        self._link(blob_path, target_path)
+        self._append_manifest(entry)
+        return entry
+
+    def _save_file(self, target_path: str, media_file: MediaFile, url: str) -> Dict:
+        entry = {
+            "path": target_path, "url": url, "sha256": self._hash_file(media_file.path), "size": media_file.size,
+            "etag": media_file.etag, "last_modified": media_file.last_modified,
+        }
+        pathlib.Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+        if not self.enabled:
+            shutil.move(media_file.path, target_path)
+            return entry
+        blob_path = self.blob_path(entry["sha256"])
+        if self._is_valid_blob(blob_path, entry["size"]):
+            os.remove(media_file.path)
+        else:
+            pathlib.Path(blob_path).parent.mkdir(parents=True, exist_ok=True)
+            os.replace(media_file.path, blob_path)
+        self._link(blob_path, target_path)
+        self._append_manifest(entry)
+        return entry
+
+    def _save_link(self, target_path: str, media_link: MediaLink, url: str) -> Dict:
+        entry = self._link_url(media_link.url, target_path)
+        if entry is None:
+            raise FileNotFoundError(f"saved content of {media_link.url} is missing")
+        return entry
+
+    def _link_url(self, url: str, target_path: str) -> Optional[Dict]:
+        entry = self.lookup_valid_url(url)
+        if entry is None:
+            return None
+        pathlib.Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+        self._link(self.blob_path(entry["sha256"]), target_path)
+        entry = {**entry, "path": target_path}
+        self._append_manifest(entry)
+        return entry
+
+    @staticmethod
+    def _is_valid_blob(blob_path: str, size: int) -> bool:
+        try:
+            return os.path.getsize(blob_path) == size
+        except OSError:
+            return False
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _write_file(path: str, content: bytes) -> None:
+        # 先写临时文件再替换, 中途退出不会留下不完整的文件
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _link(self, blob_path: str, target_path: str) -> None:
+        if os.path.exists(target_path) and os.path.samefile(blob_path, target_path):
+            return
+        tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.link_mode == "hardlink":
+            try:
+                os.link(blob_path, tmp_path)
+            except OSError as e:
+                utils.logger.warning(f"[MediaStore._link] hardlink {target_path} failed, fallback to copy: {e}")
+                shutil.copyfile(blob_path, tmp_path)
+        elif self.link_mode == "symlink":
+            os.symlink(os.path.relpath(blob_path, os.path.dirname(target_path) or "."), tmp_path)
+        else:
+            shutil.copyfile(blob_path, tmp_path)
+        os.replace(tmp_path, target_path)
+
+    def _append_manifest(self, entry: Dict) -> None:
+        with self._lock:
+            pathlib.Path(self.root_dir).mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(json_codec.dumps(entry, ensure_ascii=False) + "\n")
+            if entry["url"]:
+                self._load_url_index()[entry["url"]] = entry
+
+
+_media_stores: Dict[tuple, MediaStore] = {}
+
+
+def get_media_store() -> MediaStore:
+    """
+    获取按当前配置共享的媒体存储, 同一个存储目录共用一个URL索引
+    :return:
+    """
+    key = (config.MEDIA_STORE_DIR, config.MEDIA_STORE_LINK_MODE, config.MEDIA_REVALIDATE)
+    if key not in _media_stores:
+        _media_stores[key] = MediaStore(*key)
+    return _media_stores[key]
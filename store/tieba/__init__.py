@@ -12,6 +12,7 @@
 # -*- coding: utf-8 -*-
 from typing import List
 
+from metrics.crawler_metrics import StoreTimer
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from var import source_keyword_var
 
@@ -65,7 +66,8 @@ async def update_tieba_note(note_item: TiebaNote):
     save_note_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note] tieba note: {save_note_item}")
 
-    await TieBaStoreFactory.create_store().store_content(save_note_item)
+    with StoreTimer("tieba", "contents"):
+        await TieBaStoreFactory.create_store().store_content(save_note_item)
 
 
 async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaComment]):
@@ -97,7 +99,8 @@ async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
     save_comment_item = comment_item.model_dump()
     save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
-    await TieBaStoreFactory.create_store().store_comment(save_comment_item)
+    with StoreTimer("tieba", "comments"):
+        await TieBaStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(user_info: TiebaCreator):
@@ -112,4 +115,5 @@ async def save_creator(user_info: TiebaCreator):
     local_db_item = user_info.model_dump()
     local_db_item["last_modify_ts"] = utils.get_current_timestamp()
     utils.logger.info(f"[store.tieba.save_creator] creator:{local_db_item}")
-    await TieBaStoreFactory.create_store().store_creator(local_db_item)
+    with StoreTimer("tieba", "creators"):
+        await TieBaStoreFactory.create_store().store_creator(local_db_item)
@@ -12,7 +12,6 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import csv
-import json
 import os
 import pathlib
 from typing import Dict
@@ -21,7 +20,7 @@ import aiofiles
 
 import config
 from base.base_crawler import AbstractStore
-from tools import utils, words
+from tools import json_codec, utils, words
 from var import crawler_type_var
 
 
@@ -175,7 +174,6 @@ class TieBaJsonStoreImplement(AbstractStore):
     words_store_path: str = "data/tieba/words"
     lock = asyncio.Lock()
     file_count: int = calculate_number_of_files(json_store_path)
-    WordCloud = words.AsyncWordCloudGenerator()
 
     def make_save_file_name(self, store_type: str) -> (str, str):
         """
@@ -210,15 +208,15 @@ class TieBaJsonStoreImplement(AbstractStore):
         async with self.lock:
             if os.path.exists(save_file_name):
                 async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
+                    save_data = json_codec.loads(await file.read())
 
             save_data.append(save_item)
             async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
+                await file.write(json_codec.dumps(save_data, ensure_ascii=False))
 
             if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
                 try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
+                    await words.get_word_cloud_generator().generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
                 except:
                     pass
 
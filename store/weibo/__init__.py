@@ -17,6 +17,7 @@
 import re
 from typing import List
 
+from metrics.crawler_metrics import StoreTimer
 from var import source_keyword_var
 
 from .weibo_store_image import *
@@ -96,7 +97,8 @@ async def update_weibo_note(note_item: Dict):
     }
     utils.logger.info(
         f"[store.weibo.update_weibo_note] weibo note id:{note_id}, title:{save_content_item.get('content')[:24]} ...")
-    await WeibostoreFactory.create_store().store_content(content_item=save_content_item)
+    with StoreTimer("wb", "contents"):
+        await WeibostoreFactory.create_store().store_content(content_item=save_content_item)
 
 
 async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
@@ -152,22 +154,39 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.weibo.update_weibo_note_comment] Weibo note comment: {comment_id}, content: {save_comment_item.get('content', '')[:24]} ...")
-    await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    with StoreTimer("wb", "comments"):
+        await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
 
 
-async def update_weibo_note_image(picid: str, pic_content, extension_file_name):
+async def update_weibo_note_image(picid: str, pic_content, extension_file_name, url: str = ""):
     """
     Save weibo note image to local
     Args:
         picid:
         pic_content:
         extension_file_name:
+        url: image url, recorded so the same url is not downloaded again
 
     Returns:
+        media store manifest entry of the saved file
+    """
+    return await WeiboStoreImage().store_image(
+        {"pic_id": picid, "pic_content": pic_content, "extension_file_name": extension_file_name, "url": url})
+
+
+async def link_weibo_note_image(picid: str, url: str, extension_file_name) -> bool:
+    """
+    Link an already downloaded image url to local
+    Args:
+        picid:
+        url:
+        extension_file_name:
+
+    Returns:
+        whether the url was downloaded before and linked, download it when False
 
     """
-    await WeiboStoreImage().store_image(
-        {"pic_id": picid, "pic_content": pic_content, "extension_file_name": extension_file_name})
+    return await WeiboStoreImage().link_image(picid, url, extension_file_name)
 
 
 async def save_creator(user_id: str, user_info: Dict):
@@ -193,4 +212,5 @@ async def save_creator(user_id: str, user_info: Dict):
         "last_modify_ts": utils.get_current_timestamp(),
     }
     utils.logger.info(f"[store.weibo.save_creator] creator:{local_db_item}")
-    await WeibostoreFactory.create_store().store_creator(local_db_item)
+    with StoreTimer("wb", "creators"):
+        await WeibostoreFactory.create_store().store_creator(local_db_item)
@@ -13,9 +13,11 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:34
 # @Desc    :
+import json
 from typing import List
 
 import config
+from metrics.crawler_metrics import StoreTimer
 from var import source_keyword_var
 
 from . import xhs_store_impl
@@ -111,7 +113,8 @@ async def update_xhs_note(note_item: Dict):
         "xsec_token": note_item.get("xsec_token"), # xsec_token
     }
     utils.logger.info(f"[store.xhs.update_xhs_note] xhs note: {local_db_item}")
-    await XhsStoreFactory.create_store().store_content(local_db_item)
+    with StoreTimer("xhs", "contents"):
+        await XhsStoreFactory.create_store().store_content(local_db_item)
 
 
 async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
@@ -160,7 +163,8 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
         "like_count": comment_item.get("like_count", 0),
     }
     utils.logger.info(f"[store.xhs.update_xhs_note_comment] xhs note comment:{local_db_item}")
-    await XhsStoreFactory.create_store().store_comment(local_db_item)
+    with StoreTimer("xhs", "comments"):
+        await XhsStoreFactory.create_store().store_comment(local_db_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -209,20 +213,38 @@ async def save_creator(user_id: str, creator: Dict):
         "last_modify_ts": utils.get_current_timestamp(), # 最后更新时间戳（MediaCrawler程序生成的，主要用途在db存储的时候记录一条记录最新更新时间）
     }
     utils.logger.info(f"[store.xhs.save_creator] creator:{local_db_item}")
-    await XhsStoreFactory.create_store().store_creator(local_db_item)
+    with StoreTimer("xhs", "creators"):
+        await XhsStoreFactory.create_store().store_creator(local_db_item)
 
 
-async def update_xhs_note_image(note_id, pic_content, extension_file_name):
+async def update_xhs_note_image(note_id, pic_content, extension_file_name, url: str = ""):
     """
     更新小红书笔
     Args:
         note_id:
         pic_content:
         extension_file_name:
+        url: 图片/视频的下载地址, 记录后同一地址不再重复下载
 
     Returns:
+        媒体存储的清单记录
 
     """
 
-    await XiaoHongShuImage().store_image(
-        {"notice_id": note_id, "pic_content": pic_content, "extension_file_name": extension_file_name})
+    return await XiaoHongShuImage().store_image(
+        {"notice_id": note_id, "pic_content": pic_content, "extension_file_name": extension_file_name, "url": url})
+
+
+async def link_xhs_note_image(note_id, url, extension_file_name) -> bool:
+    """
+    图片/视频地址之前下载过时直接链接到笔记目录
+    Args:
+        note_id:
+        url:
+        extension_file_name:
+
+    Returns:
+        是否已链接, 为False时需要下载
+
+    """
+    return await XiaoHongShuImage().link_image(note_id, url, extension_file_name)
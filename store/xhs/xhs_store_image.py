@@ -13,29 +13,27 @@
 # @Author  : helloteemo
 # @Time    : 2024/7/11 22:35
 # @Desc    : 小红书图片保存
-import pathlib
 from typing import Dict
 
-import aiofiles
-
 from base.base_crawler import AbstractStoreImage
+from store.media_store import get_media_store
 from tools import utils
 
 
 class XiaoHongShuImage(AbstractStoreImage):
     image_store_path: str = "data/xhs/images"
 
-    async def store_image(self, image_content_item: Dict):
+    async def store_image(self, image_content_item: Dict) -> Dict:
         """
         store content
         Args:
             content_item:
 
         Returns:
-
+            media store manifest entry of the saved file
         """
-        await self.save_image(image_content_item.get("notice_id"), image_content_item.get("pic_content"),
-                              image_content_item.get("extension_file_name"))
+        return await self.save_image(image_content_item.get("notice_id"), image_content_item.get("pic_content"),
+                              image_content_item.get("extension_file_name"), image_content_item.get("url", ""))
 
     def make_save_file_name(self, notice_id: str, extension_file_name: str) -> str:
         """
@@ -49,18 +47,30 @@ class XiaoHongShuImage(AbstractStoreImage):
         """
         return f"{self.image_store_path}/{notice_id}/{extension_file_name}"
 
-    async def save_image(self, notice_id: str, pic_content: str, extension_file_name="jpg"):
+    async def save_image(self, notice_id: str, pic_content: str, extension_file_name="jpg", url: str = "") -> Dict:
         """
         save image to local
         Args:
             notice_id: notice id
             pic_content: image content
+            url: image url, recorded so the same url is not downloaded again
 
         Returns:
-
+            media store manifest entry of the saved file
         """
-        pathlib.Path(self.image_store_path + "/" + notice_id).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(notice_id, extension_file_name)
-        async with aiofiles.open(save_file_name, 'wb') as f:
-            await f.write(pic_content)
-            utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        entry = await get_media_store().save(save_file_name, pic_content, url=url)
+        utils.logger.info(f"[XiaoHongShuImageStoreImplement.save_image] save image {save_file_name} success ...")
+        return entry
+
+    async def link_image(self, notice_id: str, url: str, extension_file_name="jpg") -> bool:
+        """
+        link an already downloaded url to the note directory
+        Args:
+            notice_id: notice id
+            url: image url
+
+        Returns:
+            whether the url was downloaded before and linked
+        """
+        return await get_media_store().link_url(url, self.make_save_file_name(notice_id, extension_file_name))
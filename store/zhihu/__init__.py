@@ -14,6 +14,7 @@ from typing import List
 
 import config
 from base.base_crawler import AbstractStore
+from metrics.crawler_metrics import StoreTimer
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from store.zhihu.zhihu_store_impl import (ZhihuCsvStoreImplement,
                                           ZhihuDbStoreImplement,
@@ -66,7 +67,8 @@ async def update_zhihu_content(content_item: ZhihuContent):
     local_db_item = content_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_content] zhihu content: {local_db_item}")
-    await ZhihuStoreFactory.create_store().store_content(local_db_item)
+    with StoreTimer("zhihu", "contents"):
+        await ZhihuStoreFactory.create_store().store_content(local_db_item)
 
 
 
@@ -98,7 +100,8 @@ async def update_zhihu_content_comment(comment_item: ZhihuComment):
     local_db_item = comment_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_note_comment] zhihu content comment:{local_db_item}")
-    await ZhihuStoreFactory.create_store().store_comment(local_db_item)
+    with StoreTimer("zhihu", "comments"):
+        await ZhihuStoreFactory.create_store().store_comment(local_db_item)
 
 
 async def save_creator(creator: ZhihuCreator):
@@ -114,4 +117,5 @@ async def save_creator(creator: ZhihuCreator):
         return
     local_db_item = creator.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
-    await ZhihuStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
+    with StoreTimer("zhihu", "creators"):
+        await ZhihuStoreFactory.create_store().store_creator(local_db_item)
\ No newline at end of file
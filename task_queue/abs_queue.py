@@ -0,0 +1,91 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列抽象类
+
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from .types import CrawlTask
+
+
+class AbstractTaskQueue(ABC):
+
+    @abstractmethod
+    async def put(self, tasks: List[CrawlTask]) -> None:
+        """
+        任务入队
+        :param tasks: 任务列表
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pull(self, count: int, lease_sec: int) -> List[CrawlTask]:
+        """
+        拉取任务并加上租约, 租约到期前未确认的任务会被重新入队
+        :param count: 最多拉取的任务数量
+        :param lease_sec: 租约时长(秒)
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ack(self, task_ids: List[str]) -> None:
+        """
+        确认任务已完成, 从队列中删除
+        :param task_ids:
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def nack(self, task_ids: List[str]) -> None:
+        """
+        任务执行失败, 立即重新入队
+        :param task_ids:
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def extend_lease(self, task_ids: List[str], lease_sec: int) -> None:
+        """
+        为执行中的任务续租
+        :param task_ids:
+        :param lease_sec: 从当前时间起的租约时长(秒)
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def requeue_expired(self) -> int:
+        """
+        把租约已过期的任务重新入队(例如执行该任务的worker崩溃了)
+        :return: 重新入队的任务数量
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]:
+        """
+        获取队列中等待执行(pending)和执行中(processing)的任务数量
+        :return:
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """
+        关闭队列连接
+        :return:
+        """
+        pass
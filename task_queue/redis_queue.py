@@ -0,0 +1,125 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于Redis的任务队列实现, 用于多台机器共享同一个任务队列
+#            pending: 等待执行的任务ID列表, processing: 执行中的任务ID有序集合(score为租约到期时间),
+#            tasks: 任务ID到任务内容的哈希表
+
+import time
+from typing import Dict, List
+
+from redis.asyncio import Redis
+
+from config import db_config
+
+from .abs_queue import AbstractTaskQueue
+from .types import CrawlTask
+
+# 原子地弹出任务并加上租约, 避免worker在两步操作之间崩溃导致任务丢失
+PULL_SCRIPT = """
+local payloads = {}
+for i = 1, tonumber(ARGV[1]) do
+    local task_id = redis.call('RPOP', KEYS[1])
+    if not task_id then
+        break
+    end
+    local payload = redis.call('HGET', KEYS[3], task_id)
+    if payload then
+        redis.call('ZADD', KEYS[2], ARGV[2], task_id)
+        table.insert(payloads, payload)
+    else
+        -- 任务已经确认完成(租约过期放回队列后才收到ack), 丢弃这个ID, 不再加租约
+        redis.call('ZREM', KEYS[2], task_id)
+    end
+end
+return payloads
+"""
+
+# 把租约过期的任务放回队列头部, 优先重新执行
+REQUEUE_SCRIPT = """
+local task_ids = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, task_id in ipairs(task_ids) do
+    redis.call('ZREM', KEYS[2], task_id)
+    redis.call('RPUSH', KEYS[1], task_id)
+end
+return #task_ids
+"""
+
+
+class RedisTaskQueue(AbstractTaskQueue):
+
+    def __init__(self, queue_name: str):
+        """
+        初始化Redis任务队列
+        :param queue_name: 队列名称
+        """
+        self._redis_client = Redis(
+            host=db_config.REDIS_DB_HOST,
+            port=db_config.REDIS_DB_PORT,
+            db=db_config.REDIS_DB_NUM,
+            password=db_config.REDIS_DB_PWD,
+        )
+        key_prefix = f"mediacrawler:task_queue:{queue_name}"
+        self._pending_key = f"{key_prefix}:pending"
+        self._processing_key = f"{key_prefix}:processing"
+        self._tasks_key = f"{key_prefix}:tasks"
+        self._pull_script = self._redis_client.register_script(PULL_SCRIPT)
+        self._requeue_script = self._redis_client.register_script(REQUEUE_SCRIPT)
+
+    async def put(self, tasks: List[CrawlTask]) -> None:
+        if not tasks:
+            return
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._tasks_key, mapping={task.task_id: task.model_dump_json() for task in tasks})
+            pipe.lpush(self._pending_key, *[task.task_id for task in tasks])
+            await pipe.execute()
+
+    async def pull(self, count: int, lease_sec: int) -> List[CrawlTask]:
+        payloads = await self._pull_script(
+            keys=[self._pending_key, self._processing_key, self._tasks_key],
+            args=[count, time.time() + lease_sec],
+        )
+        return [CrawlTask.model_validate_json(payload) for payload in payloads]
+
+    async def ack(self, task_ids: List[str]) -> None:
+        if not task_ids:
+            return
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._processing_key, *task_ids)
+            pipe.hdel(self._tasks_key, *task_ids)
+            await pipe.execute()
+
+    async def nack(self, task_ids: List[str]) -> None:
+        if not task_ids:
+            return
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._processing_key, *task_ids)
+            pipe.rpush(self._pending_key, *task_ids)
+            await pipe.execute()
+
+    async def extend_lease(self, task_ids: List[str], lease_sec: int) -> None:
+        if not task_ids:
+            return
+        deadline = time.time() + lease_sec
+        await self._redis_client.zadd(self._processing_key, {task_id: deadline for task_id in task_ids}, xx=True)
+
+    async def requeue_expired(self) -> int:
+        return await self._requeue_script(keys=[self._pending_key, self._processing_key], args=[time.time()])
+
+    async def stats(self) -> Dict[str, int]:
+        return {
+            "pending": await self._redis_client.llen(self._pending_key),
+            "processing": await self._redis_client.zcard(self._processing_key),
+        }
+
+    async def close(self) -> None:
+        await self._redis_client.close()
@@ -0,0 +1,128 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于SQLite的任务队列实现, 适用于单机多进程和测试, db_path为 ":memory:" 时为纯内存队列
+
+import time
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+from .abs_queue import AbstractTaskQueue
+from .types import CrawlTask
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+
+
+class SqliteTaskQueue(AbstractTaskQueue):
+
+    def __init__(self, queue_name: str, db_path: str):
+        """
+        初始化SQLite任务队列
+        :param queue_name: 队列名称, 同一个数据库文件中可以存放多个队列
+        :param db_path: 数据库文件路径
+        """
+        self._queue_name = queue_name
+        self._db_path = db_path
+        self._conn: Optional[aiosqlite.Connection] = None
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """
+        获取数据库连接, 首次调用时建表
+        :return:
+        """
+        if self._conn is None:
+            # isolation_level=None 由我们自己控制事务, 拉取任务时需要 BEGIN IMMEDIATE 保证多进程互斥
+            self._conn = await aiosqlite.connect(self._db_path, isolation_level=None)
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS crawl_task ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                "task_id TEXT NOT NULL UNIQUE,"
+                "queue_name TEXT NOT NULL,"
+                "payload TEXT NOT NULL,"
+                "status TEXT NOT NULL,"
+                "lease_deadline REAL NOT NULL DEFAULT 0)"
+            )
+            await self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_crawl_task_queue_status ON crawl_task (queue_name, status)"
+            )
+        return self._conn
+
+    async def put(self, tasks: List[CrawlTask]) -> None:
+        conn = await self._get_conn()
+        await conn.executemany(
+            "INSERT OR IGNORE INTO crawl_task (task_id, queue_name, payload, status) VALUES (?, ?, ?, ?)",
+            [(task.task_id, self._queue_name, task.model_dump_json(), STATUS_PENDING) for task in tasks],
+        )
+
+    async def pull(self, count: int, lease_sec: int) -> List[CrawlTask]:
+        conn = await self._get_conn()
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            async with conn.execute(
+                    "SELECT task_id, payload FROM crawl_task WHERE queue_name = ? AND status = ? ORDER BY seq LIMIT ?",
+                    (self._queue_name, STATUS_PENDING, count),
+            ) as cursor:
+                rows = await cursor.fetchall()
+            await conn.executemany(
+                "UPDATE crawl_task SET status = ?, lease_deadline = ? WHERE task_id = ?",
+                [(STATUS_PROCESSING, time.time() + lease_sec, row[0]) for row in rows],
+            )
+            await conn.execute("COMMIT")
+        except Exception:
+            await conn.execute("ROLLBACK")
+            raise
+        return [CrawlTask.model_validate_json(row[1]) for row in rows]
+
+    async def ack(self, task_ids: List[str]) -> None:
+        conn = await self._get_conn()
+        await conn.executemany("DELETE FROM crawl_task WHERE task_id = ?", [(task_id,) for task_id in task_ids])
+
+    async def nack(self, task_ids: List[str]) -> None:
+        conn = await self._get_conn()
+        await conn.executemany(
+            "UPDATE crawl_task SET status = ?, lease_deadline = 0 WHERE task_id = ?",
+            [(STATUS_PENDING, task_id) for task_id in task_ids],
+        )
+
+    async def extend_lease(self, task_ids: List[str], lease_sec: int) -> None:
+        conn = await self._get_conn()
+        await conn.executemany(
+            "UPDATE crawl_task SET lease_deadline = ? WHERE task_id = ? AND status = ?",
+            [(time.time() + lease_sec, task_id, STATUS_PROCESSING) for task_id in task_ids],
+        )
+
+    async def requeue_expired(self) -> int:
+        conn = await self._get_conn()
+        async with conn.execute(
+                "UPDATE crawl_task SET status = ?, lease_deadline = 0 "
+                "WHERE queue_name = ? AND status = ? AND lease_deadline < ?",
+                (STATUS_PENDING, self._queue_name, STATUS_PROCESSING, time.time()),
+        ) as cursor:
+            return cursor.rowcount
+
+    async def stats(self) -> Dict[str, int]:
+        conn = await self._get_conn()
+        result = {STATUS_PENDING: 0, STATUS_PROCESSING: 0}
+        async with conn.execute(
+                "SELECT status, COUNT(*) FROM crawl_task WHERE queue_name = ? GROUP BY status",
+                (self._queue_name,),
+        ) as cursor:
+            for status, count in await cursor.fetchall():
+                result[status] = count
+        return result
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
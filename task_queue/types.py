@@ -0,0 +1,26 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列基础类型
+import uuid
+
+from pydantic import BaseModel, Field
+
+
+class CrawlTask(BaseModel):
+    """分布式任务队列中的一个爬取任务"""
+    task_id: str = Field(default_factory=lambda: uuid.uuid4().hex, title="任务ID")
+    platform: str = Field(title="平台")
+    crawler_type: str = Field(title="爬取类型")
+    config_name: str = Field(title="任务所属的配置项, 例如 KEYWORDS、XHS_CREATOR_ID_LIST")
+    target: str = Field(title="关键词/内容ID/创作者ID")
+    cursor: str = Field(default="", title="起始游标(搜索的起始页码)")
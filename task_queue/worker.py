@@ -0,0 +1,186 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列的生产者和worker, worker把拉取到的任务转换成会话配置后复用各平台爬虫执行
+
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import config
+from base.base_crawler import AbstractCrawler
+from base.session_pool import (CrawlerSession, CrawlerSessionPool,
+                               get_task_config_names, get_task_list,
+                               make_task_config_value)
+from tools import utils
+from var import crawler_session_var
+
+from .abs_queue import AbstractTaskQueue
+from .types import CrawlTask
+
+
+async def produce_tasks(task_queue: AbstractTaskQueue) -> List[CrawlTask]:
+    """
+    把当前平台和爬取类型配置的任务列表写入任务队列
+    :param task_queue:
+    :return: 入队的任务
+    """
+    task_config_names = get_task_config_names(config.PLATFORM, config.CRAWLER_TYPE)
+    if not task_config_names:
+        raise ValueError(f"crawler type {config.CRAWLER_TYPE} of {config.PLATFORM} can not be split into tasks")
+
+    cursor = str(config.START_PAGE) if config.CRAWLER_TYPE == "search" and config.START_PAGE != 1 else ""
+    tasks = []
+    for name in task_config_names:
+        for target in get_task_list(name):
+            tasks.append(CrawlTask(
+                platform=config.PLATFORM,
+                crawler_type=config.CRAWLER_TYPE,
+                config_name=name,
+                target=str(target),
+                cursor=cursor,
+            ))
+    await task_queue.put(tasks)
+    utils.logger.info(f"[produce_tasks] put {len(tasks)} tasks into task queue")
+    return tasks
+
+
+class CrawlTaskWorker:
+    def __init__(self, task_queue: AbstractTaskQueue, crawler_creator: Callable[[], AbstractCrawler],
+                 batch_size: int = 10, lease_sec: int = 300, max_retry: int = 3, poll_interval: float = 5):
+        """
+        任务队列worker, 循环拉取一批任务并执行, 队列中没有等待执行和执行中的任务时退出
+        :param task_queue: 任务队列
+        :param crawler_creator: 创建爬虫实例的函数
+        :param batch_size: 每次拉取的任务数量
+        :param lease_sec: 任务租约时长(秒), 执行期间会定期续租
+        :param max_retry: 任务执行失败的最大重试次数
+        :param poll_interval: 队列为空但仍有其他worker执行中的任务时的轮询间隔(秒)
+        """
+        self.task_queue = task_queue
+        self.crawler_creator = crawler_creator
+        self.batch_size = batch_size
+        self.lease_sec = lease_sec
+        self.max_retry = max_retry
+        self.poll_interval = poll_interval
+        self._retry_counts: Dict[str, int] = defaultdict(int)
+
+    async def run(self) -> None:
+        """
+        启动worker, 直到队列中的任务全部完成
+        :return:
+        """
+        while True:
+            requeued_count = await self.task_queue.requeue_expired()
+            if requeued_count:
+                utils.logger.info(f"[CrawlTaskWorker.run] requeue {requeued_count} expired tasks")
+
+            tasks = await self.task_queue.pull(self.batch_size, self.lease_sec)
+            if not tasks:
+                stats = await self.task_queue.stats()
+                if stats["pending"] == 0 and stats["processing"] == 0:
+                    utils.logger.info("[CrawlTaskWorker.run] task queue is empty, worker exit ...")
+                    return
+                # 其他worker还有执行中的任务, 它们崩溃时任务会在租约到期后重新入队
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            for task_group in self.group_tasks(tasks):
+                await self.run_task_group(task_group)
+
+    @staticmethod
+    def group_tasks(tasks: List[CrawlTask]) -> List[List[CrawlTask]]:
+        """
+        把同一平台、爬取类型、配置项和起始游标的任务分到同一组, 同一组的任务由一个爬虫实例执行
+        :param tasks:
+        :return:
+        """
+        groups: Dict[Tuple[str, str, str, str], List[CrawlTask]] = defaultdict(list)
+        for task in tasks:
+            groups[(task.platform, task.crawler_type, task.config_name, task.cursor)].append(task)
+        return list(groups.values())
+
+    async def run_task_group(self, tasks: List[CrawlTask]) -> None:
+        """
+        执行一组任务, 执行期间定期续租, 成功后确认, 失败后重新入队
+        :param tasks:
+        :return:
+        """
+        task_ids = [task.task_id for task in tasks]
+        heartbeat = asyncio.create_task(self._keep_lease(task_ids))
+        try:
+            await self._run_crawler(tasks)
+        except Exception as e:
+            utils.logger.error(f"[CrawlTaskWorker.run_task_group] run tasks {task_ids} failed: {e}")
+            await self._handle_failure(task_ids)
+        else:
+            await self.task_queue.ack(task_ids)
+            for task_id in task_ids:
+                self._retry_counts.pop(task_id, None)
+        finally:
+            heartbeat.cancel()
+
+    async def _run_crawler(self, tasks: List[CrawlTask]) -> None:
+        """
+        把任务转换成会话的配置覆盖后启动爬虫, 其他任务配置项置空, 保证只爬取分配到的任务
+        :param tasks:
+        :return:
+        """
+        first_task = tasks[0]
+        task_config_names = get_task_config_names(first_task.platform, first_task.crawler_type)
+        config_overrides = {
+            name: make_task_config_value(name, [task.target for task in tasks] if name == first_task.config_name else [])
+            for name in task_config_names
+        }
+        session: CrawlerSession = CrawlerSessionPool.new_session(0, config_overrides)
+
+        # 平台、爬取类型和起始页码仍是全局配置, 执行期间临时切换
+        origin_values = (config.PLATFORM, config.CRAWLER_TYPE, config.START_PAGE)
+        config.PLATFORM, config.CRAWLER_TYPE = first_task.platform, first_task.crawler_type
+        config.START_PAGE = int(first_task.cursor) if first_task.cursor else 1
+        token = crawler_session_var.set(session)
+        try:
+            crawler = self.crawler_creator()
+            await crawler.start()
+        finally:
+            crawler_session_var.reset(token)
+            config.PLATFORM, config.CRAWLER_TYPE, config.START_PAGE = origin_values
+
+    async def _handle_failure(self, task_ids: List[str]) -> None:
+        """
+        失败的任务重新入队, 超过最大重试次数后放弃
+        :param task_ids:
+        :return:
+        """
+        retry_ids, give_up_ids = [], []
+        for task_id in task_ids:
+            self._retry_counts[task_id] += 1
+            if self._retry_counts[task_id] > self.max_retry:
+                give_up_ids.append(task_id)
+                self._retry_counts.pop(task_id)
+            else:
+                retry_ids.append(task_id)
+        if retry_ids:
+            await self.task_queue.nack(retry_ids)
+        if give_up_ids:
+            utils.logger.error(f"[CrawlTaskWorker._handle_failure] give up tasks {give_up_ids} after {self.max_retry} retries")
+            await self.task_queue.ack(give_up_ids)
+
+    async def _keep_lease(self, task_ids: List[str]) -> None:
+        """
+        定期为执行中的任务续租
+        :param task_ids:
+        :return:
+        """
+        while True:
+            await asyncio.sleep(self.lease_sec / 3)
+            await self.task_queue.extend_lease(task_ids, self.lease_sec)
@@ -0,0 +1,104 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import os
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+import requests
+
+from benchmark.replay import ReplayTransport, install_transport, load_fixture
+from benchmark.runner import FIXTURE_DIR, REPO_ROOT, check_regressions, percentile
+
+
+class TestReplayTransport(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.transport = ReplayTransport([
+            {"url": "https://api.example.com/comments", "match": {"cursor": ""},
+             "json": {"cursor": "c2", "items": ["{{param.note_id}}-{{seq}}"]}},
+            {"url": "https://api.example.com/comments", "match": {"cursor": "c2"},
+             "json": {"cursor": "", "items": []}},
+            {"method": "POST", "url": "https://api.example.com/graphql",
+             "match": {"operationName": "feed", "variables.pcursor": "*"}, "json": {"ok": 1}},
+            {"url": "https://api.example.com/note/*", "text": "<p>{{path.-1}}</p>"},
+        ], REPO_ROOT)
+
+    async def test_match_params_and_render(self):
+        with install_transport(self.transport):
+            async with httpx.AsyncClient(proxies="http://127.0.0.1:1") as client:
+                first = await client.get("https://api.example.com/comments", params={"cursor": "", "note_id": "n1"})
+                again = await client.get("https://api.example.com/comments", params={"cursor": "", "note_id": "n1"})
+                second = await client.get("https://api.example.com/comments", params={"cursor": "c2"})
+                page = await client.get("https://api.example.com/note/abc123")
+
+        self.assertEqual(first.json()["items"], ["n1-1"])
+        self.assertEqual(again.json()["items"], ["n1-2"])
+        self.assertEqual(second.json()["cursor"], "")
+        self.assertEqual(page.text, "<p>abc123</p>")
+        self.assertEqual(self.transport.request_count, 4)
+
+    async def test_nested_body_match(self):
+        with install_transport(self.transport):
+            async with httpx.AsyncClient() as client:
+                hit = await client.post("https://api.example.com/graphql",
+                                        json={"operationName": "feed", "variables": {"pcursor": ""}})
+                miss = await client.post("https://api.example.com/graphql", json={"operationName": "feed"})
+
+        self.assertEqual(hit.json(), {"ok": 1})
+        self.assertEqual(miss.status_code, 404)
+        self.assertEqual(self.transport.unmatched, ["POST https://api.example.com/graphql"])
+
+    def test_requests_replay(self):
+        original_request = requests.request
+        with install_transport(self.transport):
+            response = requests.request("GET", "https://api.example.com/note/n9", params={"a": "1"})
+        self.assertEqual(response.text, "<p>n9</p>")
+        self.assertIs(requests.request, original_request)
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    def test_percentile(self):
+        values = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+        self.assertEqual(percentile(values, 0.5), 5)
+        self.assertEqual(percentile(values, 0.99), 10)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_check_regressions(self):
+        def make_report(items, items_per_sec, peak_rss_mb, unmatched=()):
+            return {"stores": [{"store": "json", "peak_rss_mb": peak_rss_mb, "scenarios": [
+                {"platform": "xhs", "flow": "search", "items": items, "items_per_sec": items_per_sec,
+                 "unmatched": list(unmatched)}]}]}
+
+        baseline = make_report(100, 50.0, 200.0)
+        self.assertEqual(check_regressions(make_report(100, 40.0, 240.0), baseline, 0.3), [])
+        problems = check_regressions(make_report(90, 20.0, 300.0, ["GET https://x"]), baseline, 0.3)
+        self.assertEqual(len(problems), 4)
+
+    def test_fixtures_cover_all_flows(self):
+        # 每个平台的回放数据都要覆盖三种爬取模式, 文件路由指向的样本必须存在
+        fixture_files = sorted(os.listdir(FIXTURE_DIR))
+        self.assertEqual(len(fixture_files), 7)
+        for file_name in fixture_files:
+            fixture = load_fixture(os.path.join(FIXTURE_DIR, file_name))
+            self.assertEqual(f"{fixture['platform']}.json", file_name)
+            for flow in ("search", "detail", "creator"):
+                self.assertIn(flow, fixture["config"])
+            for route in fixture["routes"]:
+                if "file" in route:
+                    self.assertTrue(os.path.exists(os.path.join(REPO_ROOT, route["file"])), route["file"])
+
+
+if __name__ == "__main__":
+    unittest.main()
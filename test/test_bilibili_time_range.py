@@ -0,0 +1,105 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : B站按时间范围搜索的窗口拆分和数量限制测试
+
+import math
+import unittest
+from unittest import IsolatedAsyncioTestCase, mock
+
+import config
+from base.concurrency import reset_stage_semaphores
+from media_platform.bilibili.core import BILI_SEARCH_MIN_WINDOW_SECONDS, BilibiliCrawler
+
+
+class TestBilibiliTimeRangeSearch(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.origin_config = (config.CRAWLER_MAX_NOTES_COUNT, config.MAX_NOTES_PER_DAY, config.START_DAY,
+                              config.END_DAY, config.ENABLE_GET_COMMENTS, config.KEYWORDS)
+        config.KEYWORDS = "编程副业"
+        config.ENABLE_GET_COMMENTS = False
+        reset_stage_semaphores()
+        self.searched_windows = set()
+        self.crawler = BilibiliCrawler()
+        self.crawler.bili_client = mock.Mock()
+        self.crawler.bili_client.search_video_by_keyword = self.search_video_by_keyword
+        self.crawler.get_video_info_task = self.get_video_info_task
+        self.crawler.get_bilibili_video = mock.AsyncMock()
+        patcher = mock.patch("media_platform.bilibili.core.bilibili_store")
+        self.store = patcher.start()
+        self.store.update_bilibili_video = mock.AsyncMock()
+        self.store.update_up_info = mock.AsyncMock()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        (config.CRAWLER_MAX_NOTES_COUNT, config.MAX_NOTES_PER_DAY, config.START_DAY,
+         config.END_DAY, config.ENABLE_GET_COMMENTS, config.KEYWORDS) = self.origin_config
+        reset_stage_semaphores()
+
+    async def search_video_by_keyword(self, keyword, page, page_size, order, pubtime_begin_s, pubtime_end_s):
+        # 每36秒发布一个视频, 一天2400个, 超过接口1000条的上限
+        self.searched_windows.add((pubtime_begin_s, pubtime_end_s))
+        num_results = (pubtime_end_s - pubtime_begin_s + 1) // 36
+        start = (page - 1) * page_size
+        return {
+            "numResults": num_results,
+            "numPages": math.ceil(num_results / page_size),
+            "result": [{"aid": f"{pubtime_begin_s + index * 36}"}
+                       for index in range(start, min(start + page_size, num_results, 1000))],
+        }
+
+    @staticmethod
+    async def get_video_info_task(aid, bvid, semaphore):
+        return {"View": {"aid": aid}}
+
+    def stored_aids(self):
+        return [call.args[0]["View"]["aid"] for call in self.store.update_bilibili_video.call_args_list]
+
+    def test_day_windows(self):
+        windows = BilibiliCrawler.get_day_windows("2024-02-28", "2024-03-01")
+        self.assertEqual([day for day, _, _ in windows], ["2024-02-28", "2024-02-29", "2024-03-01"])
+        for (_, _, end_s), (_, next_begin_s, _) in zip(windows, windows[1:]):
+            self.assertEqual(end_s + 1, next_begin_s)
+        # 与 get_pubtime_datetime 的时间戳一致
+        self.assertEqual(windows[0][2] - windows[0][1], 86399)
+        with self.assertRaises(ValueError):
+            BilibiliCrawler.get_day_windows("2024-03-02", "2024-03-01")
+
+    def test_split_time_window(self):
+        self.assertEqual(BilibiliCrawler.split_time_window(0, 86399), [(0, 43199), (43200, 86399)])
+        self.assertEqual(BilibiliCrawler.split_time_window(0, 2), [(0, 0), (1, 2)])
+
+    async def test_windows_over_limit_are_split(self):
+        config.CRAWLER_MAX_NOTES_COUNT = 100000
+        config.START_DAY = config.END_DAY = "2024-01-01"
+        await self.crawler.search_by_keywords_in_time_range(daily_limit=False)
+
+        aids = self.stored_aids()
+        self.assertEqual(len(aids), 2400)
+        self.assertEqual(len(set(aids)), 2400)
+        spans = {end_s - begin_s + 1 for begin_s, end_s in self.searched_windows}
+        self.assertEqual(spans, {86400, 43200, 21600})
+        self.assertGreaterEqual(min(spans), BILI_SEARCH_MIN_WINDOW_SECONDS)
+
+    async def test_daily_and_total_limit(self):
+        config.CRAWLER_MAX_NOTES_COUNT = 12
+        config.MAX_NOTES_PER_DAY = 5
+        config.START_DAY, config.END_DAY = "2024-01-01", "2024-01-05"
+        await self.crawler.search_by_keywords_in_time_range(daily_limit=True)
+
+        self.assertEqual(len(self.stored_aids()), 12)
+        # 名额远小于接口上限时不拆分窗口
+        self.assertEqual({end_s - begin_s + 1 for begin_s, end_s in self.searched_windows}, {86400})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : B站视频清晰度和大小上限选择测试
+
+import asyncio
+import unittest
+from typing import Dict, List
+from unittest import IsolatedAsyncioTestCase, mock
+
+import config
+from media_platform.bilibili.core import BilibiliCrawler
+
+# 清晰度 -> 视频大小
+SIZES = {80: 300, 64: 200, 32: 100, 16: 50}
+
+
+class TestBilibiliVideoStream(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requested: List[int] = []
+        self.crawler = BilibiliCrawler()
+        self.crawler.bili_client = mock.Mock()
+        self.crawler.bili_client.get_video_play_url = self.get_video_play_url
+
+    async def get_video_play_url(self, aid: int, cid: int, qn: int) -> Dict:
+        self.requested.append(qn)
+        # 账号最高只能看720P
+        quality = max(quality for quality in SIZES if quality <= min(qn, 64))
+        return {
+            "quality": quality,
+            "accept_quality": list(SIZES),
+            "durl": [{"url": f"https://cdn/{quality}.mp4", "size": SIZES[quality]}],
+        }
+
+    async def select(self, max_bytes: int):
+        with mock.patch.object(config, "BILI_VIDEO_QUALITY", 80), \
+                mock.patch.object(config, "BILI_VIDEO_MAX_BYTES", max_bytes):
+            return await self.crawler.select_video_stream(1, 2, asyncio.Semaphore(1))
+
+    async def test_no_size_cap(self):
+        self.assertEqual(await self.select(0), ("https://cdn/64.mp4", 200))
+        self.assertEqual(self.requested, [80])
+
+    async def test_lower_quality_under_size_cap(self):
+        self.assertEqual(await self.select(120), ("https://cdn/32.mp4", 100))
+        self.assertEqual(self.requested, [80, 32])
+
+    async def test_skip_when_lowest_quality_too_large(self):
+        self.assertIsNone(await self.select(10))
+        self.assertEqual(self.requested, [80, 32, 16])
+
+
+if __name__ == '__main__':
+    unittest.main()
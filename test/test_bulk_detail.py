@@ -0,0 +1,116 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 大量指定ID详情爬取的窗口和断点测试
+
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import AsyncIterator, Dict, List
+
+from base.bulk_detail import DetailCheckpoint, read_ids, select_shard, stream_details
+
+
+async def iterate(ids: List[str]) -> AsyncIterator[str]:
+    for item_id in ids:
+        yield item_id
+
+
+class TestStreamDetails(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp_dir.name, "checkpoint", "xhs.json")
+        self.running = 0
+        self.max_running = 0
+        self.stored: Dict[str, str] = {}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def fetch(self, item_id: str):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        # 序号小的后完成, 验证乱序完成时的断点
+        await asyncio.sleep(0.001 * (10 - int(item_id) % 10))
+        self.running -= 1
+        if item_id == "13":
+            return None
+        if item_id == "17":
+            raise ValueError("broken")
+        return f"detail {item_id}"
+
+    async def handle(self, item_id: str, detail: str):
+        self.stored[item_id] = detail
+
+    async def test_read_ids_from_file(self):
+        path = os.path.join(self.tmp_dir.name, "ids.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("1\n\n# comment\n 2 \n3")
+        self.assertEqual([item_id async for item_id in read_ids(path)], ["1", "2", "3"])
+
+    async def test_select_shard(self):
+        ids = [str(index) for index in range(7)]
+        shards = []
+        for index in range(3):
+            shards.append([item_id async for item_id in select_shard(iterate(ids), (index, 3))])
+        self.assertEqual(shards, [["0", "3", "6"], ["1", "4"], ["2", "5"]])
+        self.assertNotEqual(DetailCheckpoint.for_source("xhs", "ids.txt", (0, 3)).path,
+                            DetailCheckpoint.for_source("xhs", "ids.txt", (1, 3)).path)
+
+    async def test_window_and_failures(self):
+        ids = [str(index) for index in range(50)]
+        processed = await stream_details("xhs", iterate(ids), self.fetch, self.handle, window=4,
+                                         checkpoint=DetailCheckpoint(self.checkpoint_path))
+        self.assertEqual(processed, 50)
+        self.assertLessEqual(self.max_running, 4)
+        self.assertEqual(set(self.stored), set(ids) - {"13", "17"})
+        # 全部完成后删除断点
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    async def interrupt(self, ids: List[str]) -> int:
+        task = asyncio.create_task(stream_details("xhs", iterate(ids), self.fetch, self.handle, window=5,
+                                                  checkpoint=DetailCheckpoint(self.checkpoint_path)))
+        while len(self.stored) < 10:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        return DetailCheckpoint(self.checkpoint_path).done
+
+    async def test_resume_from_checkpoint(self):
+        ids = [str(index) for index in range(30)]
+        done = await self.interrupt(ids)
+        self.assertGreater(done, 0)
+        # 断点之前的ID都已保存
+        self.assertTrue(all(str(index) in self.stored for index in range(done) if index not in (13, 17)))
+
+        self.stored.clear()
+        processed = await stream_details("xhs", iterate(ids), self.fetch, self.handle, window=5,
+                                         checkpoint=DetailCheckpoint(self.checkpoint_path))
+        self.assertEqual(processed, 30 - done)
+        self.assertEqual(set(self.stored), {str(index) for index in range(done, 30)} - {"13", "17"})
+
+    async def test_changed_input_starts_over(self):
+        done = await self.interrupt([str(index) for index in range(30)])
+        self.stored.clear()
+        # 输入变化后断点不再适用, 从头处理
+        ids = [str(index) for index in range(1, 31)]
+        processed = await stream_details("xhs", iterate(ids), self.fetch, self.handle, window=5,
+                                         checkpoint=DetailCheckpoint(self.checkpoint_path))
+        self.assertGreater(done, 0)
+        self.assertEqual(processed, 30)
+        self.assertEqual(set(self.stored), set(ids) - {"13", "17"})
+
+
+if __name__ == '__main__':
+    unittest.main()
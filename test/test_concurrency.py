@@ -0,0 +1,114 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import copy
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from base.concurrency import (apply_concurrency_arg, gather_all, get_stage_concurrency, reset_stage_semaphores,
+                              stage_semaphore)
+from media_platform.xhs.client import XiaoHongShuClient
+
+
+class TestStageConcurrency(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.origin_config = (config.MAX_CONCURRENCY_NUM, copy.deepcopy(config.STAGE_CONCURRENCY),
+                              copy.deepcopy(config.PLATFORM_STAGE_CONCURRENCY))
+        config.MAX_CONCURRENCY_NUM = 2
+        config.STAGE_CONCURRENCY = {"comments": 0, "media": 0}
+        config.PLATFORM_STAGE_CONCURRENCY = {}
+        reset_stage_semaphores()
+
+    def tearDown(self):
+        config.MAX_CONCURRENCY_NUM, config.STAGE_CONCURRENCY, config.PLATFORM_STAGE_CONCURRENCY = self.origin_config
+        reset_stage_semaphores()
+
+    def test_concurrency_priority(self):
+        apply_concurrency_arg("4, comments=8, dy.comments=3")
+        self.assertEqual(config.MAX_CONCURRENCY_NUM, 4)
+        self.assertEqual(get_stage_concurrency("xhs", "comments"), 8)
+        self.assertEqual(get_stage_concurrency("dy", "comments"), 3)
+        self.assertEqual(get_stage_concurrency("dy", "media"), 4)
+        with self.assertRaises(ValueError):
+            apply_concurrency_arg("comment=8")
+
+    async def test_limit_shared_across_batches(self):
+        running = 0
+        max_running = 0
+
+        async def fetch():
+            nonlocal running, max_running
+            async with stage_semaphore("xhs", "comments"):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        async def batch():
+            await asyncio.gather(*[fetch() for _ in range(5)])
+
+        # 两个批次各自gather, 但同一阶段共用一个并发上限
+        await asyncio.gather(batch(), batch())
+        self.assertEqual(max_running, 2)
+        self.assertIs(stage_semaphore("xhs", "comments"), stage_semaphore("xhs", "comments"))
+        self.assertIsNot(stage_semaphore("xhs", "comments"), stage_semaphore("dy", "comments"))
+
+    async def test_gather_all_cancels_on_error(self):
+        slow = asyncio.ensure_future(asyncio.sleep(10))
+
+        async def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await gather_all([slow, fail()])
+        self.assertTrue(slow.cancelled())
+
+    async def test_sub_comment_threads_fetched_concurrently(self):
+        origin_sub_comments = config.ENABLE_GET_SUB_COMMENTS
+        config.ENABLE_GET_SUB_COMMENTS = True
+        self.addCleanup(setattr, config, "ENABLE_GET_SUB_COMMENTS", origin_sub_comments)
+        config.STAGE_CONCURRENCY["sub_comments"] = 3
+        running = 0
+        max_running = 0
+        received = []
+
+        async def get_note_sub_comments(note_id, root_comment_id, xsec_token, num, cursor):
+            nonlocal running, max_running
+            async with stage_semaphore("xhs", "sub_comments"):
+                running += 1
+                max_running = max(max_running, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+            page = int(cursor or 0)
+            return {"has_more": page < 1, "cursor": str(page + 1), "comments": [f"{root_comment_id}-{page}"]}
+
+        async def callback(note_id, comments):
+            received.extend(comments)
+
+        client = XiaoHongShuClient.__new__(XiaoHongShuClient)
+        client.get_note_sub_comments = get_note_sub_comments
+        comments = [{"note_id": "n", "id": f"c{i}", "sub_comment_has_more": True} for i in range(5)]
+        result = await client.get_comments_all_sub_comments(comments, "token", crawl_interval=0, callback=callback)
+
+        self.assertEqual(max_running, 3)
+        self.assertEqual(len(result), 10)
+        self.assertCountEqual(received, result)
+        # 结果按一级评论的顺序合并
+        self.assertEqual(result[:2], ["c0-0", "c0-1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
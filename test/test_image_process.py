@@ -0,0 +1,94 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 图片缩略图和重新压缩测试
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+import config
+from base.image_process import ImageProcessor
+from store.media_store import MediaStore, get_media_store
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+class TestImageProcessor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        patcher = mock.patch.multiple(config, MEDIA_STORE_DIR=os.path.join(self.root, "media"),
+                                      MEDIA_STORE_LINK_MODE="hardlink")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    async def save(self, note: str, content: bytes):
+        return await get_media_store().save(self.path(note, "0.jpg"), content, url=f"https://cdn/{note}.jpg")
+
+    async def test_thumbnail_and_recompress(self):
+        processor = ImageProcessor(workers=1, thumbnail_size=100, recompress_format="webp", quality=70)
+        self.addAsyncCleanup(processor.close)
+        record = await processor.process(await self.save("note1", make_jpeg(400, 200)))
+
+        self.assertEqual((record["width"], record["height"]), (400, 200))
+        self.assertTrue(record["original_kept"])
+        thumb = record["variants"]["thumb"]
+        self.assertEqual((thumb["path"], thumb["width"], thumb["height"]), (self.path("note1", "0_thumb.webp"), 100, 50))
+        with Image.open(self.path("note1", "0.webp")) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (400, 200)))
+        self.assertTrue(os.path.exists(self.path("note1", "0.jpg")))
+        # 尺寸记录到清单中
+        entry = MediaStore(self.path("media")).lookup_url("https://cdn/note1.jpg")
+        self.assertEqual(entry["variants"]["recompressed"]["path"], self.path("note1", "0.webp"))
+
+    async def test_same_content_processed_once(self):
+        processor = ImageProcessor(workers=1, thumbnail_size=100, recompress_format="")
+        self.addAsyncCleanup(processor.close)
+        content = make_jpeg(300, 300)
+        await processor.process(await self.save("note1", content))
+        await processor.process(await self.save("note2", content))
+        self.assertTrue(os.path.samefile(self.path("note1", "0_thumb.webp"), self.path("note2", "0_thumb.webp")))
+        self.assertFalse(os.path.exists(self.path("note1", "0.webp")))
+
+    async def test_drop_original(self):
+        processor = ImageProcessor(workers=1, thumbnail_size=0, recompress_format="webp", keep_original=False)
+        self.addAsyncCleanup(processor.close)
+        entry = await self.save("note1", make_jpeg(64, 64))
+        record = await processor.process(entry)
+        self.assertFalse(record["original_kept"])
+        self.assertFalse(os.path.exists(self.path("note1", "0.jpg")))
+        self.assertFalse(os.path.exists(get_media_store().blob_path(entry["sha256"])))
+        self.assertTrue(os.path.exists(self.path("note1", "0.webp")))
+
+    async def test_invalid_image_is_logged(self):
+        processor = ImageProcessor(workers=1)
+        self.addAsyncCleanup(processor.close)
+        self.assertIsNone(await processor.process(await self.save("note1", b"not an image")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 启动耗时基准测试, 通过 python -X importtime 检查入口模块的导入耗时和导入的重量级依赖
+
+import os
+import re
+import subprocess
+import sys
+import unittest
+from typing import Dict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 main 的耗时预算(微秒), 包含 pydantic/httpx 等必需依赖, 预留了足够的余量
+MAIN_IMPORT_BUDGET_US = 1500_000
+
+# 启动时不应导入的重量级依赖, 只有实际用到时才导入
+HEAVY_MODULES = ["cv2", "pandas", "matplotlib", "wordcloud", "jieba", "playwright", "aiomysql"]
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \|(\s*)(\S+)$")
+
+
+def get_import_times(code: str) -> Dict[str, int]:
+    """
+    在子进程中执行代码, 返回顶层导入的模块及其累计耗时(微秒)
+    :param code:
+    :return:
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            import_times[match.group(4)] = int(match.group(2))
+    return import_times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_main_import_budget(self):
+        import_times = get_import_times("import main")
+        self.assertLess(import_times["main"], MAIN_IMPORT_BUDGET_US)
+        for module_name in HEAVY_MODULES:
+            self.assertNotIn(module_name, import_times)
+        self.assertFalse([name for name in import_times if name.startswith("media_platform")])
+
+    def test_only_selected_platform_imported(self):
+        import_times = get_import_times("import main; main.CrawlerFactory.create_crawler('xhs')")
+        platform_modules = {name.split(".")[1] for name in import_times if name.startswith("media_platform.")}
+        self.assertEqual(platform_modules, {"xhs"})
+        for module_name in ["cv2", "pandas", "matplotlib", "wordcloud", "jieba"]:
+            self.assertNotIn(module_name, import_times)
+
+
+if __name__ == '__main__':
+    unittest.main()
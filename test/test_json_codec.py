@@ -0,0 +1,122 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : JSON编解码测试
+
+import importlib.util
+import json
+import unittest
+
+import httpx
+import requests
+
+from tools import json_codec
+
+SAMPLE = {
+    "note_id": "6789",
+    "title": "编程副业 \"引号\" \\ / \x01",
+    "liked_count": 12,
+    "ip_location": None,
+    "ratio": 0.25,
+    "tag_list": [{"name": "标签", "type": "topic"}, [], {}],
+    "is_top": False,
+}
+
+
+class TestJsonCodec(unittest.TestCase):
+    def setUp(self):
+        self.original_backend = json_codec.get_backend()
+
+    def tearDown(self):
+        json_codec.set_backend(self.original_backend)
+
+    def backends(self):
+        for name in ("json", "msgspec", "orjson"):
+            if name != "json" and importlib.util.find_spec(name) is None:
+                continue
+            self.assertEqual(json_codec.set_backend(name), name)
+            yield name
+
+    def test_dumps_same_as_stdlib(self):
+        layouts = [
+            {"separators": (",", ":")},
+            {},
+            {"indent": 2},
+            {"indent": 4},
+            {"indent": 2, "sort_keys": True},
+            {"ensure_ascii": True},
+        ]
+        for name in self.backends():
+            for layout in layouts:
+                kwargs = {"ensure_ascii": False, **layout}
+                with self.subTest(backend=name, **layout):
+                    self.assertEqual(json_codec.dumps(SAMPLE, **kwargs), json.dumps(SAMPLE, **kwargs))
+            # 加速库不支持的值交给标准库
+            big = {"id": 2 ** 70, 1: "int key"}
+            self.assertEqual(json_codec.dumps(big, ensure_ascii=False), json.dumps(big, ensure_ascii=False))
+            self.assertEqual(json_codec.dumps({"s": {1}}, ensure_ascii=False, default=list), '{"s": [1]}')
+
+    @unittest.skipUnless(importlib.util.find_spec("msgspec") or importlib.util.find_spec("orjson"),
+                         "msgspec and orjson are not installed")
+    def test_dumps_special_floats(self):
+        cases = [
+            {"ratio": float("nan")},
+            [float("inf"), -float("inf")],
+            {"small": 1e-7, "big": 1e16, "id": "1e5", "items": [{"score": 1.5e300}]},
+            1e-7,
+        ]
+        for name in self.backends():
+            if name == "json":
+                continue
+            for obj in cases:
+                for layout in ({"separators": (",", ":")}, {}, {"indent": 2}):
+                    kwargs = {"ensure_ascii": False, **layout}
+                    with self.subTest(backend=name, obj=obj, **layout):
+                        self.assertEqual(json_codec.dumps(obj, **kwargs), json.dumps(obj, **kwargs))
+            # 字符串中形似科学计数法的内容和 null 不影响加速库输出
+            self.assertEqual(json_codec._backend.dumps({"id": "1e5", "x": None, "r": 0.5}, None, (",", ":")),
+                             '{"id":"1e5","x":null,"r":0.5}')
+            self.assertIsNone(json_codec._backend.dumps({"r": [1e-7]}, None, (",", ":")))
+
+    def test_loads(self):
+        text = json.dumps(SAMPLE, ensure_ascii=False)
+        for name in self.backends():
+            with self.subTest(backend=name):
+                self.assertEqual(json_codec.loads(text), SAMPLE)
+                self.assertEqual(json_codec.loads(text.encode("utf-8")), SAMPLE)
+                self.assertEqual(json_codec.loads('{"a": "x\ty"}', strict=False), {"a": "x\ty"})
+                with self.assertRaises(json.JSONDecodeError):
+                    json_codec.loads("{bad json")
+
+    def test_loads_response(self):
+        for name in self.backends():
+            for encoding in ("utf-8", "gbk"):
+                with self.subTest(backend=name, encoding=encoding):
+                    response = httpx.Response(
+                        200, content=json.dumps(SAMPLE, ensure_ascii=False).encode(encoding),
+                        headers={"content-type": f"application/json; charset={encoding}"},
+                    )
+                    self.assertEqual(json_codec.loads_response(response), SAMPLE)
+            response = httpx.Response(200, content=b'{"code": 0}')
+            self.assertEqual(json_codec.loads_response(response), {"code": 0})
+            response = requests.Response()
+            response._content = '{"msg": "成功"}'.encode("utf-8")
+            response.encoding = "utf-8"
+            self.assertEqual(json_codec.loads_response(response), {"msg": "成功"})
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            json_codec.set_backend("ujson")
+
+
+if __name__ == '__main__':
+    unittest.main()
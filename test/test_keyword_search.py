@@ -0,0 +1,95 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多关键词并发搜索测试
+
+import asyncio
+import copy
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from base.concurrency import reset_stage_semaphores, stage_semaphore
+from base.keyword_search import KeywordSearchProgress, search_keywords
+from var import source_keyword_var
+
+
+class TestKeywordSearch(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.origin_config = (config.MAX_CONCURRENCY_NUM, copy.deepcopy(config.STAGE_CONCURRENCY))
+        config.MAX_CONCURRENCY_NUM = 1
+        config.STAGE_CONCURRENCY = {"keyword": 3, "search": 2}
+        reset_stage_semaphores()
+
+    def tearDown(self):
+        config.MAX_CONCURRENCY_NUM, config.STAGE_CONCURRENCY = self.origin_config
+        reset_stage_semaphores()
+
+    async def test_keywords_run_concurrently_with_isolated_context(self):
+        running = 0
+        max_running = 0
+        max_searching = 0
+        searching = 0
+        stored = []
+
+        async def search_keyword(keyword, pages):
+            nonlocal running, max_running, searching, max_searching
+            running += 1
+            max_running = max(max_running, running)
+            for page in range(pages):
+                async with stage_semaphore("xhs", "search"):
+                    searching += 1
+                    max_searching = max(max_searching, searching)
+                    await asyncio.sleep(0.01)
+                    searching -= 1
+                # 存储时读取的关键词必须是当前任务自己的
+                stored.append((keyword, source_keyword_var.get()))
+            running -= 1
+
+        await search_keywords("xhs", "a,b,c,d,e", search_keyword, 2)
+
+        self.assertEqual(max_running, 3)
+        self.assertEqual(max_searching, 2)
+        self.assertEqual(len(stored), 10)
+        for keyword, source_keyword in stored:
+            self.assertEqual(keyword, source_keyword)
+        self.assertEqual(source_keyword_var.get(), "")
+
+    async def test_error_cancels_other_keywords(self):
+        cancelled = []
+
+        async def search_keyword(keyword):
+            if keyword == "bad":
+                raise ValueError(keyword)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(keyword)
+                raise
+
+        with self.assertRaises(ValueError):
+            await search_keywords("xhs", "a,bad,c", search_keyword)
+        self.assertCountEqual(cancelled, ["a", "c"])
+
+    def test_progress_eta(self):
+        progress = KeywordSearchProgress("xhs", ["a", "b", "c", "d"])
+        self.assertIsNone(progress.eta())
+        started_at = progress.start("a")
+        progress.started_at -= 2
+        progress.finish("a", started_at)
+        self.assertEqual(progress.finished, 1)
+        self.assertEqual(progress.running, 0)
+        self.assertAlmostEqual(progress.eta(), 6, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from metrics.loop_watchdog import LoopWatchdog
+
+
+def read_cookie_file():
+    time.sleep(0.15)
+
+
+async def fetch():
+    await asyncio.sleep(0.1)
+
+
+class TestLoopWatchdog(IsolatedAsyncioTestCase):
+    async def test_blocking_call_site(self):
+        watchdog = LoopWatchdog(threshold_ms=50)
+        watchdog.start()
+        for _ in range(2):
+            read_cookie_file()
+            await asyncio.sleep(0.05)
+        await asyncio.gather(fetch(), fetch())
+        watchdog.stop()
+
+        offenders = watchdog.get_offenders()
+        self.assertEqual(len(offenders), 1)
+        self.assertEqual(offenders[0]["count"], 2)
+        self.assertIn("read_cookie_file (test/test_loop_watchdog.py", offenders[0]["call_site"])
+        self.assertGreaterEqual(offenders[0]["max_ms"], 100)
+        self.assertIn("test_blocking_call_site", " ".join(offenders[0]["stack"]))
+
+    async def test_export(self):
+        watchdog = LoopWatchdog(threshold_ms=50)
+        watchdog.start()
+        await fetch()
+        with tempfile.TemporaryDirectory() as export_dir:
+            file_name = watchdog.export(export_dir)
+            with open(file_name, encoding="utf-8") as f:
+                report = json.load(f)
+        self.assertEqual(report["offenders"], [])
+        self.assertEqual(report["threshold_ms"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 媒体下载流水线和带宽限速测试
+
+import asyncio
+import time
+import unittest
+from typing import List, Optional
+
+from base.media_download import BandwidthLimiter
+from base.media_pipeline import MediaJob, MediaPipeline
+
+
+class TestMediaPipeline(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.order: List[str] = []
+        self.saved: List[str] = []
+
+    def make_job(self, name: str, kind: str = "image", size_hint: int = 0, content: Optional[bytes] = b"data",
+                 linked: bool = False, release: Optional[asyncio.Event] = None) -> MediaJob:
+        async def download():
+            self.order.append(name)
+            if release is not None:
+                await release.wait()
+            return content
+
+        async def save(data: bytes):
+            self.saved.append(name)
+
+        async def link():
+            return linked
+
+        return MediaJob("xhs", f"https://cdn/{name}", download, save, link, kind=kind, size_hint=size_hint)
+
+    async def test_images_before_videos_and_large_videos_last(self):
+        pipeline = MediaPipeline(worker_num=1, queue_size=10)
+        release = asyncio.Event()
+        # 第一个任务占住下载协程, 其余任务在队列中按优先级排序
+        await pipeline.submit(self.make_job("blocker", release=release))
+        await asyncio.sleep(0)
+        await pipeline.submit(self.make_job("large", kind="video", size_hint=1 << 40))
+        await pipeline.submit(self.make_job("video", kind="video"))
+        await pipeline.submit(self.make_job("image1"))
+        await pipeline.submit(self.make_job("image2"))
+        release.set()
+        await pipeline.join()
+        await pipeline.close()
+        self.assertEqual(["blocker", "image1", "image2", "video", "large"], self.order)
+
+    async def test_submit_waits_when_queue_is_full(self):
+        pipeline = MediaPipeline(worker_num=1, queue_size=1)
+        release = asyncio.Event()
+        await pipeline.submit(self.make_job("running", release=release))
+        await asyncio.sleep(0)
+        await pipeline.submit(self.make_job("queued"))
+        blocked = asyncio.create_task(pipeline.submit(self.make_job("blocked")))
+        await asyncio.sleep(0.01)
+        self.assertFalse(blocked.done())
+        release.set()
+        await blocked
+        await pipeline.join()
+        await pipeline.close()
+        self.assertEqual(["running", "queued", "blocked"], self.saved)
+
+    async def test_linked_and_failed_jobs_are_not_saved(self):
+        pipeline = MediaPipeline(worker_num=0, queue_size=1)
+        await pipeline.submit(self.make_job("linked", linked=True))
+        await pipeline.submit(self.make_job("failed", content=None))
+        await pipeline.submit(self.make_job("ok"))
+        # 不使用队列时提交即完成下载
+        self.assertEqual(["failed", "ok"], self.order)
+        self.assertEqual(["ok"], self.saved)
+
+
+class TestMediaPipelineEventLoop(unittest.TestCase):
+    def test_rebuild_workers_for_new_event_loop(self):
+        pipeline = MediaPipeline(worker_num=1, queue_size=10)
+        saved: List[str] = []
+
+        async def run(name: str):
+            async def download():
+                return b"data"
+
+            async def save(data: bytes):
+                saved.append(name)
+
+            await pipeline.submit(MediaJob("xhs", f"https://cdn/{name}", download, save))
+            await asyncio.wait_for(pipeline.join(), timeout=1)
+
+        # 每次 asyncio.run 都是新的事件循环, 之前的下载协程已经随旧的事件循环停止
+        asyncio.run(run("first"))
+        asyncio.run(run("second"))
+        asyncio.run(pipeline.close())
+        self.assertEqual(["first", "second"], saved)
+
+
+class TestBandwidthLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_rate_is_shared_by_concurrent_downloads(self):
+        limiter = BandwidthLimiter(bytes_per_sec=10000, burst_bytes=1000)
+
+        async def download():
+            for _ in range(5):
+                await limiter.acquire(200)
+
+        start_time = time.monotonic()
+        await asyncio.gather(download(), download())
+        # 共2000字节, 令牌桶中有1000字节, 剩下的1000字节按每秒10000字节至少需要0.1秒
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.09)
+
+    async def test_unlimited(self):
+        limiter = BandwidthLimiter(bytes_per_sec=0)
+        start_time = time.monotonic()
+        await limiter.acquire(1 << 30)
+        self.assertLess(time.monotonic() - start_time, 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按内容寻址的媒体存储测试
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from typing import Union
+from unittest import mock
+
+import httpx
+
+import config
+from base.media_download import download_segmented, request_media
+from store.media_store import MediaContent, MediaFile, MediaLink, MediaStore, get_media_store
+from store.xhs.xhs_store_image import XiaoHongShuImage
+
+
+class TestMediaStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def blob_count(self, store: MediaStore) -> int:
+        return sum(len(files) for _, _, files in os.walk(store.blob_dir))
+
+    async def test_same_content_stored_once(self):
+        store = MediaStore(self.path("media"), "hardlink")
+        first = await store.save(self.path("xhs", "note1", "0.jpg"), b"image", url="https://cdn/a.jpg")
+        second = await store.save(self.path("dy", "love", "1.jpg"), b"image", url="https://cdn/b.jpg")
+        self.assertEqual(first["sha256"], second["sha256"])
+        self.assertEqual(self.blob_count(store), 1)
+        self.assertTrue(os.path.samefile(self.path("xhs", "note1", "0.jpg"), self.path("dy", "love", "1.jpg")))
+        with open(self.path("dy", "love", "1.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"image")
+        with open(store.manifest_path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    async def test_known_url_is_linked_without_download(self):
+        store = MediaStore(self.path("media"), "hardlink")
+        self.assertFalse(await store.link_url("https://cdn/a.jpg", self.path("note2", "0.jpg")))
+        await store.save(self.path("note1", "0.jpg"), b"image", url="https://cdn/a.jpg")
+        self.assertTrue(await store.link_url("https://cdn/a.jpg", self.path("note2", "0.jpg")))
+        self.assertTrue(os.path.samefile(self.path("note1", "0.jpg"), self.path("note2", "0.jpg")))
+
+        # 新进程从清单恢复URL索引
+        reopened = MediaStore(self.path("media"), "hardlink")
+        self.assertEqual(reopened.lookup_url("https://cdn/a.jpg")["size"], 5)
+        self.assertTrue(await reopened.link_url("https://cdn/a.jpg", self.path("note3", "0.jpg")))
+
+        # 已保存的内容被删除后需要重新下载
+        os.remove(reopened.blob_path(reopened.lookup_url("https://cdn/a.jpg")["sha256"]))
+        self.assertFalse(await reopened.link_url("https://cdn/a.jpg", self.path("note4", "0.jpg")))
+        self.assertIsNone(reopened.lookup_url("https://cdn/a.jpg"))
+
+    async def test_compact_manifest_on_load(self):
+        store = MediaStore(self.path("media"), "hardlink")
+        for version in range(5):
+            await store.save(self.path("note1", "0.jpg"), f"v{version}".encode(), url="https://cdn/a.jpg")
+        await store.save(self.path("note2", "0.jpg"), b"other", url="https://cdn/b.jpg")
+        await store.link_url("https://cdn/a.jpg", self.path("note3", "0.jpg"))
+        with open(store.manifest_path, "a", encoding="utf-8") as f:
+            f.write('{"path": "broken')
+
+        with mock.patch("store.media_store.MANIFEST_COMPACT_THRESHOLD", 2):
+            MediaStore(self.path("media"), "hardlink").lookup_url("https://cdn/a.jpg")
+        # 每个路径、每个URL只保留最新的记录, 不完整的行被丢弃
+        with open(store.manifest_path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["path"] for line in f],
+                             [self.path("note1", "0.jpg"), self.path("note2", "0.jpg"), self.path("note3", "0.jpg")])
+        compacted = MediaStore(self.path("media"), "hardlink")
+        self.assertEqual(compacted.lookup_url("https://cdn/a.jpg"), store.lookup_url("https://cdn/a.jpg"))
+        self.assertEqual(compacted.lookup_url("https://cdn/b.jpg"), store.lookup_url("https://cdn/b.jpg"))
+
+    async def test_overwrite_does_not_touch_shared_blob(self):
+        store = MediaStore(self.path("media"), "hardlink")
+        await store.save(self.path("note1", "0.jpg"), b"old")
+        await store.save(self.path("note2", "0.jpg"), b"old")
+        await store.save(self.path("note1", "0.jpg"), b"new")
+        with open(self.path("note2", "0.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        with open(self.path("note1", "0.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"new")
+        self.assertEqual(self.blob_count(store), 2)
+
+    async def test_link_modes(self):
+        symlink_store = MediaStore(self.path("media"), "symlink")
+        await symlink_store.save(self.path("note1", "0.jpg"), b"image")
+        self.assertTrue(os.path.islink(self.path("note1", "0.jpg")))
+        with open(self.path("note1", "0.jpg"), "rb") as f:
+            self.assertEqual(f.read(), b"image")
+
+        off_store = MediaStore(self.path("plain"), "off")
+        await off_store.save(self.path("note2", "0.jpg"), b"image", url="https://cdn/a.jpg")
+        self.assertFalse(os.path.exists(off_store.blob_dir))
+        self.assertFalse(await off_store.link_url("https://cdn/a.jpg", self.path("note3", "0.jpg")))
+
+        with self.assertRaises(ValueError):
+            MediaStore(self.path("media"), "reflink")
+
+    async def test_platform_image_store(self):
+        with mock.patch.object(config, "MEDIA_STORE_DIR", self.path("media")), \
+                mock.patch.object(XiaoHongShuImage, "image_store_path", self.path("xhs", "images")):
+            store = XiaoHongShuImage()
+            await store.store_image({"notice_id": "n1", "pic_content": b"image", "extension_file_name": "0.jpg",
+                                     "url": "https://cdn/a.jpg"})
+            self.assertTrue(await store.link_image("n2", "https://cdn/a.jpg", "0.jpg"))
+            self.assertFalse(await store.link_image("n2", "https://cdn/b.jpg", "1.jpg"))
+            self.assertTrue(os.path.samefile(self.path("xhs", "images", "n1", "0.jpg"),
+                                             self.path("xhs", "images", "n2", "0.jpg")))
+            self.assertEqual(get_media_store().root_dir, self.path("media"))
+
+
+class TestConditionalDownload(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.requests = []
+        self.current_etag = '"v1"'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == self.current_etag:
+            return httpx.Response(304, headers={"etag": self.current_etag})
+        body = f"image {self.current_etag}".encode()
+        return httpx.Response(200, content=body, headers={"etag": self.current_etag,
+                                                          "last-modified": "Mon, 19 Oct 2026 08:00:00 GMT"})
+
+    async def download(self, revalidate: bool, target: str) -> Union[MediaContent, MediaLink]:
+        with mock.patch.object(config, "MEDIA_STORE_DIR", os.path.join(self.root, "media")), \
+                mock.patch.object(config, "MEDIA_REVALIDATE", revalidate):
+            media_store = get_media_store()
+            target_path = os.path.join(self.root, target, "0.jpg")
+            if await media_store.link_url("https://cdn/a.jpg", target_path):
+                return media_store.lookup_url("https://cdn/a.jpg")
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self.handler)) as client:
+                content, _ = await request_media(client, "https://cdn/a.jpg")
+            await media_store.save(target_path, content, url="https://cdn/a.jpg")
+            return content
+
+    async def test_validators_recorded_and_known_url_skipped(self):
+        content = await self.download(revalidate=False, target="note1")
+        self.assertEqual(content.etag, '"v1"')
+        entry = MediaStore(os.path.join(self.root, "media")).lookup_url("https://cdn/a.jpg")
+        self.assertEqual(entry["etag"], '"v1"')
+        self.assertEqual(entry["last_modified"], "Mon, 19 Oct 2026 08:00:00 GMT")
+
+        await self.download(revalidate=False, target="note2")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_revalidate_with_conditional_request(self):
+        await self.download(revalidate=False, target="note1")
+        content = await self.download(revalidate=True, target="note2")
+        self.assertEqual(self.requests[-1].headers["if-none-match"], '"v1"')
+        self.assertEqual(self.requests[-1].headers["if-modified-since"], "Mon, 19 Oct 2026 08:00:00 GMT")
+        # 304 时不读取已保存的文件, 直接链接
+        self.assertIsInstance(content, MediaLink)
+        self.assertEqual((content.url, len(content)), ("https://cdn/a.jpg", len(b'image "v1"')))
+        self.assertTrue(os.path.samefile(os.path.join(self.root, "note1", "0.jpg"),
+                                         os.path.join(self.root, "note2", "0.jpg")))
+
+        # 服务端内容变化时重新下载
+        self.current_etag = '"v2"'
+        content = await self.download(revalidate=True, target="note3")
+        self.assertIsInstance(content, MediaContent)
+        self.assertEqual(content, b'image "v2"')
+        self.assertEqual(len(self.requests), 3)
+
+
+class TestSegmentedDownload(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.body = bytes(range(256)) * 40
+        self.ranges = []
+        self.fail_once = {"bytes=1000-1999"}
+        self.support_range = True
+        patcher = mock.patch.multiple(config, MEDIA_STORE_DIR=os.path.join(self.root, "media"),
+                                      MEDIA_SEGMENT_BYTES=1000, MEDIA_SEGMENT_CONCURRENCY=3, MEDIA_SEGMENT_RETRY=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        range_header = request.headers.get("range")
+        if not self.support_range or not range_header:
+            return httpx.Response(200, content=self.body)
+        self.ranges.append(range_header)
+        if range_header in self.fail_once:
+            self.fail_once.remove(range_header)
+            return httpx.Response(503)
+        start, end = map(int, range_header[len("bytes="):].split("-"))
+        return httpx.Response(206, content=self.body[start:end + 1], headers={"etag": '"v1"'})
+
+    async def download(self):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(self.handler)) as client:
+            return await download_segmented(client, "https://cdn/video.mp4", len(self.body))
+
+    async def test_segments_assembled_on_disk(self):
+        media_file = await self.download()
+        self.assertIsInstance(media_file, MediaFile)
+        self.assertEqual(media_file.etag, '"v1"')
+        # 11个分段, 失败的一段重试一次
+        self.assertEqual(len(self.ranges), 12)
+        target_path = os.path.join(self.root, "videos", "video.mp4")
+        entry = await get_media_store().save(target_path, media_file, url="https://cdn/video.mp4")
+        self.assertFalse(os.path.exists(media_file.path))
+        self.assertEqual(entry["size"], len(self.body))
+        with open(target_path, "rb") as f:
+            self.assertEqual(f.read(), self.body)
+
+    async def test_concurrent_downloads_of_same_url(self):
+        first, second = await asyncio.gather(self.download(), self.download())
+        self.assertNotEqual(first.path, second.path)
+        for index, media_file in enumerate((first, second)):
+            target_path = os.path.join(self.root, f"videos{index}", "video.mp4")
+            await get_media_store().save(target_path, media_file, url="https://cdn/video.mp4")
+            with open(target_path, "rb") as f:
+                self.assertEqual(f.read(), self.body)
+
+    async def test_failed_segment_aborts_download(self):
+        self.fail_once = set()
+        original_handler = self.handler
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.headers.get("range") == "bytes=3000-3999":
+                return httpx.Response(503)
+            return original_handler(request)
+
+        self.handler = handler
+        self.assertIsNone(await self.download())
+        self.assertEqual(os.listdir(get_media_store().tmp_dir), [])
+
+    async def test_fallback_without_range_support(self):
+        self.support_range = False
+        content = await self.download()
+        self.assertEqual(content, self.body)
+
+
+if __name__ == '__main__':
+    unittest.main()
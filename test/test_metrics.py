@@ -0,0 +1,116 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+
+from metrics.crawler_metrics import (REQUEST_COUNT, STORE_ITEMS,
+                                     STORE_QUEUE_DEPTH, RequestTimer,
+                                     StoreTimer, normalize_endpoint)
+from metrics.exporter import MetricsServer, dump_metrics
+from metrics.registry import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_render_text(self):
+        counter = self.registry.counter("test_total", "test counter", ["platform"])
+        counter.labels("xhs").inc()
+        counter.labels("xhs").inc(2)
+        histogram = self.registry.histogram("test_seconds", "test histogram", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        text = self.registry.render_text()
+        self.assertIn('test_total{platform="xhs"} 3.0', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("test_seconds_count 2", text)
+
+    def test_to_dict(self):
+        histogram = self.registry.histogram("test_seconds", "test histogram", ["platform"], buckets=(0.1, 1))
+        for value in [0.01, 0.02, 0.5]:
+            histogram.labels("dy").observe(value)
+        sample = self.registry.to_dict()["test_seconds"]["samples"][0]
+        self.assertEqual(sample["labels"], {"platform": "dy"})
+        self.assertEqual(sample["count"], 3)
+        self.assertEqual(sample["p50"], 0.1)
+        self.assertEqual(sample["max"], 0.5)
+
+    def test_label_count_mismatch(self):
+        counter = self.registry.counter("test_total", "test counter", ["platform"])
+        with self.assertRaises(ValueError):
+            counter.labels("xhs", "extra")
+
+    def test_dump_metrics(self):
+        self.registry.gauge("test_gauge", "test gauge").set(5)
+        with tempfile.TemporaryDirectory() as dump_dir:
+            with open(dump_metrics(dump_dir, self.registry), encoding="utf-8") as file:
+                self.assertEqual(json.load(file)["test_gauge"]["samples"][0]["value"], 5)
+
+
+class TestCrawlerMetrics(unittest.TestCase):
+    def test_normalize_endpoint(self):
+        self.assertEqual(normalize_endpoint("https://edith.xiaohongshu.com/api/sns/web/v1/feed?a=1"),
+                         "/api/sns/web/v1/feed")
+        self.assertEqual(normalize_endpoint("https://www.zhihu.com/api/v4/answers/1234567890/root_comment"),
+                         "/api/v4/answers/{id}/root_comment")
+
+    def test_request_timer(self):
+        with RequestTimer("test", "https://example.com/api/ok") as request_timer:
+            request_timer.status_code = 200
+        with self.assertRaises(RuntimeError):
+            with RequestTimer("test", "https://example.com/api/ok"):
+                raise RuntimeError()
+        self.assertEqual(REQUEST_COUNT.labels("test", "/api/ok", "200").value, 1)
+        self.assertEqual(REQUEST_COUNT.labels("test", "/api/ok", "error").value, 1)
+
+    def test_store_timer(self):
+        with StoreTimer("test", "contents"):
+            self.assertEqual(STORE_QUEUE_DEPTH.labels("test").value, 1)
+        self.assertEqual(STORE_QUEUE_DEPTH.labels("test").value, 0)
+        self.assertEqual(STORE_ITEMS.labels("test", "contents").value, 1)
+
+
+class TestMetricsServer(IsolatedAsyncioTestCase):
+    async def test_serve_metrics(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "test counter").inc()
+        metrics_server = MetricsServer("127.0.0.1", 19100, registry)
+        await metrics_server.start()
+        try:
+            async with httpx.AsyncClient() as client:
+                for _ in range(50):
+                    try:
+                        response = await client.get("http://127.0.0.1:19100/metrics")
+                        break
+                    except httpx.ConnectError:
+                        await asyncio.sleep(0.1)
+                self.assertIn("test_total 1.0", response.text)
+                response = await client.get("http://127.0.0.1:19100/metrics.json")
+                self.assertEqual(response.json()["test_total"]["samples"][0]["value"], 1)
+        finally:
+            await metrics_server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
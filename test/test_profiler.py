@@ -0,0 +1,109 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from metrics.profiler import LoopMonitor, RunProfiler, classify_task, extract_stack, find_call_site
+
+
+async def fetch_page():
+    await asyncio.sleep(0.3)
+
+
+async def get_comments():
+    await fetch_page()
+
+
+async def batch_get_note_comments():
+    await asyncio.gather(get_comments(), get_comments())
+
+
+async def search():
+    await batch_get_note_comments()
+
+
+def block_loop():
+    time.sleep(0.2)
+
+
+class TestRunProfiler(IsolatedAsyncioTestCase):
+    async def test_classify_task(self):
+        task = asyncio.create_task(search())
+        await asyncio.sleep(0.01)
+        # 搜索流程里抓评论, 按最内层的函数归类
+        self.assertEqual(classify_task(task), "comments")
+        await task
+
+    async def test_family_wall_time_and_loop_lag(self):
+        monitor = LoopMonitor(interval_ms=10, lag_threshold_ms=100)
+        monitor.start()
+        await search()
+        block_loop()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        report = monitor.to_dict()
+        self.assertGreater(report["families"]["comments"]["wall_sec"], 0.2)
+        self.assertGreater(report["families"]["comments"]["avg_concurrency"], 1.5)
+        self.assertEqual(report["loop_lag"]["blocked_count"], 1)
+        self.assertGreaterEqual(report["loop_lag"]["events"][0]["lag_ms"], 150)
+
+    async def test_sample_report(self):
+        with tempfile.TemporaryDirectory() as export_dir:
+            profiler = RunProfiler("sample", export_dir, sample_interval_ms=2, lag_threshold_ms=100)
+            profiler.start()
+            await search()
+            block_loop()
+            await asyncio.sleep(0.05)
+            await profiler.stop()
+            file_prefix = profiler.export()
+
+            with open(f"{file_prefix}.json", encoding="utf-8") as f:
+                report = json.load(f)
+            self.assertTrue(os.path.exists(f"{file_prefix}.txt"))
+            self.assertTrue(os.path.exists(f"{file_prefix}.folded"))
+            # 采样线程能定位到阻塞事件循环的同步调用
+            self.assertIn("block_loop (test/test_profiler.py", report["loop_lag"]["events"][0]["blocking_call"])
+            self.assertTrue(any("block_loop" in item["function"] for item in report["top_functions"]))
+
+    async def test_cprofile_report(self):
+        with tempfile.TemporaryDirectory() as export_dir:
+            profiler = RunProfiler("cprofile", export_dir)
+            profiler.start()
+            await search()
+            await profiler.stop()
+            file_prefix = profiler.export()
+            self.assertTrue(os.path.exists(f"{file_prefix}.prof"))
+            with open(f"{file_prefix}.txt", encoding="utf-8") as f:
+                self.assertIn("get_comments", f.read())
+
+    def test_find_call_site(self):
+        stack = extract_stack(sys._getframe()) + ("recv_into (ssl.py:1241)",)
+        self.assertTrue(find_call_site(stack).startswith("recv_into (ssl.py:1241) <- test_find_call_site (test/"))
+        self.assertEqual(find_call_site(("recv_into (ssl.py:1241)",)), "recv_into (ssl.py:1241)")
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            RunProfiler("pyinstrument", "data/profile")
+
+
+if __name__ == "__main__":
+    unittest.main()
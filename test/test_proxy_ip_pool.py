@@ -13,12 +13,43 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 14:42
 # @Desc    :
+import time
+from typing import List, Optional
 from unittest import IsolatedAsyncioTestCase
 
-from proxy.proxy_ip_pool import create_ip_pool
+import httpx
+
+from base.base_crawler import AbstractApiClient
+from metrics.crawler_metrics import RequestTimer
+from proxy.base_proxy import ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool, create_ip_pool
 from proxy.types import IpInfoModel
 
 
+class StaticProxyProvider(ProxyProvider):
+    """固定返回给定IP列表的代理商, 不发起网络请求"""
+
+    def __init__(self, proxies: List[IpInfoModel]):
+        self.proxies = proxies
+
+    async def get_proxies(self, num: int) -> List[IpInfoModel]:
+        return self.proxies[:num]
+
+
+class DummyApiClient(AbstractApiClient):
+    proxies = None
+
+    async def request(self, method, url, **kwargs):
+        pass
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+def new_ip_info(ip: str, expired_time_ts: Optional[int] = None) -> IpInfoModel:
+    return IpInfoModel(ip=ip, port=8080, user="user", password="pwd", expired_time_ts=expired_time_ts)
+
+
 class TestIpPool(IsolatedAsyncioTestCase):
     async def test_ip_pool(self):
         pool = await create_ip_pool(ip_pool_count=1, enable_validate_ip=True)
@@ -28,3 +59,91 @@ class TestIpPool(IsolatedAsyncioTestCase):
             print(ip_proxy_info)
             self.assertIsNotNone(ip_proxy_info.ip, msg="验证 ip 是否获取成功")
 
+
+class TestIpPoolHealth(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fast_ip, self.slow_ip = new_ip_info("1.1.1.1"), new_ip_info("2.2.2.2")
+        self.pool = ProxyIpPool(ip_pool_count=2, enable_validate_ip=False,
+                                ip_provider=StaticProxyProvider([self.slow_ip, self.fast_ip]))
+        await self.pool.load_proxies()
+
+    async def test_get_healthiest_proxy(self):
+        await self.pool.report_success(self.slow_ip, latency=2.0)
+        await self.pool.report_success(self.fast_ip, latency=0.1)
+        proxy = await self.pool.get_proxy()
+        self.assertEqual(proxy.ip, self.fast_ip.ip)
+
+    async def test_spread_over_equal_scores(self):
+        # 都还没有请求结果时分数相同, 不能总是返回同一个IP
+        picked = {(await self.pool.get_proxy()).ip for _ in range(50)}
+        self.assertEqual(picked, {self.fast_ip.ip, self.slow_ip.ip})
+
+    async def test_client_reports_request_results(self):
+        client = DummyApiClient()
+        self.pool.register_client(client, self.fast_ip)
+        async with RequestTimer("test", "https://example.com/api/proxy", client) as request_timer:
+            request_timer.status_code = 200
+        self.assertEqual(self.pool.proxy_health[self.pool.get_proxy_key(self.fast_ip)].check_count, 1)
+
+        for _ in range(2):
+            with self.assertRaises(httpx.ConnectError):
+                async with RequestTimer("test", "https://example.com/api/proxy", client):
+                    raise httpx.ConnectError("proxy down")
+        # 失败过多的IP被剔除, 客户端切换到池中剩下的IP
+        self.assertEqual([proxy.ip for proxy in self.pool.proxy_list], [self.slow_ip.ip])
+        self.assertEqual(client.proxy_info.ip, self.slow_ip.ip)
+        self.assertIn(self.slow_ip.ip, list(client.proxies.values())[0])
+
+    async def test_blocked_responses_count_as_failures(self):
+        client = DummyApiClient()
+        self.pool.register_client(client, self.fast_ip)
+        async with RequestTimer("test", "https://example.com/api/proxy", client) as request_timer:
+            request_timer.status_code = 461
+        # 状态码正常, 但客户端从响应内容判断IP被封
+        async with RequestTimer("test", "https://example.com/api/proxy", client) as request_timer:
+            request_timer.status_code = 200
+            request_timer.proxy_failed = True
+        self.assertEqual(self.pool.proxy_health[self.pool.get_proxy_key(self.fast_ip)].fail_count, 2)
+        self.assertEqual(client.proxy_info.ip, self.slow_ip.ip)
+
+    async def test_evict_failed_proxy(self):
+        await self.pool.report_failure(self.fast_ip)
+        self.assertEqual(len(self.pool.proxy_list), 2)
+        await self.pool.report_failure(self.fast_ip)
+        self.assertEqual([proxy.ip for proxy in self.pool.proxy_list], [self.slow_ip.ip])
+
+        # 被剔除的IP重新加载时不再进入池子
+        await self.pool.load_proxies()
+        self.assertEqual([proxy.ip for proxy in self.pool.proxy_list], [self.slow_ip.ip])
+
+    async def test_reload_after_all_evicted(self):
+        fresh_ip = new_ip_info("3.3.3.3")
+        # 代理商先返回缓存中已被剔除的IP, 之后才是新IP
+        self.pool.ip_provider.proxies.append(fresh_ip)
+        for proxy in (self.fast_ip, self.slow_ip):
+            for _ in range(2):
+                await self.pool.report_failure(proxy)
+        self.assertEqual(self.pool.proxy_list, [])
+        proxy = await self.pool.get_proxy()
+        self.assertEqual(proxy.ip, fresh_ip.ip)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+
+class TestIpPoolRefresh(IsolatedAsyncioTestCase):
+    async def test_rotate_expiring_proxy(self):
+        expiring_ip = new_ip_info("1.1.1.1", expired_time_ts=int(time.time()) + 10)
+        fresh_ip = new_ip_info("2.2.2.2", expired_time_ts=int(time.time()) + 600)
+        provider = StaticProxyProvider([expiring_ip])
+        pool = ProxyIpPool(ip_pool_count=1, enable_validate_ip=False, ip_provider=provider,
+                           refresh_before_expire_sec=60)
+        await pool.load_proxies()
+        client = DummyApiClient()
+        pool.register_client(client, await pool.get_proxy())
+
+        provider.proxies = [expiring_ip, fresh_ip]
+        await pool.refresh_expiring_proxies()
+        self.assertEqual([proxy.ip for proxy in pool.proxy_list], [fresh_ip.ip])
+        self.assertIn(fresh_ip.ip, list(client.proxies.values())[0])
+        await pool.close()
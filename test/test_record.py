@@ -0,0 +1,87 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 轻量记录类型测试
+
+import json
+import unittest
+from typing import Optional
+
+from benchmark.records import SAMPLES, to_pydantic_model
+from model.m_baidu_tieba import TiebaComment, TiebaNote
+from model.m_zhihu import ZhihuContent
+from model.record import Field, Record, RecordValidationError
+
+
+class Sample(Record):
+    name: str = Field(..., description="名称")
+    count: int = Field(default=0, description="数量")
+    location: Optional[str] = Field(default="", description="位置")
+
+
+class SubSample(Sample):
+    extra: str = Field(default="x", description="子类字段")
+
+
+class TestRecord(unittest.TestCase):
+    def test_slots_and_defaults(self):
+        sample = Sample(name="a")
+        self.assertEqual(sample.model_dump(), {"name": "a", "count": 0, "location": ""})
+        self.assertFalse(hasattr(sample, "__dict__"))
+        with self.assertRaises(AttributeError):
+            sample.unknown = 1
+        sample.count = 5
+        self.assertEqual(sample.count, 5)
+        # 与 pydantic 一样忽略多余的参数
+        self.assertEqual(Sample(name="b", unknown=1).name, "b")
+        self.assertEqual(list(SubSample(name="c").model_dump()), ["name", "count", "location", "extra"])
+
+    def test_required_and_int_coercion(self):
+        with self.assertRaises(TypeError):
+            Sample()
+        self.assertEqual(Sample(name="a", count="786").count, 786)
+        self.assertEqual(Sample(name="a", count=3.0).count, 3)
+        with self.assertRaises(ValueError):
+            Sample(name="a", count="")
+
+    def test_opt_in_validation(self):
+        sample = Sample(name=1)
+        with self.assertRaises(RecordValidationError):
+            sample.validate()
+        self.assertIs(Sample(name="a", location=None).validate().location, None)
+        with self.assertRaises(RecordValidationError):
+            Sample.model_validate({"count": 1})
+        with self.assertRaises(RecordValidationError):
+            Sample.model_validate({"name": "a", "count": "abc"})
+        self.assertEqual(Sample.model_validate({"name": "a", "count": "2"}).count, 2)
+
+    def test_dump_json_and_equality(self):
+        sample = Sample(name="贴吧", count=1)
+        self.assertEqual(json.loads(sample.model_dump_json()), sample.model_dump())
+        self.assertIn("贴吧", sample.model_dump_json())
+        self.assertEqual(sample, Sample(name="贴吧", count=1))
+        self.assertNotEqual(sample, Sample(name="贴吧", count=2))
+        self.assertEqual(str(sample), "name='贴吧' count=1 location=''")
+
+    def test_same_dump_as_pydantic(self):
+        for record_class, data in SAMPLES.items():
+            self.assertEqual(record_class(**data).model_dump(), to_pydantic_model(record_class)(**data).model_dump())
+        note = TiebaNote(**SAMPLES[TiebaNote])
+        self.assertEqual((note.total_replay_num, note.total_replay_page), (786, 13))
+        content = ZhihuContent()
+        content.title = "标题"
+        self.assertEqual(content.model_dump()["title"], "标题")
+        self.assertIsInstance(TiebaComment(**SAMPLES[TiebaComment]).validate(), TiebaComment)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from base.base_crawler import AbstractCrawler
+from base.session_pool import CrawlerSessionPool, get_session_config
+
+
+class RecordCrawler(AbstractCrawler):
+    """只记录会话配置, 不启动浏览器的爬虫"""
+    started_keywords = []
+
+    async def start(self):
+        RecordCrawler.started_keywords.append(get_session_config("KEYWORDS"))
+
+    async def search(self):
+        pass
+
+    async def launch_browser(self, chromium, playwright_proxy, user_agent, headless=True):
+        pass
+
+
+class TestCrawlerSessionPool(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.origin_config = (config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS, config.XHS_CREATOR_ID_LIST,
+                              config.SPECIFIED_ID_FILE, config.SPECIFIED_ID_SHARD)
+        config.PLATFORM = "xhs"
+        RecordCrawler.started_keywords = []
+
+    def test_split_keywords(self):
+        config.CRAWLER_TYPE = "search"
+        config.KEYWORDS = "k1,k2,k3"
+        sessions = CrawlerSessionPool(RecordCrawler, pool_size=2).create_sessions()
+        self.assertEqual([session.config_overrides["KEYWORDS"] for session in sessions], ["k1,k3", "k2"])
+        self.assertNotIn("USER_DATA_DIR", sessions[0].config_overrides)
+        self.assertIn("USER_DATA_DIR", sessions[1].config_overrides)
+
+    def test_session_count_limited_by_tasks(self):
+        config.CRAWLER_TYPE = "creator"
+        config.XHS_CREATOR_ID_LIST = ["u1"]
+        sessions = CrawlerSessionPool(RecordCrawler, pool_size=4).create_sessions()
+        self.assertEqual(len(sessions), 1)
+        self.assertEqual(sessions[0].config_overrides["XHS_CREATOR_ID_LIST"], ["u1"])
+
+    def test_shard_id_file(self):
+        config.CRAWLER_TYPE = "detail"
+        config.SPECIFIED_ID_FILE = "ids.txt"
+        config.SPECIFIED_ID_SHARD = (1, 2)
+        sessions = CrawlerSessionPool(RecordCrawler, pool_size=3).create_sessions()
+        # 进程分片(1, 2)内再按会话拆分, 各会话的分片互不重叠
+        self.assertEqual([session.config_overrides["SPECIFIED_ID_SHARD"] for session in sessions],
+                         [(1, 6), (3, 6), (5, 6)])
+
+    def test_stdin_single_session(self):
+        config.CRAWLER_TYPE = "detail"
+        config.SPECIFIED_ID_FILE = "-"
+        sessions = CrawlerSessionPool(RecordCrawler, pool_size=3).create_sessions()
+        self.assertEqual(len(sessions), 1)
+        self.assertNotIn("SPECIFIED_ID_SHARD", sessions[0].config_overrides)
+
+    async def test_session_context_isolation(self):
+        config.CRAWLER_TYPE = "search"
+        config.KEYWORDS = "k1,k2"
+        await CrawlerSessionPool(RecordCrawler, pool_size=2).start()
+        self.assertEqual(sorted(RecordCrawler.started_keywords), ["k1", "k2"])
+        # 会话之外读取的仍然是全局配置
+        self.assertEqual(get_session_config("KEYWORDS"), "k1,k2")
+
+    def tearDown(self):
+        (config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS, config.XHS_CREATOR_ID_LIST,
+         config.SPECIFIED_ID_FILE, config.SPECIFIED_ID_SHARD) = self.origin_config
+
+
+if __name__ == '__main__':
+    unittest.main()
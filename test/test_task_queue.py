@@ -0,0 +1,107 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from base.base_crawler import AbstractCrawler
+from base.session_pool import get_session_config
+from task_queue.queue_factory import TaskQueueFactory
+from task_queue.types import CrawlTask
+from task_queue.worker import CrawlTaskWorker, produce_tasks
+
+
+class RecordCrawler(AbstractCrawler):
+    """只记录分配到的关键词, 不启动浏览器的爬虫, 关键词为 fail 时抛出异常"""
+    started_keywords = []
+
+    async def start(self):
+        keywords = get_session_config("KEYWORDS")
+        RecordCrawler.started_keywords.append((keywords, config.START_PAGE))
+        if keywords == "fail":
+            raise RuntimeError("crawl failed")
+
+    async def search(self):
+        pass
+
+    async def launch_browser(self, chromium, playwright_proxy, user_agent, headless=True):
+        pass
+
+
+class TestSqliteTaskQueue(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.task_queue = TaskQueueFactory.create_queue("sqlite", "test", ":memory:")
+
+    async def test_pull_and_ack(self):
+        await self.task_queue.put([
+            CrawlTask(platform="xhs", crawler_type="search", config_name="KEYWORDS", target=keyword)
+            for keyword in ["k1", "k2", "k3"]
+        ])
+        tasks = await self.task_queue.pull(2, lease_sec=60)
+        self.assertEqual([task.target for task in tasks], ["k1", "k2"])
+        self.assertEqual(await self.task_queue.stats(), {"pending": 1, "processing": 2})
+
+        await self.task_queue.ack([tasks[0].task_id])
+        await self.task_queue.nack([tasks[1].task_id])
+        self.assertEqual(await self.task_queue.stats(), {"pending": 2, "processing": 0})
+
+    async def test_requeue_expired(self):
+        await self.task_queue.put([CrawlTask(platform="xhs", crawler_type="search", config_name="KEYWORDS", target="k1")])
+        tasks = await self.task_queue.pull(1, lease_sec=-1)
+        self.assertEqual(await self.task_queue.pull(1, lease_sec=60), [])
+
+        self.assertEqual(await self.task_queue.requeue_expired(), 1)
+        self.assertEqual([task.task_id for task in await self.task_queue.pull(1, lease_sec=60)], [tasks[0].task_id])
+        self.assertEqual(await self.task_queue.requeue_expired(), 0)
+
+    async def asyncTearDown(self):
+        await self.task_queue.close()
+
+
+class TestCrawlTaskWorker(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.origin_config = (config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS, config.START_PAGE)
+        config.PLATFORM = "xhs"
+        config.CRAWLER_TYPE = "search"
+        RecordCrawler.started_keywords = []
+        self.task_queue = TaskQueueFactory.create_queue("sqlite", "test", ":memory:")
+
+    async def test_produce_and_run(self):
+        config.KEYWORDS = "k1,k2,k3"
+        config.START_PAGE = 2
+        await produce_tasks(self.task_queue)
+        config.START_PAGE = 1
+
+        await CrawlTaskWorker(self.task_queue, RecordCrawler, batch_size=2).run()
+        self.assertEqual(RecordCrawler.started_keywords, [("k1,k2", 2), ("k3", 2)])
+        self.assertEqual(await self.task_queue.stats(), {"pending": 0, "processing": 0})
+        # 执行结束后恢复全局配置
+        self.assertEqual(config.START_PAGE, 1)
+
+    async def test_give_up_after_max_retry(self):
+        config.KEYWORDS = "fail"
+        await produce_tasks(self.task_queue)
+
+        await CrawlTaskWorker(self.task_queue, RecordCrawler, max_retry=2).run()
+        self.assertEqual(len(RecordCrawler.started_keywords), 3)
+        self.assertEqual(await self.task_queue.stats(), {"pending": 0, "processing": 0})
+
+    async def asyncTearDown(self):
+        await self.task_queue.close()
+        config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS, config.START_PAGE = self.origin_config
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 贴吧页面解析测试, 使用 media_platform/tieba/test_data 下的页面
+
+import threading
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from parsel import Selector
+
+from benchmark.tieba_extractor import PARENT_COMMENT, load_page
+from media_platform.tieba.help import PARSE_IN_THREAD_MIN_SIZE, TieBaExtractor
+
+
+class TestTieBaExtractor(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.extractor = TieBaExtractor()
+
+    def test_extract_search_note_list(self):
+        notes = self.extractor.extract_search_note_list(load_page("search_keyword_notes.html"))
+        self.assertEqual(len(notes), 10)
+        self.assertEqual(notes[0].note_id, "9117888152")
+        self.assertEqual(notes[0].tieba_name, "武汉交互空间")
+        self.assertEqual(notes[0].publish_time, "2024-08-05 16:45")
+
+    def test_extract_tieba_note_list(self):
+        page_content = load_page("tieba_note_list.html")
+        notes = self.extractor.extract_tieba_note_list(page_content)
+        self.assertEqual(len(notes), 48)
+        self.assertEqual(notes[0].note_id, "9079949995")
+        self.assertEqual(notes[0].total_replay_num, 18)
+        # 吧名在循环外只提取一次, 每个帖子都一样
+        tieba_name = Selector(text=page_content.replace("<!--", "")).xpath(
+            "//a[@class='card_title_fname']/text()").get(default="").strip()
+        self.assertEqual({note.tieba_name for note in notes}, {tieba_name})
+
+    def test_extract_note_detail(self):
+        note = self.extractor.extract_note_detail(load_page("note_detail.html"))
+        self.assertEqual(note.note_id, "9117905169")
+        self.assertEqual(note.title, "对于一个父亲来说，这个女儿14岁就死了")
+        self.assertEqual(note.user_nickname, "章景轩")
+        self.assertEqual((note.total_replay_num, note.total_replay_page), (786, 13))
+        self.assertEqual((note.ip_location, note.publish_time), ("广东", "2024-08-05 16:56"))
+
+    def test_extract_comments(self):
+        comments = self.extractor.extract_tieba_note_parment_comments(load_page("note_comments.html"), "123456")
+        self.assertEqual(len(comments), 30)
+        self.assertEqual(comments[0].comment_id, "150726491368")
+        self.assertEqual(comments[0].content, "中国队第22金！无悬念！")
+        self.assertEqual({comment.tieba_name for comment in comments}, {"网球风云吧"})
+
+        sub_comments = self.extractor.extract_tieba_note_sub_comments(load_page("note_sub_comments.html"),
+                                                                      PARENT_COMMENT)
+        self.assertEqual(len(sub_comments), 10)
+        self.assertEqual(sub_comments[0].comment_id, "150726504693")
+        self.assertEqual(sub_comments[0].user_nickname, "heinzfrentzen")
+        self.assertEqual(sub_comments[0].parent_comment_id, PARENT_COMMENT.comment_id)
+
+    async def test_extract_async_offloads_large_pages(self):
+        threads = []
+
+        def extract(page_content, suffix):
+            threads.append(threading.current_thread())
+            return page_content[:1] + suffix
+
+        self.assertEqual(await self.extractor.extract_async(extract, "a", "!"), "a!")
+        self.assertEqual(await self.extractor.extract_async(extract, "b" * PARSE_IN_THREAD_MIN_SIZE, "!"), "b!")
+        self.assertIs(threads[0], threading.main_thread())
+        self.assertIsNot(threads[1], threading.main_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
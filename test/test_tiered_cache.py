@@ -0,0 +1,71 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import time
+import unittest
+
+from cache.local_cache import ExpiringLocalCache
+from cache.tiered_cache import TieredCache
+
+
+class TestTieredCache(unittest.TestCase):
+
+    def setUp(self):
+        # 使用本地缓存充当远端缓存, 不依赖redis服务
+        self.remote = ExpiringLocalCache(cron_interval=10)
+        self.cache = TieredCache(local_max_size=2, local_ttl=10, remote=self.remote)
+
+    def test_set_and_get(self):
+        self.cache.set('key', 'value', 10)
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_stats()['local_hits'], 1)
+
+    def test_fall_through_to_remote(self):
+        self.remote.set('key', 'value', 10)
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['remote_hits'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_lru_eviction(self):
+        self.cache.set('key1', 'value1', 10)
+        self.cache.set('key2', 'value2', 10)
+        self.cache.get('key1')
+        self.cache.set('key3', 'value3', 10)
+        self.assertEqual(self.cache.get_stats()['local_size'], 2)
+        self.assertEqual(self.cache.get('key2'), 'value2')
+        self.assertEqual(self.cache.get_stats()['remote_hits'], 1)
+
+    def test_expired_key(self):
+        self.cache.set('key', 'value', 1)
+        time.sleep(2)  # wait for the key to expire
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+
+    def test_invalidate_from_other_instance(self):
+        self.cache.set('key', 'value', 10)
+        self.cache._on_invalidate('other_instance:key')
+        self.assertEqual(self.cache.get_stats()['local_size'], 0)
+        self.cache.set('key', 'value', 10)
+        self.cache._on_invalidate(f'{self.cache._instance_id}:key')
+        self.assertEqual(self.cache.get_stats()['local_size'], 1)
+
+    def tearDown(self):
+        self.cache.close()
+        del self.remote
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import json
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from metrics.tracing import Tracer
+from tools import utils
+
+
+class TestTracer(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tracer = Tracer(enabled=True, slow_threshold_ms=0)
+
+    async def test_nested_span(self):
+        with self.tracer.span("xhs.search", "page"):
+            with self.tracer.span("xhs.request", "network", endpoint="/api/search"):
+                await asyncio.sleep(0)
+
+        request_event, search_event = self.tracer.get_events()
+        self.assertEqual(request_event["name"], "xhs.request")
+        self.assertEqual(request_event["args"]["endpoint"], "/api/search")
+        self.assertEqual(request_event["args"]["parent_id"], search_event["args"]["span_id"])
+        self.assertIsNone(search_event["args"]["parent_id"])
+        self.assertGreaterEqual(search_event["dur"], request_event["dur"])
+
+    async def test_concurrent_tasks_isolated(self):
+        async def fetch(name: str):
+            with self.tracer.span(name, "network"):
+                await asyncio.sleep(0.01)
+
+        with self.tracer.span("root", "page"):
+            await asyncio.gather(fetch("a"), fetch("b"))
+
+        events = {event["name"]: event for event in self.tracer.get_events()}
+        # 并发任务复制了上下文, 父span都是root, 且在trace中分成不同的行
+        self.assertEqual(events["a"]["args"]["parent_id"], events["root"]["args"]["span_id"])
+        self.assertEqual(events["b"]["args"]["parent_id"], events["root"]["args"]["span_id"])
+        self.assertNotEqual(events["a"]["tid"], events["b"]["tid"])
+
+    def test_error_recorded(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("zhihu.sign", "sign"):
+                raise ValueError()
+        self.assertEqual(self.tracer.get_events()[0]["args"]["error"], "ValueError")
+
+    def test_slow_log(self):
+        tracer = Tracer(enabled=False, slow_threshold_ms=0.001)
+        with self.assertLogs(utils.logger, level="WARNING") as logs:
+            with tracer.span("parent", "page"):
+                with tracer.span("child", "store"):
+                    sum(range(1000))
+        self.assertIn("parent > child", logs.output[0])
+        self.assertEqual(tracer.get_events(), [])
+
+    def test_export_chrome_trace(self):
+        with self.tracer.span("bili.sign", "sign"):
+            pass
+        with tempfile.TemporaryDirectory() as export_dir:
+            with open(self.tracer.export_chrome_trace(export_dir), encoding="utf-8") as file:
+                trace = json.load(file)
+        self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+        self.assertEqual(trace["traceEvents"][0]["cat"], "sign")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 知乎页面 js-initialData 提取测试
+
+import json
+import threading
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from media_platform.zhihu.help import (PARSE_IN_THREAD_MIN_SIZE, ZhihuExtractor, decode_initial_entities,
+                                       find_js_initial_data)
+
+AUTHOR = {"id": "2b8d4e7f", "url_token": "coder-laozhou", "name": "编程老周", "avatar_url": "https://pic/a.jpg",
+          "type": "people"}
+ANSWER = {"id": "123", "type": "answer", "question": {"id": "456", "title": "程序员有哪些靠谱的副业?"},
+          "content": "<p>按项目整体报价</p>", "created_time": 1717215000,
+          "updated_time": 1717301400, "voteup_count": 3021, "comment_count": 186, "author": AUTHOR}
+ZVIDEO = {"id": "789", "type": "zvideo", "title": "十分钟讲清楚外包报价", "video_url": "https://www.zhihu.com/zvideo/789",
+          "created_at": 1717215000, "voteup_count": 88, "comment_count": 12, "author": "coder-laozhou"}
+
+
+def build_page(initial_data, script_attrs='id="js-initialData" type="text/json"', padding=0):
+    return (f'<!doctype html><html><head><title>知乎</title></head><body><div id="root">{"x" * padding}</div>'
+            f'<script src="/a.js"></script><script {script_attrs}>{json.dumps(initial_data, ensure_ascii=False)}'
+            f'</script></body></html>')
+
+
+class TestZhihuExtractor(IsolatedAsyncioTestCase):
+    def test_find_js_initial_data(self):
+        initial_data = {"initialState": {"entities": {"answers": {"123": ANSWER}}}}
+        for script_attrs in ('id="js-initialData" type="text/json"', "type='text/json' id='js-initialData'",
+                             "id=js-initialData"):
+            page = build_page(initial_data, script_attrs)
+            self.assertEqual(json.loads(find_js_initial_data(page)), initial_data)
+        # 只在文本里出现的 js-initialData 不算
+        self.assertIsNone(find_js_initial_data('<div class="js-initialData">js-initialData</div>'))
+
+    def test_decode_initial_entities(self):
+        entities = {"answers": {"123": ANSWER}, "users": {"coder-laozhou": AUTHOR}}
+        js_init_data = json.dumps({"initialState": {"common": {}, "entities": entities, "question": {"x": 1}}})
+        self.assertEqual(decode_initial_entities(js_init_data), entities)
+        self.assertIsNone(decode_initial_entities(json.dumps({"entities": entities})))
+        self.assertIsNone(decode_initial_entities('{"initialState": {"entities": [1, 2'))
+
+    def test_partial_decode_matches_full_decode(self):
+        page = build_page({"initialState": {"common": {"entities": {"answers": {}}},
+                                            "entities": {"answers": {"123": ANSWER}}}})
+        partial = ZhihuExtractor().extract_answer_content_from_html(page)
+        full = ZhihuExtractor(partial_decode=False).extract_answer_content_from_html(page)
+        self.assertEqual(partial.content_id, "123")
+        self.assertEqual(partial.model_dump(), full.model_dump())
+
+        page = build_page({"initialState": {"entities": {"zvideos": {"789": ZVIDEO},
+                                                         "users": {"coder-laozhou": AUTHOR}}}})
+        zvideo = ZhihuExtractor().extract_zvideo_content_from_html(page)
+        self.assertEqual(zvideo.content_id, "789")
+        self.assertEqual(zvideo.user_nickname, "编程老周")
+
+    def test_fallback_to_dom(self):
+        # 属性里的引号和大小写不规范时按文本找不到, 回退到DOM解析
+        page = build_page({"initialState": {"entities": {"users": {"coder-laozhou": {"id": "1", "name": "老周"}}}}},
+                          script_attrs='id = "js-initialData"')
+        self.assertIsNone(find_js_initial_data(page))
+        creator = ZhihuExtractor().extract_creator("coder-laozhou", page)
+        self.assertEqual(creator.user_nickname, "老周")
+        self.assertIsNone(ZhihuExtractor().extract_answer_content_from_html("<html><body></body></html>"))
+
+    async def test_large_page_parsed_in_thread(self):
+        threads = []
+        extractor = ZhihuExtractor()
+
+        def extract(html_content):
+            threads.append(threading.current_thread())
+            return extractor.extract_answer_content_from_html(html_content)
+
+        page = build_page({"initialState": {"entities": {"answers": {"123": ANSWER}}}},
+                          padding=PARSE_IN_THREAD_MIN_SIZE)
+        content = await extractor.extract_async(extract, page)
+        self.assertEqual(content.content_id, "123")
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+if __name__ == '__main__':
+    unittest.main()
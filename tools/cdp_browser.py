@@ -17,6 +17,7 @@ from typing import Optional, Dict, Any
 from playwright.async_api import Browser, BrowserContext, Playwright
 
 import config
+from base.session_pool import get_session_config
 from tools.browser_launcher import BrowserLauncher
 from tools import utils
 
@@ -131,7 +132,7 @@ class CDPBrowserManager:
             user_data_dir = os.path.join(
                 os.getcwd(),
                 "browser_data",
-                f"cdp_{config.USER_DATA_DIR % config.PLATFORM}",
+                f"cdp_{get_session_config('USER_DATA_DIR') % config.PLATFORM}",
             )
             os.makedirs(user_data_dir, exist_ok=True)
             utils.logger.info(f"[CDPBrowserManager] 用户数据目录: {user_data_dir}")
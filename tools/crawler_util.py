@@ -14,23 +14,26 @@
 # @Time    : 2023/12/2 12:53
 # @Desc    : 爬虫相关的工具函数
 
+import asyncio
 import base64
+import functools
 import json
 import random
 import re
 import urllib
 import urllib.parse
 from io import BytesIO
-from typing import Dict, List, Optional, Tuple, cast
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, cast
 
 import httpx
-from PIL import Image, ImageDraw
-from playwright.async_api import Cookie, Page
+
+if TYPE_CHECKING:
+    from playwright.async_api import Cookie, Page
 
 from . import utils
 
 
-async def find_login_qrcode(page: Page, selector: str) -> str:
+async def find_login_qrcode(page: "Page", selector: str) -> str:
     """find login qrcode image from target selector"""
     try:
         elements = await page.wait_for_selector(
@@ -53,7 +56,7 @@ async def find_login_qrcode(page: Page, selector: str) -> str:
         return ""
 
 
-async def find_qrcode_img_from_canvas(page: Page, canvas_selector: str) -> str:
+async def find_qrcode_img_from_canvas(page: "Page", canvas_selector: str) -> str:
     """
     find qrcode image from canvas element
     Args:
@@ -77,6 +80,8 @@ async def find_qrcode_img_from_canvas(page: Page, canvas_selector: str) -> str:
 
 def show_qrcode(qr_code) -> None:  # type: ignore
     """parse base64 encode qrcode image and show it"""
+    from PIL import Image, ImageDraw
+
     if "," in qr_code:
         qr_code = qr_code.split(",")[1]
     qr_code = base64.b64decode(qr_code)
@@ -131,7 +136,7 @@ def get_mobile_user_agent() -> str:
     return random.choice(ua_list)
 
 
-def convert_cookies(cookies: Optional[List[Cookie]]) -> Tuple[str, Dict]:
+def convert_cookies(cookies: Optional[List["Cookie"]]) -> Tuple[str, Dict]:
     if not cookies:
         return "", {}
     cookies_str = ";".join([f"{cookie.get('name')}={cookie.get('value')}" for cookie in cookies])
@@ -199,6 +204,23 @@ def extract_text_from_html(html: str) -> str:
     clean_text = re.sub(r'<[^>]+>', '', clean_html).strip()
     return clean_text
 
+
+async def run_page_parser(parse_func: Callable[..., Any], page_content: str, *args: Any, min_size: int) -> Any:
+    """
+    在事件循环中调用同步的页面解析函数, 页面长度超过 min_size 时放到默认线程池中执行, 避免大页面阻塞事件循环
+    :param parse_func: 解析函数, 第一个参数为页面内容
+    :param page_content: 页面内容
+    :param args: 解析函数的其余参数
+    :param min_size: 放到线程池执行的最小页面长度(字符数)
+    :return: 解析函数的返回值
+    """
+    if len(page_content) < min_size:
+        return parse_func(page_content, *args)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(parse_func, page_content, *args)
+    )
+
+
 def extract_url_params_to_dict(url: str) -> Dict:
     """Extract URL parameters to dict"""
     url_params_dict = dict()
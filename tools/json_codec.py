@@ -0,0 +1,187 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : JSON编解码: 安装了 msgspec 或 orjson 时用它们加速, 否则使用标准库json, 编码结果与标准库json.dumps一致
+
+import json
+import math
+import re
+from typing import Any, Optional, Tuple, Union
+
+import config
+
+from . import utils
+
+JsonInput = Union[str, bytes, bytearray]
+
+COMPACT_SEPARATORS = (",", ":")
+# 标准库在 indent 为 None 和不为 None 时的默认分隔符
+_DEFAULT_SEPARATORS = (", ", ": ")
+_INDENT_SEPARATORS = (",", ": ")
+# 输出中可能是科学计数法浮点数的位置(数值前是 : , [ 或开头), 字符串中的误判只会多做一次检查
+_EXPONENT_NUMBER = re.compile(r"(?:^|[:,\[])\s*-?[0-9][0-9.]*[eE]")
+
+
+def _has_special_float(obj: Any) -> bool:
+    """
+    是否包含加速库输出与标准库不同的浮点数: NaN/Infinity(加速库输出为 null)和科学计数法(1e-7 与 1e-07)
+    """
+    if isinstance(obj, float):
+        return not math.isfinite(obj) or "e" in repr(obj)
+    if isinstance(obj, dict):
+        return any(_has_special_float(key) or _has_special_float(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_special_float(item) for item in obj)
+    return False
+
+
+def _same_as_json(obj: Any, text: str) -> Optional[str]:
+    """
+    先检查加速库的输出中是否有 null 或科学计数法, 有时再遍历对象确认, 大多数输出不需要遍历
+    :return: 输出与标准库不一致时返回 None
+    """
+    if ("null" in text or _EXPONENT_NUMBER.search(text)) and _has_special_float(obj):
+        return None
+    return text
+
+
+class _MsgspecBackend:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._encode = msgspec.json.encode
+        self._decode = msgspec.json.decode
+        self._format = msgspec.json.format
+        self.errors = (msgspec.MsgspecError, TypeError, ValueError, OverflowError)
+
+    def loads(self, data: JsonInput) -> Any:
+        return self._decode(data)
+
+    def dumps(self, obj: Any, indent: Optional[int], separators: Tuple[str, str]) -> Optional[str]:
+        """
+        :return: 无法输出与标准库一致的格式时返回 None
+        """
+        if indent is None and separators == COMPACT_SEPARATORS:
+            return _same_as_json(obj, self._encode(obj).decode())
+        if indent is None and separators == _DEFAULT_SEPARATORS:
+            return _same_as_json(obj, self._format(self._encode(obj), indent=0).decode())
+        if isinstance(indent, int) and indent > 0 and separators == _INDENT_SEPARATORS:
+            return _same_as_json(obj, self._format(self._encode(obj), indent=indent).decode())
+        return None
+
+
+class _OrjsonBackend:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self.errors = (orjson.JSONDecodeError, orjson.JSONEncodeError, TypeError, ValueError, OverflowError)
+
+    def loads(self, data: JsonInput) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any, indent: Optional[int], separators: Tuple[str, str]) -> Optional[str]:
+        if indent is None and separators == COMPACT_SEPARATORS:
+            return _same_as_json(obj, self._orjson.dumps(obj).decode())
+        if indent == 2 and separators == _INDENT_SEPARATORS:
+            return _same_as_json(obj, self._orjson.dumps(obj, option=self._orjson.OPT_INDENT_2).decode())
+        return None
+
+
+_BACKENDS = {"msgspec": _MsgspecBackend, "orjson": _OrjsonBackend}
+_backend: Optional[Union[_MsgspecBackend, _OrjsonBackend]] = None
+
+
+def set_backend(name: str) -> str:
+    """
+    切换JSON编解码后端, 指定的库没有安装时回退到标准库
+    :param name: auto | msgspec | orjson | json
+    :return: 实际使用的后端名称
+    """
+    global _backend
+    if name not in ("auto", "json") and name not in _BACKENDS:
+        raise ValueError(f"unknown json codec: {name}, expected one of auto | msgspec | orjson | json")
+    candidates = list(_BACKENDS) if name == "auto" else [name] if name != "json" else []
+    _backend = None
+    for candidate in candidates:
+        try:
+            _backend = _BACKENDS[candidate]()
+            break
+        except ImportError:
+            if name != "auto":
+                utils.logger.warning(f"[json_codec.set_backend] {candidate} is not installed, fallback to json")
+    return get_backend()
+
+
+def get_backend() -> str:
+    """
+    当前使用的JSON编解码后端名称
+    :return:
+    """
+    return _backend.name if _backend is not None else "json"
+
+
+def loads(data: JsonInput, **kwargs: Any) -> Any:
+    """
+    解析JSON, 加速库解析失败时(例如需要 strict=False 才能解析的控制字符)交给标准库重新解析,
+    所以解析失败时抛出的始终是标准库的 json.JSONDecodeError
+    :param data: JSON 文本或 UTF-8 编码的字节
+    :param kwargs: 回退到标准库时传给 json.loads 的参数
+    :return:
+    """
+    if _backend is not None:
+        try:
+            return _backend.loads(data)
+        except _backend.errors:
+            pass
+    return json.loads(data, **kwargs)
+
+
+def loads_response(response: Any) -> Any:
+    """
+    解析响应的 JSON, 代替 response.json(), UTF-8 编码的响应直接解析字节, 省去解码成字符串的一次复制
+    :param response: httpx.Response 或 requests.Response
+    :return:
+    """
+    encoding = response.charset_encoding if hasattr(response, "charset_encoding") else response.encoding
+    if encoding is None or encoding.lower().replace("_", "-") in ("utf-8", "utf8"):
+        return loads(response.content)
+    return loads(response.text)
+
+
+def dumps(obj: Any, *, ensure_ascii: bool = True, indent: Optional[int] = None,
+          separators: Optional[Tuple[str, str]] = None, **kwargs: Any) -> str:
+    """
+    与 json.dumps 参数和输出一致, ensure_ascii=False 且加速库能输出相同格式时使用加速库,
+    其余情况(例如 sort_keys、default、加速库不支持的类型、NaN/Infinity、科学计数法的浮点数)使用标准库
+    :param obj:
+    :param ensure_ascii:
+    :param indent:
+    :param separators:
+    :param kwargs: 其余传给 json.dumps 的参数
+    :return:
+    """
+    if _backend is not None and not ensure_ascii and not kwargs:
+        effective_separators = tuple(separators) if separators else (
+            _INDENT_SEPARATORS if indent is not None else _DEFAULT_SEPARATORS)
+        try:
+            text = _backend.dumps(obj, indent, effective_separators)
+        except _backend.errors:
+            text = None
+        if text is not None:
+            return text
+    return json.dumps(obj, ensure_ascii=ensure_ascii, indent=indent, separators=separators, **kwargs)
+
+
+set_backend(config.JSON_CODEC)
@@ -13,9 +13,18 @@ import argparse
 import logging
 
 from .crawler_util import *
-from .slider_util import *
 from .time_util import *
 
+# 滑块验证码工具依赖opencv, 导入较慢, 只在访问时才导入
+_SLIDER_UTIL_NAMES = ("Slide", "get_track_simple", "get_tracks")
+
+
+def __getattr__(name):
+    if name in _SLIDER_UTIL_NAMES:
+        from . import slider_util
+        return getattr(slider_util, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def init_loging_config():
     level = logging.INFO
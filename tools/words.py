@@ -10,22 +10,33 @@
 
 
 import asyncio
-import json
 import logging
 from collections import Counter
 
 import aiofiles
-import jieba
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
 
 import config
-from tools import utils
+from tools import json_codec, utils
 
+# jieba、matplotlib、wordcloud 导入较慢, 在生成词云时才导入
 plot_lock = asyncio.Lock()
+_word_cloud_generator = None
+
+
+def get_word_cloud_generator() -> "AsyncWordCloudGenerator":
+    """
+    获取共享的词云生成器, 第一次调用时才创建(会加载jieba词典)
+    :return:
+    """
+    global _word_cloud_generator
+    if _word_cloud_generator is None:
+        _word_cloud_generator = AsyncWordCloudGenerator()
+    return _word_cloud_generator
 
 class AsyncWordCloudGenerator:
     def __init__(self):
+        import jieba
+
         logging.getLogger('jieba').setLevel(logging.WARNING)
         self.stop_words_file = config.STOP_WORDS_FILE
         self.lock = asyncio.Lock()
@@ -39,6 +50,8 @@ class AsyncWordCloudGenerator:
             return set(f.read().strip().split('\n'))
 
     async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
+        import jieba
+
         all_text = ' '.join(item['content'] for item in data)
         words = [word for word in jieba.lcut(all_text) if word not in self.stop_words and len(word.strip()) > 0]
         word_freq = Counter(words)
@@ -46,7 +59,7 @@ class AsyncWordCloudGenerator:
         # Save word frequency to file
         freq_file = f"{save_words_prefix}_word_freq.json"
         async with aiofiles.open(freq_file, 'w', encoding='utf-8') as file:
-            await file.write(json.dumps(word_freq, ensure_ascii=False, indent=4))
+            await file.write(json_codec.dumps(word_freq, ensure_ascii=False, indent=4))
 
         # Try to acquire the plot lock without waiting
         if plot_lock.locked():
@@ -56,6 +69,9 @@ class AsyncWordCloudGenerator:
         await self.generate_word_cloud(word_freq, save_words_prefix)
 
     async def generate_word_cloud(self, word_freq, save_words_prefix):
+        import matplotlib.pyplot as plt
+        from wordcloud import WordCloud
+
         await plot_lock.acquire()
         top_20_word_freq = {word: freq for word, freq in
                             sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}